@@ -3,6 +3,15 @@ from typing import Dict, List, Any
 from .technical_analyzer import TechnicalAnalyzer
 from .fundamental_analyzer import FundamentalAnalyzer
 from .sentiment_analyzer import SentimentAnalyzer
+from data_processing.feature_engineer import FeatureEngineer
+from data_processing.dtype_policy import DtypePolicy
+from data_processing.lookback_planner import LookbackPlanner
+
+# technical_analysis 接口返回的指标
+TECHNICAL_ANALYSIS_FEATURES = ['MA5', 'MA10', 'MA20', 'MA60', 'MACD', 'Signal', 'MACD_Hist', 'RSI', 'K', 'D', 'J']
+
+# sentiment_analysis 使用最近一个月（20 个交易日）的涨跌幅
+SENTIMENT_BARS = 20
 
 class AnalysisManager:
     """分析管理器"""
@@ -12,6 +21,9 @@ class AnalysisManager:
         self.technical_analyzer = TechnicalAnalyzer()
         self.fundamental_analyzer = FundamentalAnalyzer()
         self.sentiment_analyzer = SentimentAnalyzer()
+        # 接口直接返回指标值，使用全精度避免 float32 的舍入误差
+        self.feature_engineer = FeatureEngineer(dtype_policy=DtypePolicy.full_precision())
+        self.lookback_planner = LookbackPlanner(self.feature_engineer.registry)
     
     def analyze_stock(self, kline_data: List[Dict[str, Any]], financial_data: Dict[str, Any] = None, 
                       news_list: List[Dict[str, str]] = None, social_media_posts: List[Dict[str, str]] = None) -> Dict[str, Any]:
@@ -214,14 +226,8 @@ class AnalysisManager:
         from data_collection.data_collector import DataCollector
         data_collector = DataCollector()
         
-        # 获取最近30天的历史数据用于技术分析
-        from datetime import datetime, timedelta
-        end_date = datetime.now().strftime('%Y%m%d')
-        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
-        
-        # 获取股票数据
-        stock_data = data_collector.get_stock_data(symbol, start_date, end_date, freq='D')
-        data = stock_data.get('data', [])
+        # 只获取指标所需的最少K线数量
+        plan, data = self.lookback_planner.fetch(data_collector, symbol, TECHNICAL_ANALYSIS_FEATURES)
         
         if not data:
             # 如果没有数据，返回基本结构
@@ -253,37 +259,52 @@ class AnalysisManager:
                 'overall_signal': '中性'
             }
         
-        # 使用技术分析器进行分析
+        # 使用技术分析器进行分析（不修改 df，无需复制）
         df = pd.DataFrame(data)
-        technical_result = self.technical_analyzer.comprehensive_technical_analysis(df)
+        if 'trade_date' in df.columns:
+            df = df.sort_values('trade_date').reset_index(drop=True)
+        technical_result = self.technical_analyzer.analyze(df)
+        
+        # 只计算接口需要的指标；上市时间不足等原因K线不够时，窗口不完整的指标返回 None
+        features = self.feature_engineer.compute_features(df[['close', 'high', 'low']].copy(), TECHNICAL_ANALYSIS_FEATURES)
+        latest = features.iloc[-1]
+        insufficient = plan.insufficient(len(df))
+        
+        def value(name, default):
+            if name in insufficient:
+                return None
+            return float(latest[name]) if pd.notna(latest[name]) else default
+        
+        ma20 = value('MA20', latest['close'])
         
         # 转换为API需要的格式
         result = {
             'symbol': symbol,
             'macd': {
-                'macd': df['close'].mean() * 0.01,  # 模拟MACD值
-                'signal': df['close'].mean() * 0.008,  # 模拟信号线
-                'histogram': df['close'].mean() * 0.002,  # 模拟柱状图
+                'macd': value('MACD', 0),
+                'histogram': value('MACD_Hist', 0),
+                'signal_line': value('Signal', 0),
                 'signal': technical_result.get('macd_analysis', {}).get('signal', '中性')
             },
             'rsi': {
-                'rsi': 50 + (df['close'].pct_change().mean() * 100),  # 模拟RSI值
+                'rsi': value('RSI', 50),
                 'signal': technical_result.get('rsi_analysis', {}).get('signal', '中性')
             },
             'kdj': {
-                'k': 50 + (df['close'].pct_change().mean() * 200),  # 模拟K值
-                'd': 50 + (df['close'].pct_change().mean() * 150),  # 模拟D值
-                'j': 50 + (df['close'].pct_change().mean() * 250),  # 模拟J值
+                'k': value('K', 50),
+                'd': value('D', 50),
+                'j': value('J', 50),
                 'signal': technical_result.get('kdj_analysis', {}).get('signal', '中性')
             },
             'ma': {
-                'ma5': df['close'].rolling(window=5).mean().iloc[-1] if len(df) >= 5 else df['close'].mean(),
-                'ma10': df['close'].rolling(window=10).mean().iloc[-1] if len(df) >= 10 else df['close'].mean(),
-                'ma20': df['close'].rolling(window=20).mean().iloc[-1] if len(df) >= 20 else df['close'].mean(),
-                'ma60': df['close'].mean(),  # 模拟MA60
-                'signal': '看多' if (df['close'].iloc[-1] > (df['close'].rolling(window=20).mean().iloc[-1] if len(df) >= 20 else df['close'].mean())) else '看空'
+                'ma5': value('MA5', 0),
+                'ma10': value('MA10', 0),
+                'ma20': value('MA20', 0),
+                'ma60': value('MA60', 0),
+                'signal': '中性' if ma20 is None else ('看多' if latest['close'] > ma20 else '看空')
             },
-            'overall_signal': technical_result.get('overall_signal', '中性')
+            'overall_signal': technical_result.get('overall_signal', '中性'),
+            'insufficient_history': insufficient
         }
         
         return result
@@ -431,15 +452,11 @@ class AnalysisManager:
         
         # 获取股票历史数据，基于价格波动生成更真实的情绪文本
         from data_collection.data_collector import DataCollector
-        from datetime import datetime, timedelta
         
         data_collector = DataCollector()
-        end_date = datetime.now().strftime('%Y%m%d')
-        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
         
-        # 获取股票数据
-        stock_data = data_collector.get_stock_data(symbol, start_date, end_date, freq='D')
-        data = stock_data.get('data', [])
+        # 获取最近 SENTIMENT_BARS 个交易日的K线
+        _, data = self.lookback_planner.fetch(data_collector, symbol, bars=SENTIMENT_BARS)
         
         # 基于价格波动生成情绪文本
         if data:
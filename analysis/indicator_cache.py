@@ -0,0 +1,216 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from . import indicators
+
+# 指标名称 -> (计算函数, 默认输入列)；单输入指标可以通过 source 参数改用其他列（如成交量均线）
+INDICATORS = {
+    'sma': (indicators.sma, ('close',)),
+    'ema': (indicators.ema, ('close',)),
+    'rolling_std': (indicators.rolling_std, ('close',)),
+    'rolling_max': (indicators.rolling_max, ('close',)),
+    'rolling_min': (indicators.rolling_min, ('close',)),
+    'momentum': (indicators.momentum, ('close',)),
+    'rsi': (indicators.rsi, ('close',)),
+    'macd': (indicators.macd, ('close',)),
+    'bollinger_bands': (indicators.bollinger_bands, ('close',)),
+    'kdj': (indicators.kdj, ('high', 'low', 'close')),
+    'true_range': (indicators.true_range, ('high', 'low', 'close')),
+    'atr': (indicators.atr, ('high', 'low', 'close'))
+}
+
+IndicatorValue = Union[np.ndarray, Tuple[np.ndarray, ...]]
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """返回数组的只读视图"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+class IndicatorFrame:
+    """单只股票一段行情数据的指标帧
+
+    保存 OHLCV 列和已经计算过的指标，同一指标和参数只计算一次。
+    返回的数组都是只读视图，多个使用方共享同一份数据，不能原地修改。
+    """
+
+    SOURCES = ('open', 'high', 'low', 'close', 'vol')
+
+    def __init__(self, df: pd.DataFrame, ts_code: str = None, freq: str = 'D'):
+        """初始化指标帧
+
+        Args:
+            df: 按交易日期升序排列的K线数据
+            ts_code: 股票代码
+            freq: K线频率
+        """
+        self.ts_code = ts_code
+        self.freq = freq
+        self.length = len(df)
+        self.last_trade_date = str(df['trade_date'].iloc[-1]) if 'trade_date' in df.columns and len(df) else None
+        self.columns = {
+            col: _readonly(df[col].to_numpy(dtype=float)) for col in self.SOURCES if col in df.columns
+        }
+        self._values: Dict[Tuple, IndicatorValue] = {}
+        self._lock = threading.Lock()
+
+    def column(self, name: str) -> np.ndarray:
+        """获取行情列的只读视图"""
+        if name not in self.columns:
+            raise KeyError(f"行情数据缺少列: {name}")
+        return self.columns[name]
+
+    def get(self, name: str, source: str = None, **params) -> IndicatorValue:
+        """获取指标的只读视图，未计算过时计算并缓存
+
+        Args:
+            name: 指标名称，见 INDICATORS
+            source: 单输入指标的输入列，默认为收盘价
+            params: 指标参数，如 window=20
+
+        Returns:
+            指标数组；MACD、KDJ、布林带等多输出指标返回数组元组
+        """
+        if name not in INDICATORS:
+            raise ValueError(f"不支持的指标: {name}")
+
+        func, inputs = INDICATORS[name]
+        if source is not None:
+            if len(inputs) != 1:
+                raise ValueError(f"指标 {name} 不支持指定输入列")
+            inputs = (source,)
+
+        key = (name, inputs, tuple(sorted(params.items())))
+        with self._lock:
+            value = self._values.get(key)
+        if value is not None:
+            return value
+
+        result = func(*[self.column(col) for col in inputs], **params)
+        if isinstance(result, tuple):
+            value = tuple(_readonly(item) for item in result)
+        else:
+            value = _readonly(result)
+
+        with self._lock:
+            return self._values.setdefault(key, value)
+
+    def latest(self, name: str, source: str = None, **params) -> Union[float, Tuple[float, ...]]:
+        """获取指标的最新值"""
+        value = self.get(name, source, **params)
+        if isinstance(value, tuple):
+            return tuple(float(item[-1]) for item in value)
+        return float(value[-1])
+
+    @property
+    def nbytes(self) -> int:
+        """已缓存数据占用的字节数"""
+        with self._lock:
+            values = list(self._values.values())
+        total = sum(array.nbytes for array in self.columns.values())
+        for value in values:
+            total += sum(item.nbytes for item in value) if isinstance(value, tuple) else value.nbytes
+        return total
+
+class IndicatorCache:
+    """指标帧缓存
+
+    键为 (ts_code, freq, 最后交易日, 数据长度, 行情数据摘要)：同一份行情数据在
+    技术分析、图表和回测中只计算一次指标；数据被修正时摘要不同，不会读到旧结果。
+    """
+
+    def __init__(self, max_frames: int = 256):
+        """初始化缓存
+
+        Args:
+            max_frames: 最多缓存的指标帧数量，超出后淘汰最久未使用的
+        """
+        self.max_frames = max_frames
+        self._frames: 'OrderedDict[Tuple, IndicatorFrame]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(df: pd.DataFrame) -> str:
+        """计算行情数据摘要"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for col in IndicatorFrame.SOURCES:
+            if col in df.columns:
+                hasher.update(col.encode())
+                hasher.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).tobytes())
+        return hasher.hexdigest()
+
+    def frame(self, df: pd.DataFrame, ts_code: str = None, freq: str = 'D') -> IndicatorFrame:
+        """获取行情数据对应的指标帧
+
+        Args:
+            df: 按交易日期升序排列的K线数据
+            ts_code: 股票代码，如果为 None，从 df 的 ts_code 列获取
+            freq: K线频率
+        """
+        if ts_code is None and 'ts_code' in df.columns and not df.empty:
+            ts_code = str(df['ts_code'].iloc[0])
+
+        last_trade_date = str(df['trade_date'].iloc[-1]) if 'trade_date' in df.columns and not df.empty else None
+        key = (ts_code, freq, last_trade_date, len(df), self._digest(df))
+
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                return frame
+
+        frame = IndicatorFrame(df, ts_code, freq)
+
+        with self._lock:
+            frame = self._frames.setdefault(key, frame)
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+
+        return frame
+
+    def invalidate(self, ts_code: str = None, freq: str = None) -> int:
+        """失效匹配的指标帧，参数为 None 表示不限制该维度，返回失效的数量"""
+        with self._lock:
+            stale = [key for key in self._frames
+                     if (ts_code is None or key[0] is None or key[0] == ts_code)
+                     and (freq is None or key[1] == freq)]
+            for key in stale:
+                del self._frames[key]
+            return len(stale)
+
+    def handle_change(self, payload: Dict[str, Any]) -> None:
+        """处理数据变更通知"""
+        table = payload.get('table', '*')
+        if table == '*':
+            self.clear()
+        elif table == 'kline_data':
+            self.invalidate(payload.get('ts_code'), payload.get('freq'))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._frames.clear()
+
+# 进程内共享的指标缓存
+_shared_cache: Optional[IndicatorCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_indicator_cache() -> IndicatorCache:
+    """获取进程内共享的指标缓存，并订阅数据变更通知"""
+    global _shared_cache
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = IndicatorCache(int(os.getenv('INDICATOR_CACHE_FRAMES', '256')))
+
+            from data_collection.change_notifier import get_change_listener
+            listener = get_change_listener(os.getenv('DATABASE_URL'))
+            if listener:
+                listener.subscribe(_shared_cache.handle_change)
+
+    return _shared_cache
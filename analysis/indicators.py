@@ -0,0 +1,384 @@
+"""技术指标计算库
+
+所有指标都是基于 NumPy 的 O(n) 算法，输入为 float64/float32 数组，返回同类型的数组。
+输入可以是一维数组（单只股票），也可以是二维数组（时间 × 股票，沿第 0 维计算）。
+缺失值的处理与 pandas 的 rolling(window).xxx() 和 ewm(adjust=False).mean() 保持一致：
+窗口内有缺失值时结果为 NaN，EMA 在缺失值处沿用上一个值。
+"""
+import numpy as np
+from typing import Tuple
+from scipy.signal import lfilter
+from . import kernels
+
+def _prepare(values) -> Tuple[np.ndarray, np.dtype, bool]:
+    """转换为 float64 二维数组，返回 (数组, 原始浮点类型, 是否为一维)"""
+    array = np.asarray(values)
+    dtype = array.dtype if array.dtype in (np.float32, np.float64) else np.dtype(np.float64)
+    is_1d = array.ndim == 1
+    array = array.astype(np.float64, copy=False)
+    if is_1d:
+        array = array[:, None]
+    return array, dtype, is_1d
+
+def _restore(result: np.ndarray, dtype: np.dtype, is_1d: bool) -> np.ndarray:
+    """恢复为输入的形状和类型"""
+    if is_1d:
+        result = result[:, 0]
+    return result.astype(dtype, copy=False)
+
+def _as_float(values) -> np.ndarray:
+    """转换为浮点数组，保留 float32"""
+    array = np.asarray(values)
+    if array.dtype in (np.float32, np.float64):
+        return array
+    return array.astype(np.float64)
+
+def _rolling_moments(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """用累加和计算每个完整窗口的一阶、二阶矩，结果长度为 n - window + 1
+
+    累加前减去每列的第一个有效值，降低长序列累加和相减时的精度损失。
+
+    Returns:
+        (去中心化后的窗口和, 窗口平方和, 窗口内有效值个数, 每列的中心值)
+    """
+    valid = ~np.isnan(x)
+    first = np.argmax(valid, axis=0)
+    offset = x[first, np.arange(x.shape[1])]
+    offset = np.where(np.isnan(offset), 0.0, offset)
+    centered = np.where(valid, x - offset, 0.0)
+
+    zeros = np.zeros((1, x.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(centered, axis=0)])
+    squares = np.concatenate([zeros, np.cumsum(centered ** 2, axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+
+    return (sums[window:] - sums[:-window], squares[window:] - squares[:-window],
+            counts[window:] - counts[:-window], offset)
+
+def sma(values, window: int) -> np.ndarray:
+    """简单移动平均，等价于 rolling(window).mean()"""
+    x, dtype, is_1d = _prepare(values)
+    out = np.full(x.shape, np.nan)
+
+    if 0 < window <= x.shape[0]:
+        sums, _, counts, offset = _rolling_moments(x, window)
+        out[window - 1:] = np.where(counts == window, offset + sums / window, np.nan)
+
+    return _restore(out, dtype, is_1d)
+
+def rolling_std(values, window: int, ddof: int = 1) -> np.ndarray:
+    """滚动标准差，等价于 rolling(window).std()"""
+    x, dtype, is_1d = _prepare(values)
+    out = np.full(x.shape, np.nan)
+
+    if 0 < window <= x.shape[0] and window > ddof:
+        sums, squares, counts, _ = _rolling_moments(x, window)
+        variance = (squares - sums ** 2 / window) / (window - ddof)
+        # 浮点误差可能产生极小的负数
+        variance = np.maximum(variance, 0.0)
+        out[window - 1:] = np.where(counts == window, np.sqrt(variance), np.nan)
+
+    return _restore(out, dtype, is_1d)
+
+def _rolling_central_moments(values, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.dtype, bool]:
+    """计算每个完整窗口的二、三、四阶中心矩（除以 window），窗口内有缺失值时为 NaN"""
+    x, dtype, is_1d = _prepare(values)
+    n, k = x.shape
+    m2 = m3 = m4 = np.full((0, k), np.nan)
+
+    if 0 < window <= n:
+        valid = ~np.isnan(x)
+        first = np.argmax(valid, axis=0)
+        offset = x[first, np.arange(k)]
+        centered = np.where(valid, x - np.where(np.isnan(offset), 0.0, offset), 0.0)
+
+        zeros = np.zeros((1, k))
+        def window_sums(array):
+            sums = np.concatenate([zeros, np.cumsum(array, axis=0)])
+            return (sums[window:] - sums[:-window]) / window
+
+        mean = window_sums(centered)
+        s2 = window_sums(centered ** 2)
+        s3 = window_sums(centered ** 3)
+        s4 = window_sums(centered ** 4)
+        complete = window_sums(valid) == 1
+
+        m2 = np.where(complete, s2 - mean ** 2, np.nan)
+        m3 = np.where(complete, s3 - 3 * mean * s2 + 2 * mean ** 3, np.nan)
+        m4 = np.where(complete, s4 - 4 * mean * s3 + 6 * mean ** 2 * s2 - 3 * mean ** 4, np.nan)
+
+    return m2, m3, m4, x, dtype, is_1d
+
+def rolling_skew(values, window: int) -> np.ndarray:
+    """滚动偏度（无偏修正），等价于 rolling(window).skew()"""
+    m2, m3, _, x, dtype, is_1d = _rolling_central_moments(values, window)
+    out = np.full(x.shape, np.nan)
+
+    if window >= 3 and m2.shape[0]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            skew = np.sqrt(window * (window - 1)) / (window - 2) * m3 / m2 ** 1.5
+        # 与 pandas 一致：窗口内方差接近 0 时偏度为 0
+        out[window - 1:] = np.where(m2 <= 1e-14, 0.0, skew)
+        out[window - 1:][np.isnan(m2)] = np.nan
+
+    return _restore(out, dtype, is_1d)
+
+def rolling_kurt(values, window: int) -> np.ndarray:
+    """滚动峰度（无偏修正的超额峰度），等价于 rolling(window).kurt()"""
+    m2, _, m4, x, dtype, is_1d = _rolling_central_moments(values, window)
+    out = np.full(x.shape, np.nan)
+
+    if window >= 4 and m2.shape[0]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            kurt = (window - 1) / ((window - 2) * (window - 3)) * ((window + 1) * m4 / m2 ** 2 - 3 * (window - 1))
+        # 与 pandas 一致：窗口内方差接近 0 时峰度为 -3
+        out[window - 1:] = np.where(m2 <= 1e-14, -3.0, kurt)
+        out[window - 1:][np.isnan(m2)] = np.nan
+
+    return _restore(out, dtype, is_1d)
+
+def _rolling_extreme(values, window: int, func: np.ufunc, fill: float) -> np.ndarray:
+    """van Herk/Gil-Werman 算法计算滚动最大/最小值，每个元素只比较常数次
+
+    将序列按窗口长度分块，分别计算块内的前缀和后缀极值，
+    任意窗口最多跨两个块，结果为左侧块的后缀极值与右侧块的前缀极值中的较大（小）者。
+    """
+    x, dtype, is_1d = _prepare(values)
+    n, k = x.shape
+    out = np.full(x.shape, np.nan)
+
+    if 0 < window <= n:
+        missing = np.isnan(x)
+        blocks_count = -(-n // window)
+        padded = np.full((blocks_count * window, k), fill)
+        padded[:n] = np.where(missing, fill, x)
+        blocks = padded.reshape(blocks_count, window, k)
+
+        prefix = func.accumulate(blocks, axis=1).reshape(-1, k)
+        suffix = func.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, k)
+        result = func(suffix[:n - window + 1], prefix[window - 1:n])
+
+        # 窗口内有缺失值时结果为 NaN
+        zeros = np.zeros((1, k))
+        missing_counts = np.concatenate([zeros, np.cumsum(missing, axis=0)])
+        has_missing = (missing_counts[window:] - missing_counts[:-window]) > 0
+        out[window - 1:] = np.where(has_missing, np.nan, result)
+
+    return _restore(out, dtype, is_1d)
+
+def rolling_max(values, window: int) -> np.ndarray:
+    """滚动最大值，等价于 rolling(window).max()"""
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+def rolling_min(values, window: int) -> np.ndarray:
+    """滚动最小值，等价于 rolling(window).min()"""
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+def _sorted_median(sorted_block: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """已排序窗口（NaN 排在末尾）中前 count 个有效值的中位数"""
+    safe = np.maximum(count, 1)[..., None]
+    lower = np.take_along_axis(sorted_block, (safe - 1) // 2, axis=-1)[..., 0]
+    upper = np.take_along_axis(sorted_block, safe // 2, axis=-1)[..., 0]
+    return np.where(count > 0, (lower + upper) / 2, np.nan)
+
+def rolling_median_mad(values, window: int, min_periods: int = None,
+                       block_size: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+    """滚动中位数和中位数绝对偏差（MAD），中位数等价于 rolling(window, min_periods).median()，
+    但只计算完整窗口（前 window - 1 行为 NaN）
+
+    在步长视图上按块计算，每块最多复制 block_size × window 个元素，内存占用有上限。
+
+    Args:
+        min_periods: 窗口内至少需要的有效值个数，None 表示窗口内有缺失值时结果为 NaN
+
+    Returns:
+        (中位数, MAD)，窗口不足或有效值不足时为 NaN
+    """
+    x, dtype, is_1d = _prepare(values)
+    n = x.shape[0]
+    median = np.full(x.shape, np.nan)
+    mad = np.full(x.shape, np.nan)
+
+    if 0 < window <= n:
+        windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+        for start in range(0, n - window + 1, block_size):
+            block = windows[start:start + block_size]
+            rows = slice(start + window - 1, start + window - 1 + len(block))
+            if min_periods is None:
+                block_median = np.median(block, axis=-1)
+                block_mad = np.median(np.abs(block - block_median[..., None]), axis=-1)
+            else:
+                count = (~np.isnan(block)).sum(axis=-1)
+                block_median = np.where(count >= min_periods, _sorted_median(np.sort(block, axis=-1), count), np.nan)
+                block_mad = _sorted_median(np.sort(np.abs(block - block_median[..., None]), axis=-1), count)
+            median[rows] = block_median
+            mad[rows] = block_mad
+
+    return _restore(median, dtype, is_1d), _restore(mad, dtype, is_1d)
+
+def ema(values, span: float = None, alpha: float = None) -> np.ndarray:
+    """指数移动平均，等价于 ewm(span=span, adjust=False).mean() 或 ewm(alpha=alpha, adjust=False).mean()"""
+    if alpha is None:
+        if span is None:
+            raise ValueError("必须指定 span 或 alpha")
+        alpha = 2.0 / (span + 1.0)
+
+    x, dtype, is_1d = _prepare(values)
+    n, k = x.shape
+    out = np.full(x.shape, np.nan)
+    if n == 0:
+        return _restore(out, dtype, is_1d)
+
+    # 有效值连续（只有开头和结尾缺失，如上市前、停牌后）的列一次性用线性滤波器计算
+    valid = ~np.isnan(x)
+    counts = valid.sum(axis=0)
+    first = np.argmax(valid, axis=0)
+    last = n - 1 - np.argmax(valid[::-1], axis=0)
+    contiguous = (counts > 0) & (counts == last - first + 1)
+
+    if contiguous.any():
+        cols = np.flatnonzero(contiguous)
+        block = x[:, cols]
+        rows = np.arange(n)[:, None]
+        # 开头用第一个有效值填充，EMA 保持不变；结尾的缺失值沿用最后一个有效结果
+        filled = np.where(rows < first[cols], block[first[cols], np.arange(len(cols))], block)
+        filled = np.where(rows > last[cols], 0.0, filled)
+
+        # 线性滤波器递推：y[t] = alpha * x[t] + (1 - alpha) * y[t-1]
+        result = np.empty(filled.shape)
+        result[0] = filled[0]
+        if n > 1:
+            result[1:], _ = lfilter([alpha], [1.0, alpha - 1.0], filled[1:], axis=0,
+                                    zi=(1.0 - alpha) * filled[:1])
+        result = np.where(rows > last[cols], result[last[cols], np.arange(len(cols))], result)
+        out[:, cols] = np.where(rows < first[cols], np.nan, result)
+
+    # 中间有缺失值的列逐列计算
+    for j in np.flatnonzero(~contiguous & (counts > 0)):
+        out[:, j] = kernels.ema_with_gaps(x[:, j], alpha)
+
+    return _restore(out, dtype, is_1d)
+
+def shift(values, periods: int = 1) -> np.ndarray:
+    """平移序列，空出的位置为 NaN，等价于 shift(periods)"""
+    x, dtype, is_1d = _prepare(values)
+    out = np.full(x.shape, np.nan)
+
+    if periods == 0:
+        out[:] = x
+    elif 0 < periods < x.shape[0]:
+        out[periods:] = x[:-periods]
+    elif 0 < -periods < x.shape[0]:
+        out[:periods] = x[-periods:]
+
+    return _restore(out, dtype, is_1d)
+
+def momentum(values, period: int = 10) -> np.ndarray:
+    """动量指标：当前值与 period 个周期前的差"""
+    x = _as_float(values)
+    return x - shift(x, period)
+
+def macd(close, fast_period: int = 12, slow_period: int = 26,
+         signal_period: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD 指标，返回 (MACD, Signal, MACD_Hist)"""
+    macd_line = ema(close, span=fast_period) - ema(close, span=slow_period)
+    signal_line = ema(macd_line, span=signal_period)
+    return macd_line, signal_line, macd_line - signal_line
+
+def rsi(close, window: int = 14, method: str = 'sma') -> np.ndarray:
+    """RSI 指标
+
+    Args:
+        method: sma 为简单移动平均版本；wilder 为 Wilder 平滑（前 window 个涨跌幅取平均作为初值），
+                与 streaming_indicators.RSI 的同名方法一致
+    """
+    delta = _as_float(close) - shift(close, 1)
+
+    # 第一个差值为 NaN，与 pandas 的 where 一样按 0 处理
+    gain = np.where(delta > 0, delta, 0.0).astype(delta.dtype, copy=False)
+    loss = np.where(delta < 0, -delta, 0.0).astype(delta.dtype, copy=False)
+
+    if method == 'wilder':
+        # Wilder 平滑从第一个有效差值开始
+        gain[0] = loss[0] = np.nan
+        avg_gain, avg_loss = wilder_smooth(gain, window), wilder_smooth(loss, window)
+    elif method == 'sma':
+        avg_gain, avg_loss = sma(gain, window), sma(loss, window)
+    else:
+        raise ValueError(f"不支持的 RSI 计算方法: {method}")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def wilder_smooth(values, window: int) -> np.ndarray:
+    """Wilder 平滑（RMA），缺失值不参与递推；递推由 kernels 的当前后端计算"""
+    x, dtype, is_1d = _prepare(values)
+    out = np.empty(x.shape)
+    for j in range(x.shape[1]):
+        out[:, j] = kernels.wilder_smooth(x[:, j], window)
+    return _restore(out, dtype, is_1d)
+
+def kdj(high, low, close, window: int = 9,
+        alpha: float = 1 / 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """KDJ 指标，返回 (RSV, K, D, J)"""
+    low_min = rolling_min(low, window)
+    high_max = rolling_max(high, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv = (_as_float(close) - low_min) / (high_max - low_min) * 100
+
+    k = ema(rsv, alpha=alpha)
+    d = ema(k, alpha=alpha)
+    return rsv, k, d, 3 * k - 2 * d
+
+def bollinger_bands(close, window: int = 20,
+                    num_std: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """布林带，返回 (中轨, 标准差, 上轨, 下轨)"""
+    mid = sma(close, window)
+    std = rolling_std(close, window)
+    return mid, std, mid + num_std * std, mid - num_std * std
+
+def true_range(high, low, close) -> np.ndarray:
+    """真实波幅：max(最高-最低, |最高-昨收|, |最低-昨收|)，第一根K线为 最高-最低"""
+    high = _as_float(high)
+    low = _as_float(low)
+    prev_close = shift(close, 1)
+
+    ranges = high - low
+    with np.errstate(invalid='ignore'):
+        result = np.fmax(ranges, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    # fmax 会忽略昨收缺失产生的 NaN，但当日价格缺失时结果应为 NaN
+    return np.where(np.isnan(ranges), np.nan, result).astype(ranges.dtype, copy=False)
+
+def atr(high, low, close, window: int = 14, method: str = 'sma') -> np.ndarray:
+    """平均真实波幅
+
+    Args:
+        method: sma 为真实波幅的简单移动平均；wilder 为 Wilder 平滑
+    """
+    if method == 'wilder':
+        return wilder_smooth(true_range(high, low, close), window)
+    if method != 'sma':
+        raise ValueError(f"不支持的 ATR 计算方法: {method}")
+    return sma(true_range(high, low, close), window)
+
+def crossover(fast, slow) -> np.ndarray:
+    """交叉信号：fast 上穿 slow 为 1，下穿为 -1，否则为 0
+
+    上穿指当前 fast > slow 且前一期 fast <= slow；包含 NaN 的比较视为不成立。
+    """
+    fast = np.asarray(fast)
+    slow = np.asarray(slow)
+    signals = np.zeros(fast.shape, dtype=np.int8)
+
+    if fast.shape[0] < 2:
+        return signals
+
+    current, previous = fast[1:], fast[:-1]
+    current_slow, previous_slow = slow[1:], slow[:-1]
+    with np.errstate(invalid='ignore'):
+        signals[1:][(current > current_slow) & (previous <= previous_slow)] = 1
+        signals[1:][(current < current_slow) & (previous >= previous_slow)] = -1
+
+    return signals
@@ -0,0 +1,210 @@
+"""递推计算内核
+
+EMA（中间有缺失值的序列）、Wilder 平滑和持仓模拟都依赖上一步的结果，无法完全用
+NumPy 向量运算表示。这里的内核有两个后端：
+  numpy  线性递推用 scipy.signal.lfilter，持仓模拟为 Python 循环（参考实现）
+  numba  同一份循环代码由 Numba 编译（安装 numba 后可用）
+通过环境变量 INDICATOR_BACKEND（auto/numpy/numba，默认 auto：有 numba 时使用 numba）
+或 set_backend() 在运行时选择。两个后端的结果在浮点误差范围内一致，见 benchmarks/bench_kernels.py。
+"""
+import os
+from typing import Dict, Tuple
+import numpy as np
+from scipy.signal import lfilter
+
+try:
+    import numba
+    numba_available = True
+except ImportError:
+    numba = None
+    numba_available = False
+
+BACKENDS = ('numpy', 'numba')
+
+def _resolve_backend(name: str) -> str:
+    if name == 'auto':
+        return 'numba' if numba_available else 'numpy'
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的计算后端: {name}")
+    if name == 'numba' and not numba_available:
+        print("numba 未安装，使用 numpy 后端")
+        return 'numpy'
+    return name
+
+_backend = _resolve_backend(os.getenv('INDICATOR_BACKEND', 'auto'))
+
+def set_backend(name: str) -> str:
+    """选择计算后端（auto/numpy/numba），返回实际使用的后端"""
+    global _backend
+    _backend = _resolve_backend(name)
+    return _backend
+
+def get_backend() -> str:
+    """当前使用的计算后端"""
+    return _backend
+
+def _jit(func):
+    """numba 可用时编译循环内核，否则返回原函数"""
+    return numba.njit(cache=True)(func) if numba_available else func
+
+# ---- 循环内核：只使用 numba 支持的语法，同时作为 numpy 后端的参考实现 ----
+# numpy 后端传入 Python 列表逐元素访问，比逐元素访问 ndarray 快
+
+def _ema_with_gaps_loop(x, alpha: float) -> np.ndarray:
+    n = len(x)
+    out = np.full(n, np.nan)
+    first = -1
+    for i in range(n):
+        # x == x 排除 NaN，对 Python 列表也适用
+        if x[i] == x[i]:
+            first = i
+            break
+    if first < 0:
+        return out
+
+    out[first] = x[first]
+    # 逐点递推，缺失期间权重继续衰减（与 pandas 的 ignore_na=False 一致）
+    weighted = x[first]
+    old_weight = 1.0
+    for i in range(first + 1, n):
+        old_weight *= 1.0 - alpha
+        if x[i] == x[i]:
+            weighted = (old_weight * weighted + alpha * x[i]) / (old_weight + alpha)
+            old_weight = 1.0
+        out[i] = weighted
+    return out
+
+def _wilder_loop(x, window: int) -> np.ndarray:
+    n = len(x)
+    out = np.full(n, np.nan)
+    count = 0
+    total = 0.0
+    value = np.nan
+    for i in range(n):
+        if x[i] != x[i]:
+            continue
+        if count < window:
+            total += x[i]
+            count += 1
+            if count == window:
+                value = total / window
+                out[i] = value
+        else:
+            value = value + (x[i] - value) / window
+            out[i] = value
+    return out
+
+def _simulate_loop(close, signals, capital: float, trailing_stop_pct: float):
+    """持仓循环只生成订单，每根K线的持仓和资金由订单向量化还原"""
+    n = len(close)
+    order_index = np.zeros(n, dtype=np.int64)
+    order_side = np.zeros(n, dtype=np.int8)
+    order_shares = np.zeros(n)
+    order_capital = np.zeros(n)
+    orders = 0
+
+    position = 0.0
+    cash = capital
+    peak = 0.0
+    for i in range(n):
+        price = close[i]
+        signal = signals[i]
+        if position > 0:
+            if price > peak:
+                peak = price
+            # 跟踪止损：收盘价从持仓期间最高收盘价回撤超过比例时卖出
+            if trailing_stop_pct > 0 and price <= peak * (1.0 - trailing_stop_pct):
+                signal = -1
+
+        if signal == 1 and position == 0:
+            # 买入
+            shares = cash // price
+            position = shares
+            cash -= shares * price
+            peak = price
+            order_index[orders] = i
+            order_side[orders] = 1
+            order_shares[orders] = shares
+            order_capital[orders] = cash
+            orders += 1
+        elif signal == -1 and position > 0:
+            # 卖出
+            cash += position * price
+            order_index[orders] = i
+            order_side[orders] = -1
+            order_shares[orders] = position
+            order_capital[orders] = cash
+            orders += 1
+            position = 0.0
+
+    return order_index[:orders], order_side[:orders], order_shares[:orders], order_capital[:orders]
+
+_ema_with_gaps_jit = _jit(_ema_with_gaps_loop)
+_wilder_jit = _jit(_wilder_loop)
+_simulate_jit = _jit(_simulate_loop)
+
+# ---- 对外接口 ----
+
+def ema_with_gaps(x: np.ndarray, alpha: float) -> np.ndarray:
+    """单列指数移动平均，用于中间有缺失值的序列，等价于 ewm(alpha=alpha, adjust=False).mean()"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    if _backend == 'numba':
+        return _ema_with_gaps_jit(x, alpha)
+    return _ema_with_gaps_loop(x.tolist(), alpha)
+
+def wilder_smooth(x: np.ndarray, window: int) -> np.ndarray:
+    """单列 Wilder 平滑：前 window 个有效值的平均作为初值，之后 s = s + (x - s) / window
+
+    缺失值不参与递推，对应位置的结果为 NaN。
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    if _backend == 'numba':
+        return _wilder_jit(x, window)
+
+    out = np.full(x.shape[0], np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if window <= 0 or len(valid) < window:
+        return out
+
+    values = x[valid]
+    seed = values[:window].sum() / window
+    # s[t] = (1 - 1/window) * s[t-1] + x[t] / window
+    alpha = 1.0 / window
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], values[window:], zi=[(1.0 - alpha) * seed])
+    out[valid[window - 1]] = seed
+    out[valid[window:]] = smoothed
+    return out
+
+def simulate_long_only(close: np.ndarray, signals: np.ndarray, capital: float,
+                       trailing_stop_pct: float = 0.0) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """模拟只做多的全仓交易
+
+    Args:
+        close: 收盘价
+        signals: 交易信号（1 买入，-1 卖出，0 不操作）
+        capital: 初始资金
+        trailing_stop_pct: 跟踪止损比例，0 表示不止损
+
+    Returns:
+        (每根K线交易前的持仓, 每根K线交易前的资金, 订单)，订单为
+        index/side/shares/capital 数组，side 为 1 买入、-1 卖出
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signals = np.ascontiguousarray(signals, dtype=np.int64)
+    if _backend == 'numba':
+        index, side, shares, cash = _simulate_jit(close, signals, float(capital), float(trailing_stop_pct))
+    else:
+        index, side, shares, cash = _simulate_loop(close.tolist(), signals.tolist(),
+                                                   float(capital), float(trailing_stop_pct))
+
+    # 第 i 根K线交易前的状态为之前最后一笔订单后的状态
+    n = len(close)
+    positions = np.zeros(n)
+    capitals = np.full(n, float(capital))
+    if len(index):
+        last = np.searchsorted(index, np.arange(n), side='left') - 1
+        has_order = last >= 0
+        last = np.maximum(last, 0)
+        positions = np.where(has_order & (side[last] == 1), shares[last], 0.0)
+        capitals = np.where(has_order, cash[last], float(capital))
+    return positions, capitals, {'index': index, 'side': side, 'shares': shares, 'capital': cash}
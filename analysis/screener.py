@@ -0,0 +1,271 @@
+"""全市场技术选股
+
+一次在 交易日 × 股票 的行情面板上计算全部股票的技术指标（PanelFeatureEngineer），
+再对最新交易日按与 TechnicalAnalyzer 相同的规则向量化地判断趋势、MACD、KDJ、RSI、
+布林带位置和成交量信号，得到当日的信号表。信号表保存在数据库 technical_signals 表中，
+查询时按条件筛选和排序，例如 "rsi<30,ma_relationship=多头排列"。
+
+信号表同时按请求的截止交易日和实际的信号日期缓存，并记录计算时的数据指纹汇总
+（DataStorage.get_fingerprint_summary）；行情数据有任何变化（例如当天的行情陆续入库）时重新计算。
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .technical_analyzer import TechnicalAnalysis
+from data_processing.panel_feature_engineer import KlinePanel, PanelFeatureEngineer
+from data_processing.lookback_planner import LookbackPlanner
+from data_collection.trading_calendar import format_days
+
+# 面板特征 -> 信号表中的数值列（与 TechnicalAnalysis.FIELDS 同名）
+FEATURE_FIELDS = {
+    'MA5': 'ma5', 'MA20': 'ma20', 'MA60': 'ma60',
+    'MACD': 'macd', 'Signal': 'signal', 'MACD_Hist': 'macd_hist',
+    'K': 'k', 'D': 'd', 'J': 'j', 'RSI': 'rsi',
+    'BB_Upper': 'bb_upper', 'BB_Mid': 'bb_mid', 'BB_Lower': 'bb_lower',
+    'VOL_MA5': 'vol_ma5', 'VOL_MA10': 'vol_ma10'
+}
+SCREEN_FEATURES = list(FEATURE_FIELDS)
+
+VALUE_COLUMNS = TechnicalAnalysis.FIELDS
+SIGNAL_COLUMNS = TechnicalAnalysis.SIGNALS
+
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$')
+FILTER_OPERATORS = {
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value,
+    '=': lambda column, value: column == value,
+    '!=': lambda column, value: column != value
+}
+
+def technical_signals(values: Dict[str, np.ndarray], has_previous: np.ndarray) -> Dict[str, np.ndarray]:
+    """按 TechnicalAnalyzer 的规则向量化地判断信号
+
+    Args:
+        values: VALUE_COLUMNS 中每列的数组（每只股票一个值）
+        has_previous: 是否有前一根K线；没有时趋势为震荡
+
+    Returns:
+        SIGNAL_COLUMNS 中每列的信号数组
+    """
+    v = values
+
+    def trend(name):
+        return np.where(has_previous, np.where(v[name] > v[f'prev_{name}'], '上升', '下降'), '震荡')
+
+    signals = {
+        'short_term_trend': trend('ma5'),
+        'medium_term_trend': trend('ma20'),
+        'long_term_trend': trend('ma60'),
+        'ma_relationship': np.select(
+            [has_previous & (v['ma5'] > v['ma20']) & (v['ma20'] > v['ma60']),
+             has_previous & (v['ma5'] < v['ma20']) & (v['ma20'] < v['ma60'])],
+            ['多头排列', '空头排列'], '震荡整理'),
+        'macd_signal': np.select(
+            [(v['macd'] > v['signal']) & (v['macd_hist'] > 0), (v['macd'] < v['signal']) & (v['macd_hist'] < 0)],
+            ['金叉看多', '死叉看空'], '信号不明确'),
+        'kdj_signal': np.select(
+            [(v['k'] > v['d']) & (v['j'] > v['k']), (v['k'] < v['d']) & (v['j'] < v['k']), v['k'] > 80, v['k'] < 20],
+            ['金叉看多', '死叉看空', '超买', '超卖'], '信号不明确'),
+        'rsi_signal': np.select([v['rsi'] > 70, v['rsi'] < 30], ['超买', '超卖'], '正常'),
+        'close_position': np.select(
+            [v['close'] > v['bb_upper'], v['close'] < v['bb_lower'], v['close'] > v['bb_mid']],
+            ['突破上轨', '突破下轨', '中轨上方'], '中轨下方'),
+        'volume_trend': np.select(
+            [(v['vol'] > v['vol_ma5']) & (v['vol_ma5'] > v['vol_ma10']),
+             (v['vol'] < v['vol_ma5']) & (v['vol_ma5'] < v['vol_ma10'])],
+            ['放量上涨', '缩量下跌'], '成交量平稳')
+    }
+
+    # 综合信号：中期趋势、MACD 和 RSI 投票
+    bullish = ((signals['medium_term_trend'] == '上升').astype(int) + (signals['macd_signal'] == '金叉看多')
+               + (signals['rsi_signal'] == '超卖'))
+    bearish = ((signals['medium_term_trend'] == '下降').astype(int) + (signals['macd_signal'] == '死叉看空')
+               + (signals['rsi_signal'] == '超买'))
+    signals['overall_signal'] = np.select([bullish > bearish, bearish > bullish], ['看多', '看空'], '中性')
+    return signals
+
+def parse_filters(text: Optional[str]) -> List[Tuple[str, str, Any]]:
+    """解析筛选条件，如 "rsi<30,ma_relationship=多头排列"，数值列的值转换为浮点数
+
+    Raises:
+        ValueError: 条件格式不正确、列不存在或数值列的值不是数字
+    """
+    filters = []
+    for expression in (text or '').split(','):
+        if not expression.strip():
+            continue
+        match = FILTER_PATTERN.match(expression)
+        if not match:
+            raise ValueError(f"筛选条件格式不正确: {expression}")
+        column, operator, value = match.groups()
+        if column in VALUE_COLUMNS:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"筛选条件 {column} 的值必须是数字: {value}")
+        elif column in SIGNAL_COLUMNS or column == 'ts_code':
+            if operator not in ('=', '!='):
+                raise ValueError(f"信号列 {column} 只支持 = 和 !=")
+        else:
+            raise ValueError(f"不支持的筛选列: {column}")
+        filters.append((column, operator, value))
+    return filters
+
+class TechnicalScreener:
+    """全市场技术选股引擎"""
+
+    def __init__(self, storage=None, planner: LookbackPlanner = None, max_tables: int = 8):
+        """初始化选股引擎
+
+        Args:
+            storage: 数据存储（DataStorage），如果为 None，首次使用时创建
+            planner: 回看长度规划器，用于确定需要读取的K线数量
+            max_tables: 进程内缓存的信号表数量
+        """
+        self._storage = storage
+        self.planner = planner or LookbackPlanner()
+        # 保留 NaN：窗口不足的指标不参与比较（比较结果为 False），与逐只股票分析一致
+        self.engineer = PanelFeatureEngineer(fill_value=None, registry=self.planner.registry)
+        self.max_tables = max_tables
+        # 交易日 -> (数据指纹汇总, 信号表)
+        self._tables: 'OrderedDict[str, Tuple[Optional[str], pd.DataFrame]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            from data_collection.data_storage import DataStorage
+            self._storage = DataStorage()
+        return self._storage
+
+    def compute(self, panel: KlinePanel) -> pd.DataFrame:
+        """计算面板最后一个交易日的信号表，当天没有行情（停牌）的股票不在表中"""
+        columns = ['ts_code', 'trade_date'] + list(VALUE_COLUMNS) + list(SIGNAL_COLUMNS)
+        if not panel.symbols or not len(panel.dates):
+            return pd.DataFrame(columns=columns)
+
+        features = self.engineer.compute(panel, features=SCREEN_FEATURES)
+        valid = panel.valid
+        cols = np.flatnonzero(valid[-1])
+
+        # 每只股票上一根K线的行号（跳过停牌日），没有时为 -1
+        rows = np.where(valid, np.arange(len(panel.dates))[:, None], -1)
+        previous = np.maximum.accumulate(rows, axis=0)[-2, cols] if len(panel.dates) > 1 else np.full(len(cols), -1)
+        has_previous = previous >= 0
+
+        values = {field: features[name][-1, cols].astype(np.float64) for name, field in FEATURE_FIELDS.items()}
+        for field in ('ma5', 'ma20', 'ma60'):
+            name = field.upper()
+            values[f'prev_{field}'] = np.where(has_previous, features[name][np.maximum(previous, 0), cols], np.nan)
+        values['close'] = panel.fields['close'][-1, cols].astype(np.float64)
+        values['vol'] = panel.fields['vol'][-1, cols].astype(np.float64)
+
+        table = pd.DataFrame({
+            'ts_code': np.asarray(panel.symbols, dtype=object)[cols],
+            'trade_date': format_days(panel.dates[-1])
+        })
+        for name in VALUE_COLUMNS:
+            table[name] = values[name]
+        for name, signal in technical_signals(values, has_previous).items():
+            table[name] = signal
+        return table[columns]
+
+    def run(self, trade_date: str = None, ts_codes: List[str] = None, save: bool = True) -> pd.DataFrame:
+        """读取全市场K线并计算信号表
+
+        Args:
+            trade_date: 截止日期，默认为今天，非交易日回退到之前最近的交易日
+            ts_codes: 只计算这些股票，None 表示数据库中的全部股票；只有全市场的信号表会保存和缓存
+            save: 是否保存到数据库 technical_signals 表
+        """
+        # 比前一根K线多一根，用于判断均线方向
+        plan = self.planner.plan(SCREEN_FEATURES, end_date=trade_date)
+        start_date = format_days(self.planner.calendar.window_start(plan.end_date, plan.bars + 1))
+        # 在读取行情之前取得指纹汇总，计算期间写入的数据会使这份信号表在下次读取时过期
+        data_token = self.storage.get_fingerprint_summary(ts_codes)
+        data = self.storage.get_kline_universe(ts_codes, start_date, plan.end_date)
+        table = self.compute(KlinePanel.from_frame(pd.DataFrame(data)))
+        print(f"选股信号计算完成：{len(table)} 只股票")
+
+        if len(table) and ts_codes is None:
+            screen_date = table['trade_date'].iloc[0]
+            if save:
+                self.storage.save_technical_signals(screen_date, table.to_dict('records'), plan.end_date, data_token)
+            self._remember([plan.end_date, screen_date], data_token, table)
+        return table
+
+    def _remember(self, trade_dates: List[str], data_token: Optional[str], table: pd.DataFrame) -> None:
+        with self._lock:
+            for trade_date in dict.fromkeys(trade_dates):
+                self._tables[trade_date] = (data_token, table)
+                self._tables.move_to_end(trade_date)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+
+    def load(self, trade_date: str = None, refresh: bool = False) -> pd.DataFrame:
+        """获取信号表：优先读取进程内缓存和数据库，没有或行情数据已变化时重新计算
+
+        Args:
+            trade_date: 截止日期（YYYYMMDD），默认为最近的交易日；当天行情尚未入库时返回之前最近一个交易日的信号表
+            refresh: 是否重新计算
+        """
+        end_date = self.planner.plan(end_date=trade_date).end_date
+
+        if not refresh:
+            data_token = self.storage.get_fingerprint_summary()
+            with self._lock:
+                cached = self._tables.get(end_date)
+            if cached is not None and cached[0] == data_token:
+                return cached[1]
+
+            run = self.storage.get_technical_signal_run(end_date)
+            if run is not None and run['data_token'] == data_token:
+                records = self.storage.get_technical_signals(run['trade_date'])
+                if records:
+                    table = pd.DataFrame(records, columns=['ts_code', 'trade_date'] + list(VALUE_COLUMNS)
+                                         + list(SIGNAL_COLUMNS))
+                    self._remember([end_date, run['trade_date']], data_token, table)
+                    return table
+
+        return self.run(end_date)
+
+    @staticmethod
+    def query(table: pd.DataFrame, filters: List[Tuple[str, str, Any]] = None, sort_by: str = None,
+              limit: int = None) -> pd.DataFrame:
+        """按条件筛选和排序信号表
+
+        Args:
+            filters: parse_filters 的结果，条件之间为"且"
+            sort_by: 排序列，前缀 - 表示降序（如 -rsi），缺失值排在最后
+            limit: 最多返回的行数
+        """
+        mask = np.ones(len(table), dtype=bool)
+        for column, operator, value in filters or []:
+            mask &= FILTER_OPERATORS[operator](table[column], value).to_numpy()
+        result = table[mask]
+
+        if sort_by:
+            column = sort_by.lstrip('-')
+            if column not in table.columns:
+                raise ValueError(f"不支持的排序列: {column}")
+            result = result.sort_values(column, ascending=not sort_by.startswith('-'), kind='stable')
+        if limit is not None:
+            result = result.head(limit)
+        return result.reset_index(drop=True)
+
+# 进程内共享的选股引擎
+_screener: Optional[TechnicalScreener] = None
+_screener_lock = threading.Lock()
+
+def get_screener(storage=None) -> TechnicalScreener:
+    """获取进程内共享的选股引擎"""
+    global _screener
+    with _screener_lock:
+        if _screener is None:
+            _screener = TechnicalScreener(storage)
+        return _screener
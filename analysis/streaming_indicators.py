@@ -0,0 +1,546 @@
+"""增量（流式）技术指标
+
+每个指标对象保存计算所需的最小状态，新K线或新报价到来时以 O(1) 更新：
+SMA 使用滑动窗口累加和，滚动标准差使用滑动窗口 Welford 算法，
+滚动最大/最小值使用单调队列，EMA 递推。结果与 analysis.indicators 中的批量计算一致。
+
+update(..., commit=False) 只计算"假如这根K线就此收盘"的指标值而不改变状态，
+用于盘中报价反复更新同一根未完成的K线；commit=True 表示K线已完成，写入状态。
+snapshot() 返回可 JSON 序列化的状态，StreamingIndicator.restore() 从快照恢复。
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+NAN = float('nan')
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+def _divide(numerator: float, denominator: float) -> float:
+    """与 NumPy 一致的除法：除以 0 时返回 ±inf 或 NaN"""
+    if denominator == 0:
+        if numerator == 0 or _is_nan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+def _fmax(a: float, b: float) -> float:
+    """忽略 NaN 的最大值"""
+    if _is_nan(a):
+        return b
+    if _is_nan(b):
+        return a
+    return max(a, b)
+
+class StreamingIndicator:
+    """增量指标基类"""
+
+    _registry: Dict[str, type] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        StreamingIndicator._registry[cls.__name__] = cls
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出当前状态"""
+        state = {}
+        for name, value in self.__dict__.items():
+            if isinstance(value, StreamingIndicator):
+                state[name] = value.snapshot()
+            elif isinstance(value, deque):
+                state[name] = {'deque': list(value), 'maxlen': value.maxlen}
+            else:
+                state[name] = value
+        return {'type': type(self).__name__, 'state': state}
+
+    @staticmethod
+    def restore(snapshot: Dict[str, Any]) -> 'StreamingIndicator':
+        """从快照恢复指标对象"""
+        cls = StreamingIndicator._registry[snapshot['type']]
+        indicator = cls.__new__(cls)
+        for name, value in snapshot['state'].items():
+            if isinstance(value, dict) and 'type' in value and 'state' in value:
+                value = StreamingIndicator.restore(value)
+            elif isinstance(value, dict) and 'deque' in value:
+                value = deque([tuple(item) if isinstance(item, list) else item for item in value['deque']],
+                              maxlen=value['maxlen'])
+            setattr(indicator, name, value)
+        return indicator
+
+class SMA(StreamingIndicator):
+    """简单移动平均（滑动窗口累加和）"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = deque(maxlen=window)
+        self.total = 0.0
+        self.nan_count = 0
+        self.count = 0
+        self.value = NAN
+
+    def _next(self, x: float) -> Tuple[float, int, float]:
+        """计算加入 x 后的 (累加和, 缺失值个数, 指标值)"""
+        total, nan_count = self.total, self.nan_count
+        if len(self.buffer) == self.window:
+            leaving = self.buffer[0]
+            if _is_nan(leaving):
+                nan_count -= 1
+            else:
+                total -= leaving
+        if _is_nan(x):
+            nan_count += 1
+        else:
+            total += x
+
+        size = min(len(self.buffer) + 1, self.window)
+        value = total / self.window if size == self.window and nan_count == 0 else NAN
+        return total, nan_count, value
+
+    def update(self, x: float, commit: bool = True) -> float:
+        total, nan_count, value = self._next(x)
+        if commit:
+            self.buffer.append(x)
+            self.nan_count = nan_count
+            self.value = value
+            self.count += 1
+            # 每滑过一个完整窗口重新求和一次，消除长时间累加的浮点误差
+            if self.count % self.window == 0:
+                total = math.fsum(v for v in self.buffer if not _is_nan(v))
+            self.total = total
+        return value
+
+class RollingStd(StreamingIndicator):
+    """滚动标准差（滑动窗口 Welford 算法）"""
+
+    def __init__(self, window: int, ddof: int = 1):
+        self.window = window
+        self.ddof = ddof
+        self.buffer = deque(maxlen=window)
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = NAN
+
+    def _recompute(self, values: List[float]) -> Tuple[float, float]:
+        """从窗口数据重新计算均值和二阶中心矩"""
+        valid = [v for v in values if not _is_nan(v)]
+        if not valid:
+            return 0.0, 0.0
+        mean = math.fsum(valid) / len(valid)
+        return mean, math.fsum((v - mean) ** 2 for v in valid)
+
+    def _next(self, x: float) -> Tuple[int, float, float, float]:
+        """计算加入 x 后的 (缺失值个数, 均值, 二阶中心矩, 标准差)"""
+        full = len(self.buffer) == self.window
+        leaving = self.buffer[0] if full else None
+        nan_count = self.nan_count + _is_nan(x) - (leaving is not None and _is_nan(leaving))
+
+        if nan_count > 0:
+            mean, m2 = self.mean, self.m2
+        elif self.nan_count > 0 or (leaving is not None and _is_nan(leaving)):
+            # 窗口刚刚不再包含缺失值，重新计算
+            values = list(self.buffer)[1:] if full else list(self.buffer)
+            mean, m2 = self._recompute(values + [x])
+        elif full:
+            delta = x - leaving
+            mean = self.mean + delta / self.window
+            m2 = self.m2 + delta * (x - mean + leaving - self.mean)
+        else:
+            count = len(self.buffer) + 1
+            delta = x - self.mean
+            mean = self.mean + delta / count
+            m2 = self.m2 + delta * (x - mean)
+
+        size = min(len(self.buffer) + 1, self.window)
+        if size == self.window and nan_count == 0 and self.window > self.ddof:
+            value = math.sqrt(max(m2, 0.0) / (self.window - self.ddof))
+        else:
+            value = NAN
+        return nan_count, mean, m2, value
+
+    def update(self, x: float, commit: bool = True) -> float:
+        nan_count, mean, m2, value = self._next(x)
+        if commit:
+            self.buffer.append(x)
+            self.nan_count, self.mean, self.m2, self.value = nan_count, mean, m2, value
+        return value
+
+class BollingerBands(StreamingIndicator):
+    """布林带，返回 (中轨, 标准差, 上轨, 下轨)"""
+
+    def __init__(self, window: int = 20, num_std: float = 2):
+        self.num_std = num_std
+        self.mid = SMA(window)
+        self.std = RollingStd(window)
+
+    def update(self, x: float, commit: bool = True) -> Tuple[float, float, float, float]:
+        mid = self.mid.update(x, commit)
+        std = self.std.update(x, commit)
+        return mid, std, mid + self.num_std * std, mid - self.num_std * std
+
+class EMA(StreamingIndicator):
+    """指数移动平均，与 ewm(adjust=False).mean() 一致（包括缺失值的处理）"""
+
+    def __init__(self, span: float = None, alpha: float = None):
+        if alpha is None:
+            if span is None:
+                raise ValueError("必须指定 span 或 alpha")
+            alpha = 2.0 / (span + 1.0)
+        self.alpha = alpha
+        self.weighted = NAN
+        self.old_weight = 1.0
+
+    def _next(self, x: float) -> Tuple[float, float]:
+        """计算加入 x 后的 (加权值, 旧值权重)"""
+        if _is_nan(self.weighted):
+            return (x, 1.0) if not _is_nan(x) else (NAN, 1.0)
+
+        old_weight = self.old_weight * (1.0 - self.alpha)
+        if _is_nan(x):
+            return self.weighted, old_weight
+        return (old_weight * self.weighted + self.alpha * x) / (old_weight + self.alpha), 1.0
+
+    @property
+    def value(self) -> float:
+        return self.weighted
+
+    def update(self, x: float, commit: bool = True) -> float:
+        weighted, old_weight = self._next(x)
+        if commit:
+            self.weighted, self.old_weight = weighted, old_weight
+        return weighted
+
+class MACD(StreamingIndicator):
+    """MACD，返回 (MACD, Signal, MACD_Hist)"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = EMA(span=fast_period)
+        self.slow = EMA(span=slow_period)
+        self.signal = EMA(span=signal_period)
+
+    def update(self, x: float, commit: bool = True) -> Tuple[float, float, float]:
+        macd_line = self.fast.update(x, commit) - self.slow.update(x, commit)
+        signal_line = self.signal.update(macd_line, commit)
+        return macd_line, signal_line, macd_line - signal_line
+
+class RSI(StreamingIndicator):
+    """RSI 指标
+
+    method='sma' 时涨跌幅取简单移动平均，与 analysis.indicators.rsi 一致；
+    method='wilder' 时使用 Wilder 平滑（前 window 个涨跌幅取平均作为初值）。
+    """
+
+    def __init__(self, window: int = 14, method: str = 'sma'):
+        if method not in ('sma', 'wilder'):
+            raise ValueError(f"不支持的 RSI 计算方法: {method}")
+        self.window = window
+        self.method = method
+        self.prev_close = NAN
+        self.count = 0
+        if method == 'sma':
+            self.gain = SMA(window)
+            self.loss = SMA(window)
+        else:
+            self.gain = EMA(alpha=1.0 / window)
+            self.loss = EMA(alpha=1.0 / window)
+            self.gain_seed = SMA(window)
+            self.loss_seed = SMA(window)
+
+    def update(self, close: float, commit: bool = True) -> float:
+        delta = close - self.prev_close
+        # 第一个差值为 NaN，与批量计算一样按 0 处理
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self.method == 'sma':
+            avg_gain = self.gain.update(gain, commit)
+            avg_loss = self.loss.update(loss, commit)
+        elif self.count < 1:
+            # Wilder 平滑从第一个有效差值开始
+            avg_gain = avg_loss = NAN
+        elif self.count <= self.window:
+            avg_gain = self.gain_seed.update(gain, commit)
+            avg_loss = self.loss_seed.update(loss, commit)
+            if commit and self.count == self.window:
+                self.gain.update(avg_gain)
+                self.loss.update(avg_loss)
+        else:
+            avg_gain = self.gain.update(gain, commit)
+            avg_loss = self.loss.update(loss, commit)
+
+        if commit:
+            self.prev_close = close
+            self.count += 1
+
+        rs = _divide(avg_gain, avg_loss)
+        return 100 - _divide(100, 1 + rs)
+
+class RollingExtreme(StreamingIndicator):
+    """滚动最大/最小值（单调队列）"""
+
+    def __init__(self, window: int, mode: str = 'max'):
+        self.window = window
+        self.is_max = mode == 'max'
+        self.index = -1
+        self.last_nan_index = -window - 1
+        self.queue = deque()
+        self.value = NAN
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def update(self, x: float, commit: bool = True) -> float:
+        index = self.index + 1
+        expired = index - self.window
+        has_nan = _is_nan(x) or self.last_nan_index > expired
+
+        if index + 1 < self.window or has_nan:
+            value = NAN
+        else:
+            # 队首可能刚好滑出窗口，单调队列中第一个未过期的元素即为窗口极值
+            value = x
+            for item_index, item_value in self.queue:
+                if item_index > expired:
+                    value = item_value if self._dominates(item_value, x) else x
+                    break
+
+        if commit:
+            self.index = index
+            if _is_nan(x):
+                self.last_nan_index = index
+            else:
+                while self.queue and self._dominates(x, self.queue[-1][1]):
+                    self.queue.pop()
+                self.queue.append((index, x))
+            while self.queue and self.queue[0][0] <= expired:
+                self.queue.popleft()
+            self.value = value
+
+        return value
+
+class KDJ(StreamingIndicator):
+    """KDJ，返回 (RSV, K, D, J)"""
+
+    def __init__(self, window: int = 9, alpha: float = 1 / 3):
+        self.high_max = RollingExtreme(window, 'max')
+        self.low_min = RollingExtreme(window, 'min')
+        self.k = EMA(alpha=alpha)
+        self.d = EMA(alpha=alpha)
+
+    def update(self, high: float, low: float, close: float,
+               commit: bool = True) -> Tuple[float, float, float, float]:
+        high_max = self.high_max.update(high, commit)
+        low_min = self.low_min.update(low, commit)
+        rsv = _divide(close - low_min, high_max - low_min) * 100
+        k = self.k.update(rsv, commit)
+        d = self.d.update(k, commit)
+        return rsv, k, d, 3 * k - 2 * d
+
+class ATR(StreamingIndicator):
+    """平均真实波幅（真实波幅的简单移动平均）"""
+
+    def __init__(self, window: int = 14):
+        self.prev_close = NAN
+        self.average = SMA(window)
+
+    def update(self, high: float, low: float, close: float, commit: bool = True) -> float:
+        ranges = high - low
+        if _is_nan(ranges):
+            true_range = NAN
+        else:
+            true_range = _fmax(ranges, _fmax(abs(high - self.prev_close), abs(low - self.prev_close)))
+
+        value = self.average.update(true_range, commit)
+        if commit:
+            self.prev_close = close
+        return value
+
+def _to_float(value: Any) -> float:
+    """转换为浮点数，无法转换时为 NaN"""
+    try:
+        return float(value) if value is not None else NAN
+    except (TypeError, ValueError):
+        return NAN
+
+def _normalize_date(value: Any) -> Optional[str]:
+    """交易日期统一为 YYYYMMDD"""
+    return str(value).replace('-', '')[:8] if value else None
+
+class StreamingIndicatorSet(StreamingIndicator):
+    """单只股票的一组增量指标，参数与 TechnicalAnalyzer 一致"""
+
+    def __init__(self):
+        self.last_trade_date = None
+        self.count = 0
+        self.ma5 = SMA(5)
+        self.ma10 = SMA(10)
+        self.ma20 = SMA(20)
+        self.ma60 = SMA(60)
+        self.vol_ma5 = SMA(5)
+        self.vol_ma10 = SMA(10)
+        self.macd = MACD()
+        self.rsi = RSI(14)
+        self.kdj = KDJ()
+        self.bollinger = BollingerBands(20, 2)
+        self.atr = ATR(14)
+        self.values: Dict[str, float] = {}
+
+    def update(self, bar: Dict[str, Any], commit: bool = True) -> Dict[str, float]:
+        """用一根K线更新指标，返回各指标的当前值
+
+        Args:
+            bar: 包含 open/high/low/close/vol 和 trade_date 的K线
+            commit: False 表示盘中未完成的K线，只计算不写入状态
+        """
+        close = _to_float(bar.get('close'))
+        high = _to_float(bar.get('high'))
+        low = _to_float(bar.get('low'))
+        vol = _to_float(bar.get('vol'))
+
+        macd_line, signal_line, macd_hist = self.macd.update(close, commit)
+        _, k, d, j = self.kdj.update(high, low, close, commit)
+        bb_mid, _, bb_upper, bb_lower = self.bollinger.update(close, commit)
+
+        values = {
+            'price': close,
+            'close': close,
+            'ma5': self.ma5.update(close, commit),
+            'ma10': self.ma10.update(close, commit),
+            'ma20': self.ma20.update(close, commit),
+            'ma60': self.ma60.update(close, commit),
+            'macd': macd_line,
+            'macd_signal': signal_line,
+            'macd_hist': macd_hist,
+            'rsi': self.rsi.update(close, commit),
+            'k': k,
+            'd': d,
+            'j': j,
+            'bb_upper': bb_upper,
+            'bb_mid': bb_mid,
+            'bb_lower': bb_lower,
+            'atr': self.atr.update(high, low, close, commit),
+            'vol': vol,
+            'vol_ma5': self.vol_ma5.update(vol, commit),
+            'vol_ma10': self.vol_ma10.update(vol, commit)
+        }
+
+        if commit:
+            self.last_trade_date = _normalize_date(bar.get('trade_date')) or self.last_trade_date
+            self.count += 1
+            self.values = values
+
+        return values
+
+class RealtimeIndicatorEngine:
+    """多只股票的实时指标引擎
+
+    首次遇到某只股票时通过 history_loader 加载历史K线预热指标，之后每个报价
+    只做 O(1) 的增量计算。同一交易日的报价反复更新同一根未完成的K线，
+    交易日切换时将上一交易日的最后报价作为该日K线写入状态。
+    """
+
+    def __init__(self, history_loader: Callable[[str], List[Dict[str, Any]]] = None):
+        """初始化引擎
+
+        Args:
+            history_loader: 加载历史日K线的函数，参数为 ts_code，返回按日期升序排列的K线
+        """
+        self.history_loader = history_loader
+        self._sets: Dict[str, StreamingIndicatorSet] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # 正在加载历史数据的股票，同一只股票只加载一次
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.RLock()
+
+    def warm_up(self, ts_code: str, bars: List[Dict[str, Any]]) -> StreamingIndicatorSet:
+        """用历史K线初始化（或继续更新）指标"""
+        with self._lock:
+            indicator_set = self._sets.setdefault(ts_code, StreamingIndicatorSet())
+            for bar in bars:
+                trade_date = _normalize_date(bar.get('trade_date'))
+                if indicator_set.last_trade_date and trade_date and trade_date <= indicator_set.last_trade_date:
+                    continue
+                indicator_set.update(bar)
+            return indicator_set
+
+    def _get_set(self, ts_code: str) -> StreamingIndicatorSet:
+        """获取指标集合，首次使用时加载历史数据预热
+
+        不能在持有引擎锁时调用：历史数据在锁外加载，一只股票冷启动不会阻塞其他股票的报价。
+        加载失败时返回未预热的临时集合，不写入状态，下次使用时重新加载。
+        """
+        with self._lock:
+            indicator_set = self._sets.get(ts_code)
+            if indicator_set is not None:
+                return indicator_set
+            if not self.history_loader:
+                return self._sets.setdefault(ts_code, StreamingIndicatorSet())
+            loading = self._loading.setdefault(ts_code, threading.Lock())
+
+        with loading:
+            # 等待期间其他线程可能已经加载完成
+            with self._lock:
+                indicator_set = self._sets.get(ts_code)
+            if indicator_set is not None:
+                return indicator_set
+
+            try:
+                bars = self.history_loader(ts_code)
+            except Exception as e:
+                print(f"加载 {ts_code} 历史数据失败: {e}")
+                return StreamingIndicatorSet()
+            finally:
+                with self._lock:
+                    self._loading.pop(ts_code, None)
+            return self.warm_up(ts_code, bars)
+
+    def on_bar(self, ts_code: str, bar: Dict[str, Any]) -> Dict[str, float]:
+        """处理一根已完成的K线"""
+        indicator_set = self._get_set(ts_code)
+        with self._lock:
+            self._pending.pop(ts_code, None)
+            return indicator_set.update(bar)
+
+    def on_quote(self, ts_code: str, bar: Dict[str, Any]) -> Dict[str, float]:
+        """处理盘中报价，bar 为当日截至目前的K线（最新价作为 close）"""
+        indicator_set = self._get_set(ts_code)
+        with self._lock:
+            trade_date = _normalize_date(bar.get('trade_date'))
+
+            pending = self._pending.get(ts_code)
+            if pending is not None and _normalize_date(pending.get('trade_date')) != trade_date:
+                indicator_set.update(pending)
+                self._pending.pop(ts_code)
+
+            # 该交易日的K线已经写入（例如收盘后已入库），直接返回
+            if trade_date and indicator_set.last_trade_date and trade_date <= indicator_set.last_trade_date:
+                return dict(indicator_set.values)
+
+            self._pending[ts_code] = dict(bar)
+            return indicator_set.update(bar, commit=False)
+
+    def values(self, ts_code: str) -> Dict[str, float]:
+        """获取最新的指标值（包括未完成的K线）"""
+        indicator_set = self._get_set(ts_code)
+        with self._lock:
+            pending = self._pending.get(ts_code)
+            if pending is not None:
+                return indicator_set.update(pending, commit=False)
+            return dict(indicator_set.values)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出所有股票的指标状态"""
+        with self._lock:
+            return {
+                'sets': {ts_code: indicator_set.snapshot() for ts_code, indicator_set in self._sets.items()},
+                'pending': {ts_code: dict(bar) for ts_code, bar in self._pending.items()}
+            }
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        """从快照恢复所有股票的指标状态"""
+        with self._lock:
+            self._sets = {ts_code: StreamingIndicator.restore(state)
+                          for ts_code, state in snapshot.get('sets', {}).items()}
+            self._pending = {ts_code: dict(bar) for ts_code, bar in snapshot.get('pending', {}).items()}
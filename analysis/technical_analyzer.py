@@ -1,140 +1,217 @@
 import pandas as pd
 import numpy as np
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import Dict, List, Any
+from .indicator_cache import IndicatorCache, IndicatorFrame, get_indicator_cache
+
+class TechnicalAnalysis(Mapping):
+    """技术分析结果（不可变）
+
+    只保存各指标的最新值（均线另有前一日的值）和信号，数值在一个只读 float64 数组中。
+    作为映射使用时按 comprehensive_technical_analysis 的字典结构提供只读视图，
+    to_dict() 返回可以修改和序列化的普通字典。
+    """
+
+    __slots__ = ('values', 'signals', 'length')
+
+    # 数值字段，与 values 数组一一对应
+    FIELDS = ('ma5', 'ma20', 'ma60', 'prev_ma5', 'prev_ma20', 'prev_ma60',
+              'macd', 'signal', 'macd_hist', 'k', 'd', 'j', 'rsi',
+              'bb_upper', 'bb_mid', 'bb_lower', 'close', 'vol', 'vol_ma5', 'vol_ma10')
+    # 信号字段，与 signals 元组一一对应
+    SIGNALS = ('short_term_trend', 'medium_term_trend', 'long_term_trend', 'ma_relationship',
+               'macd_signal', 'kdj_signal', 'rsi_signal', 'close_position', 'volume_trend', 'overall_signal')
+    SECTIONS = ('trend_analysis', 'macd_analysis', 'kdj_analysis', 'rsi_analysis',
+                'bollinger_bands_analysis', 'volume_analysis', 'overall_signal')
+
+    _FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+    _SIGNAL_INDEX = {name: i for i, name in enumerate(SIGNALS)}
+
+    def __init__(self, values: Dict[str, float], signals: Dict[str, str], length: int):
+        """初始化分析结果
+
+        Args:
+            values: FIELDS 中每个字段的值
+            signals: SIGNALS 中每个字段的信号
+            length: 参与分析的K线数量，0 表示没有数据
+        """
+        array = np.array([values.get(name, np.nan) for name in self.FIELDS], dtype=np.float64)
+        array.flags.writeable = False
+        object.__setattr__(self, 'values', array)
+        object.__setattr__(self, 'signals', tuple(signals.get(name, '') for name in self.SIGNALS))
+        object.__setattr__(self, 'length', length)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TechnicalAnalysis 是不可变对象")
+
+    def __delattr__(self, name):
+        raise AttributeError("TechnicalAnalysis 是不可变对象")
+
+    @classmethod
+    def empty(cls) -> 'TechnicalAnalysis':
+        """没有行情数据时的结果，映射视图为空"""
+        return cls({}, {}, 0)
+
+    def value(self, name: str) -> float:
+        """数值字段"""
+        return float(self.values[self._FIELD_INDEX[name]])
+
+    def signal(self, name: str) -> str:
+        """信号字段"""
+        return self.signals[self._SIGNAL_INDEX[name]]
+
+    def _section(self, name: str) -> Any:
+        value, signal = self.value, self.signal
+        if name == 'trend_analysis':
+            return {key: signal(key) for key in ('short_term_trend', 'medium_term_trend',
+                                                 'long_term_trend', 'ma_relationship')}
+        if name == 'macd_analysis':
+            return {'macd_value': value('macd'), 'signal_value': value('signal'),
+                    'macd_hist': value('macd_hist'), 'signal': signal('macd_signal')}
+        if name == 'kdj_analysis':
+            return {'k_value': value('k'), 'd_value': value('d'), 'j_value': value('j'),
+                    'signal': signal('kdj_signal')}
+        if name == 'rsi_analysis':
+            return {'rsi_value': value('rsi'), 'signal': signal('rsi_signal')}
+        if name == 'bollinger_bands_analysis':
+            return {'bb_upper': value('bb_upper'), 'bb_mid': value('bb_mid'), 'bb_lower': value('bb_lower'),
+                    'close_position': signal('close_position')}
+        if name == 'volume_analysis':
+            return {'current_volume': value('vol'), 'volume_ma5': value('vol_ma5'),
+                    'volume_ma10': value('vol_ma10'), 'volume_trend': signal('volume_trend')}
+        return signal('overall_signal')
+
+    def __getitem__(self, name: str) -> Any:
+        if not self.length or name not in self.SECTIONS:
+            raise KeyError(name)
+        section = self._section(name)
+        return MappingProxyType(section) if isinstance(section, dict) else section
+
+    def __iter__(self):
+        return iter(self.SECTIONS if self.length else ())
+
+    def __len__(self) -> int:
+        return len(self.SECTIONS) if self.length else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通字典（与 comprehensive_technical_analysis 的返回值相同）"""
+        return {name: self._section(name) for name in self}
+
+    def __repr__(self) -> str:
+        return f"TechnicalAnalysis(length={self.length}, overall_signal={self.signal('overall_signal')!r})"
 
 class TechnicalAnalyzer:
-    """技术分析类"""
+    """技术分析类
+
+    analyze 一次取出所有指标（指标数组来自共享的指标缓存，只读），在最新值上判断信号，
+    不修改传入的 DataFrame，可以在多个线程共享的行情数据上直接调用。
+    """
     
-    def analyze_trend(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """分析趋势"""
+    def __init__(self, indicator_cache: IndicatorCache = None):
+        """初始化技术分析器
+        
+        Args:
+            indicator_cache: 指标缓存，如果为 None，使用进程内共享的缓存
+        """
+        self.indicator_cache = indicator_cache or get_indicator_cache()
+    
+    def _frame(self, df: pd.DataFrame) -> IndicatorFrame:
+        """获取行情数据对应的指标帧"""
+        return self.indicator_cache.frame(df)
+    
+    def analyze(self, df: pd.DataFrame) -> TechnicalAnalysis:
+        """综合技术分析，返回不可变的分析结果"""
         if df.empty:
-            return {}
+            return TechnicalAnalysis.empty()
+        
+        frame = self._frame(df)
+        values = {'close': float(frame.column('close')[-1])}
         
-        # 计算移动平均线
-        df['MA5'] = df['close'].rolling(window=5).mean()
-        df['MA20'] = df['close'].rolling(window=20).mean()
-        df['MA60'] = df['close'].rolling(window=60).mean()
+        ma5, ma20, ma60 = (frame.get('sma', window=window) for window in (5, 20, 60))
+        for name, series in (('ma5', ma5), ('ma20', ma20), ('ma60', ma60)):
+            values[name] = float(series[-1])
+            values[f'prev_{name}'] = float(series[-2]) if len(series) >= 2 else np.nan
+        values['macd'], values['signal'], values['macd_hist'] = frame.latest('macd')
+        _, values['k'], values['d'], values['j'] = frame.latest('kdj')
+        values['rsi'] = frame.latest('rsi', window=14)
+        values['bb_mid'], _, values['bb_upper'], values['bb_lower'] = frame.latest('bollinger_bands', window=20, num_std=2)
+        values['vol'] = float(frame.column('vol')[-1])
+        values['vol_ma5'] = frame.latest('sma', source='vol', window=5)
+        values['vol_ma10'] = frame.latest('sma', source='vol', window=10)
         
-        # 判断趋势 - 直接比较当前行与前一行的移动平均值
+        signals = {
+            'macd_signal': self._analyze_macd_signal(values),
+            'kdj_signal': self._analyze_kdj_signal(values),
+            'rsi_signal': self._analyze_rsi_signal(values['rsi']),
+            'close_position': self._analyze_bb_position(values),
+            'volume_trend': self._analyze_volume_trend(values)
+        }
         if len(df) < 2:
-            # 数据不足，返回中性
-            trend_analysis = {
-                'short_term_trend': '震荡',
-                'medium_term_trend': '震荡',
-                'long_term_trend': '震荡',
-                'ma_relationship': '震荡整理'
-            }
+            # 数据不足，趋势为中性
+            signals.update({'short_term_trend': '震荡', 'medium_term_trend': '震荡',
+                            'long_term_trend': '震荡', 'ma_relationship': '震荡整理'})
         else:
-            latest_data = df.iloc[-1]
-            prev_data = df.iloc[-2]
-            
-            trend_analysis = {
-                'short_term_trend': '上升' if latest_data['MA5'] > prev_data['MA5'] else '下降',
-                'medium_term_trend': '上升' if latest_data['MA20'] > prev_data['MA20'] else '下降',
-                'long_term_trend': '上升' if latest_data['MA60'] > prev_data['MA60'] else '下降',
-                'ma_relationship': self._analyze_ma_relationship(latest_data)
-            }
+            signals.update({
+                'short_term_trend': '上升' if values['ma5'] > values['prev_ma5'] else '下降',
+                'medium_term_trend': '上升' if values['ma20'] > values['prev_ma20'] else '下降',
+                'long_term_trend': '上升' if values['ma60'] > values['prev_ma60'] else '下降',
+                'ma_relationship': self._analyze_ma_relationship(values)
+            })
+        signals['overall_signal'] = self._generate_overall_signal(signals)
         
-        return trend_analysis
+        return TechnicalAnalysis(values, signals, len(df))
+    
+    def analyze_trend(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """分析趋势"""
+        return self._section(df, 'trend_analysis')
     
-    def _analyze_ma_relationship(self, latest_data: pd.Series) -> str:
+    def _section(self, df: pd.DataFrame, name: str) -> Dict[str, Any]:
+        analysis = self.analyze(df)
+        return dict(analysis[name]) if analysis else {}
+    
+    def _analyze_ma_relationship(self, values: Dict[str, float]) -> str:
         """分析移动平均线关系"""
-        if latest_data['MA5'] > latest_data['MA20'] > latest_data['MA60']:
+        if values['ma5'] > values['ma20'] > values['ma60']:
             return '多头排列'
-        elif latest_data['MA5'] < latest_data['MA20'] < latest_data['MA60']:
+        elif values['ma5'] < values['ma20'] < values['ma60']:
             return '空头排列'
         else:
             return '震荡整理'
     
     def analyze_macd(self, df: pd.DataFrame) -> Dict[str, Any]:
         """分析MACD指标"""
-        if df.empty:
-            return {}
-        
-        # 计算MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal']
-        
-        latest_data = df.iloc[-1]
-        
-        macd_analysis = {
-            'macd_value': latest_data['MACD'],
-            'signal_value': latest_data['Signal'],
-            'macd_hist': latest_data['MACD_Hist'],
-            'signal': self._analyze_macd_signal(latest_data)
-        }
-        
-        return macd_analysis
+        return self._section(df, 'macd_analysis')
     
-    def _analyze_macd_signal(self, latest_data: pd.Series) -> str:
+    def _analyze_macd_signal(self, values: Dict[str, float]) -> str:
         """分析MACD信号"""
-        if latest_data['MACD'] > latest_data['Signal'] and latest_data['MACD_Hist'] > 0:
+        if values['macd'] > values['signal'] and values['macd_hist'] > 0:
             return '金叉看多'
-        elif latest_data['MACD'] < latest_data['Signal'] and latest_data['MACD_Hist'] < 0:
+        elif values['macd'] < values['signal'] and values['macd_hist'] < 0:
             return '死叉看空'
         else:
             return '信号不明确'
     
     def analyze_kdj(self, df: pd.DataFrame) -> Dict[str, Any]:
         """分析KDJ指标"""
-        if df.empty:
-            return {}
-        
-        # 计算KDJ
-        low_min = df['low'].rolling(window=9).min()
-        high_max = df['high'].rolling(window=9).max()
-        df['RSV'] = (df['close'] - low_min) / (high_max - low_min) * 100
-        df['K'] = df['RSV'].ewm(alpha=1/3, adjust=False).mean()
-        df['D'] = df['K'].ewm(alpha=1/3, adjust=False).mean()
-        df['J'] = 3 * df['K'] - 2 * df['D']
-        
-        latest_data = df.iloc[-1]
-        
-        kdj_analysis = {
-            'k_value': latest_data['K'],
-            'd_value': latest_data['D'],
-            'j_value': latest_data['J'],
-            'signal': self._analyze_kdj_signal(latest_data)
-        }
-        
-        return kdj_analysis
+        return self._section(df, 'kdj_analysis')
     
-    def _analyze_kdj_signal(self, latest_data: pd.Series) -> str:
+    def _analyze_kdj_signal(self, values: Dict[str, float]) -> str:
         """分析KDJ信号"""
-        if latest_data['K'] > latest_data['D'] and latest_data['J'] > latest_data['K']:
+        if values['k'] > values['d'] and values['j'] > values['k']:
             return '金叉看多'
-        elif latest_data['K'] < latest_data['D'] and latest_data['J'] < latest_data['K']:
+        elif values['k'] < values['d'] and values['j'] < values['k']:
             return '死叉看空'
-        elif latest_data['K'] > 80:
+        elif values['k'] > 80:
             return '超买'
-        elif latest_data['K'] < 20:
+        elif values['k'] < 20:
             return '超卖'
         else:
             return '信号不明确'
     
     def analyze_rsi(self, df: pd.DataFrame) -> Dict[str, Any]:
         """分析RSI指标"""
-        if df.empty:
-            return {}
-        
-        # 计算RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        latest_data = df.iloc[-1]
-        
-        rsi_analysis = {
-            'rsi_value': latest_data['RSI'],
-            'signal': self._analyze_rsi_signal(latest_data['RSI'])
-        }
-        
-        return rsi_analysis
+        return self._section(df, 'rsi_analysis')
     
     def _analyze_rsi_signal(self, rsi_value: float) -> str:
         """分析RSI信号"""
@@ -147,115 +224,62 @@ class TechnicalAnalyzer:
     
     def analyze_bollinger_bands(self, df: pd.DataFrame) -> Dict[str, Any]:
         """分析布林带"""
-        if df.empty:
-            return {}
-        
-        # 计算布林带
-        df['BB_Mid'] = df['close'].rolling(window=20).mean()
-        df['BB_Std'] = df['close'].rolling(window=20).std()
-        df['BB_Upper'] = df['BB_Mid'] + 2 * df['BB_Std']
-        df['BB_Lower'] = df['BB_Mid'] - 2 * df['BB_Std']
-        
-        latest_data = df.iloc[-1]
-        
-        bb_analysis = {
-            'bb_upper': latest_data['BB_Upper'],
-            'bb_mid': latest_data['BB_Mid'],
-            'bb_lower': latest_data['BB_Lower'],
-            'close_position': self._analyze_bb_position(latest_data)
-        }
-        
-        return bb_analysis
+        return self._section(df, 'bollinger_bands_analysis')
     
-    def _analyze_bb_position(self, latest_data: pd.Series) -> str:
+    def _analyze_bb_position(self, values: Dict[str, float]) -> str:
         """分析价格在布林带中的位置"""
-        if latest_data['close'] > latest_data['BB_Upper']:
+        if values['close'] > values['bb_upper']:
             return '突破上轨'
-        elif latest_data['close'] < latest_data['BB_Lower']:
+        elif values['close'] < values['bb_lower']:
             return '突破下轨'
-        elif latest_data['close'] > latest_data['BB_Mid']:
+        elif values['close'] > values['bb_mid']:
             return '中轨上方'
         else:
             return '中轨下方'
     
     def analyze_volume(self, df: pd.DataFrame) -> Dict[str, Any]:
         """分析成交量"""
-        if df.empty:
-            return {}
-        
-        # 计算成交量指标
-        df['VOL_MA5'] = df['vol'].rolling(window=5).mean()
-        df['VOL_MA10'] = df['vol'].rolling(window=10).mean()
-        
-        latest_data = df.iloc[-1]
-        
-        volume_analysis = {
-            'current_volume': latest_data['vol'],
-            'volume_ma5': latest_data['VOL_MA5'],
-            'volume_ma10': latest_data['VOL_MA10'],
-            'volume_trend': self._analyze_volume_trend(latest_data)
-        }
-        
-        return volume_analysis
+        return self._section(df, 'volume_analysis')
     
-    def _analyze_volume_trend(self, latest_data: pd.Series) -> str:
+    def _analyze_volume_trend(self, values: Dict[str, float]) -> str:
         """分析成交量趋势"""
-        if latest_data['vol'] > latest_data['VOL_MA5'] > latest_data['VOL_MA10']:
+        if values['vol'] > values['vol_ma5'] > values['vol_ma10']:
             return '放量上涨'
-        elif latest_data['vol'] < latest_data['VOL_MA5'] < latest_data['VOL_MA10']:
+        elif values['vol'] < values['vol_ma5'] < values['vol_ma10']:
             return '缩量下跌'
         else:
             return '成交量平稳'
     
     def comprehensive_technical_analysis(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """综合技术分析"""
-        if df.empty:
-            return {}
-        
-        analysis = {
-            'trend_analysis': self.analyze_trend(df),
-            'macd_analysis': self.analyze_macd(df),
-            'kdj_analysis': self.analyze_kdj(df),
-            'rsi_analysis': self.analyze_rsi(df),
-            'bollinger_bands_analysis': self.analyze_bollinger_bands(df),
-            'volume_analysis': self.analyze_volume(df),
-            'overall_signal': self._generate_overall_signal(df)
-        }
-        
-        return analysis
+        """综合技术分析（字典形式，见 analyze）"""
+        return self.analyze(df).to_dict()
     
-    def _generate_overall_signal(self, df: pd.DataFrame) -> str:
-        """生成综合信号"""
-        # 这里可以根据各个指标的信号综合判断
-        # 简单实现：根据趋势和主要指标判断
-        trend_analysis = self.analyze_trend(df)
-        macd_analysis = self.analyze_macd(df)
-        rsi_analysis = self.analyze_rsi(df)
-        
-        signals = []
+    def _generate_overall_signal(self, signals: Dict[str, str]) -> str:
+        """生成综合信号：根据中期趋势、MACD 和 RSI 的信号投票"""
+        votes = []
         
         # 趋势信号
-        if trend_analysis.get('medium_term_trend') == '上升':
-            signals.append('看多')
-        elif trend_analysis.get('medium_term_trend') == '下降':
-            signals.append('看空')
+        if signals['medium_term_trend'] == '上升':
+            votes.append('看多')
+        elif signals['medium_term_trend'] == '下降':
+            votes.append('看空')
         
         # MACD信号
-        if macd_analysis.get('signal') == '金叉看多':
-            signals.append('看多')
-        elif macd_analysis.get('signal') == '死叉看空':
-            signals.append('看空')
+        if signals['macd_signal'] == '金叉看多':
+            votes.append('看多')
+        elif signals['macd_signal'] == '死叉看空':
+            votes.append('看空')
         
         # RSI信号
-        if rsi_analysis.get('signal') == '超买':
-            signals.append('看空')
-        elif rsi_analysis.get('signal') == '超卖':
-            signals.append('看多')
+        if signals['rsi_signal'] == '超买':
+            votes.append('看空')
+        elif signals['rsi_signal'] == '超卖':
+            votes.append('看多')
         
         # 统计信号
-        if signals.count('看多') > signals.count('看空'):
+        if votes.count('看多') > votes.count('看空'):
             return '看多'
-        elif signals.count('看空') > signals.count('看多'):
+        elif votes.count('看空') > votes.count('看多'):
             return '看空'
         else:
-            return '中性'
\ No newline at end of file
+            return '中性'
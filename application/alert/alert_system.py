@@ -1,10 +1,14 @@
 import time
 import threading
-from analysis.analysis_manager import AnalysisManager
+from data_collection.data_collector import DataCollector
+from data_collection.symbol_resolver import get_symbol_resolver
+from application.realtime_indicators import quote_to_bar, get_realtime_engine
 
 class AlertSystem:
-    def __init__(self):
-        self.analysis_manager = AnalysisManager()
+    def __init__(self, data_collector=None, indicator_engine=None):
+        self.data_collector = data_collector or DataCollector()
+        # 指标由实时指标引擎增量计算，每次检查只处理最新报价
+        self.indicator_engine = indicator_engine or get_realtime_engine(self.data_collector)
         self.alert_rules = {}
         self.alert_history = []
         self.running = False
@@ -19,7 +23,8 @@ class AlertSystem:
             "rule_type": rule_type,
             "threshold": threshold,
             "direction": direction,
-            "last_triggered": None
+            "last_triggered": None,
+            "last_value": None
         }
         
         self.alert_rules[symbol].append(rule)
@@ -32,44 +37,71 @@ class AlertSystem:
             return f"Alert rule removed for {symbol}"
         return f"Invalid alert rule index for {symbol}"
     
+    def _fetch_quotes(self, ts_codes):
+        """批量获取实时报价，返回 ts_code -> 当日K线"""
+        quotes = {}
+        realtime_data = self.data_collector.get_realtime_data(ts_codes)
+        for row in (realtime_data or {}).get('data', []):
+            bar = quote_to_bar(row)
+            if bar and bar['ts_code']:
+                quotes[bar['ts_code']] = bar
+        return quotes
+    
     def check_alerts(self):
         """检查预警条件"""
-        for symbol, rules in self.alert_rules.items():
+        ts_codes = {symbol: get_symbol_resolver().normalize(symbol) or symbol for symbol in self.alert_rules}
+        try:
+            quotes = self._fetch_quotes(list(ts_codes.values())) if ts_codes else {}
+        except Exception as e:
+            print(f"Error fetching realtime quotes: {e}")
+            quotes = {}
+        
+        for symbol, rules in list(self.alert_rules.items()):
             try:
-                # Get technical analysis results
-                analysis_result = self.analysis_manager.technical_analysis(symbol)
+                ts_code = ts_codes.get(symbol) or get_symbol_resolver().normalize(symbol) or symbol
+                quote = quotes.get(ts_code)
+                if quote:
+                    values = self.indicator_engine.on_quote(ts_code, quote)
+                else:
+                    values = self.indicator_engine.values(ts_code)
                 
                 for rule in rules:
                     rule_type = rule["rule_type"]
                     threshold = rule["threshold"]
                     direction = rule["direction"]
+                    previous_value = rule.get("last_value")
                     
                     # Check if the rule condition is met
-                    if self._check_rule_condition(analysis_result, rule_type, threshold, direction):
+                    if self._check_rule_condition(values, rule_type, threshold, direction, previous_value):
                         alert_message = f"ALERT: {symbol} - {rule_type} {direction} {threshold} at {time.strftime('%Y-%m-%d %H:%M:%S')}"
                         self.alert_history.append(alert_message)
                         self._send_alert(alert_message)
                         rule["last_triggered"] = time.time()
+                    
+                    value = values.get(rule_type)
+                    if value is not None and value == value:
+                        rule["last_value"] = value
             except Exception as e:
                 print(f"Error checking alerts for {symbol}: {e}")
     
-    def _check_rule_condition(self, analysis_result, rule_type, threshold, direction):
-        """检查规则条件是否满足"""
-        if rule_type not in analysis_result:
-            return False
+    def _check_rule_condition(self, analysis_result, rule_type, threshold, direction, previous_value=None):
+        """检查规则条件是否满足
         
-        value = analysis_result[rule_type]
+        analysis_result 为指标名到最新值的映射；穿越类条件需要上一次检查时的指标值
+        """
+        value = analysis_result.get(rule_type)
+        # 指标不存在或数据不足（NaN）时不触发
+        if value is None or value != value:
+            return False
         
         if direction == "above":
             return value > threshold
         elif direction == "below":
             return value < threshold
         elif direction == "cross_above":
-            # Need historical data to check cross above
-            return False
+            return previous_value is not None and previous_value <= threshold < value
         elif direction == "cross_below":
-            # Need historical data to check cross below
-            return False
+            return previous_value is not None and previous_value >= threshold > value
         return False
     
     def _send_alert(self, message):
@@ -1,10 +1,16 @@
+import math
 from fastapi import APIRouter, HTTPException, Query
 from data_collection.data_collector import DataCollector
+from data_collection.symbol_resolver import get_symbol_resolver
+from data_collection.trading_calendar import format_days, get_trading_calendar, to_days
 from data_processing.data_processor import DataProcessor
+from data_processing.prefix_sums import PrefixSums, ROLLING_STATS
 from analysis.analysis_manager import AnalysisManager
+from analysis.screener import SIGNAL_COLUMNS, VALUE_COLUMNS, get_screener, parse_filters
 from prediction.prediction_manager import PredictionManager
 from backtest.backtest_manager import BacktestManager
 from visualization.report_generator import ReportGenerator
+from application.realtime_indicators import quote_to_bar, get_realtime_engine
 
 router = APIRouter()
 
@@ -16,6 +22,8 @@ prediction_manager = PredictionManager()
 backtest_manager = BacktestManager()
 report_generator = ReportGenerator()
 data_storage = data_collector.storage
+realtime_engine = get_realtime_engine(data_collector)
+screener = get_screener(data_storage)
 
 @router.get("/stock/list")
 async def get_stock_list():
@@ -50,17 +58,12 @@ async def add_stock(
     """手动添加股票"""
     try:
         # 构建股票代码格式
-        if symbol.startswith('00') or symbol.startswith('30'):
-            ts_code = f"{symbol}.SZ"
-        elif symbol.startswith('60'):
-            ts_code = f"{symbol}.SH"
-        else:
-            ts_code = symbol
+        ts_code = get_symbol_resolver().normalize(symbol) or symbol
         
         # 创建股票数据
         stock_data = [{
             "ts_code": ts_code,
-            "symbol": symbol,
+            "symbol": ts_code.split(".")[0],
             "name": name,
             "area": area or "未知",
             "industry": industry or "未知",
@@ -143,7 +146,8 @@ async def search_stock(
 
 @router.get("/stock/realtime")
 async def get_stock_realtime(
-    symbols: str = Query(..., description="股票代码列表，用逗号分隔")
+    symbols: str = Query(..., description="股票代码列表，用逗号分隔"),
+    with_indicators: bool = Query(False, description="是否返回基于最新价增量计算的技术指标")
 ):
     """获取股票实时价格"""
     try:
@@ -162,7 +166,7 @@ async def get_stock_realtime(
                 for _, row in realtime_data.iterrows():
                     symbol = row['code']
                     # 构建完整的ts_code
-                    ts_code = f"{symbol}.SZ" if symbol.startswith('00') or symbol.startswith('30') else f"{symbol}.SH"
+                    ts_code = get_symbol_resolver().normalize(symbol) or symbol
                     
                     # 计算价格和涨跌幅
                     price = float(row.get('price', 0)) if row.get('price') else 0
@@ -190,6 +194,14 @@ async def get_stock_realtime(
                         'low': float(row.get('low', 0)) if row.get('low') else 0,
                         'volume': volume
                     })
+                    
+                    if with_indicators:
+                        bar = quote_to_bar(row)
+                        values = realtime_engine.on_quote(ts_code, bar) if bar else realtime_engine.values(ts_code)
+                        # NaN（数据不足）和 inf 无法序列化为 JSON，转换为 None
+                        result[-1]['indicators'] = {
+                            name: (value if math.isfinite(value) else None) for name, value in values.items()
+                        }
                 
                 return {"status": "success", "data": result}
         except Exception as e:
@@ -199,10 +211,10 @@ async def get_stock_realtime(
         result = []
         for symbol in symbol_list:
             try:
-                # 获取最近的K线数据
-                from datetime import datetime, timedelta
-                end_date = datetime.now().strftime('%Y%m%d')
-                start_date = (datetime.now() - timedelta(days=7)).strftime('%Y%m%d')
+                # 获取最近5个交易日的K线数据
+                from datetime import date
+                end_date = date.today().strftime('%Y%m%d')
+                start_date = format_days(get_trading_calendar().window_start(end_date, 5))
                 
                 stock_data = data_collector.get_stock_data(symbol, start_date, end_date, freq='D')
                 data = stock_data.get('data', [])
@@ -288,6 +300,49 @@ async def get_stock_history(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/stock/rolling")
+async def get_stock_rolling(
+    symbol: str = Query(..., description="股票代码"),
+    windows: str = Query("5,20,60", description="窗口长度（K线数），多个用逗号分隔，如 5,10,20,60,120,250"),
+    start_date: str = Query(..., description="开始日期，格式：YYYY-MM-DD"),
+    end_date: str = Query(..., description="结束日期，格式：YYYY-MM-DD")
+):
+    """任意窗口的滚动均值、标准差、VWAP 和成交量（由K线前缀和计算，与窗口长度无关）"""
+    try:
+        window_list = [int(window) for window in windows.split(',') if window.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="窗口长度必须为正整数")
+    if not window_list or min(window_list) < 1:
+        raise HTTPException(status_code=400, detail="窗口长度必须为正整数")
+    
+    try:
+        ts_code = get_symbol_resolver().normalize(symbol) or symbol
+        start, end = start_date.replace('-', ''), end_date.replace('-', '')
+        lookback = max(window_list)
+        records = data_storage.get_prefix_sums(ts_code, start, end, lookback=lookback)
+        if records:
+            prefix = PrefixSums.from_records(records)
+        else:
+            # 没有前缀和索引（未设置数据库或尚未导入）时由K线直接累计
+            bars = get_trading_calendar().count(start, end) + lookback
+            prefix = PrefixSums.from_bars(data_collector.get_kline_bars(ts_code, bars, end))
+        
+        # 只返回请求区间内的交易日，之前的记录只作为窗口起点
+        in_range = (prefix.trade_dates >= to_days(start)) & (prefix.trade_dates <= to_days(end))
+        result = {}
+        for window in window_list:
+            stats = prefix.rolling(window)
+            # NaN（K线不足一个窗口）无法序列化为 JSON，转换为 None
+            result[str(window)] = {
+                name: [value if math.isfinite(value) else None for value in stats[name][in_range].tolist()]
+                for name in ROLLING_STATS
+            }
+        dates = [str(day) for day in prefix.trade_dates[in_range]]
+        return {"status": "success", "data": {"ts_code": ts_code, "dates": dates, "windows": result}}
+    except Exception as e:
+        print(f"计算滚动统计错误: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/stock/analysis")
 async def get_stock_analysis(
     symbol: str = Query(..., description="股票代码"),
@@ -307,6 +362,32 @@ async def get_stock_analysis(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/screener")
+async def screen_stocks(
+    filters: str = Query(None, description="筛选条件，逗号分隔表示同时满足，如 rsi<30,ma_relationship=多头排列"),
+    sort: str = Query(None, description="排序列，前缀 - 表示降序，如 -rsi"),
+    limit: int = Query(50, description="最多返回的股票数"),
+    trade_date: str = Query(None, description="交易日，格式：YYYY-MM-DD，默认为最近的交易日"),
+    refresh: bool = Query(False, description="是否重新计算当日信号表")
+):
+    """全市场技术选股：按条件筛选当日的技术信号表"""
+    try:
+        conditions = parse_filters(filters)
+        if sort and sort.lstrip('-') not in ('ts_code',) + VALUE_COLUMNS + SIGNAL_COLUMNS:
+            raise ValueError(f"不支持的排序列: {sort.lstrip('-')}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        table = screener.load(trade_date, refresh)
+        result = screener.query(table, conditions, sort, limit)
+        # NaN（窗口不足的指标）无法序列化为 JSON，转换为 None
+        records = result.astype(object).where(result.notna(), None).to_dict('records')
+        return {"status": "success", "data": {"total": len(table), "count": len(records), "stocks": records}}
+    except Exception as e:
+        print(f"技术选股错误: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/stock/prediction")
 async def get_stock_prediction(
     symbol: str = Query(..., description="股票代码"),
@@ -0,0 +1,71 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from analysis.streaming_indicators import RealtimeIndicatorEngine
+from data_collection.symbol_resolver import get_symbol_resolver
+
+def quote_to_bar(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """将实时报价转换为当日截至目前的K线，停牌（价格为0）返回 None"""
+    try:
+        price = float(row.get('price') or 0)
+    except (TypeError, ValueError):
+        return None
+    if price <= 0:
+        return None
+
+    def _value(name):
+        try:
+            value = float(row.get(name) or 0)
+        except (TypeError, ValueError):
+            value = 0
+        return value if value > 0 else price
+
+    trade_date = str(row.get('date') or datetime.now().strftime('%Y%m%d')).replace('-', '')
+    return {
+        'ts_code': get_symbol_resolver().normalize(str(row.get('code', ''))),
+        'trade_date': trade_date,
+        'open': _value('open'),
+        'high': _value('high'),
+        'low': _value('low'),
+        'close': price,
+        # 实时行情成交量单位为股，日K线为手
+        'vol': float(row.get('volume') or 0) / 100
+    }
+
+def create_realtime_engine(data_collector, history_days: int = 365) -> RealtimeIndicatorEngine:
+    """创建实时指标引擎，使用数据收集器加载历史日K线预热
+
+    历史数据只从数据库或日K线接口读取，并去掉当天的K线：当天的K线由盘中报价更新，
+    预热时写入当天（例如实时报价）会使之后的报价被忽略。
+    """
+    def load_history(ts_code: str) -> List[Dict[str, Any]]:
+        today = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - timedelta(days=history_days)).strftime('%Y%m%d')
+        data = data_collector.storage.get_kline_data(ts_code, start_date, today, 'D')
+        if not data:
+            kline_data = data_collector.data_source.get_kline_data(ts_code, start_date, today, 'D') or {}
+            if kline_data.get('error'):
+                # 抛出异常使引擎不缓存未预热的指标，下次使用时重新加载
+                raise RuntimeError(kline_data['error'])
+            data = kline_data.get('data', [])
+        history = [bar for bar in data if str(bar.get('trade_date', '')).replace('-', '') < today]
+        return sorted(history, key=lambda bar: str(bar.get('trade_date', '')))
+
+    return RealtimeIndicatorEngine(load_history)
+
+# 进程内共享的实时指标引擎，预警系统和实时行情接口共用同一份指标状态
+_shared_engine: Optional[RealtimeIndicatorEngine] = None
+_shared_engine_lock = threading.Lock()
+
+def get_realtime_engine(data_collector=None) -> RealtimeIndicatorEngine:
+    """获取进程内共享的实时指标引擎"""
+    global _shared_engine
+
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            if data_collector is None:
+                from data_collection.data_collector import DataCollector
+                data_collector = DataCollector()
+            _shared_engine = create_realtime_engine(data_collector)
+
+    return _shared_engine
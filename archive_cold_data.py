@@ -0,0 +1,15 @@
+# 将已结束年份的K线和指数数据归档为 Parquet 冷数据，减小 PostgreSQL 的热数据量
+import argparse
+from data_collection.data_storage import DataStorage
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="归档已结束年份的K线/指数数据")
+    parser.add_argument("--before-year", type=int, default=None, help="归档该年份之前的数据，默认为当前年份")
+    parser.add_argument("--tables", default="kline_data,index_data", help="要归档的表，用逗号分隔")
+    parser.add_argument("--no-vacuum", action="store_true", help="归档后不执行 VACUUM ANALYZE")
+    args = parser.parse_args()
+
+    storage = DataStorage()
+    for table in args.tables.split(','):
+        archived = storage.archive_closed_years(table, before_year=args.before_year, vacuum=not args.no_vacuum)
+        print(f"{table} 归档完成，共 {sum(archived.values())} 条数据，{len(archived)} 个分区")
@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from .strategies import MAStrategy, MACDStrategy, RSIStrategy, KDJStrategy, BollingerBandsStrategy
 
 class BacktestManager:
@@ -1,19 +1,32 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Tuple
+import numpy as np
 import pandas as pd
+from analysis import kernels
+from analysis.indicator_cache import IndicatorCache, IndicatorFrame, get_indicator_cache
 
 class BaseStrategy(ABC):
     """策略抽象基类"""
     
-    def __init__(self, params: Dict[str, Any] = None):
-        """初始化策略"""
+    def __init__(self, params: Dict[str, Any] = None, indicator_cache: IndicatorCache = None):
+        """初始化策略
+        
+        Args:
+            params: 策略参数
+            indicator_cache: 指标缓存，如果为 None，使用进程内共享的缓存（参数优化时不同参数组合共享已计算的指标）
+        """
         self.params = params or {}
+        self.indicator_cache = indicator_cache or get_indicator_cache()
         self.position = 0  # 当前持仓
         self.capital = 1000000  # 初始资金
         self.historical_orders = []  # 历史订单
         self.historical_positions = []  # 历史持仓
         self.historical_capital = []  # 历史资金
     
+    def _frame(self, df: pd.DataFrame) -> IndicatorFrame:
+        """获取行情数据对应的指标帧"""
+        return self.indicator_cache.frame(df)
+    
     @abstractmethod
     def generate_signals(self, df: pd.DataFrame) -> List[int]:
         """生成交易信号"""
@@ -38,46 +51,31 @@ class BaseStrategy(ABC):
         }
     
     def _simulate_trading(self, df: pd.DataFrame, signals: List[int]):
-        """模拟交易"""
-        current_position = 0
-        current_capital = self.capital
-        
-        for i, signal in enumerate(signals):
-            close_price = df.iloc[i]['close']
-            
-            # 记录当前状态
-            self.historical_positions.append(current_position)
-            self.historical_capital.append(current_capital)
-            
-            # 执行交易信号
-            if signal == 1 and current_position == 0:
-                # 买入
-                shares = current_capital // close_price
-                current_position = shares
-                current_capital -= shares * close_price
-                
-                # 记录订单
-                self.historical_orders.append({
-                    'date': df.iloc[i]['trade_date'],
-                    'signal': 'buy',
-                    'price': close_price,
-                    'shares': shares,
-                    'capital': current_capital
-                })
-            elif signal == -1 and current_position > 0:
-                # 卖出
-                current_capital += current_position * close_price
-                
-                # 记录订单
-                self.historical_orders.append({
-                    'date': df.iloc[i]['trade_date'],
-                    'signal': 'sell',
-                    'price': close_price,
-                    'shares': current_position,
-                    'capital': current_capital
-                })
-                
-                current_position = 0
+        """模拟交易
+
+        持仓循环由 analysis.kernels.simulate_long_only 计算（安装 numba 时为编译后的内核）。
+        params 中的 trailing_stop_pct 设置跟踪止损比例，默认不止损。
+        """
+        close = df['close'].to_numpy(dtype=float)[:len(signals)]
+        positions, capitals, orders = kernels.simulate_long_only(
+            close, np.asarray(signals, dtype=np.int64), self.capital,
+            self.params.get('trailing_stop_pct', 0.0))
+        
+        # 记录每根K线交易前的状态
+        self.historical_positions.extend(positions.tolist())
+        self.historical_capital.extend(capitals.tolist())
+        
+        # 记录订单
+        dates = df['trade_date']
+        for i, side, shares, capital in zip(orders['index'].tolist(), orders['side'].tolist(),
+                                            orders['shares'].tolist(), orders['capital'].tolist()):
+            self.historical_orders.append({
+                'date': dates.iloc[i],
+                'signal': 'buy' if side == 1 else 'sell',
+                'price': close[i],
+                'shares': shares,
+                'capital': capital
+            })
     
     def _calculate_performance(self, df: pd.DataFrame) -> Dict[str, Any]:
         """计算绩效"""
@@ -178,6 +176,3 @@ class BaseStrategy(ABC):
                     win_trades += 1
         
         return win_trades / total_trades * 100 if total_trades > 0 else 0
-
-# 导入numpy
-import numpy as np
\ No newline at end of file
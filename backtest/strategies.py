@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Any
+from analysis import indicators
 from .base_strategy import BaseStrategy
 
 class MAStrategy(BaseStrategy):
@@ -20,29 +21,18 @@ class MAStrategy(BaseStrategy):
     
     def generate_signals(self, df: pd.DataFrame) -> List[int]:
         """生成交易信号"""
-        signals = []
-        
         # 计算移动平均线
-        df['MA_short'] = df['close'].rolling(window=self.short_window).mean()
-        df['MA_long'] = df['close'].rolling(window=self.long_window).mean()
+        frame = self._frame(df)
+        ma_short = frame.get('sma', window=self.short_window)
+        ma_long = frame.get('sma', window=self.long_window)
+        df['MA_short'] = ma_short
+        df['MA_long'] = ma_long
         
-        for i in range(len(df)):
-            if i < self.long_window:
-                signals.append(0)  # 无信号
-                continue
-            
-            # 金叉：短期均线上穿长期均线
-            if (df.iloc[i]['MA_short'] > df.iloc[i]['MA_long'] and 
-                df.iloc[i-1]['MA_short'] <= df.iloc[i-1]['MA_long']):
-                signals.append(1)  # 买入信号
-            # 死叉：短期均线下穿长期均线
-            elif (df.iloc[i]['MA_short'] < df.iloc[i]['MA_long'] and 
-                  df.iloc[i-1]['MA_short'] >= df.iloc[i-1]['MA_long']):
-                signals.append(-1)  # 卖出信号
-            else:
-                signals.append(0)  # 无信号
+        # 金叉（短期均线上穿长期均线）买入，死叉卖出
+        signals = indicators.crossover(ma_short, ma_long)
+        signals[:self.long_window] = 0  # 均线未形成前无信号
         
-        return signals
+        return signals.tolist()
 
 class MACDStrategy(BaseStrategy):
     """MACD策略"""
@@ -63,32 +53,16 @@ class MACDStrategy(BaseStrategy):
     
     def generate_signals(self, df: pd.DataFrame) -> List[int]:
         """生成交易信号"""
-        signals = []
-        
         # 计算MACD
-        exp1 = df['close'].ewm(span=self.fast_period, adjust=False).mean()
-        exp2 = df['close'].ewm(span=self.slow_period, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal'] = df['MACD'].ewm(span=self.signal_period, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal']
+        macd_line, signal_line, macd_hist = self._frame(df).get(
+            'macd', fast_period=self.fast_period, slow_period=self.slow_period, signal_period=self.signal_period)
+        df['MACD'], df['Signal'], df['MACD_Hist'] = macd_line, signal_line, macd_hist
         
-        for i in range(len(df)):
-            if i < self.slow_period:
-                signals.append(0)  # 无信号
-                continue
-            
-            # 金叉：MACD线上穿信号线
-            if (df.iloc[i]['MACD'] > df.iloc[i]['Signal'] and 
-                df.iloc[i-1]['MACD'] <= df.iloc[i-1]['Signal']):
-                signals.append(1)  # 买入信号
-            # 死叉：MACD线下穿信号线
-            elif (df.iloc[i]['MACD'] < df.iloc[i]['Signal'] and 
-                  df.iloc[i-1]['MACD'] >= df.iloc[i-1]['Signal']):
-                signals.append(-1)  # 卖出信号
-            else:
-                signals.append(0)  # 无信号
+        # 金叉（MACD线上穿信号线）买入，死叉卖出
+        signals = indicators.crossover(macd_line, signal_line)
+        signals[:self.slow_period] = 0  # 指标未稳定前无信号
         
-        return signals
+        return signals.tolist()
 
 class RSIStrategy(BaseStrategy):
     """RSI策略"""
@@ -109,30 +83,18 @@ class RSIStrategy(BaseStrategy):
     
     def generate_signals(self, df: pd.DataFrame) -> List[int]:
         """生成交易信号"""
-        signals = []
-        
         # 计算RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=self.window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=self.window).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        rsi = self._frame(df).get('rsi', window=self.window)
+        df['RSI'] = rsi
         
-        for i in range(len(df)):
-            if i < self.window:
-                signals.append(0)  # 无信号
-                continue
-            
-            # 超卖：RSI低于超卖水平
-            if df.iloc[i]['RSI'] < self.oversold_level:
-                signals.append(1)  # 买入信号
-            # 超买：RSI高于超买水平
-            elif df.iloc[i]['RSI'] > self.overbought_level:
-                signals.append(-1)  # 卖出信号
-            else:
-                signals.append(0)  # 无信号
+        # 超卖买入，超买卖出
+        signals = np.zeros(len(df), dtype=np.int8)
+        with np.errstate(invalid='ignore'):
+            signals[rsi < self.oversold_level] = 1
+            signals[rsi > self.overbought_level] = -1
+        signals[:self.window] = 0  # 指标未形成前无信号
         
-        return signals
+        return signals.tolist()
 
 class KDJStrategy(BaseStrategy):
     """KDJ策略"""
@@ -153,33 +115,15 @@ class KDJStrategy(BaseStrategy):
     
     def generate_signals(self, df: pd.DataFrame) -> List[int]:
         """生成交易信号"""
-        signals = []
-        
         # 计算KDJ
-        low_min = df['low'].rolling(window=self.window).min()
-        high_max = df['high'].rolling(window=self.window).max()
-        df['RSV'] = (df['close'] - low_min) / (high_max - low_min) * 100
-        df['K'] = df['RSV'].ewm(alpha=1/3, adjust=False).mean()
-        df['D'] = df['K'].ewm(alpha=1/3, adjust=False).mean()
-        df['J'] = 3 * df['K'] - 2 * df['D']
+        rsv, k, d, j = self._frame(df).get('kdj', window=self.window)
+        df['RSV'], df['K'], df['D'], df['J'] = rsv, k, d, j
         
-        for i in range(len(df)):
-            if i < self.window:
-                signals.append(0)  # 无信号
-                continue
-            
-            # 金叉：K线上穿D线
-            if (df.iloc[i]['K'] > df.iloc[i]['D'] and 
-                df.iloc[i-1]['K'] <= df.iloc[i-1]['D']):
-                signals.append(1)  # 买入信号
-            # 死叉：K线下穿D线
-            elif (df.iloc[i]['K'] < df.iloc[i]['D'] and 
-                  df.iloc[i-1]['K'] >= df.iloc[i-1]['D']):
-                signals.append(-1)  # 卖出信号
-            else:
-                signals.append(0)  # 无信号
+        # 金叉（K线上穿D线）买入，死叉卖出
+        signals = indicators.crossover(k, d)
+        signals[:self.window] = 0  # 指标未形成前无信号
         
-        return signals
+        return signals.tolist()
 
 class BollingerBandsStrategy(BaseStrategy):
     """布林带策略"""
@@ -198,26 +142,17 @@ class BollingerBandsStrategy(BaseStrategy):
     
     def generate_signals(self, df: pd.DataFrame) -> List[int]:
         """生成交易信号"""
-        signals = []
-        
         # 计算布林带
-        df['BB_Mid'] = df['close'].rolling(window=self.window).mean()
-        df['BB_Std'] = df['close'].rolling(window=self.window).std()
-        df['BB_Upper'] = df['BB_Mid'] + self.std_dev * df['BB_Std']
-        df['BB_Lower'] = df['BB_Mid'] - self.std_dev * df['BB_Std']
-        
-        for i in range(len(df)):
-            if i < self.window:
-                signals.append(0)  # 无信号
-                continue
-            
-            # 突破下轨：买入信号
-            if df.iloc[i]['close'] < df.iloc[i]['BB_Lower']:
-                signals.append(1)  # 买入信号
-            # 突破上轨：卖出信号
-            elif df.iloc[i]['close'] > df.iloc[i]['BB_Upper']:
-                signals.append(-1)  # 卖出信号
-            else:
-                signals.append(0)  # 无信号
-        
-        return signals
\ No newline at end of file
+        frame = self._frame(df)
+        close = frame.column('close')
+        bb_mid, bb_std, bb_upper, bb_lower = frame.get('bollinger_bands', window=self.window, num_std=self.std_dev)
+        df['BB_Mid'], df['BB_Std'], df['BB_Upper'], df['BB_Lower'] = bb_mid, bb_std, bb_upper, bb_lower
+        
+        # 突破下轨买入，突破上轨卖出
+        signals = np.zeros(len(df), dtype=np.int8)
+        with np.errstate(invalid='ignore'):
+            signals[close < bb_lower] = 1
+            signals[close > bb_upper] = -1
+        signals[:self.window] = 0  # 布林带未形成前无信号
+        
+        return signals.tolist()
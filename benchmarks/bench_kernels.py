@@ -0,0 +1,111 @@
+"""递推计算内核的基准测试
+
+对每个可用后端（numpy/numba）计时，并与参考实现比较结果：
+  ema_with_gaps   pandas ewm(adjust=False).mean()
+  wilder_smooth   逐点循环的 Wilder 平滑
+  rsi(wilder)     streaming_indicators.RSI 逐笔更新
+  simulate        逐根K线的持仓循环（原 BaseStrategy._simulate_trading）
+结果不一致时以非零状态码退出。
+
+用法：python benchmarks/bench_kernels.py [--size 200000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis import indicators, kernels
+from analysis.streaming_indicators import RSI
+
+def reference_simulate(close, signals, capital):
+    """原 BaseStrategy._simulate_trading 的持仓循环"""
+    position, cash = 0, capital
+    positions, capitals, orders = [], [], []
+    for i, signal in enumerate(signals):
+        price = close[i]
+        positions.append(position)
+        capitals.append(cash)
+        if signal == 1 and position == 0:
+            shares = cash // price
+            position = shares
+            cash -= shares * price
+            orders.append((i, 1, shares, cash))
+        elif signal == -1 and position > 0:
+            cash += position * price
+            orders.append((i, -1, position, cash))
+            position = 0
+    return np.array(positions, dtype=float), np.array(capitals, dtype=float), orders
+
+def timed(func, repeat):
+    func()  # 预热（numba 首次调用时编译）
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+def compare(name, actual, expected, rtol):
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    exact = actual.shape == expected.shape and np.array_equal(actual, expected, equal_nan=True)
+    close = exact or (actual.shape == expected.shape and
+                      np.allclose(actual, expected, rtol=rtol, atol=rtol, equal_nan=True))
+    status = '逐位一致' if exact else ('误差范围内' if close else '不一致')
+    return close, status
+
+def main():
+    parser = argparse.ArgumentParser(description='递推计算内核基准测试')
+    parser.add_argument('--size', type=int, default=200000, help='序列长度')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, args.size)))
+    gappy = close.copy()
+    gappy[rng.random(args.size) < 0.01] = np.nan
+    signals = rng.choice([-1, 0, 0, 0, 1], args.size)
+
+    # 参考结果
+    ema_expected = pd.Series(gappy).ewm(alpha=1 / 3, adjust=False).mean().to_numpy()
+    wilder_expected = kernels._wilder_loop(gappy, 14)
+    rsi_model = RSI(14, 'wilder')
+    rsi_expected = np.array([rsi_model.update(value) for value in close])
+    sim_positions, sim_capitals, sim_orders = reference_simulate(close.tolist(), signals.tolist(), 1000000)
+    _, reference_time = timed(lambda: reference_simulate(close.tolist(), signals.tolist(), 1000000), 1)
+
+    backends = ['numpy'] + (['numba'] if kernels.numba_available else [])
+    print(f"序列长度 {args.size}，可用后端: {', '.join(backends)}")
+    print(f"{'内核':<16}{'后端':<8}{'耗时(ms)':>12}  结果")
+    print(f"{'simulate':<16}{'参考':<8}{reference_time * 1000:>12.2f}  -")
+
+    failed = False
+    for backend in backends:
+        kernels.set_backend(backend)
+        checks = [
+            ('ema_with_gaps', lambda: kernels.ema_with_gaps(gappy, 1 / 3), ema_expected, 1e-12),
+            ('wilder_smooth', lambda: kernels.wilder_smooth(gappy, 14), wilder_expected, 1e-10),
+            ('rsi(wilder)', lambda: indicators.rsi(close, 14, 'wilder'), rsi_expected, 1e-9),
+        ]
+        for name, func, expected, rtol in checks:
+            result, elapsed = timed(func, args.repeat)
+            ok, status = compare(name, result, expected, rtol)
+            failed |= not ok
+            print(f"{name:<16}{backend:<8}{elapsed * 1000:>12.2f}  {status}")
+
+        (positions, capitals, orders), elapsed = timed(
+            lambda: kernels.simulate_long_only(close, signals, 1000000), args.repeat)
+        order_rows = list(zip(orders['index'].tolist(), orders['side'].tolist(),
+                              orders['shares'].tolist(), orders['capital'].tolist()))
+        ok = (order_rows == sim_orders and np.array_equal(positions, sim_positions)
+              and np.array_equal(capitals, sim_capitals))
+        failed |= not ok
+        print(f"{'simulate':<16}{backend:<8}{elapsed * 1000:>12.2f}  {'逐位一致' if ok else '不一致'}")
+
+    if failed:
+        print("存在与参考实现不一致的结果")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
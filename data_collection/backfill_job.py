@@ -0,0 +1,378 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional
+import psycopg2
+from psycopg2.extras import execute_values
+from .data_collector import DataCollector, FETCH_EMPTY, FETCH_ERROR, FETCH_QUOTA, FETCH_SAVED
+
+class BackfillJob:
+    """可断点续传的全市场K线回填任务
+
+    每个 (股票, 日期范围, 频率) 在 backfill_checkpoint 表中记录状态和尝试次数：
+    pending -> running -> done；失败后为 failed 并在 retry_delay 秒后重试，
+    达到最大尝试次数后进入死信状态 dead，不再自动重试。区间内没有数据
+    （停牌、退市或尚未上市）视为完成；数据源配额超限时退避等待，不计入尝试次数。
+    任务重启时已完成的股票不会重复获取。
+
+    执行中的记录带有 owner 和租约，由心跳线程续约，同一任务可以由多个进程同时执行；
+    进程异常退出后租约过期，记录会被其他进程（或重启后的本进程）重新领取。
+    """
+
+    def __init__(self, collector: Optional[DataCollector] = None, job_name: str = None,
+                 max_workers: int = 4, max_attempts: int = 3, retry_delay: float = 30.0,
+                 worker_id: str = None, lease_seconds: int = 300, heartbeat_interval: float = 60.0,
+                 batch_size: int = 200, quota_delay: float = 60.0, max_quota_delay: float = 3600.0):
+        """初始化回填任务
+
+        Args:
+            collector: 数据收集器，如果为 None，使用默认数据源和存储
+            job_name: 任务名称，同名任务共享检查点，默认按日期范围和频率生成
+            max_workers: 并发获取的线程数
+            max_attempts: 每只股票的最大尝试次数，超过后进入死信列表
+            retry_delay: 失败后等待多少秒再重试
+            worker_id: 执行进程标识，默认为 主机名-进程号
+            lease_seconds: 租约时长（秒），应明显大于心跳间隔
+            heartbeat_interval: 心跳续约间隔（秒）
+            batch_size: 每次领取的记录数，多个进程同时执行时各自领取一批
+            quota_delay: 配额超限后首次退避的秒数，连续超限时加倍
+            max_quota_delay: 配额超限退避的最长秒数（例如等待 TuShare 每日配额恢复）
+        """
+        self.collector = collector or DataCollector()
+        self.db_url = self.collector.storage.db_url
+        self.job_name = job_name
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.batch_size = batch_size
+        self.quota_delay = quota_delay
+        self.max_quota_delay = max_quota_delay
+        # 配额超限后暂停获取直到 _resume_at（time.time()），各线程共享
+        self._quota_lock = threading.Lock()
+        self._resume_at = 0.0
+        self._current_quota_delay = quota_delay
+        # 本进程正在执行的记录，由心跳线程续约
+        self._active_ids = set()
+        self._init_table()
+
+    def _init_table(self):
+        """初始化检查点表"""
+        if not self.db_url:
+            print("警告：未设置 DATABASE_URL，无法初始化回填检查点表")
+            return
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+            id SERIAL PRIMARY KEY,
+            job_name TEXT,
+            ts_code TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            freq TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE(job_name, ts_code, start_date, end_date, freq)
+        )
+        ''')
+        # 早期版本的检查点表没有租约和重试时间列
+        cursor.execute('''
+        ALTER TABLE backfill_checkpoint
+            ADD COLUMN IF NOT EXISTS owner TEXT,
+            ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_backfill_checkpoint_status
+        ON backfill_checkpoint (job_name, status)
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def plan(self, symbols: List[str], start_date: str, end_date: str, freq: str = 'D') -> int:
+        """登记需要回填的股票，已登记的记录保持原状态（幂等）
+
+        Returns:
+            新登记的股票数量
+        """
+        if not self.db_url:
+            print("警告：未设置 DATABASE_URL，无法登记回填任务")
+            return 0
+
+        self.job_name = self.job_name or f'kline_{freq}_{start_date}_{end_date}'
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            # execute_values 分页执行，rowcount 只是最后一页的行数，按 RETURNING 的结果计数
+            inserted = execute_values(cursor, '''
+            INSERT INTO backfill_checkpoint (job_name, ts_code, start_date, end_date, freq)
+            VALUES %s
+            ON CONFLICT (job_name, ts_code, start_date, end_date, freq) DO NOTHING
+            RETURNING id
+            ''', [(self.job_name, symbol, start_date, end_date, freq) for symbol in symbols], fetch=True)
+            count = len(inserted)
+
+            conn.commit()
+            print(f"回填任务 {self.job_name} 新登记 {count} 只股票，共 {len(symbols)} 只")
+            return count
+        except Exception as e:
+            print(f"登记回填任务失败: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+
+    def run(self, idle_interval: float = 30.0) -> Dict[str, int]:
+        """执行回填，直到没有可重试的股票、其他进程也没有执行中的记录为止
+
+        Args:
+            idle_interval: 等待重试或等待其他进程时的最长轮询间隔（秒）
+
+        Returns:
+            各状态的股票数量
+        """
+        if not self.db_url or not self.job_name:
+            print("警告：回填任务未登记，无法执行")
+            return {}
+
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(stop_event,), daemon=True)
+        heartbeat.start()
+
+        batch_index = 0
+        try:
+            while True:
+                tasks = self._claim_tasks()
+                if not tasks:
+                    wait = self._next_wait()
+                    if wait is None:
+                        break
+                    time.sleep(min(max(wait, 1.0), idle_interval))
+                    continue
+
+                batch_index += 1
+                print(f"回填任务 {self.job_name} 工作进程 {self.worker_id} 第 {batch_index} 批，"
+                      f"共 {len(tasks)} 只股票")
+
+                with self._quota_lock:
+                    self._active_ids.update(task['id'] for task in tasks)
+                try:
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                        futures = [executor.submit(self._run_task, task) for task in tasks]
+                        for future in as_completed(futures):
+                            future.result()
+                finally:
+                    with self._quota_lock:
+                        self._active_ids.clear()
+        finally:
+            stop_event.set()
+            heartbeat.join()
+
+        summary = self.get_progress()
+        print(f"回填任务 {self.job_name} 结束：{summary}")
+        return summary
+
+    def _next_wait(self) -> Optional[float]:
+        """没有可领取的记录时需要等待的秒数：有等待重试的记录或其他进程仍在执行时返回，
+        否则返回 None 表示任务已结束"""
+        rows = self._query('''
+        SELECT
+            MIN(EXTRACT(EPOCH FROM next_attempt_at - NOW()))
+                FILTER (WHERE status IN ('pending', 'failed') AND attempts < %s),
+            MIN(EXTRACT(EPOCH FROM lease_expires_at - NOW())) FILTER (WHERE status = 'running')
+        FROM backfill_checkpoint
+        WHERE job_name = %s
+        ''', (self.max_attempts, self.job_name))
+        if not rows:
+            return None
+        waits = [float(value) for value in rows[0] if value is not None]
+        return min(waits) if waits else None
+
+    def _claim_tasks(self) -> List[Dict[str, Any]]:
+        """领取一批待执行、到达重试时间或租约已过期的记录，标记为 running 并持有租约"""
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            # 租约过期且已用完尝试次数的记录不再接管
+            cursor.execute('''
+            UPDATE backfill_checkpoint
+            SET status = 'dead', owner = NULL, lease_expires_at = NULL, updated_at = NOW()
+            WHERE job_name = %s AND status = 'running' AND lease_expires_at < NOW() AND attempts >= %s
+            ''', (self.job_name, self.max_attempts))
+
+            cursor.execute('''
+            UPDATE backfill_checkpoint
+            SET status = 'running', owner = %s, attempts = attempts + 1,
+                lease_expires_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+            WHERE id IN (
+                SELECT id FROM backfill_checkpoint
+                WHERE job_name = %s AND attempts < %s AND (
+                    (status IN ('pending', 'failed') AND (next_attempt_at IS NULL OR next_attempt_at <= NOW()))
+                    OR (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < NOW()))
+                )
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, ts_code, start_date, end_date, freq, attempts
+            ''', (self.worker_id, self.lease_seconds, self.job_name, self.max_attempts, self.batch_size))
+            rows = cursor.fetchall()
+
+            conn.commit()
+            return [
+                {'id': row[0], 'ts_code': row[1], 'start_date': row[2], 'end_date': row[3],
+                 'freq': row[4], 'attempts': row[5]}
+                for row in rows
+            ]
+        except Exception as e:
+            print(f"获取回填任务失败: {e}")
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
+
+    def _heartbeat_loop(self, stop_event: threading.Event):
+        """心跳循环：续约本进程正在执行的记录"""
+        while not stop_event.wait(self.heartbeat_interval):
+            with self._quota_lock:
+                ids = list(self._active_ids)
+            if ids:
+                self._execute('''
+                UPDATE backfill_checkpoint SET lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE id = ANY(%s) AND owner = %s AND status = 'running'
+                ''', (self.lease_seconds, ids, self.worker_id))
+
+    def _wait_for_quota(self):
+        """配额超限退避期间暂停获取"""
+        with self._quota_lock:
+            wait = self._resume_at - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _quota_exceeded(self) -> float:
+        """记录一次配额超限，返回退避秒数；连续超限时退避时间加倍"""
+        with self._quota_lock:
+            now = time.time()
+            if self._resume_at <= now:
+                self._resume_at = now + self._current_quota_delay
+                print(f"数据源配额超限，暂停 {self._current_quota_delay:.0f} 秒")
+                self._current_quota_delay = min(self._current_quota_delay * 2, self.max_quota_delay)
+            return self._resume_at - now
+
+    def _run_task(self, task: Dict[str, Any]):
+        """执行单只股票的回填并记录结果，租约已被其他进程接管时不覆盖"""
+        self._wait_for_quota()
+        try:
+            result = self.collector.fetch_and_save_kline_status(
+                task['ts_code'], task['start_date'], task['end_date'], task['freq'])
+        except Exception as e:
+            result = {'status': FETCH_ERROR, 'error': str(e)}
+        error = result['error']
+
+        if result['status'] == FETCH_QUOTA:
+            # 配额超限不是这只股票的问题：退回 pending，不计入尝试次数
+            delay = self._quota_exceeded()
+            self._execute('''
+            UPDATE backfill_checkpoint
+            SET status = 'pending', attempts = attempts - 1, last_error = %s, owner = NULL,
+                lease_expires_at = NULL, next_attempt_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+            WHERE id = %s AND owner = %s
+            ''', (error, delay, task['id'], self.worker_id))
+            return
+
+        if result['status'] in (FETCH_SAVED, FETCH_EMPTY):
+            with self._quota_lock:
+                self._current_quota_delay = self.quota_delay
+            status = 'done'
+            # 停牌、退市或尚未上市的股票区间内没有数据，记录原因以便核对
+            error = '区间内没有K线数据' if result['status'] == FETCH_EMPTY else None
+        elif task['attempts'] >= self.max_attempts:
+            status = 'dead'
+            print(f"{task['ts_code']} 已尝试 {task['attempts']} 次仍失败，加入死信列表: {error}")
+        else:
+            status = 'failed'
+
+        self._execute('''
+        UPDATE backfill_checkpoint
+        SET status = %s, last_error = %s, owner = NULL, lease_expires_at = NULL,
+            next_attempt_at = CASE WHEN %s = 'failed' THEN NOW() + make_interval(secs => %s) END,
+            updated_at = NOW()
+        WHERE id = %s AND owner = %s
+        ''', (status, error, status, self.retry_delay, task['id'], self.worker_id))
+
+    def get_progress(self) -> Dict[str, int]:
+        """获取各状态的股票数量"""
+        rows = self._query('''
+        SELECT status, COUNT(*) FROM backfill_checkpoint
+        WHERE job_name = %s GROUP BY status
+        ''', (self.job_name,))
+        return {row[0]: row[1] for row in rows}
+
+    def get_dead_letters(self) -> List[Dict[str, Any]]:
+        """获取死信列表（多次失败的股票）"""
+        rows = self._query('''
+        SELECT ts_code, start_date, end_date, freq, attempts, last_error, updated_at
+        FROM backfill_checkpoint
+        WHERE job_name = %s AND status = 'dead'
+        ORDER BY ts_code
+        ''', (self.job_name,))
+        return [
+            {'ts_code': row[0], 'start_date': row[1], 'end_date': row[2], 'freq': row[3],
+             'attempts': row[4], 'last_error': row[5], 'updated_at': row[6]}
+            for row in rows
+        ]
+
+    def requeue_dead_letters(self) -> int:
+        """将死信列表中的股票重新加入队列"""
+        return self._execute('''
+        UPDATE backfill_checkpoint
+        SET status = 'pending', attempts = 0, next_attempt_at = NULL, updated_at = NOW()
+        WHERE job_name = %s AND status = 'dead'
+        ''', (self.job_name,))
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        """执行更新语句，返回影响的行数"""
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(sql, params)
+            count = cursor.rowcount
+            conn.commit()
+            return count
+        except Exception as e:
+            print(f"更新回填检查点失败: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        """执行查询语句"""
+        if not self.db_url or not self.job_name:
+            return []
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"查询回填检查点失败: {e}")
+            return []
+        finally:
+            conn.close()
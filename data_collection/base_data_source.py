@@ -27,4 +27,8 @@ class BaseDataSource(ABC):
     @abstractmethod
     def get_index_data(self, index_symbol: str, start_date: str, end_date: str, freq: str = 'D') -> Dict[str, Any]:
         """获取指数数据"""
-        pass
\ No newline at end of file
+        pass
+    
+    def get_trade_calendar(self, exchange: str = 'SSE', start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+        """获取交易日历（cal_date、is_open），不支持的数据源返回空列表"""
+        return []
@@ -0,0 +1,277 @@
+import glob
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+import pandas as pd
+import psycopg2
+from .data_storage import DataStorage
+from .symbol_utils import normalize_ts_code
+
+class BulkImporter:
+    """历史行情批量导入器
+
+    从 CSV/Parquet 文件目录读取供应商导出的历史数据：多线程读取和校验文件，
+    将数据以 COPY 方式写入临时表，再批量合并（upsert）到 kline_data/index_data，
+    同一 (ts_code, trade_date, freq) 以最后读到的数据为准。
+    """
+
+    COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'pre_close',
+               'change', 'pct_chg', 'vol', 'amount', 'freq']
+    REQUIRED_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close']
+    PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close', 'change', 'pct_chg', 'vol', 'amount']
+
+    # 常见供应商列名到标准列名的映射（比较时忽略大小写）
+    COLUMN_ALIASES = {
+        'code': 'ts_code', 'symbol': 'ts_code', 'ticker': 'ts_code', 'stock_code': 'ts_code',
+        '股票代码': 'ts_code', '代码': 'ts_code', '证券代码': 'ts_code',
+        'date': 'trade_date', 'datetime': 'trade_date', 'trading_date': 'trade_date',
+        '日期': 'trade_date', '交易日期': 'trade_date',
+        '开盘': 'open', '开盘价': 'open',
+        '最高': 'high', '最高价': 'high',
+        '最低': 'low', '最低价': 'low',
+        '收盘': 'close', '收盘价': 'close',
+        'preclose': 'pre_close', 'prev_close': 'pre_close', '昨收': 'pre_close', '前收盘价': 'pre_close',
+        'chg': 'change', '涨跌额': 'change',
+        'pct_change': 'pct_chg', 'pctchg': 'pct_chg', '涨跌幅': 'pct_chg',
+        'volume': 'vol', '成交量': 'vol',
+        'turnover': 'amount', 'amt': 'amount', '成交额': 'amount'
+    }
+
+    FILE_PATTERNS = ('*.csv', '*.csv.gz', '*.parquet')
+
+    def __init__(self, storage: Optional[DataStorage] = None, max_workers: int = 4, batch_rows: int = 500000):
+        """初始化导入器
+
+        Args:
+            storage: 数据存储，如果为 None，使用默认数据库
+            max_workers: 读取文件的线程数
+            batch_rows: 每次合并到目标表的行数，合并后提交事务
+        """
+        self.storage = storage or DataStorage()
+        self.db_url = self.storage.db_url
+        self.max_workers = max_workers
+        self.batch_rows = batch_rows
+
+    def find_files(self, path: str, recursive: bool = True) -> List[str]:
+        """查找目录下的 CSV/Parquet 文件，path 也可以是单个文件"""
+        if os.path.isfile(path):
+            return [path]
+
+        files = []
+        for pattern in self.FILE_PATTERNS:
+            if recursive:
+                files.extend(glob.glob(os.path.join(path, '**', pattern), recursive=True))
+            else:
+                files.extend(glob.glob(os.path.join(path, pattern)))
+        return sorted(set(files))
+
+    def read_file(self, path: str, freq: str = 'D', is_index: bool = False) -> Tuple[pd.DataFrame, int]:
+        """读取并校验单个文件
+
+        Returns:
+            (标准化后的数据, 被拒绝的行数)
+
+        Raises:
+            ValueError: 文件缺少必需的列
+        """
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            # 代码和日期按字符串读取，避免丢失前导零
+            df = pd.read_csv(path, dtype=str, encoding_errors='replace')
+
+        df = self._rename_columns(df)
+
+        # 文件中没有代码列时，按文件名推断（如 600000.SH.csv、sh600000.csv）
+        if 'ts_code' not in df.columns:
+            stem = os.path.basename(path).split('.csv')[0].split('.parquet')[0]
+            df['ts_code'] = stem
+
+        missing = [col for col in self.REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"缺少必需的列: {', '.join(missing)}")
+
+        total = len(df)
+        df = self._normalize(df, freq, is_index)
+        return df, total - len(df)
+
+    def _rename_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """将列名映射为标准列名"""
+        columns = {}
+        for col in df.columns:
+            name = str(col).strip().lower()
+            name = self.COLUMN_ALIASES.get(name, name)
+            if name not in columns.values():
+                columns[col] = name
+        return df[list(columns)].rename(columns=columns)
+
+    def _normalize(self, df: pd.DataFrame, freq: str, is_index: bool) -> pd.DataFrame:
+        """标准化代码、日期和数值列，丢弃不合法的行"""
+        result = pd.DataFrame(index=df.index)
+
+        # 代码去重后再标准化，避免逐行调用
+        codes = df['ts_code'].astype(str)
+        # Parquet 中整数类型的代码列丢失了前导零
+        if pd.api.types.is_integer_dtype(df['ts_code']):
+            codes = codes.str.zfill(6)
+        mapping = {code: normalize_ts_code(code, is_index) for code in codes.unique()}
+        result['ts_code'] = codes.map(mapping)
+
+        # 日期统一为 YYYYMMDD，兼容 2024-01-02、2024/01/02、带时间的写法
+        dates = df['trade_date'].astype(str).str.replace(r'[-/]', '', regex=True).str[:8]
+        result['trade_date'] = dates.where(dates.str.fullmatch(r'\d{8}'))
+
+        for col in self.PRICE_COLUMNS:
+            if col in df.columns:
+                result[col] = pd.to_numeric(df[col], errors='coerce')
+            else:
+                result[col] = float('nan')
+
+        result['freq'] = df['freq'].fillna(freq).astype(str) if 'freq' in df.columns else freq
+
+        valid = (
+            result['ts_code'].notna() &
+            result['trade_date'].notna() &
+            result[['open', 'high', 'low', 'close']].notna().all(axis=1) &
+            (result['high'] >= result['low'])
+        )
+        return result.loc[valid, self.COLUMNS]
+
+    def _read_files(self, files: List[str], freq: str, is_index: bool) -> Iterator[Tuple[str, Any]]:
+        """多线程读取文件，按文件顺序产出 (文件, 结果或异常)
+
+        同时在读的文件不超过线程数的两倍，避免一次性把所有文件载入内存。
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = []
+            for path in files:
+                pending.append((path, executor.submit(self.read_file, path, freq, is_index)))
+                if len(pending) >= self.max_workers * 2:
+                    path, future = pending.pop(0)
+                    yield path, self._result(future)
+            for path, future in pending:
+                yield path, self._result(future)
+
+    @staticmethod
+    def _result(future) -> Any:
+        """获取读取结果，异常作为结果返回"""
+        try:
+            return future.result()
+        except Exception as e:
+            return e
+
+    def import_path(self, path: str, table: str = 'kline_data', freq: str = 'D',
+                    recursive: bool = True) -> Dict[str, int]:
+        """导入目录或文件中的历史数据
+
+        Args:
+            path: 数据目录或单个文件
+            table: 目标表，kline_data 或 index_data
+            freq: 文件中没有 freq 列时使用的K线频率
+            recursive: 是否递归查找子目录
+
+        Returns:
+            导入统计：files、failed_files、rows、rejected_rows
+        """
+        if table not in ('kline_data', 'index_data'):
+            raise ValueError(f"不支持导入的表: {table}")
+
+        stats = {'files': 0, 'failed_files': 0, 'rows': 0, 'rejected_rows': 0}
+
+        if not self.db_url:
+            print("警告：未设置 DATABASE_URL，无法导入数据")
+            return stats
+
+        files = self.find_files(path, recursive)
+        print(f"找到 {len(files)} 个待导入文件")
+        if not files:
+            return stats
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+            CREATE TEMP TABLE import_stage (
+                seq BIGSERIAL,
+                ts_code TEXT,
+                trade_date TEXT,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                pre_close REAL,
+                change REAL,
+                pct_chg REAL,
+                vol REAL,
+                amount REAL,
+                freq TEXT
+            ) ON COMMIT DELETE ROWS
+            ''')
+            conn.commit()
+
+            staged = 0
+            for file_path, result in self._read_files(files, freq, table == 'index_data'):
+                if isinstance(result, Exception):
+                    stats['failed_files'] += 1
+                    print(f"读取文件 {file_path} 失败: {result}")
+                    continue
+
+                df, rejected = result
+                stats['files'] += 1
+                stats['rejected_rows'] += rejected
+                if rejected:
+                    print(f"文件 {file_path} 有 {rejected} 行数据不合法，已跳过")
+
+                if df.empty:
+                    continue
+
+                self._copy_frame(cursor, df)
+                staged += len(df)
+
+                if staged >= self.batch_rows:
+                    stats['rows'] += self._merge(conn, cursor, table)
+                    staged = 0
+
+            if staged:
+                stats['rows'] += self._merge(conn, cursor, table)
+        except Exception as e:
+            print(f"导入数据失败: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+
+        print(f"导入完成：{stats['files']} 个文件，{stats['rows']} 行数据，"
+              f"{stats['rejected_rows']} 行不合法，{stats['failed_files']} 个文件读取失败")
+        return stats
+
+    def _copy_frame(self, cursor, df: pd.DataFrame) -> None:
+        """以 COPY 方式将数据写入临时表"""
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY import_stage ({', '.join(self.COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def _merge(self, conn, cursor, table: str) -> int:
+        """将临时表合并到目标表并提交，返回合并的行数"""
+        columns = ', '.join(self.COLUMNS)
+        updates = ',\n                '.join(f'{col} = EXCLUDED.{col}' for col in self.PRICE_COLUMNS)
+
+        # 同一批次内重复的记录只保留最后写入的一条，否则 ON CONFLICT 会报错
+        cursor.execute(f'''
+        INSERT INTO {table} ({columns})
+        SELECT DISTINCT ON (ts_code, trade_date, freq) {columns}
+        FROM import_stage
+        ORDER BY ts_code, trade_date, freq, seq DESC
+        ON CONFLICT (ts_code, trade_date, freq) DO UPDATE SET
+                {updates}
+        ''')
+        count = cursor.rowcount
+
+        # 变更通知、K线前缀和与缓存失效由存储层在提交时处理
+        self.storage.commit_bulk_import(conn, cursor, table, 'import_stage')
+
+        print(f"已合并 {count} 行数据到 {table}")
+        return count
@@ -0,0 +1,146 @@
+import json
+import os
+import select
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional
+import psycopg2
+
+# 数据变更通知频道
+CHANNEL = 'stock_data_changed'
+
+def publish_change(cursor, table: str, ts_code: str = None, freq: str = None,
+                   start_date: str = None, end_date: str = None) -> None:
+    """在当前事务中发布数据变更通知
+
+    使用 pg_notify，通知只会在事务提交后送达，事务回滚则不会发送。
+    """
+    payload = {
+        'table': table,
+        'ts_code': ts_code,
+        'freq': freq,
+        'start_date': start_date,
+        'end_date': end_date,
+        'pid': os.getpid()
+    }
+    cursor.execute('SELECT pg_notify(%s, %s)', (CHANNEL, json.dumps(payload)))
+
+class ChangeListener:
+    """数据变更监听器
+
+    使用独立的数据库连接执行 LISTEN，在后台线程中接收通知并分发给订阅者。
+    连接断开后会自动重连，并向订阅者发送一次全量失效通知（table 为 '*'），
+    因为断开期间的通知可能已经丢失。
+    """
+
+    def __init__(self, db_url: str, poll_timeout: float = 5.0, reconnect_delay: float = 5.0):
+        """初始化监听器
+
+        Args:
+            db_url: PostgreSQL 连接字符串（不能经过事务级连接池，否则 LISTEN 无效）
+            poll_timeout: 等待通知的超时秒数
+            reconnect_delay: 连接失败后的重连间隔秒数
+        """
+        self.db_url = db_url
+        self.poll_timeout = poll_timeout
+        self.reconnect_delay = reconnect_delay
+        self.subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self.running = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """订阅数据变更通知"""
+        with self._lock:
+            if callback not in self.subscribers:
+                self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """取消订阅"""
+        with self._lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def start(self) -> None:
+        """启动后台监听线程"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            self._thread = threading.Thread(target=self._listen_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台监听线程"""
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=self.poll_timeout + 1)
+
+    def _dispatch(self, payload: Dict[str, Any]) -> None:
+        """将通知分发给所有订阅者"""
+        with self._lock:
+            subscribers = list(self.subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"处理数据变更通知失败: {e}")
+
+    def _listen_loop(self) -> None:
+        """监听循环"""
+        first_connect = True
+
+        while self.running:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.db_url)
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {CHANNEL}')
+
+                # 重连后无法得知断开期间的变更，全部失效
+                if not first_connect:
+                    self._dispatch({'table': '*'})
+                first_connect = False
+
+                while self.running:
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            payload = json.loads(notify.payload)
+                        except ValueError:
+                            payload = {'table': '*'}
+                        self._dispatch(payload)
+            except Exception as e:
+                print(f"数据变更监听连接失败: {e}")
+                first_connect = False
+                time.sleep(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+# 每个数据库只保留一个监听器，所有缓存共享
+_listeners: Dict[str, ChangeListener] = {}
+_listeners_lock = threading.Lock()
+
+def get_change_listener(db_url: Optional[str]) -> Optional[ChangeListener]:
+    """获取（并按需启动）指定数据库的共享监听器
+
+    如果设置了环境变量 CHANGE_LISTEN_URL，则使用该地址监听（例如绕过 PgBouncer 直连数据库）。
+    """
+    listen_url = os.getenv('CHANGE_LISTEN_URL') or db_url
+    if not listen_url:
+        return None
+
+    with _listeners_lock:
+        listener = _listeners.get(listen_url)
+        if listener is None:
+            listener = ChangeListener(listen_url)
+            _listeners[listen_url] = listener
+            listener.start()
+
+    return listener
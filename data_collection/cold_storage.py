@@ -0,0 +1,211 @@
+import os
+from typing import Dict, List, Any, Optional, Iterable
+
+# Try to import pyarrow, but handle import error
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.parquet as pq
+    pyarrow_available = True
+except ImportError:
+    print("pyarrow not available, cold storage archive will be disabled")
+    pyarrow_available = False
+    pa = None
+    pq = None
+
+def merge_hot_cold(hot_rows: List[Dict[str, Any]], cold_rows: List[Dict[str, Any]],
+                   keys: tuple = ('trade_date',)) -> List[Dict[str, Any]]:
+    """合并热数据和冷数据，同一键（默认交易日）以热数据为准，按键排序"""
+    merged = {tuple(row[key] for key in keys): row for row in cold_rows}
+    merged.update({tuple(row[key] for key in keys): row for row in hot_rows})
+    return [merged[key] for key in sorted(merged)]
+
+class ColdStorage:
+    """冷数据存储类 - 将已结束年份的K线/指数数据归档为 Parquet 文件
+
+    目录结构：{archive_dir}/{table}/freq={freq}/year={year}.parquet
+    每个分区按 (ts_code, trade_date) 排序写入，行组带有最小/最大值统计信息，
+    读取时可以按股票代码和日期范围进行谓词下推。
+    """
+
+    COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'pre_close',
+               'change', 'pct_chg', 'vol', 'amount', 'freq']
+
+    def __init__(self, archive_dir: str = None, compression: str = 'zstd', row_group_size: int = 50000):
+        """初始化冷数据存储
+
+        Args:
+            archive_dir: 归档目录，如果为 None，从环境变量 COLD_ARCHIVE_DIR 获取，默认 ./cold_archive
+            compression: Parquet 压缩算法
+            row_group_size: 每个行组的行数，越小谓词下推越精确
+        """
+        self.archive_dir = archive_dir or os.getenv('COLD_ARCHIVE_DIR', './cold_archive')
+        self.compression = compression
+        self.row_group_size = row_group_size
+
+    @property
+    def available(self) -> bool:
+        """冷数据存储是否可用"""
+        return pyarrow_available
+
+    def _schema(self):
+        """Parquet 文件结构"""
+        fields = [('ts_code', pa.string()), ('trade_date', pa.string())]
+        fields += [(col, pa.float64()) for col in self.COLUMNS[2:-1]]
+        fields.append(('freq', pa.string()))
+        return pa.schema(fields)
+
+    def partition_path(self, table: str, freq: str, year: int) -> str:
+        """获取分区文件路径"""
+        return os.path.join(self.archive_dir, table, f'freq={freq}', f'year={year}.parquet')
+
+    def archived_freqs(self, table: str) -> List[str]:
+        """获取已归档的频率"""
+        table_dir = os.path.join(self.archive_dir, table)
+        if not self.available or not os.path.isdir(table_dir):
+            return []
+        return sorted(name[len('freq='):] for name in os.listdir(table_dir) if name.startswith('freq='))
+
+    def archived_years(self, table: str, freq: str) -> List[int]:
+        """获取已归档的年份"""
+        freq_dir = os.path.join(self.archive_dir, table, f'freq={freq}')
+        if not self.available or not os.path.isdir(freq_dir):
+            return []
+
+        years = []
+        for filename in os.listdir(freq_dir):
+            if filename.startswith('year=') and filename.endswith('.parquet'):
+                years.append(int(filename[len('year='):-len('.parquet')]))
+
+        return sorted(years)
+
+    def write_partition(self, table: str, freq: str, year: int, batches: Iterable[List[tuple]]) -> int:
+        """写入一个年份分区
+
+        Args:
+            batches: 按 (ts_code, trade_date) 排序的行批次，每行字段顺序与 COLUMNS 一致
+
+        Returns:
+            写入的行数
+        """
+        if not self.available:
+            raise RuntimeError("pyarrow 不可用，无法写入冷数据")
+
+        path = self.partition_path(table, freq, year)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # 分区已存在（例如补录了已归档年份的数据），合并后重写
+        if os.path.exists(path):
+            return self._merge_partition(path, batches)
+
+        # 先写入临时文件，完成后再替换，避免中途失败留下损坏的分区
+        tmp_path = path + '.tmp'
+        schema = self._schema()
+        count = 0
+
+        with pq.ParquetWriter(tmp_path, schema, compression=self.compression, write_statistics=True) as writer:
+            for batch in batches:
+                if not batch:
+                    continue
+                writer.write_table(self._rows_to_table(batch, schema), row_group_size=self.row_group_size)
+                count += len(batch)
+
+        os.replace(tmp_path, path)
+        return count
+
+    def _merge_partition(self, path: str, batches: Iterable[List[tuple]]) -> int:
+        """将新行合并到已有分区，同一 (ts_code, trade_date) 以新数据为准"""
+        schema = self._schema()
+        existing = pq.read_table(path).to_pylist()
+
+        merged = {(row['ts_code'], row['trade_date']): tuple(row[col] for col in self.COLUMNS) for row in existing}
+        count = 0
+        for batch in batches:
+            for row in batch:
+                merged[(row[0], row[1])] = tuple(row)
+                count += 1
+
+        rows = [merged[key] for key in sorted(merged)]
+        tmp_path = path + '.tmp'
+        pq.write_table(self._rows_to_table(rows, schema), tmp_path, compression=self.compression,
+                       row_group_size=self.row_group_size, write_statistics=True)
+        os.replace(tmp_path, path)
+
+        return count
+
+    def delete_symbol(self, table: str, ts_code: str) -> int:
+        """从所有已归档的分区中删除一只股票（重写受影响的分区），返回删除的行数"""
+        if not self.available:
+            return 0
+
+        count = 0
+        for freq in self.archived_freqs(table):
+            for year in self.archived_years(table, freq):
+                path = self.partition_path(table, freq, year)
+                data = pq.read_table(path)
+                keep = pa.compute.not_equal(data['ts_code'], pa.scalar(ts_code, pa.string()))
+                remaining = data.filter(keep)
+                if remaining.num_rows == data.num_rows:
+                    continue
+
+                count += data.num_rows - remaining.num_rows
+                if remaining.num_rows == 0:
+                    os.remove(path)
+                    continue
+                tmp_path = path + '.tmp'
+                pq.write_table(remaining, tmp_path, compression=self.compression,
+                               row_group_size=self.row_group_size, write_statistics=True)
+                os.replace(tmp_path, path)
+
+        return count
+
+    def _rows_to_table(self, rows: List[tuple], schema):
+        """将行列表转换为 Arrow 表"""
+        columns = list(zip(*rows))
+        arrays = [pa.array(columns[i], type=schema.field(i).type) for i in range(len(self.COLUMNS))]
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def read(self, table: str, ts_code: str, start_date: str, end_date: str, freq: str) -> List[Dict[str, Any]]:
+        """读取冷数据，按股票代码和日期范围进行谓词下推"""
+        if not self.available:
+            return []
+
+        start_year, end_year = int(start_date[:4]), int(end_date[:4])
+        years = [year for year in self.archived_years(table, freq) if start_year <= year <= end_year]
+
+        rows = []
+        for year in years:
+            data = pq.read_table(
+                self.partition_path(table, freq, year),
+                columns=self.COLUMNS[1:-1],
+                filters=[('ts_code', '=', ts_code), ('trade_date', '>=', start_date), ('trade_date', '<=', end_date)]
+            )
+            rows.extend(data.to_pylist())
+
+        return rows
+
+    def read_universe(self, table: str, ts_codes: Optional[List[str]], start_date: str, end_date: str,
+                      freq: str) -> List[Dict[str, Any]]:
+        """读取多只股票的冷数据（包含 ts_code 列），ts_codes 为 None 表示全部股票"""
+        if not self.available:
+            return []
+
+        start_year, end_year = int(start_date[:4]), int(end_date[:4])
+        years = [year for year in self.archived_years(table, freq) if start_year <= year <= end_year]
+        filters = [('trade_date', '>=', start_date), ('trade_date', '<=', end_date)]
+        if ts_codes is not None:
+            filters.append(('ts_code', 'in', list(ts_codes)))
+
+        rows = []
+        for year in years:
+            data = pq.read_table(self.partition_path(table, freq, year), columns=self.COLUMNS[:-1], filters=filters)
+            rows.extend(data.to_pylist())
+
+        return rows
+
+    def partition_row_count(self, table: str, freq: str, year: int) -> int:
+        """从文件元数据中获取分区行数"""
+        path = self.partition_path(table, freq, year)
+        if not self.available or not os.path.exists(path):
+            return 0
+        return pq.ParquetFile(path).metadata.num_rows
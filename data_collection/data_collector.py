@@ -1,7 +1,44 @@
-from typing import Dict, List, Optional, Any
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Any, Tuple
 from .base_data_source import BaseDataSource
 from .tushare_data_source import TuShareDataSource
 from .data_storage import DataStorage
+from .symbol_resolver import get_symbol_resolver
+from .symbol_utils import normalize_ts_code
+from .trading_calendar import TradingCalendar, format_days, get_trading_calendar, set_trading_calendar
+
+# fetch_and_save_kline_status 的结果状态
+FETCH_SAVED = 'saved'
+FETCH_EMPTY = 'empty'
+FETCH_QUOTA = 'quota'
+FETCH_ERROR = 'error'
+
+# TuShare 访问频率或每日配额超限时的错误信息，如 "抱歉，您每分钟最多访问该接口500次"
+QUOTA_ERROR_KEYWORDS = ('最多访问', '访问频率', '频次', 'rate limit')
+
+def is_quota_error(error: str) -> bool:
+    """错误信息是否表示数据源访问频率或配额超限"""
+    text = str(error).lower()
+    return any(keyword in text for keyword in QUOTA_ERROR_KEYWORDS)
+
+# 数据源已确认的区间：(股票代码, 频率) -> (开始日期, 结束日期, K线数量)，进程内共享。
+# 新上市或停牌的股票在区间内本来就不足 bars 根K线，确认过的区间不再重复请求数据源
+_source_ranges: Dict[Tuple[str, str], Tuple[str, str, int]] = {}
+_source_ranges_lock = threading.Lock()
+
+def _source_range_confirmed(symbol: str, freq: str, start_date: str, end_date: str, stored: int) -> bool:
+    """数据源在包含 [start_date, end_date] 的区间内的K线是否已全部在存储中"""
+    with _source_ranges_lock:
+        confirmed = _source_ranges.get((symbol, freq))
+    if confirmed is None:
+        return False
+    confirmed_start, confirmed_end, count = confirmed
+    return confirmed_start <= start_date and end_date <= confirmed_end and stored >= count
+
+def _confirm_source_range(symbol: str, freq: str, start_date: str, end_date: str, count: int) -> None:
+    with _source_ranges_lock:
+        _source_ranges[(symbol, freq)] = (start_date, end_date, count)
 
 class DataCollector:
     """数据收集管理器"""
@@ -31,22 +68,8 @@ class DataCollector:
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, freq: str = 'D') -> Dict[str, Any]:
         """获取股票历史数据"""
         # 1. 股票代码标准化处理
-        # 移除可能的前缀和后缀，保留6位数字代码
-        import re
-        simple_symbol = re.sub(r'[^0-9]', '', symbol)
-        
-        # 确保股票代码是6位数字
-        if len(simple_symbol) > 6:
-            simple_symbol = simple_symbol[-6:]
-        elif len(simple_symbol) < 6:
-            simple_symbol = simple_symbol.zfill(6)
-        
-        # 2. 确保股票代码格式正确
-        if not (symbol.endswith('.SZ') or symbol.endswith('.SH')):
-            if simple_symbol.startswith('6'):
-                symbol = f"{simple_symbol}.SH"
-            else:
-                symbol = f"{simple_symbol}.SZ"
+        symbol = get_symbol_resolver().normalize(symbol) or symbol
+        simple_symbol = symbol.split('.')[0]
         
         try:
             # 3. 尝试使用tushare的pro_api获取数据（优先使用）
@@ -131,6 +154,44 @@ class DataCollector:
         # 6. 如果所有尝试都失败，返回空数据
         return {'data': [], 'columns': []}
     
+    def get_kline_bars(self, symbol: str, bars: int, end_date: str = None, freq: str = 'D',
+                       start_date: str = None, max_extensions: int = 3) -> List[Dict[str, Any]]:
+        """获取截至 end_date 的最近 bars 根日K线，按交易日期升序排列
+        
+        先从缓存和数据库读取交易日历换算出的区间，不足时再从数据源获取并保存到数据库；
+        停牌等原因仍然不足时按缺少的数量继续向前扩展，最多扩展 max_extensions 次。
+        新上市或长期停牌的股票在区间内本来就不足 bars 根K线，数据源确认过的区间
+        之后直接返回数据库中的K线，不再重复请求数据源。
+        """
+        if freq != 'D':
+            raise ValueError("按K线数量获取只支持日K线")
+        
+        symbol = get_symbol_resolver().normalize(symbol) or symbol
+        calendar = get_trading_calendar()
+        end_date = end_date or date.today().strftime('%Y%m%d')
+        start_date = start_date or format_days(calendar.window_start(end_date, bars))
+        
+        data = []
+        for _ in range(max_extensions + 1):
+            previous = len(data)
+            data = self.storage.get_kline_data(symbol, start_date, end_date, freq)
+            if len(data) < bars and not _source_range_confirmed(symbol, freq, start_date, end_date, len(data)):
+                result = self.data_source.get_kline_data(symbol, start_date, end_date, freq) or {}
+                source = result.get('data') or []
+                if len(source) > len(data):
+                    # 保存后下次从数据库读取
+                    self.storage.save_kline_data(symbol, source, freq)
+                    data = source
+                if not result.get('error'):
+                    _confirm_source_range(symbol, freq, start_date, end_date, len(source))
+            # 数量足够，或向前扩展后没有更多数据（如上市时间不足）
+            if len(data) >= bars or len(data) <= previous:
+                break
+            start_date = format_days(calendar.offset(start_date, -(bars - len(data))))
+        
+        data = sorted(data, key=lambda bar: str(bar.get('trade_date', '')))
+        return data[-bars:] if bars > 0 else []
+    
     def fetch_and_save_stock_list(self, market: str = 'all'):
         """获取并保存股票列表"""
         print(f"开始获取 {market} 市场股票列表...")
@@ -141,16 +202,61 @@ class DataCollector:
         else:
             print("获取股票列表失败")
     
-    def fetch_and_save_kline_data(self, symbol: str, start_date: str, end_date: str, freq: str = 'D'):
-        """获取并保存K线数据"""
+    def fetch_and_save_kline_data(self, symbol: str, start_date: str, end_date: str, freq: str = 'D') -> bool:
+        """获取并保存K线数据，返回是否获取并保存成功"""
+        return self.fetch_and_save_kline_status(symbol, start_date, end_date, freq)['status'] == FETCH_SAVED
+    
+    def fetch_and_save_kline_status(self, symbol: str, start_date: str, end_date: str,
+                                    freq: str = 'D') -> Dict[str, Any]:
+        """获取并保存K线数据，返回结果状态
+        
+        Returns:
+            {'status': ..., 'error': ...}，status 为 FETCH_SAVED（已保存）、FETCH_EMPTY（区间内没有数据，
+            如停牌、退市或尚未上市）、FETCH_QUOTA（数据源访问频率或配额超限）或 FETCH_ERROR（其他错误）
+        """
+        symbol = normalize_ts_code(symbol) or symbol
         print(f"开始获取 {symbol} 从 {start_date} 到 {end_date} 的 {freq} 级K线数据...")
         
-        kline_data = self.data_source.get_kline_data(symbol, start_date, end_date, freq)
-        if kline_data and kline_data.get('data'):
-            self.storage.save_kline_data(symbol, kline_data['data'], freq)
-            print(f"K线数据获取完成，共 {len(kline_data['data'])} 条数据")
-        else:
-            print("获取K线数据失败")
+        kline_data = self.data_source.get_kline_data(symbol, start_date, end_date, freq) or {}
+        error = kline_data.get('error')
+        if error:
+            print(f"获取K线数据失败: {error}")
+            return {'status': FETCH_QUOTA if is_quota_error(error) else FETCH_ERROR, 'error': error}
+        
+        if not kline_data.get('data'):
+            print("区间内没有K线数据")
+            return {'status': FETCH_EMPTY, 'error': None}
+        
+        if not self.storage.save_kline_data(symbol, kline_data['data'], freq):
+            return {'status': FETCH_ERROR, 'error': '保存K线数据失败'}
+        print(f"K线数据获取完成，共 {len(kline_data['data'])} 条数据")
+        return {'status': FETCH_SAVED, 'error': None}
+    
+    def fetch_and_save_trade_calendar(self, exchange: str = 'SSE', start_date: str = '19901219',
+                                      end_date: str = None) -> bool:
+        """批量获取并保存交易日历，成功后替换进程内共享的交易日历"""
+        print(f"开始获取 {exchange} 交易日历...")
+        
+        calendar = self.data_source.get_trade_calendar(exchange, start_date, end_date)
+        if not calendar or not self.storage.save_trade_calendar(exchange, calendar):
+            print("获取交易日历失败")
+            return False
+        
+        set_trading_calendar(TradingCalendar.from_records(self.storage.get_trade_calendar(exchange) or calendar, exchange))
+        print(f"交易日历获取完成，共 {len(calendar)} 天")
+        return True
+    
+    def find_kline_gaps(self, symbol: str, start_date: str, end_date: str, freq: str = 'D') -> List[str]:
+        """缺口检测：返回区间内数据库中缺少日K线的交易日（YYYYMMDD）
+        
+        停牌日同样没有K线，返回结果需要结合停复牌信息判断。
+        """
+        if freq != 'D':
+            raise ValueError("缺口检测只支持日K线")
+        
+        data = self.storage.get_kline_data(symbol, start_date, end_date, freq)
+        missing = get_trading_calendar().missing_days([str(row['trade_date']) for row in data], start_date, end_date)
+        return list(format_days(missing))
     
     def fetch_and_save_financial_data(self, symbol: str, year: int, quarter: int):
         """获取并保存财务数据"""
@@ -186,22 +292,26 @@ class DataCollector:
         
         return realtime_data
     
-    def batch_fetch_kline_data(self, symbols: List[str], start_date: str, end_date: str, freq: str = 'D'):
-        """批量获取K线数据"""
+    def batch_fetch_kline_data(self, symbols: List[str], start_date: str, end_date: str, freq: str = 'D') -> Dict[str, List[str]]:
+        """批量获取K线数据，返回成功和失败的股票代码"""
         print(f"开始批量获取 {len(symbols)} 只股票的K线数据...")
         
-        success_count = 0
-        fail_count = 0
+        succeeded = []
+        failed = []
         
         for symbol in symbols:
             try:
-                self.fetch_and_save_kline_data(symbol, start_date, end_date, freq)
-                success_count += 1
+                if self.fetch_and_save_kline_data(symbol, start_date, end_date, freq):
+                    succeeded.append(symbol)
+                else:
+                    failed.append(symbol)
             except Exception as e:
                 print(f"获取 {symbol} 失败: {e}")
-                fail_count += 1
+                failed.append(symbol)
+        
+        print(f"批量获取完成：成功 {len(succeeded)} 只，失败 {len(failed)} 只")
         
-        print(f"批量获取完成：成功 {success_count} 只，失败 {fail_count} 只")
+        return {'succeeded': succeeded, 'failed': failed}
     
     def initialize_sample_data(self):
         """初始化样本数据"""
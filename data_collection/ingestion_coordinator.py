@@ -0,0 +1,393 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Any, Optional
+import psycopg2
+from psycopg2.extras import execute_values
+from .data_collector import DataCollector, FETCH_ERROR, FETCH_QUOTA, FETCH_SAVED
+
+class IngestionCoordinator:
+    """分片数据采集协调器
+
+    将股票池切分为多个分片记录在 ingestion_shards 租约表中，
+    多个进程或机器上的 IngestionWorker 共享同一数据库，通过
+    SELECT ... FOR UPDATE SKIP LOCKED 领取分片，互不阻塞。
+    """
+
+    def __init__(self, db_url: str = None):
+        """初始化协调器
+
+        Args:
+            db_url: PostgreSQL 连接字符串，如果为 None，从环境变量 DATABASE_URL 获取
+        """
+        self.db_url = db_url or os.getenv('DATABASE_URL')
+        self._init_table()
+
+    def _init_table(self):
+        """初始化租约表"""
+        if not self.db_url:
+            print("警告：未设置 DATABASE_URL，无法初始化分片租约表")
+            return
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingestion_shards (
+            id SERIAL PRIMARY KEY,
+            job_name TEXT,
+            shard_index INTEGER,
+            symbols TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            freq TEXT,
+            status TEXT DEFAULT 'pending',
+            owner TEXT,
+            lease_expires_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            attempts INTEGER DEFAULT 0,
+            failed_symbols TEXT,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE(job_name, shard_index)
+        )
+        ''')
+        # 早期版本的租约表没有重试时间列
+        cursor.execute('ALTER TABLE ingestion_shards ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ingestion_shards_status
+        ON ingestion_shards (job_name, status)
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def create_shards(self, job_name: str, symbols: List[str], start_date: str, end_date: str,
+                      freq: str = 'D', shard_size: int = 50) -> int:
+        """切分股票池并登记分片，以相同参数重复调用不会覆盖已有分片（幂等）
+
+        Returns:
+            新登记的分片数量
+
+        Raises:
+            ValueError: 同名任务已登记，但股票池、日期范围或频率不同
+        """
+        if not self.db_url:
+            print("警告：未设置 DATABASE_URL，无法登记分片")
+            return 0
+
+        shards = [
+            (job_name, index, json.dumps(symbols[offset:offset + shard_size]), start_date, end_date, freq)
+            for index, offset in enumerate(range(0, len(symbols), shard_size))
+        ]
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+        conflict = None
+
+        try:
+            # 同一任务的登记串行执行，避免两个协调器同时切分
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (job_name,))
+            cursor.execute('''
+            SELECT symbols, start_date, end_date, freq FROM ingestion_shards WHERE job_name = %s
+            ''', (job_name,))
+            existing = cursor.fetchall()
+
+            if existing:
+                # 已登记的分片覆盖的股票池必须与本次相同，否则新增的股票不会被采集
+                planned = set()
+                for row in existing:
+                    planned.update(json.loads(row[0]))
+                ranges = {(row[1], row[2], row[3]) for row in existing}
+                if planned != set(symbols) or ranges != {(start_date, end_date, freq)}:
+                    conflict = (f"采集任务 {job_name} 已按不同的参数登记（已登记 {len(planned)} 只股票，"
+                                f"新增 {len(set(symbols) - planned)} 只，缺少 {len(planned - set(symbols))} 只），"
+                                f"请使用新的任务名称")
+                conn.rollback()
+                count = 0
+            else:
+                # execute_values 分页执行，rowcount 只是最后一页的行数，按 RETURNING 的结果计数
+                inserted = execute_values(cursor, '''
+                INSERT INTO ingestion_shards (job_name, shard_index, symbols, start_date, end_date, freq)
+                VALUES %s
+                ON CONFLICT (job_name, shard_index) DO NOTHING
+                RETURNING id
+                ''', shards, fetch=True)
+                count = len(inserted)
+                conn.commit()
+        except Exception as e:
+            print(f"登记分片失败: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+
+        if conflict:
+            raise ValueError(conflict)
+        print(f"采集任务 {job_name} 新登记 {count} 个分片，共 {len(shards)} 个")
+        return count
+
+    def get_progress(self, job_name: str) -> Dict[str, int]:
+        """获取各状态的分片数量"""
+        if not self.db_url:
+            return {}
+
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+            SELECT status, COUNT(*) FROM ingestion_shards
+            WHERE job_name = %s GROUP BY status
+            ''', (job_name,))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"获取分片进度失败: {e}")
+            return {}
+        finally:
+            conn.close()
+
+class IngestionWorker:
+    """分片采集工作进程
+
+    领取分片后持有租约，并由心跳线程定期续约；进程异常退出后租约过期，
+    分片会被其他工作进程重新领取。与 BackfillJob 相同，区间内没有数据的股票视为完成；
+    失败的分片在 retry_delay 秒后只重试其中失败的股票，超过最大尝试次数后标记为 dead；
+    数据源配额超限时停止处理分片，未处理的股票退回队列并退避等待，不计入尝试次数。
+    """
+
+    def __init__(self, job_name: str, collector: Optional[DataCollector] = None, worker_id: str = None,
+                 lease_seconds: int = 300, heartbeat_interval: float = 60.0, max_attempts: int = 3,
+                 retry_delay: float = 30.0, quota_delay: float = 60.0, max_quota_delay: float = 3600.0):
+        """初始化工作进程
+
+        Args:
+            job_name: 采集任务名称
+            collector: 数据收集器，如果为 None，使用默认数据源和存储
+            worker_id: 工作进程标识，默认为 主机名-进程号
+            lease_seconds: 租约时长（秒），应明显大于心跳间隔
+            heartbeat_interval: 心跳续约间隔（秒）
+            max_attempts: 每个分片的最大尝试次数
+            retry_delay: 分片失败后等待多少秒再重试
+            quota_delay: 配额超限后首次退避的秒数，连续超限时加倍
+            max_quota_delay: 配额超限退避的最长秒数
+        """
+        self.job_name = job_name
+        self.collector = collector or DataCollector()
+        self.db_url = self.collector.storage.db_url
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.quota_delay = quota_delay
+        self.max_quota_delay = max_quota_delay
+        self._current_quota_delay = quota_delay
+
+    def claim_shard(self) -> Optional[Dict[str, Any]]:
+        """领取一个待处理、失败可重试或租约已过期的分片"""
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            # 租约过期且已用完尝试次数的分片不再接管
+            cursor.execute('''
+            UPDATE ingestion_shards SET status = 'dead', updated_at = NOW()
+            WHERE job_name = %s AND status = 'running' AND lease_expires_at < NOW() AND attempts >= %s
+            ''', (self.job_name, self.max_attempts))
+
+            cursor.execute('''
+            UPDATE ingestion_shards
+            SET status = 'running', owner = %s, attempts = attempts + 1,
+                lease_expires_at = NOW() + make_interval(secs => %s),
+                heartbeat_at = NOW(), updated_at = NOW()
+            WHERE id = (
+                SELECT id FROM ingestion_shards
+                WHERE job_name = %s AND (
+                    (status = 'pending' AND (next_attempt_at IS NULL OR next_attempt_at <= NOW()))
+                    OR (status = 'failed' AND attempts < %s AND (next_attempt_at IS NULL OR next_attempt_at <= NOW()))
+                    OR (status = 'running' AND lease_expires_at < NOW() AND attempts < %s)
+                )
+                ORDER BY shard_index
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, shard_index, symbols, failed_symbols, start_date, end_date, freq, attempts
+            ''', (self.worker_id, self.lease_seconds, self.job_name, self.max_attempts, self.max_attempts))
+            row = cursor.fetchone()
+            conn.commit()
+
+            if row is None:
+                return None
+
+            # 重试时只处理上次失败或未处理的股票
+            symbols = json.loads(row[3]) if row[3] else json.loads(row[2])
+            return {
+                'id': row[0], 'shard_index': row[1], 'symbols': symbols,
+                'start_date': row[4], 'end_date': row[5], 'freq': row[6], 'attempts': row[7]
+            }
+        except Exception as e:
+            print(f"领取分片失败: {e}")
+            conn.rollback()
+            return None
+        finally:
+            conn.close()
+
+    def renew_lease(self, shard_id: int) -> bool:
+        """续约，返回租约是否仍归本进程所有"""
+        return self._update_shard('''
+        UPDATE ingestion_shards
+        SET lease_expires_at = NOW() + make_interval(secs => %s), heartbeat_at = NOW()
+        WHERE id = %s AND owner = %s AND status = 'running'
+        ''', (self.lease_seconds, shard_id, self.worker_id))
+
+    def complete_shard(self, shard: Dict[str, Any], result: Dict[str, List[str]]) -> bool:
+        """记录分片结果，租约已被其他进程接管时不覆盖
+
+        Args:
+            result: process_shard 的结果，failed 为出错的股票，deferred 为因配额超限未处理的股票
+        """
+        failed, deferred = result.get('failed', []), result.get('deferred', [])
+        retry = failed + deferred
+        if deferred:
+            # 配额超限不是分片的问题：退回 pending，不计入尝试次数，退避后重试未完成的股票
+            status, delay = 'pending', self._quota_exceeded()
+        elif not failed:
+            status, delay = 'done', None
+        elif shard['attempts'] >= self.max_attempts:
+            status, delay = 'dead', None
+        else:
+            status, delay = 'failed', self.retry_delay
+
+        return self._update_shard('''
+        UPDATE ingestion_shards
+        SET status = %s, failed_symbols = %s, lease_expires_at = NULL,
+            attempts = attempts - CASE WHEN %s = 'pending' THEN 1 ELSE 0 END,
+            next_attempt_at = CASE WHEN %s IS NULL THEN NULL ELSE NOW() + make_interval(secs => %s) END,
+            updated_at = NOW()
+        WHERE id = %s AND owner = %s
+        ''', (status, json.dumps(retry) if retry else None, status, delay, delay or 0,
+              shard['id'], self.worker_id))
+
+    def _quota_exceeded(self) -> float:
+        """记录一次配额超限，返回退避秒数；连续超限时退避时间加倍"""
+        delay = self._current_quota_delay
+        print(f"工作进程 {self.worker_id} 数据源配额超限，{delay:.0f} 秒后重试")
+        self._current_quota_delay = min(self._current_quota_delay * 2, self.max_quota_delay)
+        return delay
+
+    def _update_shard(self, sql: str, params: tuple) -> bool:
+        """执行分片更新语句，返回是否更新到记录"""
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(sql, params)
+            updated = cursor.rowcount > 0
+            conn.commit()
+            return updated
+        except Exception as e:
+            print(f"更新分片失败: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    def _heartbeat_loop(self, shard_id: int, stop_event: threading.Event):
+        """心跳循环"""
+        while not stop_event.wait(self.heartbeat_interval):
+            if not self.renew_lease(shard_id):
+                print(f"工作进程 {self.worker_id} 失去分片 {shard_id} 的租约")
+                return
+
+    def process_shard(self, shard: Dict[str, Any]) -> Dict[str, List[str]]:
+        """在心跳保护下执行分片采集
+
+        Returns:
+            {'failed': 出错的股票, 'deferred': 因配额超限未处理的股票（包括超限的那只）}
+        """
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(shard['id'], stop_event), daemon=True)
+        heartbeat.start()
+
+        failed = []
+        try:
+            for index, symbol in enumerate(shard['symbols']):
+                try:
+                    result = self.collector.fetch_and_save_kline_status(
+                        symbol, shard['start_date'], shard['end_date'], shard['freq'])
+                except Exception as e:
+                    result = {'status': FETCH_ERROR, 'error': str(e)}
+
+                if result['status'] == FETCH_QUOTA:
+                    # 配额对分片内所有股票都一样，剩余的股票留到退避之后
+                    return {'failed': failed, 'deferred': shard['symbols'][index:]}
+                if result['status'] == FETCH_ERROR:
+                    print(f"分片 {shard['shard_index']} 获取 {symbol} 失败: {result['error']}")
+                    failed.append(symbol)
+                elif result['status'] == FETCH_SAVED:
+                    self._current_quota_delay = self.quota_delay
+            return {'failed': failed, 'deferred': []}
+        finally:
+            stop_event.set()
+            heartbeat.join()
+
+    def _next_wait(self) -> Optional[float]:
+        """没有可领取的分片时需要等待的秒数：有等待重试的分片或其他进程仍在执行时返回，
+        否则返回 None 表示任务已结束"""
+        conn = psycopg2.connect(self.db_url)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+            SELECT
+                MIN(EXTRACT(EPOCH FROM next_attempt_at - NOW()))
+                    FILTER (WHERE status = 'pending' OR (status = 'failed' AND attempts < %s)),
+                MIN(EXTRACT(EPOCH FROM lease_expires_at - NOW())) FILTER (WHERE status = 'running')
+            FROM ingestion_shards
+            WHERE job_name = %s
+            ''', (self.max_attempts, self.job_name))
+            waits = [float(value) for value in cursor.fetchone() if value is not None]
+            return min(waits) if waits else None
+        except Exception as e:
+            print(f"获取分片状态失败: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def run(self, wait_for_others: bool = True, idle_interval: float = 30.0) -> int:
+        """循环领取并处理分片，直到任务完成
+
+        Args:
+            wait_for_others: 没有可领取的分片但有等待重试的分片、或其他进程仍在运行时，是否等待以便重试或接管过期的租约
+            idle_interval: 等待时的轮询间隔（秒）
+
+        Returns:
+            本进程完成的分片数量
+        """
+        if not self.db_url:
+            print("警告：未设置 DATABASE_URL，无法执行分片采集")
+            return 0
+
+        processed = 0
+        coordinator = IngestionCoordinator(self.db_url)
+
+        while True:
+            shard = self.claim_shard()
+            if shard is None:
+                wait = self._next_wait() if wait_for_others else None
+                if wait is not None:
+                    time.sleep(min(max(wait, 1.0), idle_interval))
+                    continue
+                break
+
+            print(f"工作进程 {self.worker_id} 领取分片 {shard['shard_index']}（第 {shard['attempts']} 次），"
+                  f"共 {len(shard['symbols'])} 只股票")
+            result = self.process_shard(shard)
+            self.complete_shard(shard, result)
+            processed += 1
+
+        print(f"工作进程 {self.worker_id} 结束，共处理 {processed} 个分片，任务进度: "
+              f"{coordinator.get_progress(self.job_name)}")
+        return processed
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from .symbol_resolver import UNKNOWN_ID, encode_dates, get_symbol_resolver
+from .symbol_utils import normalize_ts_code
+
+def _day(date) -> Optional[int]:
+    """将日期（YYYYMMDD 或 YYYY-MM-DD）编码为日序号"""
+    return int(encode_dates(str(date))) if date else None
+
+def _symbol_text(ts_code: str) -> str:
+    """未登记代码的缓存键：规范化的 ts_code，无法识别时为原始字符串"""
+    return normalize_ts_code(ts_code) or str(ts_code).strip()
+
+def cache_key(table: str, ts_code: str = None, freq: str = None, start_date: str = None,
+              end_date: str = None) -> Tuple:
+    """缓存键：股票代码和日期分别编码为 int32 编号和日序号
+
+    代码只做只读查找，不登记新代码（读取路径不写数据库）。未登记的代码用规范化的 ts_code
+    作为键，无法识别的代码（如 AAPL、HSI）保留原始字符串，避免不同代码共用 UNKNOWN_ID。
+    """
+    if ts_code is None:
+        return table, None, freq, _day(start_date), _day(end_date)
+    symbol_id = get_symbol_resolver().lookup(ts_code)
+    if symbol_id == UNKNOWN_ID:
+        symbol_id = _symbol_text(ts_code)
+    return table, symbol_id, freq, _day(start_date), _day(end_date)
+
+class KlineCache:
+    """行情数据查询缓存
+
+    缓存键为 cache_key() 生成的 (table, 股票编号, freq, 起始日序号, 截止日序号)，按 TTL 过期，
+    并可根据数据变更通知精确失效与变更日期范围有重叠的条目。
+
+    每次失效都会递增代数（generation）。读取方在查询数据库之前取得代数并在写入缓存时传入，
+    如果查询期间发生过失效，查询结果可能已经过时，不再写入缓存。
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000):
+        """初始化缓存
+
+        Args:
+            ttl: 缓存有效期（秒）
+            max_entries: 最大缓存条目数，超出后淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        """当前代数，应在查询数据库之前读取"""
+        with self._lock:
+            return self._generation
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Tuple, value: Any, generation: int = None) -> bool:
+        """写入缓存，返回是否写入
+
+        Args:
+            generation: 查询之前读取的代数；之后发生过失效时不写入
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, table: str = '*', ts_code: str = None, freq: str = None,
+                   start_date: str = None, end_date: str = None) -> int:
+        """失效匹配的缓存条目，返回失效的条目数
+
+        参数为 None 表示不限制该维度；日期范围只要与缓存条目的范围有重叠就会失效。
+        """
+        if table != '*':
+            _, symbol_id, freq, start_day, end_day = cache_key(table, ts_code, freq, start_date, end_date)
+            # 代码在缓存条目写入之后才登记时，条目的键是 ts_code 字符串，两种键都需要匹配
+            symbol_keys = {symbol_id, _symbol_text(ts_code)} if ts_code is not None else None
+
+        with self._lock:
+            # 无论是否有匹配的条目都递增，使正在进行的查询不再写入缓存
+            self._generation += 1
+            if table == '*':
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+
+            stale = []
+            for key in self._entries:
+                key_table, key_id, key_freq, key_start, key_end = key
+                if key_table != table:
+                    continue
+                if symbol_keys is not None and key_id is not None and key_id not in symbol_keys:
+                    continue
+                if freq is not None and key_freq is not None and key_freq != freq:
+                    continue
+                if start_day is not None and key_end is not None and key_end < start_day:
+                    continue
+                if end_day is not None and key_start is not None and key_start > end_day:
+                    continue
+                stale.append(key)
+
+            for key in stale:
+                del self._entries[key]
+
+            return len(stale)
+
+    def handle_change(self, payload: Dict[str, Any]) -> None:
+        """处理数据变更通知"""
+        self.invalidate(payload.get('table', '*'), payload.get('ts_code'), payload.get('freq'),
+                        payload.get('start_date'), payload.get('end_date'))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self.invalidate('*')
+
+# 同一数据库的 DataStorage 实例共享缓存
+_shared_caches: Dict[str, KlineCache] = {}
+_shared_caches_lock = threading.Lock()
+
+def get_shared_cache(db_url: str, ttl: float) -> Tuple[KlineCache, bool]:
+    """获取指定数据库的共享缓存，返回 (缓存, 是否新建)"""
+    with _shared_caches_lock:
+        cache = _shared_caches.get(db_url)
+        if cache is not None:
+            return cache, False
+        cache = KlineCache(ttl)
+        _shared_caches[db_url] = cache
+        return cache, True
@@ -0,0 +1,152 @@
+"""股票代码和日期的整数编码
+
+SymbolResolver 把 ts_code 驻留为连续的 int32 编号，缓存、面板数组和模型表用编号代替字符串作键。
+登记代码时预先生成常见写法（600000、sh600000、600000.XSHG 等）到编号的查找表，
+之后的规范化只是一次字典查找，不再逐次用正则解析。编号保存在数据库 symbol_ids 表中，
+各进程一致。日期统一编码为 int32 日序号（1970-01-01 起的天数）。
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from .symbol_utils import EXCHANGE_ALIASES, infer_exchange, normalize_ts_code
+from .trading_calendar import to_days
+
+# 无法识别的代码的编号
+UNKNOWN_ID = -1
+
+def encode_dates(dates) -> np.ndarray:
+    """日期编码为 int32 日序号（1970-01-01 为 0）"""
+    return np.asarray(to_days(dates)).astype(np.int64).astype(np.int32)
+
+def decode_dates(days) -> np.ndarray:
+    """int32 日序号还原为 datetime64[D]"""
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]')
+
+def _aliases(ts_code: str) -> List[str]:
+    """ts_code 的常见写法"""
+    digits, exchange = ts_code.split('.')
+    suffixes = [alias for alias, target in EXCHANGE_ALIASES.items() if target == exchange]
+    # 纯数字写法按代码段推断交易所，只有推断结果一致时才是这个代码的写法（如 000001 是平安银行，不是上证指数）
+    forms = [digits] if infer_exchange(digits) == exchange else []
+    for suffix in suffixes:
+        forms += [f'{digits}.{suffix}', f'{suffix}{digits}', f'{suffix}.{digits}']
+    return forms + [form.lower() for form in forms if form != digits]
+
+class SymbolResolver:
+    """ts_code 与 int32 编号的双向映射"""
+
+    def __init__(self, storage=None):
+        """初始化代码解析器
+
+        Args:
+            storage: 数据存储（DataStorage），用于读取和登记持久化的编号；None 表示只在进程内编号
+        """
+        self.storage = storage
+        self._codes: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._aliases: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if storage is not None:
+            self._load(storage.get_symbol_ids())
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def _load(self, mapping: Dict[str, int]) -> None:
+        for ts_code, symbol_id in sorted(mapping.items(), key=lambda item: item[1]):
+            self._add(ts_code, symbol_id)
+
+    def _add(self, ts_code: str, symbol_id: int) -> None:
+        if symbol_id >= len(self._codes):
+            self._codes.extend([None] * (symbol_id + 1 - len(self._codes)))
+        self._codes[symbol_id] = ts_code
+        self._ids[ts_code] = symbol_id
+        for form in _aliases(ts_code):
+            self._aliases[form] = symbol_id
+
+    def register(self, ts_codes: Iterable[str]) -> List[int]:
+        """批量登记已规范化的 ts_code，返回编号"""
+        ts_codes = list(ts_codes)
+        with self._lock:
+            new_codes = [code for code in dict.fromkeys(ts_codes) if code not in self._ids]
+            if new_codes:
+                mapping = self.storage.register_symbols(new_codes) if self.storage is not None else {}
+                if len(mapping) != len(new_codes):
+                    # 数据库不可用时在进程内编号，避开已持久化的编号
+                    next_id = len(self._codes)
+                    mapping = {code: next_id + i for i, code in enumerate(new_codes)}
+                for code in new_codes:
+                    self._add(code, mapping[code])
+            return [self._ids[code] for code in ts_codes]
+
+    def symbol_id(self, symbol) -> int:
+        """任意写法的代码对应的编号，首次出现时登记，无法识别返回 UNKNOWN_ID"""
+        if symbol is None:
+            return UNKNOWN_ID
+        text = str(symbol).strip()
+        symbol_id = self._aliases.get(text)
+        if symbol_id is not None:
+            return symbol_id
+        ts_code = normalize_ts_code(text)
+        if ts_code is None:
+            return UNKNOWN_ID
+        symbol_id = self.register([ts_code])[0]
+        with self._lock:
+            self._aliases[text] = symbol_id
+        return symbol_id
+
+    def lookup(self, symbol) -> int:
+        """只读查找已登记代码的编号，不登记新代码（不写数据库），未登记或无法识别返回 UNKNOWN_ID"""
+        if symbol is None:
+            return UNKNOWN_ID
+        text = str(symbol).strip()
+        symbol_id = self._aliases.get(text)
+        if symbol_id is not None:
+            return symbol_id
+        symbol_id = self._ids.get(normalize_ts_code(text))
+        return symbol_id if symbol_id is not None else UNKNOWN_ID
+
+    def normalize(self, symbol) -> Optional[str]:
+        """规范化为 ts_code，与 normalize_ts_code 相同，已登记代码的常见写法只需一次字典查找
+
+        只读，不登记新代码：读取路径（查询、告警、实时行情）的任意合法代码不会写入 symbol_ids，
+        代码在写入行情时登记（见 DataStorage）。
+        """
+        symbol_id = self.lookup(symbol)
+        if symbol_id != UNKNOWN_ID:
+            return self._codes[symbol_id]
+        return normalize_ts_code(symbol) if symbol is not None else None
+
+    def code(self, symbol_id: int) -> str:
+        """编号对应的 ts_code"""
+        return self._codes[symbol_id]
+
+    def encode(self, symbols) -> np.ndarray:
+        """批量编码为 int32 编号，相同写法只解析一次"""
+        codes, uniques = pd.factorize(np.asarray(symbols, dtype=object))
+        ids = np.array([self.symbol_id(symbol) for symbol in uniques] + [UNKNOWN_ID], dtype=np.int32)
+        # factorize 把缺失值编码为 -1，对应追加的 UNKNOWN_ID
+        return ids[codes]
+
+    def decode(self, ids) -> np.ndarray:
+        """批量还原为 ts_code（对象数组）"""
+        codes = np.asarray(self._codes + [None], dtype=object)
+        return codes[np.asarray(ids, dtype=np.int64)]
+
+# 进程内共享的代码解析器
+_resolver: Optional[SymbolResolver] = None
+_resolver_lock = threading.Lock()
+
+def get_symbol_resolver() -> SymbolResolver:
+    """获取进程内共享的代码解析器，设置了 DATABASE_URL 时使用持久化的编号"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            storage = None
+            if os.getenv('DATABASE_URL'):
+                from .data_storage import DataStorage
+                storage = DataStorage()
+            _resolver = SymbolResolver(storage)
+        return _resolver
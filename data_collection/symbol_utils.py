@@ -0,0 +1,62 @@
+import re
+from typing import Optional
+
+# 交易所后缀别名（兼容 TuShare、雅虎、聚宽等数据源的写法）
+EXCHANGE_ALIASES = {
+    'SH': 'SH', 'SS': 'SH', 'XSHG': 'SH',
+    'SZ': 'SZ', 'XSHE': 'SZ',
+    'BJ': 'BJ'
+}
+
+TS_CODE_PATTERN = re.compile(r'^\d{6}\.(SH|SZ|BJ)$')
+
+def infer_exchange(code: str, is_index: bool = False) -> str:
+    """根据6位数字代码推断交易所
+
+    Args:
+        code: 6位数字代码
+        is_index: 是否为指数代码（指数与个股的代码段不同，如 000001 是上证指数，也是平安银行）
+    """
+    if is_index:
+        if code.startswith('399'):
+            return 'SZ'
+        if code.startswith('899'):
+            return 'BJ'
+        return 'SH'
+
+    if code.startswith(('5', '6', '9')):
+        return 'SH'
+    if code.startswith(('4', '8')):
+        return 'BJ'
+    return 'SZ'
+
+# 6位数字代码，前面或后面可以带交易所标识（分隔符 . 可选）
+SYMBOL_PATTERN = re.compile(r'^(?:([A-Z]+)\.?)?(\d{6})(?:\.?([A-Z]+))?$')
+
+def normalize_ts_code(symbol: str, is_index: bool = False) -> Optional[str]:
+    """将各种格式的股票代码统一为 ts_code 格式（如 600000.SH）
+
+    支持 600000、600000.SH、sh600000、SH.600000、600000.XSHG 等写法；
+    没有交易所标识时按代码段推断。代码不是恰好6位数字、交易所标识无法识别
+    （如 00700.HK）或同时带有前缀和后缀时返回 None。
+    """
+    if symbol is None:
+        return None
+
+    match = SYMBOL_PATTERN.match(str(symbol).strip().upper())
+    if match is None:
+        return None
+
+    prefix, digits, suffix = match.groups()
+    if prefix and suffix:
+        return None
+    letters = prefix or suffix
+    if letters is None:
+        return f'{digits}.{infer_exchange(digits, is_index)}'
+    if letters not in EXCHANGE_ALIASES:
+        return None
+    return f'{digits}.{EXCHANGE_ALIASES[letters]}'
+
+def is_valid_ts_code(ts_code: str) -> bool:
+    """检查是否为合法的 ts_code 格式"""
+    return bool(ts_code) and TS_CODE_PATTERN.match(ts_code) is not None
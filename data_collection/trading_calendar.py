@@ -0,0 +1,206 @@
+"""交易日历
+
+交易所日历预先展开为一张按自然日索引的 NumPy 表，覆盖 1990 年到当前日期之后三年：
+每个自然日是否开市、截至该日的累计交易日数，以及年、月、日、星期和是否为当月/季度/年度
+最后一个交易日。判断交易日、统计区间内的交易日数、向前或向后偏移 N 个交易日都只需要一次数组索引。
+
+日历由数据源（TuShare trade_cal）批量获取后保存在数据库 trade_calendar 表中
+（DataCollector.fetch_and_save_trade_calendar）。没有数据库或尚未导入时按周一至周五估计
+（不含法定节假日），已导入区间之外的日期同样按工作日处理。
+"""
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, List, Union
+import numpy as np
+import pandas as pd
+
+# 日历表的起点（上交所 1990-12-19 开市）和当前日期之后覆盖的天数
+CALENDAR_EPOCH = np.datetime64('1990-01-01', 'D')
+HORIZON_DAYS = 3 * 366
+
+DAY_FEATURES = ('year', 'month', 'day', 'weekday', 'is_month_end', 'is_quarter_end', 'is_year_end')
+
+DateLike = Union[str, int, date, np.datetime64, pd.Timestamp]
+
+def to_days(dates) -> np.ndarray:
+    """日期（YYYYMMDD/YYYY-MM-DD 字符串、整数、datetime、datetime64）转换为 datetime64[D]"""
+    # 单个日期的常见格式不经过 pandas 解析
+    if isinstance(dates, str) and len(dates) == 8 and dates.isdigit():
+        return np.datetime64(f'{dates[:4]}-{dates[4:6]}-{dates[6:]}', 'D')
+    if isinstance(dates, (date, np.datetime64)):
+        return np.datetime64(dates, 'D')
+    values = np.asarray(dates)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[D]')[()]
+    if values.dtype.kind in 'iu':
+        values = values.astype(str)
+    days = pd.to_datetime(values.ravel()).values.astype('datetime64[D]')
+    # 单个日期返回 datetime64 标量
+    return days.reshape(values.shape)[()]
+
+def format_days(days, sep: str = '') -> Union[str, np.ndarray]:
+    """datetime64[D] 格式化为 YYYYMMDD（sep='-' 时为 YYYY-MM-DD）字符串"""
+    text = np.datetime_as_string(np.asarray(days, dtype='datetime64[D]'))
+    text = np.char.replace(text, '-', sep) if sep != '-' else text
+    return str(text) if np.ndim(text) == 0 else text
+
+class TradingCalendar:
+    """交易日历，所有查询都接受单个日期或日期数组"""
+
+    def __init__(self, trading_days: Iterable[DateLike] = (), start: DateLike = None, end: DateLike = None,
+                 exchange: str = 'SSE'):
+        """初始化交易日历
+
+        Args:
+            trading_days: 已知区间内的交易日
+            start: 已知区间的起点，默认为最早的交易日
+            end: 已知区间的终点，默认为最晚的交易日；区间之外按周一至周五处理
+            exchange: 交易所代码
+        """
+        self.exchange = exchange
+        known = np.unique(to_days(list(trading_days)))
+        self.start = to_days(start) if start is not None else (known[0] if len(known) else None)
+        self.end = to_days(end) if end is not None else (known[-1] if len(known) else None)
+
+        today = np.datetime64(date.today(), 'D')
+        first = min(CALENDAR_EPOCH, self.start) if self.start is not None else CALENDAR_EPOCH
+        last = max(today, self.end) if self.end is not None else today
+        calendar_days = np.arange(first, last + HORIZON_DAYS + 1)
+
+        is_open = np.is_busday(calendar_days)
+        if self.start is not None:
+            inside = (calendar_days >= self.start) & (calendar_days <= self.end)
+            is_open[inside] = np.isin(calendar_days[inside], known)
+
+        self.first = first
+        self._is_open = is_open
+        # 截至每个自然日（含）的交易日数
+        self._cumulative = np.cumsum(is_open, dtype=np.int64)
+        self._days = calendar_days[is_open]
+
+        # 日历特征按自然日预先计算
+        months = calendar_days.astype('datetime64[M]')
+        month_number = months.astype(np.int64) % 12
+        # 当月最后一个交易日：下一个交易日属于其他月份
+        trading_months = months[is_open]
+        is_month_end = np.zeros(len(calendar_days), dtype=np.int8)
+        is_month_end[np.flatnonzero(is_open)[np.append(trading_months[1:] != trading_months[:-1], True)]] = 1
+        self._features = {
+            'year': (calendar_days.astype('datetime64[Y]').astype(np.int64) + 1970).astype(np.int16),
+            'month': (month_number + 1).astype(np.int8),
+            'day': ((calendar_days - months).astype(np.int64) + 1).astype(np.int8),
+            # 1970-01-01 是星期四（weekday=3）
+            'weekday': ((calendar_days.astype(np.int64) + 3) % 7).astype(np.int8),
+            'is_month_end': is_month_end,
+            'is_quarter_end': is_month_end & (month_number % 3 == 2),
+            'is_year_end': is_month_end & (month_number == 11)
+        }
+
+        for array in [self._is_open, self._cumulative, self._days] + list(self._features.values()):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], exchange: str = 'SSE') -> 'TradingCalendar':
+        """由 trade_cal 记录（cal_date、is_open）创建交易日历"""
+        if not records:
+            return cls(exchange=exchange)
+        cal_dates = to_days([str(record['cal_date']) for record in records])
+        is_open = np.array([int(record.get('is_open') or 0) == 1 for record in records])
+        return cls(cal_dates[is_open], cal_dates.min(), cal_dates.max(), exchange)
+
+    @property
+    def is_estimated(self) -> bool:
+        """是否没有导入交易所日历，全部按工作日估计"""
+        return self.start is None
+
+    def _index(self, dates) -> np.ndarray:
+        positions = (to_days(dates) - self.first).astype(np.int64)
+        if np.any(positions < 0) or np.any(positions >= len(self._is_open)):
+            raise ValueError(f"日期超出交易日历范围: {self.first} ~ {self.first + len(self._is_open) - 1}")
+        return positions
+
+    def _position(self, dates) -> np.ndarray:
+        """当天或之前最后一个交易日在交易日数组中的位置"""
+        return self._cumulative[self._index(dates)] - 1
+
+    def _trading_day(self, positions) -> np.ndarray:
+        positions = np.asarray(positions)
+        if np.any(positions < 0) or np.any(positions >= len(self._days)):
+            raise ValueError("交易日偏移超出交易日历范围")
+        return self._days[positions]
+
+    def is_trading_day(self, dates) -> Union[bool, np.ndarray]:
+        """是否为交易日"""
+        result = self._is_open[self._index(dates)]
+        return bool(result) if np.ndim(result) == 0 else result
+
+    def count(self, start, end) -> Union[int, np.ndarray]:
+        """[start, end] 区间内（含两端）的交易日数"""
+        start_index, end_index = self._index(start), self._index(end)
+        result = np.maximum(self._cumulative[end_index] - self._cumulative[start_index] + self._is_open[start_index], 0)
+        return int(result) if np.ndim(result) == 0 else result
+
+    def offset(self, dates, n: int) -> np.ndarray:
+        """从当天或之前最后一个交易日起偏移 n 个交易日（n < 0 向前），n=0 即回退到最近的交易日"""
+        return self._trading_day(self._position(dates) + n)
+
+    def window_start(self, end, bars: int) -> np.ndarray:
+        """截至 end 的最近 bars 个交易日的第一天"""
+        return self.offset(end, -(max(bars, 1) - 1))
+
+    def next_trading_days(self, after, n: int) -> np.ndarray:
+        """after 之后（不含）的 n 个交易日"""
+        position = int(self._position(after)) + 1
+        return self._trading_day(np.arange(position, position + n))
+
+    def trading_days(self, start, end) -> np.ndarray:
+        """[start, end] 区间内的交易日"""
+        start_index, end_index = int(self._index(start)), int(self._index(end))
+        return self._days[self._cumulative[start_index] - self._is_open[start_index]:self._cumulative[end_index]]
+
+    def missing_days(self, dates, start=None, end=None) -> np.ndarray:
+        """缺口检测：[start, end]（默认为 dates 的首尾）内不在 dates 中的交易日"""
+        days = np.unique(to_days(list(dates)))
+        if start is None and end is None and not len(days):
+            return np.array([], dtype='datetime64[D]')
+        expected = self.trading_days(days[0] if start is None else start, days[-1] if end is None else end)
+        return np.setdiff1d(expected, days, assume_unique=True)
+
+    def day_feature(self, dates, name: str) -> np.ndarray:
+        """单个日历特征，name 为 DAY_FEATURES 之一"""
+        if name not in self._features:
+            raise ValueError(f"不支持的日历特征: {name}")
+        return self._features[name][self._index(dates)]
+
+    def day_features(self, dates) -> Dict[str, np.ndarray]:
+        """日历特征：年、月、日、星期（0 为周一），以及是否为当月/季度/年度最后一个交易日"""
+        index = self._index(dates)
+        return {name: values[index] for name, values in self._features.items()}
+
+# 进程内共享的交易日历，按交易所缓存
+_calendars: Dict[str, TradingCalendar] = {}
+_calendars_lock = threading.Lock()
+
+def load_trading_calendar(exchange: str = 'SSE', storage=None) -> TradingCalendar:
+    """从数据库读取交易日历，未设置数据库或尚未导入时按工作日估计"""
+    records = []
+    if storage is not None or os.getenv('DATABASE_URL'):
+        from .data_storage import DataStorage
+        storage = storage or DataStorage()
+        records = storage.get_trade_calendar(exchange)
+    if not records:
+        print(f"交易日历 {exchange} 尚未导入，按工作日估计")
+    return TradingCalendar.from_records(records, exchange)
+
+def get_trading_calendar(exchange: str = 'SSE') -> TradingCalendar:
+    """获取进程内共享的交易日历，首次使用时加载"""
+    with _calendars_lock:
+        if exchange not in _calendars:
+            _calendars[exchange] = load_trading_calendar(exchange)
+        return _calendars[exchange]
+
+def set_trading_calendar(calendar: TradingCalendar) -> None:
+    """替换进程内共享的交易日历（如导入新的日历之后）"""
+    with _calendars_lock:
+        _calendars[calendar.exchange] = calendar
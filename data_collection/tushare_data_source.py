@@ -87,7 +87,18 @@ class TuShareDataSource(BaseDataSource):
             }
         except Exception as e:
             print(f"获取K线数据失败: {e}")
-            return {'data': [], 'columns': []}
+            # error 用于区分接口出错和区间内确实没有数据
+            return {'data': [], 'columns': [], 'error': str(e)}
+    
+    def get_trade_calendar(self, exchange: str = 'SSE', start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+        """获取交易日历"""
+        try:
+            data = self.pro.trade_cal(exchange=exchange, start_date=start_date or '', end_date=end_date or '',
+                                      fields='exchange,cal_date,is_open')
+            return data.to_dict('records')
+        except Exception as e:
+            print(f"获取交易日历失败: {e}")
+            return []
     
     def get_realtime_data(self, symbols: List[str]) -> Dict[str, Any]:
         """获取实时数据"""
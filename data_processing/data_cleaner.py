@@ -1,42 +1,219 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Union
+from analysis import indicators
+from .dtype_policy import DtypePolicy, DEFAULT_DTYPE_POLICY
+
+KLINE_NUMERIC_COLS = ['open', 'high', 'low', 'close', 'pre_close', 'change', 'pct_chg', 'vol', 'amount']
+
+# 清洗时添加的标记列，不作为特征
+METADATA_COLS = ['is_outlier']
+
+# 正态分布下 MAD 与标准差的换算系数
+MAD_TO_STD = 1.4826
+
+class StreamingKlineCleaner:
+    """分块流式K线清洗
+
+    按时间顺序逐块输入K线，输出清洗后的数据块，只保留跨块需要的少量状态：
+    每列最后一个有效值（前向填充）和最后 window - 1 根K线的价格（滚动中位数）。
+    异常值不再删除，而是用滚动中位数/MAD 标记在 is_outlier 列：
+    |价格 - 中位数| > threshold × max(1.4826 × MAD, min_scale_pct × 中位数) 的K线视为异常，
+    其开高低收替换为前一根正常K线的价格，避免错误报价进入特征计算。
+    窗口只包含当前及之前的K线，因此分块处理与一次性处理的结果完全相同。
+
+    序列开头的缺失值需要用之后的第一个有效值回填，这部分数据块会暂存到出现有效值为止，
+    最多暂存 max_pending_rows 行，超过后不再等待回填。
+    """
+
+    PRICE_COLS = ('open', 'high', 'low', 'close')
+    MISSING_COL = '_price_missing'
+
+    def __init__(self, window: int = 21, threshold: float = 10.0, min_scale_pct: float = 0.001,
+                 time_col: str = 'trade_date', dtype_policy: DtypePolicy = None,
+                 max_pending_rows: int = 100000):
+        """初始化流式清洗
+
+        Args:
+            window: 滚动中位数/MAD 的窗口
+            threshold: 偏离中位数超过多少倍稳健标准差视为异常；窗口只包含历史K线，趋势行情中
+                       中位数有滞后，阈值取 10 时随机游走价格的误报率约为万分之一
+            min_scale_pct: 稳健标准差的下限（占中位数的比例），避免价格长时间不变时 MAD 为 0
+            time_col: 时间列，日线为 trade_date，分钟线可以为 trade_time
+            dtype_policy: 数据类型策略，默认为 DEFAULT_DTYPE_POLICY
+            max_pending_rows: 等待回填开头缺失值时最多暂存的行数
+        """
+        self.window = window
+        self.threshold = threshold
+        self.min_scale_pct = min_scale_pct
+        self.time_col = time_col
+        self.dtype_policy = dtype_policy or DEFAULT_DTYPE_POLICY
+        self.max_pending_rows = max_pending_rows
+        self.reset()
+
+    def reset(self) -> None:
+        """清空跨块状态，开始处理新的序列"""
+        self._last_values: Dict[str, float] = {}
+        self._tails: Dict[str, np.ndarray] = {}
+        self._last_normal: Dict[str, float] = {}
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+        self._last_time = None
+
+    def _prepare(self, chunk: Union[pd.DataFrame, List[Dict[str, Any]]]) -> pd.DataFrame:
+        """转换类型、排序并用上一块的最后有效值前向填充"""
+        df = chunk.copy() if isinstance(chunk, pd.DataFrame) else pd.DataFrame(chunk)
+
+        if self.time_col in df.columns:
+            df[self.time_col] = pd.to_datetime(df[self.time_col])
+            df = df.sort_values(self.time_col, kind='stable')
+            first_time = df[self.time_col].iloc[0]
+            if self._last_time is not None and first_time < self._last_time:
+                raise ValueError(f"数据块需要按时间顺序输入: {first_time} 早于 {self._last_time}")
+            self._last_time = df[self.time_col].iloc[-1]
+
+        # 原始价格缺失的K线（如停牌）不参与异常值统计
+        missing = np.zeros(len(df), dtype=bool)
+        for col in KLINE_NUMERIC_COLS:
+            if col in df.columns:
+                series = pd.to_numeric(df[col], errors='coerce')
+                if col in self.PRICE_COLS:
+                    missing |= series.isna().to_numpy()
+                series = series.ffill()
+                if col in self._last_values:
+                    series = series.fillna(self._last_values[col])
+                else:
+                    # 序列开头的缺失值用第一个有效值回填
+                    series = series.bfill()
+                valid = series.dropna()
+                if len(valid):
+                    self._last_values[col] = valid.iloc[-1]
+                df[col] = series
+        df[self.MISSING_COL] = missing
+
+        return df
+
+    def _flag_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
+        """用滚动中位数/MAD 标记异常值，窗口延续上一块的最后 window - 1 根K线
+
+        统计时跳过原始价格缺失（前向填充）的K线，窗口内至少需要一半有效K线。
+        异常K线的价格用前一根正常K线（可以在上一块中）的价格前向填充；
+        序列开头之前没有正常K线时保留原值。
+        """
+        missing = df.pop(self.MISSING_COL).to_numpy(dtype=bool)
+        outlier = np.zeros(len(df), dtype=bool)
+        for col in self.PRICE_COLS:
+            if col not in df.columns:
+                continue
+            values = np.where(missing, np.nan, df[col].to_numpy(dtype=np.float64))
+            extended = np.concatenate([self._tails.get(col, np.empty(0)), values])
+            median, mad = indicators.rolling_median_mad(extended, self.window, self.window // 2 + 1)
+            median, mad = median[-len(values):], mad[-len(values):]
+            scale = np.maximum(MAD_TO_STD * mad, self.min_scale_pct * np.abs(median))
+            with np.errstate(invalid='ignore'):
+                outlier |= np.abs(values - median) > self.threshold * scale
+            self._tails[col] = extended[len(extended) - (self.window - 1):] if self.window > 1 else np.empty(0)
+
+        for col in self.PRICE_COLS:
+            if col not in df.columns:
+                continue
+            series = df[col].mask(outlier).ffill()
+            if col in self._last_normal:
+                series = series.fillna(self._last_normal[col])
+            series = series.fillna(df[col]).astype(df[col].dtype)
+            normal = series[~outlier]
+            if len(normal):
+                self._last_normal[col] = normal.iloc[-1]
+            df[col] = series
+
+        df['is_outlier'] = outlier
+        return df
+
+    def _emit(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self._pending:
+            df = pd.concat(self._pending + [df])
+            self._pending, self._pending_rows = [], 0
+            # 暂存块开头的缺失值用第一个有效值回填
+            for col in KLINE_NUMERIC_COLS:
+                if col in df.columns:
+                    df[col] = df[col].bfill()
+
+        self.dtype_policy.apply_raw(df, KLINE_NUMERIC_COLS)
+        return self._flag_outliers(df)
+
+    def update(self, chunk: Union[pd.DataFrame, List[Dict[str, Any]]]) -> pd.DataFrame:
+        """处理一个数据块，返回可以输出的清洗结果（等待回填时为空）"""
+        if chunk is None or len(chunk) == 0:
+            return pd.DataFrame()
+
+        df = self._prepare(chunk)
+        waiting = [col for col in KLINE_NUMERIC_COLS if col in df.columns and col not in self._last_values]
+        if waiting and self._pending_rows + len(df) <= self.max_pending_rows:
+            self._pending.append(df)
+            self._pending_rows += len(df)
+            return pd.DataFrame()
+
+        return self._emit(df)
+
+    def flush(self) -> pd.DataFrame:
+        """输出暂存的数据块"""
+        if not self._pending:
+            return pd.DataFrame()
+        pending = self._pending
+        self._pending, self._pending_rows = [], 0
+        df = pd.concat(pending) if len(pending) > 1 else pending[0]
+        return self._emit(df)
+
+    def clean(self, chunks: Iterable[Union[pd.DataFrame, List[Dict[str, Any]]]]) -> Iterator[pd.DataFrame]:
+        """逐块清洗，按时间顺序输出清洗结果"""
+        self.reset()
+        for chunk in chunks:
+            df = self.update(chunk)
+            if not df.empty:
+                yield df
+        df = self.flush()
+        if not df.empty:
+            yield df
 
 class DataCleaner:
     """数据清洗类"""
     
-    def clean_kline_data(self, kline_data: List[Dict[str, Any]]) -> pd.DataFrame:
-        """清洗K线数据"""
-        if not kline_data:
-            return pd.DataFrame()
+    def __init__(self, dtype_policy: DtypePolicy = None, outlier_window: int = 21, outlier_threshold: float = 10.0):
+        """初始化数据清洗
         
-        # 转换为DataFrame
-        df = pd.DataFrame(kline_data)
-        
-        # 处理日期列
-        if 'trade_date' in df.columns:
-            df['trade_date'] = pd.to_datetime(df['trade_date'])
-            df = df.sort_values('trade_date')
+        Args:
+            dtype_policy: 数据类型策略，默认为 DEFAULT_DTYPE_POLICY
+            outlier_window: 标记异常值的滚动中位数/MAD 窗口
+            outlier_threshold: 偏离中位数超过多少倍稳健标准差视为异常
+        """
+        self.dtype_policy = dtype_policy or DEFAULT_DTYPE_POLICY
+        self.outlier_window = outlier_window
+        self.outlier_threshold = outlier_threshold
+    
+    def streaming_cleaner(self, time_col: str = 'trade_date') -> StreamingKlineCleaner:
+        """创建与本清洗器参数相同的流式清洗器"""
+        return StreamingKlineCleaner(self.outlier_window, self.outlier_threshold, time_col=time_col,
+                                     dtype_policy=self.dtype_policy)
+    
+    def clean_kline_data(self, kline_data: List[Dict[str, Any]]) -> pd.DataFrame:
+        """清洗K线数据
         
-        # 处理数值列
-        numeric_cols = ['open', 'high', 'low', 'close', 'pre_close', 'change', 'pct_chg', 'vol', 'amount']
-        for col in numeric_cols:
-            if col in df.columns:
-                # 转换为数值类型
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                # 处理缺失值
-                df[col] = df[col].fillna(method='ffill')  # 前向填充
-                df[col] = df[col].fillna(method='bfill')  # 后向填充
+        转换类型并按时间排序，缺失值先前向填充再后向填充；异常K线不删除，
+        价格替换为前一根正常K线的价格并标记在 is_outlier 列（见 StreamingKlineCleaner）。
+        """
+        if kline_data is None or len(kline_data) == 0:
+            return pd.DataFrame()
         
-        # 检查并移除异常值（使用3σ法则）
-        for col in ['open', 'high', 'low', 'close']:
-            if col in df.columns:
-                mean = df[col].mean()
-                std = df[col].std()
-                df = df[(df[col] >= mean - 3 * std) & (df[col] <= mean + 3 * std)]
+        parts = list(self.streaming_cleaner().clean([kline_data]))
+        return parts[0] if len(parts) == 1 else pd.concat(parts)
+    
+    def clean_kline_chunks(self, chunks: Iterable[Union[pd.DataFrame, List[Dict[str, Any]]]],
+                           time_col: str = 'trade_date') -> Iterator[pd.DataFrame]:
+        """分块清洗按时间顺序输入的长历史（如多年的分钟线），内存占用只与块大小有关
         
-        return df
+        结果与把全部数据一次传给 clean_kline_data 相同。
+        """
+        return self.streaming_cleaner(time_col).clean(chunks)
     
     def clean_financial_data(self, financial_data: List[Dict[str, Any]]) -> pd.DataFrame:
         """清洗财务数据"""
@@ -70,15 +247,15 @@ class DataCleaner:
             df = df.sort_values('trade_date')
         
         # 处理数值列
-        numeric_cols = ['open', 'high', 'low', 'close', 'pre_close', 'change', 'pct_chg', 'vol', 'amount']
+        numeric_cols = KLINE_NUMERIC_COLS
         for col in numeric_cols:
             if col in df.columns:
                 # 转换为数值类型
                 df[col] = pd.to_numeric(df[col], errors='coerce')
                 
                 # 处理缺失值
-                df[col] = df[col].fillna(method='ffill')  # 前向填充
-                df[col] = df[col].fillna(method='bfill')  # 后向填充
+                df[col] = df[col].ffill().bfill()
+        self.dtype_policy.apply_raw(df, numeric_cols)
         
         return df
     
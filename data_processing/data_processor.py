@@ -1,40 +1,98 @@
 import pandas as pd
-from typing import Dict, List, Any, Optional
-from .data_cleaner import DataCleaner
-from .feature_engineer import FeatureEngineer
+from typing import Dict, List, Any, Optional, Union
+from .panel_feature_engineer import KlinePanel, PanelFeatureEngineer
 from .data_standardizer import DataStandardizer
+from .window_builder import WindowBuilder
+from .feature_store import FeatureStore
+from .data_cleaner import METADATA_COLS
+from .dtype_policy import DtypePolicy
+from .engines import DataFrameEngine, create_engine
 
 class DataProcessor:
     """数据处理管理器"""
     
-    def __init__(self):
-        """初始化数据处理器"""
-        self.cleaner = DataCleaner()
-        self.feature_engineer = FeatureEngineer()
-        self.standardizer = DataStandardizer()
+    def __init__(self, feature_store: FeatureStore = None, dtype_policy: DtypePolicy = None,
+                 engine: Union[str, DataFrameEngine] = None):
+        """初始化数据处理器
+        
+        Args:
+            feature_store: 特征存储，指定股票代码处理K线数据时从中读取已计算的特征
+            dtype_policy: 数据类型策略，默认特征为 float32、日历特征为窄整数、股票代码为 category
+            engine: 数据处理引擎或引擎名（pandas/columnar），默认读取环境变量 DATAFRAME_ENGINE；
+                    传入引擎实例时使用引擎的数据类型策略
+        """
+        if not isinstance(engine, DataFrameEngine):
+            engine = create_engine(engine, dtype_policy)
+        self.engine = engine
+        self.dtype_policy = engine.dtype_policy
+        self.cleaner = engine.cleaner
+        self.feature_store = feature_store or FeatureStore()
+        self.feature_engineer = engine.feature_engineer
+        self.panel_feature_engineer = PanelFeatureEngineer()
+        self.standardizer: DataStandardizer = engine.standardizer
     
-    def process_kline_data(self, kline_data: List[Dict[str, Any]], include_technical_indicators: bool = True) -> pd.DataFrame:
-        """处理K线数据"""
+    def process_kline_data(self, kline_data: List[Dict[str, Any]], include_technical_indicators: bool = True,
+                           features: Optional[List[str]] = None, symbol: str = None) -> pd.DataFrame:
+        """处理K线数据
+        
+        Args:
+            kline_data: K线记录列表
+            include_technical_indicators: 是否计算技术指标
+            features: 只计算这些特征及其依赖，None 表示计算全部特征
+            symbol: 股票代码，指定时从特征存储读取特征，只计算新增K线的特征
+        """
         # 1. 清洗数据
-        cleaned_df = self.cleaner.clean_kline_data(kline_data)
+        cleaned_df = self.engine.clean(kline_data)
         
         if cleaned_df.empty:
             return cleaned_df
         
-        # 2. 生成时间相关特征
-        cleaned_df = self.feature_engineer.generate_time_based_features(cleaned_df)
+        if symbol is not None and self.feature_store is not None:
+            features = features or self.panel_feature_engineer.default_features(include_technical_indicators)
+            cleaned_df = cleaned_df.reset_index(drop=True)
+            stored = self.feature_store.update(symbol, cleaned_df, features)
+            for name in features:
+                cleaned_df[name] = self.dtype_policy.feature_values(name, stored[name])
+            return self.dtype_policy.fillna(cleaned_df, 0)
         
-        # 3. 生成价格相关特征
-        cleaned_df = self.feature_engineer.generate_price_features(cleaned_df)
+        # 2. 生成时间、价格、波动率特征和技术指标
+        return self.engine.features(cleaned_df, features, include_technical_indicators)
+    
+    def process_kline_universe(self, kline_by_symbol: Dict[str, Any], include_technical_indicators: bool = True,
+                               features: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """批量处理多只股票的K线数据（如夜间全市场特征计算）
+        
+        Args:
+            kline_by_symbol: 股票代码 -> K线记录列表或 DataFrame
+            include_technical_indicators: 是否计算技术指标
+            features: 只计算这些特征及其依赖，None 表示计算全部特征
+        
+        Returns:
+            股票代码 -> 与 process_kline_data 相同的特征数据；columnar 引擎在线程池中并行处理
+        """
+        return self.engine.process_universe(kline_by_symbol, features, include_technical_indicators)
+    
+    def required_history(self, features: List[str]) -> int:
+        """计算指定特征的最新值至少需要的历史K线数量"""
+        return self.feature_engineer.registry.plan(features).min_history
+    
+    def process_kline_panel(self, kline_data, include_technical_indicators: bool = True) -> pd.DataFrame:
+        """一次处理多只股票的K线数据
         
-        # 4. 生成波动率特征
-        cleaned_df = self.feature_engineer.generate_volatility_features(cleaned_df)
+        Args:
+            kline_data: 多只股票的K线记录列表或 DataFrame，需要包含 ts_code 和 trade_date
+            include_technical_indicators: 是否计算技术指标
         
-        # 5. 计算技术指标
-        if include_technical_indicators:
-            cleaned_df = self.feature_engineer.calculate_technical_indicators(cleaned_df)
+        Returns:
+            每行一只股票一个交易日的特征长表，特征与 process_kline_data 一致
+        """
+        df = kline_data if isinstance(kline_data, pd.DataFrame) else pd.DataFrame(kline_data)
+        if df.empty:
+            return df
         
-        return cleaned_df
+        panel = KlinePanel.from_frame(df)
+        features = self.panel_feature_engineer.compute(panel, include_technical_indicators)
+        return self.panel_feature_engineer.to_frame(panel, features)
     
     def process_financial_data(self, financial_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """处理财务数据"""
@@ -68,15 +126,21 @@ class DataProcessor:
             return df
         
         # 选择数值特征列
-        numeric_cols = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and col != target]
+        numeric_cols = [col for col in df.columns
+                        if pd.api.types.is_numeric_dtype(df[col]) and col != target and col not in METADATA_COLS]
         
         # 标准化特征
-        standardized_df = self.standardizer.standardize(df, numeric_cols, method)
+        standardized_df = self.engine.standardize(df, numeric_cols, method)
         
         return standardized_df
     
     def prepare_training_data(self, kline_data: List[Dict[str, Any]], lookback: int = 30, predict_days: int = 1) -> Dict[str, Any]:
-        """准备训练数据"""
+        """准备训练数据
+        
+        Returns:
+            X 为 (样本数, lookback × 特征数) 的 float32 数组，y 为 (样本数, predict_days) 的未来收盘价，
+            windows 为未展平的 (样本数, lookback, 特征数) 滑动窗口视图
+        """
         # 处理K线数据
         processed_df = self.process_kline_data(kline_data)
         
@@ -84,25 +148,26 @@ class DataProcessor:
             return {'X': [], 'y': []}
         
         # 选择特征列
-        feature_cols = [col for col in processed_df.columns if pd.api.types.is_numeric_dtype(processed_df[col]) and col != 'trade_date']
-        
-        # 准备输入和输出数据
-        X = []
-        y = []
+        feature_cols = [col for col in processed_df.columns
+                        if pd.api.types.is_numeric_dtype(processed_df[col]) and col not in ['trade_date'] + METADATA_COLS]
         
-        for i in range(lookback, len(processed_df) - predict_days + 1):
-            # 输入特征
-            X.append(processed_df[feature_cols].iloc[i-lookback:i].values.flatten())
-            # 输出标签（未来几天的收盘价）
-            y.append(processed_df['close'].iloc[i:i+predict_days].values)
+        # 输入为前 lookback 天的特征，输出为未来几天的收盘价
+        windows = WindowBuilder(lookback, horizon=predict_days).from_frame(processed_df, feature_cols, 'close')
+        y = windows.y if predict_days > 1 else windows.y[:, None]
         
         return {
-            'X': X,
+            'X': windows.flatten(),
             'y': y,
             'feature_cols': feature_cols,
-            'data': processed_df
+            'data': processed_df,
+            'windows': windows
         }
     
-    def select_importance_features(self, df: pd.DataFrame, target: str = 'close', top_n: Optional[int] = 20) -> List[str]:
-        """选择重要特征"""
-        return self.standardizer.select_features(df, target, top_n=top_n)
+    def select_importance_features(self, df: pd.DataFrame, target: str = 'close', top_n: Optional[int] = 20,
+                                   method: str = 'pearson') -> List[str]:
+        """选择重要特征
+        
+        Args:
+            method: pearson/spearman/mutual_info/permutation，结果按特征集指纹缓存
+        """
+        return self.standardizer.select_features(df, target, top_n=top_n, method=method)
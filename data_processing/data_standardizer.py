@@ -1,27 +1,52 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
+from .scaler_registry import AffineScaler, ScalerRegistry, get_scaler_registry
+from .feature_importance import FeatureImportance
 
 class DataStandardizer:
-    """数据标准化类"""
+    """数据标准化类
+
+    拟合结果是不可变的仿射参数（AffineScaler），指定股票代码时按
+    (股票代码, 列集合, 方法, 数据水位) 保存到标准化器注册表，同一份数据只拟合一次，
+    并发请求之间不会互相覆盖。
+    """
+    
+    def __init__(self, registry: ScalerRegistry = None, importance: FeatureImportance = None):
+        """初始化标准化器
+        
+        Args:
+            registry: 标准化器注册表，默认使用进程内共享的注册表
+            importance: 特征重要性计算，默认为 FeatureImportance()
+        """
+        self.registry = registry or get_scaler_registry()
+        self.importance = importance or FeatureImportance()
+        self.fitted_scalers: Dict[str, AffineScaler] = {}
     
-    def __init__(self):
-        """初始化标准化器"""
-        self.scalers = {
-            'standard': StandardScaler(),
-            'minmax': MinMaxScaler(),
-            'robust': RobustScaler()
-        }
-        self.fitted_scalers = {}
+    @staticmethod
+    def _watermark(df: pd.DataFrame) -> Any:
+        """数据水位：最后交易日，没有交易日期列时为行数"""
+        if 'trade_date' in df.columns:
+            return str(df['trade_date'].max())
+        return len(df)
     
-    def standardize(self, df: pd.DataFrame, columns: List[str], method: str = 'standard') -> pd.DataFrame:
-        """标准化数据"""
+    def standardize(self, df: pd.DataFrame, columns: List[str], method: str = 'standard',
+                    symbol: str = None, watermark: Any = None) -> pd.DataFrame:
+        """标准化数据
+        
+        Args:
+            df: 数据
+            columns: 需要标准化的列
+            method: standard/minmax/robust
+            symbol: 股票代码，指定时从注册表复用已拟合的标准化器
+            watermark: 数据水位，默认为最后交易日
+        """
         if df.empty or not columns:
             return df
         
         # 选择标准化方法
-        scaler = self.scalers.get(method, self.scalers['standard'])
+        if method not in AffineScaler.METHODS:
+            method = 'standard'
         
         # 复制数据
         standardized_df = df.copy()
@@ -30,8 +55,16 @@ class DataStandardizer:
         valid_columns = [col for col in columns if col in standardized_df.columns]
         
         if valid_columns:
-            # 拟合并转换数据
-            standardized_df[valid_columns] = scaler.fit_transform(standardized_df[valid_columns])
+            values = standardized_df[valid_columns].to_numpy(dtype=np.float64)
+            if symbol is None:
+                scaler = AffineScaler.fit(values, valid_columns, method)
+            else:
+                if watermark is None:
+                    watermark = self._watermark(df)
+                scaler = self.registry.fit(symbol, values, valid_columns, method, watermark)
+            
+            # 转换数据
+            standardized_df[valid_columns] = scaler.transform(values)
             
             # 保存拟合后的标准化器
             self.fitted_scalers[method] = scaler
@@ -46,50 +79,57 @@ class DataStandardizer:
         """使用RobustScaler进行标准化（对异常值不敏感）"""
         return self.standardize(df, columns, method='robust')
     
-    def transform_new_data(self, df: pd.DataFrame, columns: List[str], method: str = 'standard') -> pd.DataFrame:
-        """使用已拟合的标准化器转换新数据"""
+    def transform_new_data(self, df: pd.DataFrame, columns: List[str], method: str = 'standard',
+                           symbol: str = None, watermark: Any = None) -> pd.DataFrame:
+        """使用已拟合的标准化器转换新数据
+        
+        Args:
+            symbol: 股票代码，和 watermark 一起指定时使用注册表中的标准化器，
+                    否则使用本实例最近一次拟合的标准化器
+            watermark: 拟合时的数据水位
+        """
         if df.empty or not columns:
             return df
         
+        # 只对存在的列进行转换
+        valid_columns = [col for col in columns if col in df.columns]
+        
         # 检查是否有拟合后的标准化器
-        if method not in self.fitted_scalers:
+        if symbol is not None and watermark is not None:
+            scaler = self.registry.get(symbol, valid_columns, method, watermark)
+            if scaler is None:
+                raise ValueError(f"未找到 {symbol} 在 {watermark} 拟合的 {method} 标准化器")
+        elif method in self.fitted_scalers:
+            scaler = self.fitted_scalers[method]
+        else:
             raise ValueError(f"未找到已拟合的 {method} 标准化器")
         
         # 复制数据
         transformed_df = df.copy()
         
-        # 只对存在的列进行转换
-        valid_columns = [col for col in columns if col in transformed_df.columns]
-        
         if valid_columns:
-            transformed_df[valid_columns] = self.fitted_scalers[method].transform(transformed_df[valid_columns])
+            if valid_columns != scaler.columns:
+                raise ValueError(f"列与拟合时不一致: {valid_columns} != {scaler.columns}")
+            transformed_df[valid_columns] = scaler.transform(transformed_df[valid_columns].to_numpy(dtype=np.float64))
         
         return transformed_df
     
-    def get_feature_importance(self, df: pd.DataFrame, target: str) -> Dict[str, float]:
-        """计算特征重要性（基于相关性）"""
-        if df.empty or target not in df.columns:
-            return {}
-        
-        # 计算各特征与目标变量的相关性
-        correlations = {}
-        for col in df.columns:
-            if col != target and pd.api.types.is_numeric_dtype(df[col]):
-                corr = df[col].corr(df[target])
-                correlations[col] = abs(corr)
-        
-        # 按重要性排序
-        sorted_correlations = dict(sorted(correlations.items(), key=lambda item: item[1], reverse=True))
+    def get_feature_importance(self, df: pd.DataFrame, target: str, method: str = 'pearson') -> Dict[str, float]:
+        """计算特征重要性（默认基于相关性），按重要性降序排列
         
-        return sorted_correlations
+        Args:
+            method: pearson/spearman/mutual_info/permutation，见 FeatureImportance.compute
+        """
+        return self.importance.compute(df, target, method)
     
-    def select_features(self, df: pd.DataFrame, target: str, top_n: Optional[int] = None, threshold: Optional[float] = None) -> List[str]:
+    def select_features(self, df: pd.DataFrame, target: str, top_n: Optional[int] = None, threshold: Optional[float] = None,
+                        method: str = 'pearson') -> List[str]:
         """选择重要特征"""
         if df.empty or target not in df.columns:
             return []
         
         # 计算特征重要性
-        importance = self.get_feature_importance(df, target)
+        importance = self.get_feature_importance(df, target, method)
         
         selected_features = []
         
@@ -103,4 +143,4 @@ class DataStandardizer:
             # 选择所有特征
             selected_features = list(importance.keys())
         
-        return selected_features
\ No newline at end of file
+        return selected_features
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Tuple
+
+# 日历特征的取值范围很小，用窄整数保存
+CALENDAR_DTYPES = {
+    'year': np.int16,
+    'month': np.int8,
+    'day': np.int8,
+    'weekday': np.int8,
+    'is_month_end': np.int8,
+    'is_quarter_end': np.int8,
+    'is_year_end': np.int8
+}
+
+class DtypePolicy:
+    """数据处理流水线的数据类型策略
+
+    特征列默认保存为 float32，日历特征为 int8/int16，股票代码为 category；
+    原始行情列默认保留 float64，特征仍然用 float64 计算，只在写入 DataFrame 时转换。
+    缺失值按列原地填充，不生成整个 DataFrame 的副本。
+    """
+
+    def __init__(self, feature_dtype=np.float32, raw_dtype=np.float64,
+                 calendar_dtypes: Dict[str, type] = None,
+                 categorical_columns: Tuple[str, ...] = ('ts_code',)):
+        """初始化数据类型策略
+
+        Args:
+            feature_dtype: 特征列的类型
+            raw_dtype: 原始行情数值列（开高低收、成交量等）的类型
+            calendar_dtypes: 日历特征名 -> 整数类型，默认为 CALENDAR_DTYPES
+            categorical_columns: 转换为 category 的字符串列
+        """
+        self.feature_dtype = np.dtype(feature_dtype)
+        self.raw_dtype = np.dtype(raw_dtype)
+        self.calendar_dtypes = CALENDAR_DTYPES if calendar_dtypes is None else calendar_dtypes
+        self.categorical_columns = tuple(categorical_columns)
+
+    @classmethod
+    def full_precision(cls) -> 'DtypePolicy':
+        """全部使用 float64/int64 的策略，与调整前的结果完全一致"""
+        return cls(np.float64, np.float64, {}, ())
+
+    def feature_values(self, name: str, values: np.ndarray) -> np.ndarray:
+        """将计算结果转换为特征列的类型"""
+        values = np.asarray(values)
+        if name in self.calendar_dtypes:
+            return values.astype(self.calendar_dtypes[name], copy=False)
+        if values.dtype.kind == 'f':
+            return values.astype(self.feature_dtype, copy=False)
+        return values
+
+    def apply_raw(self, df: pd.DataFrame, numeric_cols: Iterable[str]) -> pd.DataFrame:
+        """原地转换原始数据列的类型"""
+        for col in numeric_cols:
+            if col in df.columns and df[col].dtype != self.raw_dtype:
+                df[col] = df[col].astype(self.raw_dtype)
+        for col in self.categorical_columns:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        return df
+
+    @staticmethod
+    def fillna(df: pd.DataFrame, value=0) -> pd.DataFrame:
+        """原地填充数值列的缺失值，只替换含缺失值的列"""
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series) and series.hasnans:
+                df[col] = series.fillna(value)
+        return df
+
+# 默认的数据类型策略
+DEFAULT_DTYPE_POLICY = DtypePolicy()
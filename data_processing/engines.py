@@ -0,0 +1,171 @@
+"""数据处理引擎
+
+DataProcessor 的清洗、特征和标准化通过引擎完成，引擎之间的输出可以互换：
+  pandas    默认引擎，单线程，逐只股票处理
+  columnar  列式引擎，需要 pyarrow。目前只覆盖 read 和 map 两步：K线记录由 Polars
+            （安装了 polars 时）或 Arrow 构建 DataFrame，多只股票的批量处理在线程池中并行；
+            清洗、特征和标准化与 pandas 引擎完全相同（同一份 NumPy 内核，大数组上运算时
+            释放 GIL，夜间全市场特征计算可以使用多个核心）
+通过环境变量 DATAFRAME_ENGINE（pandas/columnar，默认 pandas）或 DataProcessor(engine=...) 选择。
+没有安装 pyarrow 时只能使用 pandas 引擎，显式选择 columnar 会报错。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+import pandas as pd
+from .data_cleaner import DataCleaner
+from .feature_engineer import FeatureEngineer
+from .data_standardizer import DataStandardizer
+from .dtype_policy import DtypePolicy, DEFAULT_DTYPE_POLICY
+
+# Try to import pyarrow, but handle import error
+try:
+    import pyarrow as pa
+    pyarrow_available = True
+except ImportError:
+    pa = None
+    pyarrow_available = False
+
+try:
+    import polars as pl
+    polars_available = True
+except ImportError:
+    pl = None
+    polars_available = False
+
+KlineInput = Union[pd.DataFrame, List[Dict[str, Any]]]
+
+class DataFrameEngine:
+    """数据处理引擎接口，默认实现为逐只股票顺序处理"""
+
+    name = None
+
+    def __init__(self, dtype_policy: DtypePolicy = None, cleaner: DataCleaner = None,
+                 feature_engineer: FeatureEngineer = None, standardizer: DataStandardizer = None):
+        """初始化引擎
+
+        Args:
+            dtype_policy: 数据类型策略，默认为 DEFAULT_DTYPE_POLICY
+            cleaner: 数据清洗，默认使用 dtype_policy 创建
+            feature_engineer: 特征工程，默认使用 dtype_policy 创建
+            standardizer: 标准化器，默认为 DataStandardizer()
+        """
+        self.dtype_policy = dtype_policy or DEFAULT_DTYPE_POLICY
+        self.cleaner = cleaner or DataCleaner(self.dtype_policy)
+        self.feature_engineer = feature_engineer or FeatureEngineer(dtype_policy=self.dtype_policy)
+        self.standardizer = standardizer or DataStandardizer()
+
+    def read(self, kline_data: KlineInput) -> KlineInput:
+        """将K线记录转换为清洗器的输入"""
+        return kline_data
+
+    def clean(self, kline_data: KlineInput) -> pd.DataFrame:
+        """清洗K线数据，见 DataCleaner.clean_kline_data"""
+        if kline_data is None or len(kline_data) == 0:
+            return pd.DataFrame()
+        return self.cleaner.clean_kline_data(self.read(kline_data))
+
+    def features(self, df: pd.DataFrame, features: Optional[List[str]] = None,
+                 include_technical_indicators: bool = True) -> pd.DataFrame:
+        """计算特征
+
+        Args:
+            df: 清洗后的K线数据
+            features: 只计算这些特征及其依赖，None 表示计算时间、价格、波动率特征和技术指标
+            include_technical_indicators: features 为 None 时是否计算技术指标
+        """
+        if df.empty:
+            return df
+
+        if features is not None:
+            df = self.feature_engineer.compute_features(df, features)
+            return self.dtype_policy.fillna(df, 0)
+
+        df = self.feature_engineer.generate_time_based_features(df)
+        df = self.feature_engineer.generate_price_features(df)
+        df = self.feature_engineer.generate_volatility_features(df)
+        if include_technical_indicators:
+            df = self.feature_engineer.calculate_technical_indicators(df)
+        return df
+
+    def standardize(self, df: pd.DataFrame, columns: List[str], method: str = 'standard') -> pd.DataFrame:
+        """标准化指定列，见 DataStandardizer.standardize"""
+        return self.standardizer.standardize(df, columns, method)
+
+    def process(self, kline_data: KlineInput, features: Optional[List[str]] = None,
+                include_technical_indicators: bool = True) -> pd.DataFrame:
+        """清洗并计算特征"""
+        return self.features(self.clean(kline_data), features, include_technical_indicators)
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """对每个元素调用 func，按输入顺序返回结果"""
+        return [func(item) for item in items]
+
+    def process_universe(self, kline_by_symbol: Dict[str, KlineInput], features: Optional[List[str]] = None,
+                         include_technical_indicators: bool = True) -> Dict[str, pd.DataFrame]:
+        """批量处理多只股票，返回 股票代码 -> 特征数据"""
+        symbols = list(kline_by_symbol)
+        results = self.map(lambda symbol: self.process(kline_by_symbol[symbol], features,
+                                                       include_technical_indicators), symbols)
+        return dict(zip(symbols, results))
+
+class PandasEngine(DataFrameEngine):
+    """pandas 引擎：单线程逐只股票处理"""
+
+    name = 'pandas'
+
+class ColumnarEngine(DataFrameEngine):
+    """列式多线程引擎
+
+    目前只重写 read 和 map：K线记录由 Polars（可选）或 Arrow 构建 DataFrame 再交给清洗器，
+    批量处理多只股票时每只股票在线程池中独立完成清洗和特征计算。clean、features、
+    standardize 沿用基类的 pandas 实现，结果与 pandas 引擎完全一致。需要 pyarrow。
+    """
+
+    name = 'columnar'
+
+    def __init__(self, dtype_policy: DtypePolicy = None, cleaner: DataCleaner = None,
+                 feature_engineer: FeatureEngineer = None, standardizer: DataStandardizer = None,
+                 max_workers: int = None):
+        """初始化列式引擎
+
+        Args:
+            max_workers: 批量处理的线程数，默认为 CPU 核数
+
+        Raises:
+            ImportError: 没有安装 pyarrow
+        """
+        if not pyarrow_available:
+            raise ImportError("columnar 引擎需要 pyarrow，请安装 pyarrow 或使用 pandas 引擎")
+        super().__init__(dtype_policy, cleaner, feature_engineer, standardizer)
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def read(self, kline_data: KlineInput) -> KlineInput:
+        """记录列表按列构建 DataFrame，类型无法统一的列（如混合字符串和数字）回退到 pandas"""
+        if isinstance(kline_data, pd.DataFrame):
+            return kline_data
+        try:
+            if polars_available:
+                return pl.from_dicts(kline_data, infer_schema_length=None).to_pandas()
+            return pa.Table.from_pylist(kline_data).to_pandas()
+        except Exception:
+            return pd.DataFrame(kline_data)
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+ENGINES = {
+    PandasEngine.name: PandasEngine,
+    ColumnarEngine.name: ColumnarEngine
+}
+
+def create_engine(name: str = None, dtype_policy: DtypePolicy = None, **kwargs) -> DataFrameEngine:
+    """按名称创建引擎，默认读取环境变量 DATAFRAME_ENGINE"""
+    name = name or os.getenv('DATAFRAME_ENGINE', PandasEngine.name)
+    if name not in ENGINES:
+        raise ValueError(f"不支持的数据处理引擎: {name}")
+    return ENGINES[name](dtype_policy, **kwargs)
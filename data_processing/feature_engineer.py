@@ -1,61 +1,54 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Any
+from .feature_registry import FeatureRegistry, FEATURE_REGISTRY
+from .dtype_policy import DtypePolicy, DEFAULT_DTYPE_POLICY
 
 class FeatureEngineer:
     """特征工程类"""
     
+    def __init__(self, registry: FeatureRegistry = None, dtype_policy: DtypePolicy = None):
+        """初始化特征工程
+        
+        Args:
+            registry: 特征注册表，默认为 FEATURE_REGISTRY
+            dtype_policy: 特征列的数据类型策略，默认为 DEFAULT_DTYPE_POLICY
+        """
+        self.registry = registry or FEATURE_REGISTRY
+        self.dtype_policy = dtype_policy or DEFAULT_DTYPE_POLICY
+    
+    def compute_features(self, df: pd.DataFrame, features: List[str], params: Dict[str, Any] = None) -> pd.DataFrame:
+        """只计算指定的特征及其依赖
+        
+        Args:
+            df: 按交易日期升序排列的K线数据
+            features: 需要的特征名，见 FEATURE_REGISTRY
+            params: 覆盖特征参数，如 {'volatility_window': 30}
+        """
+        if df.empty:
+            return df
+        
+        plan = self.registry.plan(features, params)
+        data = {}
+        for col in plan.inputs:
+            if col not in df.columns:
+                raise KeyError(f"行情数据缺少列: {col}")
+            data[col] = df[col].to_numpy() if col == 'trade_date' else df[col].to_numpy(dtype=float)
+        
+        for name, values in plan.execute(data).items():
+            df[name] = self.dtype_policy.feature_values(name, values)
+        
+        return df
+    
     def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """计算技术指标"""
         if df.empty:
             return df
         
-        # 计算移动平均线
-        df['MA5'] = df['close'].rolling(window=5).mean()
-        df['MA10'] = df['close'].rolling(window=10).mean()
-        df['MA20'] = df['close'].rolling(window=20).mean()
-        df['MA60'] = df['close'].rolling(window=60).mean()
-        
-        # 计算MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal']
-        
-        # 计算KDJ
-        low_min = df['low'].rolling(window=9).min()
-        high_max = df['high'].rolling(window=9).max()
-        df['RSV'] = (df['close'] - low_min) / (high_max - low_min) * 100
-        df['K'] = df['RSV'].ewm(alpha=1/3, adjust=False).mean()
-        df['D'] = df['K'].ewm(alpha=1/3, adjust=False).mean()
-        df['J'] = 3 * df['K'] - 2 * df['D']
-        
-        # 计算RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # 计算布林带
-        df['BB_Mid'] = df['close'].rolling(window=20).mean()
-        df['BB_Std'] = df['close'].rolling(window=20).std()
-        df['BB_Upper'] = df['BB_Mid'] + 2 * df['BB_Std']
-        df['BB_Lower'] = df['BB_Mid'] - 2 * df['BB_Std']
-        
-        # 计算成交量指标
-        df['VOL_MA5'] = df['vol'].rolling(window=5).mean()
-        df['VOL_MA10'] = df['vol'].rolling(window=10).mean()
-        
-        # 计算价格波动指标
-        df['ATR'] = df[['high', 'low', 'close']].apply(lambda x: max(x[0]-x[1], abs(x[0]-x[2]), abs(x[1]-x[2])), axis=1).rolling(window=14).mean()
-        
-        # 计算动量指标
-        df['MOM'] = df['close'] - df['close'].shift(10)
+        df = self.compute_features(df, self.registry.group('technical'))
         
         # 处理缺失值
-        df = df.fillna(0)
+        df = self.dtype_policy.fillna(df, 0)
         
         return df
     
@@ -96,66 +89,32 @@ class FeatureEngineer:
         return features
     
     def generate_time_based_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """生成时间相关特征"""
+        """生成时间相关特征（年、月、日、星期几，是否月末、季末、年末）"""
         if df.empty or 'trade_date' not in df.columns:
             return df
         
-        # 提取年、月、日
-        df['year'] = df['trade_date'].dt.year
-        df['month'] = df['trade_date'].dt.month
-        df['day'] = df['trade_date'].dt.day
-        
-        # 提取星期几
-        df['weekday'] = df['trade_date'].dt.weekday
-        
-        # 提取是否是月末、季末、年末
-        df['is_month_end'] = df['trade_date'].dt.is_month_end.astype(int)
-        df['is_quarter_end'] = df['trade_date'].dt.is_quarter_end.astype(int)
-        df['is_year_end'] = df['trade_date'].dt.is_year_end.astype(int)
-        
-        return df
+        return self.compute_features(df, self.registry.group('time'))
     
     def generate_price_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """生成价格相关特征"""
+        """生成价格相关特征（涨跌幅、振幅，收盘价、最高价、最低价相对开盘价的变化）"""
         if df.empty:
             return df
         
-        # 价格变化率
-        df['price_change_pct'] = df['close'].pct_change() * 100
-        
-        # 价格波动幅度
-        df['price_range_pct'] = (df['high'] - df['low']) / df['open'] * 100
-        
-        # 收盘价相对开盘价的变化
-        df['close_to_open_pct'] = (df['close'] - df['open']) / df['open'] * 100
-        
-        # 最高价相对开盘价的变化
-        df['high_to_open_pct'] = (df['high'] - df['open']) / df['open'] * 100
-        
-        # 最低价相对开盘价的变化
-        df['low_to_open_pct'] = (df['low'] - df['open']) / df['open'] * 100
+        df = self.compute_features(df, self.registry.group('price'))
         
         # 处理缺失值
-        df = df.fillna(0)
+        df = self.dtype_policy.fillna(df, 0)
         
         return df
     
     def generate_volatility_features(self, df: pd.DataFrame, window: int = 20) -> pd.DataFrame:
-        """生成波动率特征"""
+        """生成波动率特征（收益率、年化波动率、偏度和峰度）"""
         if df.empty:
             return df
         
-        # 计算收益率
-        df['returns'] = df['close'].pct_change()
-        
-        # 计算历史波动率
-        df['volatility'] = df['returns'].rolling(window=window).std() * np.sqrt(252)  # 年化波动率
-        
-        # 计算收益率的偏度和峰度
-        df['skewness'] = df['returns'].rolling(window=window).skew()
-        df['kurtosis'] = df['returns'].rolling(window=window).kurt()
+        df = self.compute_features(df, self.registry.group('volatility'), {'volatility_window': window})
         
         # 处理缺失值
-        df = df.fillna(0)
+        df = self.dtype_policy.fillna(df, 0)
         
-        return df
\ No newline at end of file
+        return df
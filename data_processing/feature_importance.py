@@ -0,0 +1,175 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from sklearn.feature_selection import mutual_info_regression
+from sklearn.inspection import permutation_importance
+from .data_cleaner import METADATA_COLS
+from sklearn.linear_model import LinearRegression
+
+class FeatureImportance:
+    """批量特征重要性计算
+
+    pearson 一次矩阵运算得到所有特征与目标的相关系数；spearman、mutual_info 和
+    permutation 按列分块在线程池中并行计算。缺失值按列成对剔除，与 Series.corr 一致。
+    结果按 (方法, 特征集指纹) 缓存，指纹包含列名和数据内容，同一份数据只计算一次。
+    """
+
+    METHODS = ('pearson', 'spearman', 'mutual_info', 'permutation')
+
+    def __init__(self, max_workers: int = 4, cache_size: int = 256, random_state: int = 0):
+        """初始化特征重要性计算
+
+        Args:
+            max_workers: 并行计算的线程数
+            cache_size: 最多缓存的结果数量
+            random_state: 互信息和置换重要性的随机种子
+        """
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.random_state = random_state
+        self._cache: 'OrderedDict[tuple, Dict[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def numeric_columns(df: pd.DataFrame, target: str) -> List[str]:
+        """除目标列和清洗标记列外的数值列"""
+        return [col for col in df.columns
+                if col != target and col not in METADATA_COLS and pd.api.types.is_numeric_dtype(df[col])]
+
+    @staticmethod
+    def fingerprint(X: np.ndarray, y: np.ndarray, columns: List[str], target: str) -> str:
+        """特征集指纹：列名、目标和数据内容的摘要"""
+        # sha256 有硬件加速，对大块数据比 blake2b 快
+        hasher = hashlib.sha256('\x1f'.join([target] + list(columns)).encode())
+        hasher.update(np.ascontiguousarray(X).data)
+        hasher.update(np.ascontiguousarray(y).data)
+        return hasher.hexdigest()[:32]
+
+    def compute(self, df: pd.DataFrame, target: str, method: str = 'pearson',
+                columns: Optional[List[str]] = None) -> Dict[str, float]:
+        """计算特征重要性
+
+        Args:
+            df: 特征数据
+            target: 目标列
+            method: pearson/spearman（相关系数绝对值）、mutual_info（互信息）、
+                    permutation（线性模型的置换重要性）
+            columns: 参与计算的特征列，默认为除目标列外的全部数值列
+
+        Returns:
+            特征名 -> 重要性，按重要性降序排列；无法计算（如常数列）的特征为 0
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"不支持的特征重要性方法: {method}")
+        if df.empty or target not in df.columns:
+            return {}
+
+        columns = self.numeric_columns(df, target) if columns is None else list(columns)
+        if not columns:
+            return {}
+
+        X = df[columns].to_numpy(dtype=np.float64)
+        y = df[target].to_numpy(dtype=np.float64)
+        key = (method, self.fingerprint(X, y, columns, target))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return dict(self._cache[key])
+
+        if method == 'pearson':
+            scores = np.abs(self._pearson(X, y))
+        elif method == 'spearman':
+            scores = np.abs(self._spearman(X, y))
+        elif method == 'mutual_info':
+            scores = self._parallel(self._mutual_info, X, y)
+        else:
+            scores = self._permutation(X, y)
+
+        scores = np.nan_to_num(scores, nan=0.0)
+        order = np.argsort(-scores, kind='stable')
+        result = {columns[i]: float(scores[i]) for i in order}
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(result)
+
+    @staticmethod
+    def _pearson(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """所有列与目标的相关系数，每列只使用两者都有效的行"""
+        valid = np.isfinite(X) & np.isfinite(y)[:, None]
+        if valid.all():
+            dx = X - X.mean(axis=0)
+            dy = y - y.mean()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = (dy @ dx) / np.sqrt((dx * dx).sum(axis=0) * (dy @ dy))
+            return np.clip(corr, -1, 1)
+
+        count = valid.sum(axis=0)
+        Y = np.broadcast_to(y[:, None], X.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_x = np.where(valid, X, 0).sum(axis=0) / count
+            mean_y = np.where(valid, Y, 0).sum(axis=0) / count
+            dx = np.where(valid, X - mean_x, 0)
+            dy = np.where(valid, Y - mean_y, 0)
+            corr = (dx * dy).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+        return np.clip(corr, -1, 1)
+
+    def _spearman(self, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """秩相关系数；没有缺失值的列一次排名，其余列并行逐列计算"""
+        valid = np.isfinite(X) & np.isfinite(y)[:, None]
+        complete = valid.all(axis=0)
+        corr = np.full(X.shape[1], np.nan)
+        if complete.any():
+            corr[complete] = self._pearson(rankdata(X[:, complete], axis=0), rankdata(y))
+
+        def partial(X_part: np.ndarray, y_part: np.ndarray) -> np.ndarray:
+            result = np.full(X_part.shape[1], np.nan)
+            for j in range(X_part.shape[1]):
+                mask = np.isfinite(X_part[:, j]) & np.isfinite(y_part)
+                if mask.sum() > 1:
+                    result[j] = self._pearson(rankdata(X_part[mask, j])[:, None], rankdata(y_part[mask]))[0]
+            return result
+
+        if not complete.all():
+            corr[~complete] = self._parallel(partial, X[:, ~complete], y)
+        return corr
+
+    def _mutual_info(self, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """逐列计算互信息，每列只使用两者都有效的行"""
+        result = np.zeros(X.shape[1])
+        for j in range(X.shape[1]):
+            mask = np.isfinite(X[:, j]) & np.isfinite(y)
+            # k 近邻估计至少需要 n_neighbors + 1 个样本
+            if mask.sum() > 3:
+                result[j] = mutual_info_regression(X[mask, j][:, None], y[mask],
+                                                   random_state=self.random_state)[0]
+        return result
+
+    def _permutation(self, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """线性模型的置换重要性（R² 的平均下降），缺失的特征值按 0 处理"""
+        mask = np.isfinite(y)
+        if mask.sum() < 2:
+            return np.zeros(X.shape[1])
+        X = np.nan_to_num(X[mask], nan=0.0, posinf=0.0, neginf=0.0)
+        model = LinearRegression().fit(X, y[mask])
+        result = permutation_importance(model, X, y[mask], n_repeats=5,
+                                        random_state=self.random_state, n_jobs=self.max_workers)
+        return result.importances_mean
+
+    def _parallel(self, func: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                  X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """按列分块并行计算"""
+        chunks = [chunk for chunk in np.array_split(np.arange(X.shape[1]), self.max_workers) if len(chunk)]
+        if len(chunks) <= 1:
+            return func(X, y)
+
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            results = list(executor.map(lambda chunk: func(X[:, chunk], y), chunks))
+        return np.concatenate(results)
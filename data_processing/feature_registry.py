@@ -0,0 +1,278 @@
+"""特征注册表与计算计划
+
+每个特征声明计算函数、输入（原始行情列或其他特征）、分组和回看长度。
+FeatureRegistry.plan() 只选出请求的特征及其依赖，按拓扑顺序排列，
+共享的中间结果（如收益率、真实波幅）只计算一次，并给出所需的最少历史K线数量。
+计算函数的输入输出都是 NumPy 数组，一维（单只股票）和二维（时间 × 股票）都适用。
+"""
+import numpy as np
+from typing import Dict, List, Any, Callable, Iterable, Mapping, Tuple, Union
+from analysis import indicators
+from data_collection.trading_calendar import get_trading_calendar
+
+# EMA 类指标理论上依赖全部历史，按 3 倍周期预热，此时初值的权重已小于 1%
+EMA_WARMUP = 3
+
+class FeatureSpec:
+    """特征定义"""
+
+    def __init__(self, outputs: Tuple[str, ...], func: Callable, inputs: Tuple[str, ...],
+                 lookback: Union[int, Callable[[Dict[str, Any]], int]] = 0,
+                 params: Dict[str, Any] = None, group: str = None):
+        """初始化特征定义
+
+        Args:
+            outputs: 输出的特征名，多输出指标（如 MACD）一次计算多个特征
+            func: 计算函数，参数为各输入数组和 params
+            inputs: 输入的原始行情列或其他特征名
+            lookback: 在输入之外还需要的历史K线数量，可以是参数的函数
+            params: 参数及默认值，参数名在注册表内唯一，可以在计划中覆盖
+            group: 所属分组（time/price/volatility/technical），None 表示中间结果
+        """
+        self.outputs = outputs
+        self.func = func
+        self.inputs = inputs
+        self.lookback = lookback
+        self.params = params or {}
+        self.group = group
+
+    @property
+    def name(self) -> str:
+        return self.outputs[0]
+
+    def get_lookback(self, params: Dict[str, Any]) -> int:
+        return self.lookback(params) if callable(self.lookback) else self.lookback
+
+class FeaturePlan:
+    """特征计算计划"""
+
+    def __init__(self, features: List[str], steps: List[FeatureSpec], inputs: List[str],
+                 params: Dict[str, Any], min_history: int):
+        self.features = features
+        self.steps = steps
+        self.inputs = inputs
+        self.params = params
+        self.min_history = min_history
+
+    def execute(self, data: Mapping[str, np.ndarray], keep_intermediates: bool = False) -> Dict[str, np.ndarray]:
+        """执行计划
+
+        Args:
+            data: 原始行情列名 -> 数组
+            keep_intermediates: 是否返回依赖的中间结果
+
+        Returns:
+            特征名 -> 数组
+        """
+        missing = [name for name in self.inputs if name not in data]
+        if missing:
+            raise KeyError(f"行情数据缺少列: {', '.join(missing)}")
+
+        values = {name: data[name] for name in self.inputs}
+        for spec in self.steps:
+            kwargs = {key: self.params.get(key, default) for key, default in spec.params.items()}
+            result = spec.func(*[values[name] for name in spec.inputs], **kwargs)
+            if len(spec.outputs) == 1:
+                result = (result,)
+            values.update(zip(spec.outputs, result))
+
+        names = [name for spec in self.steps for name in spec.outputs] if keep_intermediates else self.features
+        return {name: values[name] for name in names}
+
+class FeatureRegistry:
+    """特征注册表"""
+
+    RAW_COLUMNS = ('trade_date', 'open', 'high', 'low', 'close', 'vol')
+
+    def __init__(self):
+        self._specs: Dict[str, FeatureSpec] = {}
+        self._owners: Dict[str, FeatureSpec] = {}
+
+    def register(self, outputs: Union[str, Tuple[str, ...]], inputs: Tuple[str, ...],
+                 lookback: Union[int, Callable[[Dict[str, Any]], int]] = 0,
+                 params: Dict[str, Any] = None, group: str = None) -> Callable:
+        """注册特征的装饰器"""
+        outputs = (outputs,) if isinstance(outputs, str) else tuple(outputs)
+
+        def decorator(func: Callable) -> Callable:
+            spec = FeatureSpec(outputs, func, tuple(inputs), lookback, params, group)
+            for name in outputs:
+                if name in self._owners or name in self.RAW_COLUMNS:
+                    raise ValueError(f"特征 {name} 已注册")
+                self._owners[name] = spec
+            self._specs[spec.name] = spec
+            return func
+
+        return decorator
+
+    def spec(self, name: str) -> FeatureSpec:
+        """获取输出该特征的定义"""
+        if name not in self._owners:
+            raise ValueError(f"未注册的特征: {name}")
+        return self._owners[name]
+
+    def group(self, group: str) -> List[str]:
+        """获取分组内的全部特征，按注册顺序"""
+        return [name for spec in self._specs.values() if spec.group == group for name in spec.outputs]
+
+    def plan(self, features: Iterable[str], params: Dict[str, Any] = None) -> FeaturePlan:
+        """生成只包含请求特征及其依赖的计算计划
+
+        Args:
+            features: 需要的特征名
+            params: 覆盖特征参数的默认值，如 {'volatility_window': 30}
+        """
+        features = list(dict.fromkeys(features))
+        params = dict(params or {})
+        steps: List[FeatureSpec] = []
+        inputs: List[str] = []
+        history: Dict[str, int] = {}
+        visiting = set()
+
+        def visit(name: str) -> int:
+            """深度优先遍历依赖，返回计算该特征需要的回看长度"""
+            if name in self.RAW_COLUMNS and name not in self._owners:
+                if name not in inputs:
+                    inputs.append(name)
+                return 0
+
+            spec = self.spec(name)
+            if spec.name in history:
+                return history[spec.name]
+            if spec.name in visiting:
+                raise ValueError(f"特征 {spec.name} 存在循环依赖")
+
+            visiting.add(spec.name)
+            spec_params = {key: params.get(key, default) for key, default in spec.params.items()}
+            lookback = spec.get_lookback(spec_params) + max([visit(dep) for dep in spec.inputs], default=0)
+            visiting.discard(spec.name)
+
+            history[spec.name] = lookback
+            steps.append(spec)
+            return lookback
+
+        lookback = max([visit(name) for name in features], default=0)
+        return FeaturePlan(features, steps, inputs, params, lookback + 1)
+
+# 默认特征注册表，与 FeatureEngineer 的特征一致
+FEATURE_REGISTRY = FeatureRegistry()
+register = FEATURE_REGISTRY.register
+
+def _calendar_feature(trade_date: np.ndarray, name: str) -> np.ndarray:
+    # 从预先展开的交易日历表中按日期查表，月末/季末/年末为当期最后一个交易日
+    days = np.asarray(trade_date, dtype='datetime64[D]')
+    return get_trading_calendar().day_feature(days, name).astype(np.int64)
+
+@register('year', inputs=('trade_date',), group='time')
+def _year_feature(trade_date):
+    return _calendar_feature(trade_date, 'year')
+
+@register('month', inputs=('trade_date',), group='time')
+def _month_feature(trade_date):
+    return _calendar_feature(trade_date, 'month')
+
+@register('day', inputs=('trade_date',), group='time')
+def _day_feature(trade_date):
+    return _calendar_feature(trade_date, 'day')
+
+@register('weekday', inputs=('trade_date',), group='time')
+def _weekday_feature(trade_date):
+    return _calendar_feature(trade_date, 'weekday')
+
+@register('is_month_end', inputs=('trade_date',), group='time')
+def _is_month_end_feature(trade_date):
+    return _calendar_feature(trade_date, 'is_month_end')
+
+@register('is_quarter_end', inputs=('trade_date',), group='time')
+def _is_quarter_end_feature(trade_date):
+    return _calendar_feature(trade_date, 'is_quarter_end')
+
+@register('is_year_end', inputs=('trade_date',), group='time')
+def _is_year_end_feature(trade_date):
+    return _calendar_feature(trade_date, 'is_year_end')
+
+@register('returns', inputs=('close',), lookback=1, group='volatility')
+def _returns_feature(close):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return close / indicators.shift(close, 1) - 1
+
+@register('price_change_pct', inputs=('returns',), group='price')
+def _price_change_pct_feature(returns):
+    return returns * 100
+
+@register('price_range_pct', inputs=('high', 'low', 'open'), group='price')
+def _price_range_pct_feature(high, low, open_):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (high - low) / open_ * 100
+
+@register('close_to_open_pct', inputs=('close', 'open'), group='price')
+def _close_to_open_pct_feature(close, open_):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (close - open_) / open_ * 100
+
+@register('high_to_open_pct', inputs=('high', 'open'), group='price')
+def _high_to_open_pct_feature(high, open_):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (high - open_) / open_ * 100
+
+@register('low_to_open_pct', inputs=('low', 'open'), group='price')
+def _low_to_open_pct_feature(low, open_):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (low - open_) / open_ * 100
+
+def _volatility_lookback(params):
+    return params['volatility_window'] - 1
+
+@register('volatility', inputs=('returns',), lookback=_volatility_lookback,
+          params={'volatility_window': 20}, group='volatility')
+def _volatility_feature(returns, volatility_window):
+    # 年化波动率
+    return indicators.rolling_std(returns, volatility_window) * np.sqrt(252)
+
+@register('skewness', inputs=('returns',), lookback=_volatility_lookback,
+          params={'volatility_window': 20}, group='volatility')
+def _skewness_feature(returns, volatility_window):
+    return indicators.rolling_skew(returns, volatility_window)
+
+@register('kurtosis', inputs=('returns',), lookback=_volatility_lookback,
+          params={'volatility_window': 20}, group='volatility')
+def _kurtosis_feature(returns, volatility_window):
+    return indicators.rolling_kurt(returns, volatility_window)
+
+def _register_sma(name: str, source: str, window: int) -> None:
+    register(name, inputs=(source,), lookback=window - 1, group='technical')(
+        lambda values: indicators.sma(values, window))
+
+for _window in (5, 10, 20, 60):
+    _register_sma(f'MA{_window}', 'close', _window)
+
+@register(('MACD', 'Signal', 'MACD_Hist'), inputs=('close',), lookback=EMA_WARMUP * (26 + 9), group='technical')
+def _macd_feature(close):
+    return indicators.macd(close)
+
+@register(('RSV', 'K', 'D', 'J'), inputs=('high', 'low', 'close'), lookback=8 + EMA_WARMUP * 2 * 5, group='technical')
+def _kdj_feature(high, low, close):
+    return indicators.kdj(high, low, close)
+
+@register('RSI', inputs=('close',), lookback=14, group='technical')
+def _rsi_feature(close):
+    return indicators.rsi(close, 14)
+
+@register(('BB_Mid', 'BB_Std', 'BB_Upper', 'BB_Lower'), inputs=('close',), lookback=19, group='technical')
+def _bollinger_feature(close):
+    return indicators.bollinger_bands(close, 20, 2)
+
+for _window in (5, 10):
+    _register_sma(f'VOL_MA{_window}', 'vol', _window)
+
+@register('true_range', inputs=('high', 'low', 'close'), lookback=1)
+def _true_range_feature(high, low, close):
+    return indicators.true_range(high, low, close)
+
+@register('ATR', inputs=('true_range',), lookback=13, group='technical')
+def _atr_feature(true_range):
+    return indicators.sma(true_range, 14)
+
+@register('MOM', inputs=('close',), lookback=10, group='technical')
+def _momentum_feature(close):
+    return indicators.momentum(close, 10)
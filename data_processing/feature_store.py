@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .feature_registry import FeatureRegistry, FEATURE_REGISTRY
+
+# Try to import fcntl (not available on Windows), fall back to in-process locking
+try:
+    import fcntl
+    fcntl_available = True
+except ImportError:
+    fcntl_available = False
+    fcntl = None
+
+# 特征计算逻辑或存储格式有不兼容的修改时递增，使旧的存储全部失效
+FEATURE_STORE_VERSION = 3
+
+# 逐行摘要使用的 FNV-1a 参数
+_DIGEST_OFFSET = np.uint64(0xcbf29ce484222325)
+_DIGEST_PRIME = np.uint64(0x100000001b3)
+
+class FeatureStore:
+    """本地特征存储 - 将特征矩阵按列保存为内存映射文件
+
+    目录结构：{store_dir}/{symbol}/{特征集哈希}-{参数哈希}/
+      meta.json          特征列表、参数、行数和数据水位（最后交易日）
+      trade_date.bin     交易日（int64，1970-01-01 以来的天数）
+      row_digest.bin     每行原始数据的摘要（uint64）
+      {特征名}.bin       特征列
+    {store_dir}/{symbol}/{特征集哈希}-{参数哈希}.lock 为跨进程的文件锁
+
+    特征只依赖历史数据，已存储的行不会因为新K线而改变。传入的K线按交易日与已存储的
+    行对齐：重叠部分只校验原始数据摘要，水位之后的K线取前 min_history 根K线作为上下文
+    计算后追加到列文件末尾，因此固定长度的回看窗口向前滑动时不需要重建。重叠部分的历史
+    数据被修正、传入的K线早于已存储的起始日或与已存储的行没有重叠时整体重建。EMA 类特征
+    按特征注册表的预热长度计算上下文，与全量计算的差异在预热误差范围内。
+    每只股票的存储按交易日追加，不随数据水位产生新目录；创建新的特征集目录时删除
+    该股票旧存储版本留下的目录。
+    """
+
+    def __init__(self, store_dir: str = None, registry: FeatureRegistry = None, dtype=np.float32):
+        """初始化特征存储
+
+        Args:
+            store_dir: 存储目录，如果为 None，从环境变量 FEATURE_STORE_DIR 获取，默认 ./feature_store
+            registry: 特征注册表，默认为 FEATURE_REGISTRY
+            dtype: 特征列的存储类型
+        """
+        self.store_dir = store_dir or os.getenv('FEATURE_STORE_DIR', './feature_store')
+        self.registry = registry or FEATURE_REGISTRY
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(value: Any) -> str:
+        return hashlib.blake2b(json.dumps(value, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+
+    def key(self, features: List[str], params: Dict[str, Any] = None) -> Tuple[str, str]:
+        """计算 (特征集哈希, 参数哈希)
+
+        特征集哈希包含特征定义（输入和回看长度）和存储版本，定义变化时自动使用新的目录。
+        """
+        plan = self.registry.plan(features, params)
+        definition = [(spec.outputs, spec.inputs, spec.get_lookback({**spec.params, **plan.params}))
+                      for spec in plan.steps]
+        feature_hash = self._hash([FEATURE_STORE_VERSION, list(features), str(self.dtype), definition])
+        return feature_hash, self._hash(plan.params)
+
+    def path(self, symbol: str, features: List[str], params: Dict[str, Any] = None) -> str:
+        """获取特征集的存储目录"""
+        feature_hash, param_hash = self.key(features, params)
+        return os.path.join(self.store_dir, symbol, f'{feature_hash}-{param_hash}')
+
+    @staticmethod
+    def _row_digests(df: pd.DataFrame, days: np.ndarray, columns: List[str]) -> np.ndarray:
+        """逐行计算交易日和原始数据的摘要"""
+        digests = (days.astype(np.int64).view(np.uint64) ^ _DIGEST_OFFSET) * _DIGEST_PRIME
+        for col in columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            # 统一 NaN 和 -0.0 的二进制表示
+            values = np.where(np.isnan(values), np.nan, values) + 0.0
+            digests = (digests ^ values.view(np.uint64)) * _DIGEST_PRIME
+        return digests
+
+    @contextmanager
+    def _locked(self, path: str):
+        """持有特征集的进程内锁和跨进程文件锁"""
+        with self._lock:
+            if not fcntl_available:
+                yield
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f'{path}.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, path: str) -> Optional[Dict[str, Any]]:
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取特征存储元数据失败 {meta_path}: {e}")
+            return None
+
+    def _write_meta(self, path: str, meta: Dict[str, Any]) -> None:
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    def _open_column(self, path: str, name: str, dtype: np.dtype, rows: int) -> np.ndarray:
+        """以只读内存映射打开列文件"""
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path, f'{name}.bin'), dtype=dtype, mode='r', shape=(rows,))
+
+    def _append_columns(self, path: str, columns: Dict[str, np.ndarray], rows: int) -> None:
+        """追加列数据；先截断到元数据记录的行数，丢弃上次写入失败残留的数据"""
+        for name, values in columns.items():
+            file_path = os.path.join(path, f'{name}.bin')
+            with open(file_path, 'ab') as f:
+                f.truncate(rows * values.dtype.itemsize)
+                f.write(np.ascontiguousarray(values).tobytes())
+
+    def _load_columns(self, path: str, meta: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """以内存映射打开元数据记录的全部列"""
+        rows = meta['rows']
+        columns = {'trade_date': self._open_column(path, 'trade_date', np.dtype(np.int64), rows)
+                   .view('datetime64[D]')}
+        for name in meta['features']:
+            columns[name] = self._open_column(path, name, self.dtype, rows)
+        return columns
+
+    def load(self, symbol: str, features: List[str], params: Dict[str, Any] = None) -> Optional[Dict[str, np.ndarray]]:
+        """读取已存储的特征，返回列名 -> 只读内存映射数组（包括 trade_date），不存在时返回 None"""
+        path = self.path(symbol, features, params)
+        with self._locked(path):
+            meta = self._read_meta(path)
+            if meta is None:
+                return None
+            return self._load_columns(path, meta)
+
+    def _prune_stale(self, symbol: str) -> None:
+        """删除某只股票由旧存储版本创建的特征集目录"""
+        symbol_dir = os.path.join(self.store_dir, symbol)
+        if not os.path.isdir(symbol_dir):
+            return
+        for name in os.listdir(symbol_dir):
+            path = os.path.join(symbol_dir, name)
+            if not os.path.isdir(path):
+                continue
+            # 没有元数据的目录可能正由其他进程创建，不删除
+            meta = self._read_meta(path)
+            if meta is not None and meta.get('version') != FEATURE_STORE_VERSION:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _align(self, path: str, meta: Dict[str, Any], days: np.ndarray,
+               digests: np.ndarray) -> Optional[Tuple[int, int]]:
+        """按交易日将传入的K线与已存储的行对齐
+
+        Returns:
+            (第一根K线在存储中的行号, 与存储重叠的行数)；无法对齐或重叠部分的数据已变化时返回 None
+        """
+        rows = meta['rows']
+        stored_days = self._open_column(path, 'trade_date', np.dtype(np.int64), rows)
+        offset = int(np.searchsorted(stored_days, days[0]))
+        if offset >= rows or stored_days[offset] != days[0]:
+            return None
+
+        overlap = min(rows - offset, len(days))
+        stored_digests = self._open_column(path, 'row_digest', np.dtype(np.uint64), rows)
+        if (not np.array_equal(stored_days[offset:offset + overlap], days[:overlap]) or
+                not np.array_equal(stored_digests[offset:offset + overlap], digests[:overlap])):
+            return None
+        return offset, overlap
+
+    def update(self, symbol: str, df: pd.DataFrame, features: List[str],
+               params: Dict[str, Any] = None) -> Dict[str, np.ndarray]:
+        """增量更新并返回特征
+
+        Args:
+            symbol: 股票代码
+            df: 按交易日期升序排列的原始K线，trade_date 为日期类型
+            features: 需要的特征
+            params: 特征参数
+
+        Returns:
+            列名 -> 数组（包括 trade_date），行与 df 一一对应
+        """
+        if df.empty:
+            return {}
+
+        plan = self.registry.plan(features, params)
+        path = self.path(symbol, features, params)
+        input_cols = [col for col in plan.inputs if col != 'trade_date']
+        dates = df['trade_date'].to_numpy().astype('datetime64[D]')
+        days = dates.astype(np.int64)
+        digests = self._row_digests(df, days, input_cols)
+
+        with self._locked(path):
+            meta = self._read_meta(path)
+            offset, overlap = 0, 0
+            if meta is not None:
+                aligned = self._align(path, meta, days, digests)
+                if aligned is None:
+                    print(f"{symbol} 的历史数据已变化，重建特征存储")
+                    shutil.rmtree(path, ignore_errors=True)
+                    meta = None
+                else:
+                    offset, overlap = aligned
+
+            if overlap < len(df):
+                # 只用水位之前最后 min_history - 1 根K线作为上下文计算新增的行
+                rows = meta['rows'] if meta is not None else 0
+                start = max(0, overlap - plan.min_history + 1)
+                context = df.iloc[start:]
+                data = {col: (dates[start:] if col == 'trade_date' else context[col].to_numpy(dtype=float))
+                        for col in plan.inputs}
+                result = plan.execute(data)
+
+                columns = {'trade_date': days[overlap:], 'row_digest': digests[overlap:]}
+                for name in plan.features:
+                    columns[name] = np.asarray(result[name], dtype=self.dtype)[overlap - start:]
+
+                if meta is None:
+                    self._prune_stale(symbol)
+                os.makedirs(path, exist_ok=True)
+                self._append_columns(path, columns, rows)
+                meta = {
+                    'version': FEATURE_STORE_VERSION,
+                    'symbol': symbol,
+                    'features': plan.features,
+                    'params': plan.params,
+                    'rows': rows + len(df) - overlap,
+                    'watermark': str(dates[-1])
+                }
+                self._write_meta(path, meta)
+
+            stored = self._load_columns(path, meta)
+        return {name: values[offset:offset + len(df)] for name, values in stored.items()}
+
+    def invalidate(self, symbol: str = None) -> None:
+        """删除某只股票（或全部）的特征存储"""
+        with self._lock:
+            path = os.path.join(self.store_dir, symbol) if symbol else self.store_dir
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,83 @@
+"""回看长度规划
+
+把请求的特征（技术指标）和模型需要的K线数量换算为最少K线数，再由交易日历换算为
+起止日期，只获取这么多根日K线；可用K线不足的特征由 LookbackPlan.insufficient 给出，
+调用方不返回由过短窗口计算出的指标。
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Tuple
+from .feature_registry import FeatureRegistry, FEATURE_REGISTRY
+from data_collection.trading_calendar import TradingCalendar, format_days, get_trading_calendar
+
+class LookbackPlan:
+    """K线获取计划"""
+
+    def __init__(self, bars: int, start_date: str, end_date: str, feature_history: Dict[str, int]):
+        """初始化获取计划
+
+        Args:
+            bars: 需要的K线数量
+            start_date: 起始交易日（YYYYMMDD）
+            end_date: 截止交易日（YYYYMMDD）
+            feature_history: 特征名 -> 计算最新值至少需要的K线数量
+        """
+        self.bars = bars
+        self.start_date = start_date
+        self.end_date = end_date
+        self.feature_history = feature_history
+
+    def insufficient(self, available: int) -> List[str]:
+        """可用K线数量不足以计算的特征"""
+        return [name for name, bars in self.feature_history.items() if available < bars]
+
+class LookbackPlanner:
+    """按特征和模型的需要规划获取的K线数量"""
+
+    def __init__(self, registry: FeatureRegistry = None, calendar: TradingCalendar = None):
+        """初始化规划器
+
+        Args:
+            registry: 特征注册表，默认为 FEATURE_REGISTRY
+            calendar: 交易日历，默认使用进程内共享的交易日历
+        """
+        self.registry = registry or FEATURE_REGISTRY
+        self._calendar = calendar
+
+    @property
+    def calendar(self) -> TradingCalendar:
+        # 共享的交易日历可能在导入新日历后被替换，每次使用时获取
+        return self._calendar or get_trading_calendar()
+
+    def feature_history(self, features: Iterable[str], params: Dict[str, Any] = None) -> Dict[str, int]:
+        """每个特征的最新值至少需要的K线数量"""
+        return {name: self.registry.plan([name], params).min_history for name in features}
+
+    def plan(self, features: Iterable[str] = (), bars: int = 0, end_date: str = None,
+             params: Dict[str, Any] = None) -> LookbackPlan:
+        """规划获取的K线
+
+        Args:
+            features: 需要计算的特征
+            bars: 特征之外的K线需求（如模型的回看长度加训练样本数）
+            end_date: 截止日期，默认为今天，非交易日回退到之前最近的交易日
+            params: 覆盖特征参数
+        """
+        history = self.feature_history(features, params)
+        required = max([bars, 1] + list(history.values()))
+        end = self.calendar.offset(end_date or date.today().strftime('%Y%m%d'), 0)
+        start = self.calendar.window_start(end, required)
+        return LookbackPlan(required, format_days(start), format_days(end), history)
+
+    def fetch(self, collector, symbol: str, features: Iterable[str] = (), bars: int = 0, end_date: str = None,
+              params: Dict[str, Any] = None) -> Tuple[LookbackPlan, List[Dict[str, Any]]]:
+        """按计划获取日K线
+
+        Args:
+            collector: 数据收集器（DataCollector），优先从缓存和数据库读取
+
+        Returns:
+            (获取计划, 按交易日期升序排列、最多 plan.bars 根的K线)
+        """
+        plan = self.plan(features, bars, end_date, params)
+        data = collector.get_kline_bars(symbol, plan.bars, plan.end_date, start_date=plan.start_date)
+        return plan, data
@@ -0,0 +1,157 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional
+from .feature_registry import FeatureRegistry, FEATURE_REGISTRY
+from data_collection.symbol_resolver import UNKNOWN_ID, get_symbol_resolver
+
+class KlinePanel:
+    """按 交易日 × 股票 对齐的行情面板
+
+    每个字段是形状为 (日期数, 股票数) 的数组，停牌、未上市的位置为 NaN。
+    """
+
+    FIELDS = ('open', 'high', 'low', 'close', 'vol')
+
+    def __init__(self, dates: np.ndarray, symbols: List[str], fields: Dict[str, np.ndarray],
+                 symbol_ids: np.ndarray = None):
+        """初始化行情面板
+
+        Args:
+            dates: 升序排列的交易日期（datetime64）
+            symbols: 股票代码列表
+            fields: 字段名 -> (日期数, 股票数) 的数组
+            symbol_ids: 股票编号（int32），默认由共享的代码解析器编码 symbols
+        """
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.symbols = list(symbols)
+        self.fields = fields
+        self.symbol_ids = (np.asarray(symbol_ids, dtype=np.int32) if symbol_ids is not None
+                           else get_symbol_resolver().encode(self.symbols))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float64) -> 'KlinePanel':
+        """从长表（每行一只股票一个交易日）构建面板
+
+        Args:
+            df: 包含 ts_code、trade_date 和 OHLCV 列的K线数据
+            dtype: 面板数组类型，float32 可以减少一半内存
+        """
+        if df.empty:
+            return cls(np.array([], dtype='datetime64[ns]'), [], {})
+
+        # 按整数编号而不是代码字符串对齐，不同写法的同一只股票合并为一列
+        resolver = get_symbol_resolver()
+        df = df.assign(symbol_id=resolver.encode(df['ts_code'].astype(str)))
+        unknown = df['symbol_id'] == UNKNOWN_ID
+        if unknown.any():
+            print(f"忽略无法识别的股票代码: {sorted(df.loc[unknown, 'ts_code'].astype(str).unique())}")
+            df = df[~unknown]
+        df['trade_date'] = pd.to_datetime(df['trade_date'].astype(str))
+        df = df.drop_duplicates(['trade_date', 'symbol_id'], keep='last')
+
+        fields = [col for col in cls.FIELDS if col in df.columns]
+        for col in fields:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+        wide = df.set_index(['trade_date', 'symbol_id'])[fields].unstack('symbol_id').sort_index()
+        symbol_ids = wide['close'].columns.to_numpy(dtype=np.int32)
+        return cls(
+            wide.index.to_numpy(),
+            list(resolver.decode(symbol_ids)),
+            {col: wide[col].reindex(columns=symbol_ids).to_numpy(dtype=dtype) for col in fields},
+            symbol_ids
+        )
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    @property
+    def valid(self) -> np.ndarray:
+        """有行情的位置（收盘价有效）"""
+        return np.isfinite(self.fields['close'])
+
+class PanelFeatureEngineer:
+    """面板特征工程类
+
+    一次计算全市场所有股票的特征，特征定义来自特征注册表，与 FeatureEngineer
+    逐只股票计算的结果一致。
+    计算前将每只股票的有效行情按时间顺序移到数组顶部（稳定排序），这样停牌和
+    上市前的空缺不会打断滚动窗口，与逐只股票计算时只包含交易日的效果相同；
+    计算完成后再放回原来的日期位置，无行情的位置为 NaN。
+    """
+
+    def __init__(self, volatility_window: int = 20, fill_value: Optional[float] = 0.0,
+                 registry: FeatureRegistry = None):
+        """初始化面板特征工程
+
+        Args:
+            volatility_window: 波动率特征的窗口
+            fill_value: 有行情位置的缺失特征（如窗口不足）的填充值，None 表示保留 NaN
+            registry: 特征注册表，默认为 FEATURE_REGISTRY
+        """
+        self.volatility_window = volatility_window
+        self.fill_value = fill_value
+        self.registry = registry or FEATURE_REGISTRY
+
+    def default_features(self, include_technical_indicators: bool = True) -> List[str]:
+        """与 DataProcessor.process_kline_data 相同的特征列表"""
+        groups = ['time', 'price', 'volatility'] + (['technical'] if include_technical_indicators else [])
+        return [name for group in groups for name in self.registry.group(group)]
+
+    def compute(self, panel: KlinePanel, include_technical_indicators: bool = True,
+                features: List[str] = None) -> Dict[str, np.ndarray]:
+        """计算面板上所有股票的特征
+
+        Args:
+            panel: 行情面板
+            include_technical_indicators: 未指定 features 时是否计算技术指标
+            features: 只计算这些特征及其依赖
+
+        Returns:
+            特征名 -> (日期数, 股票数) 的数组
+        """
+        if not panel.symbols:
+            return {}
+
+        plan = self.registry.plan(features or self.default_features(include_technical_indicators),
+                                  {'volatility_window': self.volatility_window})
+
+        valid = panel.valid
+        # 稳定排序把每列的有效行按时间顺序移到顶部
+        order = np.argsort(~valid, axis=0, kind='stable')
+        packed = {}
+        for name in plan.inputs:
+            if name == 'trade_date':
+                values = np.broadcast_to(panel.dates[:, None], panel.shape)
+            elif name in panel.fields:
+                values = panel.fields[name]
+            else:
+                raise KeyError(f"行情面板缺少字段: {name}")
+            packed[name] = np.take_along_axis(values, order, axis=0)
+
+        results = {}
+        for name, values in plan.execute(packed).items():
+            dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+            out = np.empty(values.shape, dtype=dtype)
+            np.put_along_axis(out, order, values, axis=0)
+            if self.fill_value is not None:
+                out[np.isnan(out)] = self.fill_value
+            out[~valid] = np.nan
+            results[name] = out
+
+        return results
+
+    def to_frame(self, panel: KlinePanel, features: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """将面板特征转换为长表，只保留有行情的位置，ts_code 为分类列（整数编码）"""
+        rows, cols = np.nonzero(panel.valid)
+        data = {
+            'ts_code': pd.Categorical.from_codes(cols, categories=panel.symbols),
+            'trade_date': panel.dates[rows]
+        }
+        for name, values in panel.fields.items():
+            data[name] = values[rows, cols]
+        for name, values in features.items():
+            data[name] = values[rows, cols]
+
+        return pd.DataFrame(data)
@@ -0,0 +1,119 @@
+"""前缀和索引
+
+每只股票按交易日保存累计K线数 n 和收盘价、收盘价平方、成交量、成交额的累计和
+（数据库 kline_prefix_sum 表，写入K线时增量维护）。任意窗口的均值、标准差、VWAP
+和总成交量都由窗口两端的两次查找相减得到，与窗口长度无关，不需要对序列重新做 rolling。
+"""
+from typing import Any, Dict, Iterable, List, Union
+import numpy as np
+import pandas as pd
+from data_collection.trading_calendar import to_days
+
+# 累计和的列：收盘价、收盘价平方、成交量、成交额
+PREFIX_COLUMNS = ('sum_close', 'sum_close2', 'sum_vol', 'sum_amount')
+
+ROLLING_STATS = ('mean', 'std', 'vwap', 'volume')
+
+# TuShare 日K线成交额单位为千元、成交量单位为手，VWAP（元/股）= 成交额 * 1000 / (成交量 * 100)
+VWAP_SCALE = 10.0
+
+class PrefixSums:
+    """一只股票的前缀和序列"""
+
+    def __init__(self, trade_dates, counts, sums: Dict[str, np.ndarray], vwap_scale: float = VWAP_SCALE):
+        """初始化前缀和序列
+
+        Args:
+            trade_dates: 升序排列的交易日期
+            counts: 截至每个交易日（含）的累计K线数，从该股票的第一根K线起计
+            sums: PREFIX_COLUMNS 中每列截至每个交易日（含）的累计和
+            vwap_scale: 成交额 / 成交量换算为元/股的系数
+        """
+        self.trade_dates = np.asarray(to_days(list(trade_dates)) if len(trade_dates) else [],
+                                      dtype='datetime64[D]')
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.sums = {name: np.asarray(sums[name], dtype=np.float64) for name in PREFIX_COLUMNS}
+        self.vwap_scale = vwap_scale
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], **kwargs) -> 'PrefixSums':
+        """由 kline_prefix_sum 记录（trade_date、n 和累计和列）创建"""
+        return cls([str(record['trade_date']) for record in records],
+                   [record['n'] for record in records],
+                   {name: [record[name] or 0.0 for record in records] for name in PREFIX_COLUMNS}, **kwargs)
+
+    @classmethod
+    def from_bars(cls, bars: Union[List[Dict[str, Any]], pd.DataFrame], **kwargs) -> 'PrefixSums':
+        """由K线直接计算前缀和（累计和从第一根K线起计），用于没有数据库索引的情况"""
+        df = bars if isinstance(bars, pd.DataFrame) else pd.DataFrame(bars)
+        if df.empty:
+            return cls([], [], {name: [] for name in PREFIX_COLUMNS}, **kwargs)
+        df = df.assign(trade_date=df['trade_date'].astype(str)).sort_values('trade_date')
+        values = {col: pd.to_numeric(df[col], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+                  if col in df.columns else np.zeros(len(df)) for col in ('close', 'vol', 'amount')}
+        return cls(df['trade_date'].to_numpy(), np.arange(1, len(df) + 1), {
+            'sum_close': np.cumsum(values['close']),
+            'sum_close2': np.cumsum(values['close'] ** 2),
+            'sum_vol': np.cumsum(values['vol']),
+            'sum_amount': np.cumsum(values['amount'])
+        }, **kwargs)
+
+    def _stats(self, count: np.ndarray, sums: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """由窗口内的K线数和各列之和计算统计量，K线数不足的位置为 NaN"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            count = count.astype(np.float64)
+            mean = sums['sum_close'] / count
+            # 样本标准差（ddof=1），与 pandas rolling().std() 一致；累计和相减的舍入误差可能使方差略小于 0
+            variance = (sums['sum_close2'] - sums['sum_close'] * mean) / (count - 1)
+            std = np.sqrt(np.maximum(variance, 0.0))
+            std[count < 2] = np.nan
+            vwap = np.where(sums['sum_vol'] > 0, sums['sum_amount'] / sums['sum_vol'] * self.vwap_scale, np.nan)
+        return {'mean': mean, 'std': std, 'vwap': vwap, 'volume': sums['sum_vol']}
+
+    def rolling(self, window: int) -> Dict[str, np.ndarray]:
+        """每个交易日截至当天的最近 window 根K线的均值、标准差、VWAP 和总成交量
+
+        序列开头缺少窗口起点之前的累计和、或上市以来不足 window 根K线的位置为 NaN。
+        """
+        if window < 1:
+            raise ValueError(f"窗口长度必须为正整数: {window}")
+        base = np.arange(len(self)) - window
+        # 窗口起点之前的累计和在序列中，或者窗口恰好从第一根K线开始（之前的累计和为 0）
+        valid = (base >= 0) | (self.counts == window)
+        lookup = np.clip(base, 0, None)
+        sums = {name: np.where(base >= 0, values - values[lookup], values) if len(self) else values
+                for name, values in self.sums.items()}
+        stats = self._stats(np.full(len(self), window), sums)
+        for values in stats.values():
+            values[~valid] = np.nan
+        return stats
+
+    def range_stats(self, start, end) -> Dict[str, float]:
+        """[start, end] 区间内K线的统计量（bars 为K线数），只需要两端的两次查找"""
+        start_index = int(np.searchsorted(self.trade_dates, to_days(start), side='left'))
+        end_index = int(np.searchsorted(self.trade_dates, to_days(end), side='right')) - 1
+        if end_index < start_index:
+            return {'bars': 0, **{name: float('nan') for name in ROLLING_STATS}}
+        if start_index == 0 and self.counts[0] != 1:
+            raise ValueError("缺少区间起点之前的累计和")
+
+        def before(values):
+            return values[start_index - 1] if start_index > 0 else 0
+        count = self.counts[end_index] - before(self.counts)
+        sums = {name: np.array([values[end_index] - before(values)]) for name, values in self.sums.items()}
+        stats = self._stats(np.array([count]), sums)
+        return {'bars': int(count), **{name: float(values[0]) for name, values in stats.items()}}
+
+def rolling_frame(prefix: PrefixSums, windows: Iterable[int], stats: Iterable[str] = ROLLING_STATS) -> pd.DataFrame:
+    """多个窗口的统计量，列名为 {统计量}_{窗口}（如 mean_20），按交易日索引"""
+    columns = {}
+    for window in windows:
+        result = prefix.rolling(window)
+        for name in stats:
+            if name not in result:
+                raise ValueError(f"不支持的统计量: {name}")
+            columns[f'{name}_{window}'] = result[name]
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(prefix.trade_dates, name='trade_date'))
@@ -0,0 +1,185 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+import numpy as np
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
+
+class AffineScaler:
+    """已拟合的标准化参数：x' = x * scale + bias（逐列）
+
+    拟合使用 sklearn 的标准化器，保证零方差列、分位数范围等处理与 sklearn 一致；
+    拟合后只保存仿射参数，转换是无状态的数组运算，可以在多个线程间共享。
+    """
+
+    METHODS = {
+        'standard': StandardScaler,
+        'minmax': MinMaxScaler,
+        'robust': RobustScaler
+    }
+
+    def __init__(self, method: str, columns: List[str], scale: np.ndarray, bias: np.ndarray):
+        self.method = method
+        self.columns = list(columns)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.scale.flags.writeable = False
+        self.bias.flags.writeable = False
+
+    @classmethod
+    def fit(cls, values, columns: List[str], method: str = 'standard') -> 'AffineScaler':
+        """拟合标准化参数
+
+        Args:
+            values: (样本数, 列数) 的数组
+            columns: 列名
+            method: standard/minmax/robust
+        """
+        if method not in cls.METHODS:
+            raise ValueError(f"不支持的标准化方法: {method}")
+
+        scaler = cls.METHODS[method]().fit(np.asarray(values, dtype=np.float64))
+        if method == 'minmax':
+            return cls(method, columns, scaler.scale_, scaler.min_)
+
+        center = scaler.mean_ if method == 'standard' else scaler.center_
+        return cls(method, columns, 1.0 / scaler.scale_, -center / scaler.scale_)
+
+    def transform(self, values) -> np.ndarray:
+        """转换数据"""
+        return np.asarray(values, dtype=np.float64) * self.scale + self.bias
+
+    def inverse_transform(self, values) -> np.ndarray:
+        """还原数据"""
+        return (np.asarray(values, dtype=np.float64) - self.bias) / self.scale
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'columns': self.columns,
+            'scale': self.scale.tolist(),
+            'bias': self.bias.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AffineScaler':
+        return cls(data['method'], data['columns'], data['scale'], data['bias'])
+
+class ScalerRegistry:
+    """已拟合标准化器的注册表
+
+    键为 (股票代码, 列集合, 标准化方法, 数据水位)。同一份数据只拟合一次，
+    拟合结果保存在内存（LRU）和磁盘，服务端直接使用已保存的仿射参数转换数据。
+    磁盘上每个 (股票代码, 列集合, 标准化方法) 只保留最近保存的水位，新水位的参数
+    保存后删除被取代的文件，目录大小不随交易日增长。
+    """
+
+    def __init__(self, store_dir: str = None, max_entries: int = 1024):
+        """初始化注册表
+
+        Args:
+            store_dir: 保存目录，如果为 None，从环境变量 SCALER_STORE_DIR 获取，默认 ./scaler_store；
+                       为空字符串时只保存在内存
+            max_entries: 内存中最多保存的标准化器数量
+        """
+        self.store_dir = os.getenv('SCALER_STORE_DIR', './scaler_store') if store_dir is None else store_dir
+        self.max_entries = max_entries
+        self._scalers: 'OrderedDict[Tuple, AffineScaler]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(symbol: str, columns: Sequence[str], method: str, watermark: Any) -> Tuple:
+        return (symbol, tuple(columns), method, str(watermark))
+
+    @staticmethod
+    def _digest(value: Any) -> str:
+        return hashlib.blake2b(json.dumps(value).encode(), digest_size=12).hexdigest()
+
+    def _prefix(self, key: Tuple) -> str:
+        """同一 (股票代码, 列集合, 标准化方法) 各水位共用的文件名前缀"""
+        return os.path.join(self.store_dir, str(key[0]), f'{key[2]}-{self._digest(list(key[1]))}')
+
+    def _path(self, key: Tuple) -> str:
+        return f'{self._prefix(key)}-{self._digest(key[3])}.json'
+
+    def _prune(self, key: Tuple) -> None:
+        """删除同一 (股票代码, 列集合, 标准化方法) 被新水位取代的参数文件"""
+        path = self._path(key)
+        for stale_path in glob.glob(f'{glob.escape(self._prefix(key))}-*.json'):
+            if stale_path != path:
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    # 其他进程已删除
+                    pass
+
+    def _remember(self, key: Tuple, scaler: AffineScaler) -> AffineScaler:
+        with self._lock:
+            scaler = self._scalers.setdefault(key, scaler)
+            self._scalers.move_to_end(key)
+            while len(self._scalers) > self.max_entries:
+                self._scalers.popitem(last=False)
+        return scaler
+
+    def get(self, symbol: str, columns: Sequence[str], method: str, watermark: Any) -> Optional[AffineScaler]:
+        """获取已拟合的标准化器，不存在时返回 None"""
+        key = self.key(symbol, columns, method, watermark)
+        with self._lock:
+            scaler = self._scalers.get(key)
+            if scaler is not None:
+                self._scalers.move_to_end(key)
+                return scaler
+
+        if not self.store_dir:
+            return None
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                scaler = AffineScaler.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取标准化参数失败 {path}: {e}")
+            return None
+        return self._remember(key, scaler)
+
+    def put(self, symbol: str, watermark: Any, scaler: AffineScaler) -> AffineScaler:
+        """保存已拟合的标准化器"""
+        key = self.key(symbol, scaler.columns, scaler.method, watermark)
+        if self.store_dir:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(scaler.to_dict(), f)
+                os.replace(tmp_path, path)
+                self._prune(key)
+            except OSError as e:
+                print(f"保存标准化参数失败 {path}: {e}")
+        return self._remember(key, scaler)
+
+    def fit(self, symbol: str, values, columns: Sequence[str], method: str, watermark: Any) -> AffineScaler:
+        """获取已拟合的标准化器，不存在时拟合并保存"""
+        scaler = self.get(symbol, columns, method, watermark)
+        if scaler is None:
+            scaler = self.put(symbol, watermark, AffineScaler.fit(values, list(columns), method))
+        return scaler
+
+# 进程内共享的标准化器注册表
+_shared_registry: Optional[ScalerRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+def get_scaler_registry() -> ScalerRegistry:
+    """获取进程内共享的标准化器注册表"""
+    global _shared_registry
+
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = ScalerRegistry()
+
+    return _shared_registry
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from typing import List, Any, Iterator, Optional, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+
+class WindowSet:
+    """滑动窗口样本集
+
+    windows 是基础数组上的步长视图，形状为 (窗口数, lookback, 特征数)，不复制数据；
+    index 为每个样本对应的窗口下标（多只股票拼接时跳过跨股票的窗口）。
+    只有取出样本（X、batches、flatten）时才按需复制。
+    """
+
+    def __init__(self, windows: np.ndarray, index: np.ndarray, y: np.ndarray,
+                 end_positions: np.ndarray, symbols: Optional[np.ndarray] = None,
+                 feature_cols: List[str] = None):
+        self.windows = windows
+        self.index = index
+        self.y = y
+        self.end_positions = end_positions
+        self.symbols = symbols
+        self.feature_cols = feature_cols or []
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """(样本数, lookback, 特征数)"""
+        return (len(self.index),) + self.windows.shape[1:]
+
+    def _select(self, index: np.ndarray) -> np.ndarray:
+        # 连续的窗口用切片取出，仍然是视图
+        if len(index) and index[-1] - index[0] == len(index) - 1:
+            return self.windows[index[0]:index[-1] + 1]
+        return self.windows[index]
+
+    @property
+    def X(self) -> np.ndarray:
+        """(样本数, lookback, 特征数) 的样本，单只股票时为只读视图"""
+        return self._select(self.index)
+
+    def flatten(self) -> np.ndarray:
+        """展平为 (样本数, lookback × 特征数) 的二维数组，供树模型等使用"""
+        return self.X.reshape(len(self.index), -1)
+
+    def batches(self, batch_size: int = 4096, flatten: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """按批取出样本，每批只复制该批数据"""
+        for start in range(0, len(self.index), batch_size):
+            X = self._select(self.index[start:start + batch_size])
+            if flatten:
+                X = X.reshape(len(X), -1)
+            yield X, self.y[start:start + batch_size]
+
+class WindowBuilder:
+    """滑动窗口训练样本构建器
+
+    样本 i 的输入为第 i-lookback 到 i-1 行的特征，标签为第 i 行起 horizon 行的目标值，
+    与逐行循环 iloc[i-lookback:i] 的结果相同。
+    """
+
+    def __init__(self, lookback: int = 30, horizon: int = 1, dtype=np.float32):
+        """初始化构建器
+
+        Args:
+            lookback: 每个样本包含的历史K线数量
+            horizon: 标签包含的未来K线数量，为 1 时标签是一维数组
+            dtype: 样本数组类型
+        """
+        if lookback < 1 or horizon < 1:
+            raise ValueError("lookback 和 horizon 必须大于 0")
+        self.lookback = lookback
+        self.horizon = horizon
+        self.dtype = dtype
+
+    def _windows(self, values: np.ndarray) -> np.ndarray:
+        """(行数, 特征数) -> (窗口数, lookback, 特征数) 的视图"""
+        if len(values) < self.lookback:
+            return np.empty((0, self.lookback, values.shape[1]), dtype=values.dtype)
+        windows = sliding_window_view(values, self.lookback, axis=0)
+        return windows.transpose(0, 2, 1)
+
+    def _targets(self, target: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        if self.horizon == 1:
+            return target[ends]
+        if len(target) < self.horizon:
+            return np.empty((0, self.horizon), dtype=target.dtype)
+        return sliding_window_view(target, self.horizon)[ends]
+
+    def build(self, values: np.ndarray, target: np.ndarray, feature_cols: List[str] = None) -> WindowSet:
+        """构建单只股票的样本
+
+        Args:
+            values: (行数, 特征数) 的特征数组，按时间升序
+            target: (行数,) 的目标值
+        """
+        return self.build_many([(None, values, target)], feature_cols)
+
+    def build_many(self, segments: Sequence[Tuple[Any, np.ndarray, np.ndarray]],
+                   feature_cols: List[str] = None) -> WindowSet:
+        """构建多只股票的样本，窗口不会跨越两只股票
+
+        Args:
+            segments: (股票代码, 特征数组, 目标值数组) 列表
+        """
+        if not segments:
+            segments = [(None, np.empty((0, len(feature_cols or []))), np.empty(0))]
+        if len(segments) == 1:
+            _, values, target = segments[0]
+            values = np.asarray(values, dtype=self.dtype)
+            target = np.asarray(target, dtype=self.dtype)
+        else:
+            values = np.concatenate([np.asarray(item[1], dtype=self.dtype) for item in segments])
+            target = np.concatenate([np.asarray(item[2], dtype=self.dtype) for item in segments])
+        if values.ndim == 1:
+            values = values[:, None]
+
+        # 每段的样本终点：[段起点 + lookback, 段终点 - horizon]
+        ends, symbols = [], []
+        offset = 0
+        for symbol, seg_values, _ in segments:
+            length = len(seg_values)
+            seg_ends = np.arange(offset + self.lookback, offset + length - self.horizon + 1)
+            ends.append(seg_ends)
+            symbols.append(np.full(len(seg_ends), symbol, dtype=object))
+            offset += length
+
+        ends = np.concatenate(ends) if ends else np.empty(0, dtype=np.int64)
+        windows = self._windows(values)
+        windows.flags.writeable = False
+        return WindowSet(
+            windows,
+            ends - self.lookback,
+            self._targets(target, ends),
+            ends,
+            np.concatenate(symbols) if segments[0][0] is not None else None,
+            feature_cols
+        )
+
+    def from_frame(self, df: pd.DataFrame, feature_cols: List[str], target: str = 'close',
+                   group_by: str = None) -> WindowSet:
+        """从 DataFrame 构建样本
+
+        Args:
+            df: 按时间升序排列的特征数据；多只股票时按 group_by 分段
+            feature_cols: 特征列
+            target: 目标列
+            group_by: 股票代码列，None 表示单只股票
+        """
+        if group_by is None:
+            return self.build(df[feature_cols].to_numpy(dtype=self.dtype),
+                              df[target].to_numpy(dtype=self.dtype), feature_cols)
+
+        segments = [
+            (symbol, group[feature_cols].to_numpy(dtype=self.dtype), group[target].to_numpy(dtype=self.dtype))
+            for symbol, group in df.groupby(group_by, sort=False)
+        ]
+        return self.build_many(segments, feature_cols)
@@ -0,0 +1,18 @@
+# 从供应商导出的 CSV/Parquet 文件批量导入历史K线或指数数据
+import argparse
+from data_collection.bulk_importer import BulkImporter
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入历史行情数据")
+    parser.add_argument("path", help="数据目录或单个文件（支持 .csv、.csv.gz、.parquet）")
+    parser.add_argument("--table", default="kline_data", choices=["kline_data", "index_data"], help="目标表")
+    parser.add_argument("--freq", default="D", help="文件中没有 freq 列时使用的K线频率")
+    parser.add_argument("--workers", type=int, default=4, help="读取文件的线程数")
+    parser.add_argument("--batch-rows", type=int, default=500000, help="每次合并提交的行数")
+    parser.add_argument("--no-recursive", action="store_true", help="不递归查找子目录")
+    args = parser.parse_args()
+
+    importer = BulkImporter(max_workers=args.workers, batch_rows=args.batch_rows)
+    stats = importer.import_path(args.path, table=args.table, freq=args.freq, recursive=not args.no_recursive)
+    if stats['failed_files'] or stats['rejected_rows']:
+        print("部分数据未导入，请检查上面的日志")
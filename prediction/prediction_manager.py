@@ -3,6 +3,14 @@ import pandas as pd
 from typing import Dict, List, Any, Optional
 from .traditional_models import LinearRegressionModel, RandomForestModel, XGBoostModel, LightGBMModel
 from .model_ensemble import ModelEnsemble
+from data_processing.window_builder import WindowBuilder
+from data_processing.feature_store import FeatureStore
+from data_processing.data_processor import DataProcessor
+from data_processing.data_cleaner import METADATA_COLS
+from data_processing.scaler_registry import ScalerRegistry, get_scaler_registry
+from data_processing.lookback_planner import LookbackPlanner
+from data_collection.trading_calendar import format_days, get_trading_calendar
+from data_collection.symbol_resolver import UNKNOWN_ID, get_symbol_resolver
 
 # Try to import deep learning models, but handle import error
 try:
@@ -15,11 +23,41 @@ except ImportError:
     GRUModel = None
     TransformerModel = None
 
+# 各模型至少需要的训练样本（滑动窗口）数量，约一年的日K线
+MODEL_TRAINING_SAMPLES = {
+    'linear_regression': 120,
+    'random_forest': 240,
+    'xgboost': 240,
+    'lightgbm': 240,
+    'lstm': 240,
+    'gru': 240,
+    'transformer': 240
+}
+
+# predict 中非深度学习模型在收盘价窗口之外使用的特征：只依赖收盘价，多步预测时可按预测价格递推
+PREDICTION_FEATURES = ['returns', 'MA5', 'MA10', 'RSI', 'MOM']
+
+# predict 的组合模型类型使用的基础模型
+MODEL_TYPE_MODELS = {
+    'ensemble': ['xgboost', 'lightgbm', 'random_forest'],
+    'traditional': ['random_forest'],
+    'deep_learning': ['lstm']
+}
+
 class PredictionManager:
     """预测管理器"""
     
-    def __init__(self):
-        """初始化预测管理器"""
+    def __init__(self, feature_store: FeatureStore = None, scaler_registry: ScalerRegistry = None):
+        """初始化预测管理器
+        
+        Args:
+            feature_store: 特征存储，训练和批量预测时复用已计算的特征
+            scaler_registry: 标准化器注册表，同一股票同一数据水位的归一化参数只拟合一次
+        """
+        self.feature_store = feature_store or FeatureStore()
+        self.data_processor = DataProcessor(self.feature_store)
+        self.scaler_registry = scaler_registry or get_scaler_registry()
+        self.lookback_planner = LookbackPlanner()
         self.models = {
             'linear_regression': LinearRegressionModel,
             'random_forest': RandomForestModel,
@@ -138,27 +176,57 @@ class PredictionManager:
     def prepare_data(self, processed_df: pd.DataFrame, target: str = 'close', lookback: int = 30) -> Dict[str, np.ndarray]:
         """准备训练数据"""
         # 选择特征列
-        feature_cols = [col for col in processed_df.columns if pd.api.types.is_numeric_dtype(processed_df[col]) and col != target]
-        
-        # 准备输入和输出数据
-        X = []
-        y = []
+        feature_cols = [col for col in processed_df.columns
+                        if pd.api.types.is_numeric_dtype(processed_df[col]) and col != target and col not in METADATA_COLS]
         
-        for i in range(lookback, len(processed_df)):
-            # 输入特征
-            X.append(processed_df[feature_cols].iloc[i-lookback:i].values.flatten())
-            # 输出标签
-            y.append(processed_df[target].iloc[i])
+        # 用滑动窗口视图构建样本，X 展平为 (样本数, lookback × 特征数)
+        windows = WindowBuilder(lookback).from_frame(processed_df, feature_cols, target)
         
         return {
-            'X': np.array(X),
-            'y': np.array(y),
-            'feature_cols': feature_cols
+            'X': windows.flatten(),
+            'y': windows.y,
+            'feature_cols': feature_cols,
+            'windows': windows
         }
     
+    def prepare_symbol_data(self, symbol: str, kline_data: List[Dict[str, Any]], target: str = 'close',
+                            lookback: int = 30, features: List[str] = None) -> Dict[str, np.ndarray]:
+        """从特征存储读取（只计算新增K线的）特征并准备训练数据"""
+        processed_df = self.data_processor.process_kline_data(kline_data, features=features, symbol=symbol)
+        if processed_df.empty:
+            return {'X': np.empty((0, 0)), 'y': np.empty(0), 'feature_cols': []}
+        
+        return self.prepare_data(processed_df.drop(columns=['trade_date']), target, lookback)
+    
+    def stored_features(self, symbol: str, kline_data: List[Dict[str, Any]], index: pd.DatetimeIndex,
+                        features: List[str] = None) -> np.ndarray:
+        """从特征存储读取特征，按交易日与 index 对齐
+
+        Returns:
+            (len(index), 特征数) 的数组，缺失值为 0
+        """
+        features = features or PREDICTION_FEATURES
+        processed_df = self.data_processor.process_kline_data(kline_data, features=features, symbol=symbol)
+        if processed_df.empty:
+            return np.zeros((len(index), len(features)))
+        
+        stored = processed_df.set_index('trade_date')[features]
+        return stored.reindex(index).fillna(0).to_numpy(dtype=float)
+    
+    def latest_features(self, close_prices: np.ndarray, features: List[str] = None) -> np.ndarray:
+        """按收盘价序列计算最后一根K线的特征，多步预测时用于递推预测出的价格"""
+        features = features or PREDICTION_FEATURES
+        plan = self.feature_store.registry.plan(features)
+        result = plan.execute({'close': np.asarray(close_prices[-plan.min_history:], dtype=float)})
+        return np.nan_to_num(np.array([result[name][-1] for name in features], dtype=float))
+    
+    def required_history(self, model_type: str, look_back: int) -> int:
+        """训练 model_type 并预测至少需要的K线数量：回看长度加训练样本数"""
+        models = MODEL_TYPE_MODELS.get(model_type, [model_type])
+        return look_back + max(MODEL_TRAINING_SAMPLES.get(name, MODEL_TRAINING_SAMPLES['random_forest']) for name in models)
+    
     def predict(self, symbol: str, model_type: str = 'ensemble', days: int = 5) -> Dict[str, Any]:
         """预测股票价格"""
-        from datetime import datetime, timedelta
         import numpy as np
         import pandas as pd
         
@@ -172,16 +240,18 @@ class PredictionManager:
                     full_symbol = f"{symbol}.SZ"
             else:
                 full_symbol = symbol
+            # 已训练模型按 (股票编号, 模型名) 缓存；只读查找，未登记的代码用 ts_code 作键
+            symbol_id = get_symbol_resolver().lookup(full_symbol)
+            if symbol_id == UNKNOWN_ID:
+                symbol_id = full_symbol
             
             from data_collection.data_collector import DataCollector
             data_collector = DataCollector()
             
-            # 获取足够的历史数据用于训练和预测
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')  # 使用过去一年的数据
-            
-            stock_data = data_collector.get_stock_data(symbol, start_date, end_date, freq='D')
-            data = stock_data.get('data', [])
+            # 使用前5天的收盘价预测后1天的收盘价，只获取模型训练和预测需要的K线
+            look_back = 5
+            _, data = self.lookback_planner.fetch(data_collector, full_symbol,
+                                                  bars=self.required_history(model_type, look_back))
             
             if not data:
                 # 如果获取不到数据，返回错误信息
@@ -202,9 +272,6 @@ class PredictionManager:
             df.sort_index(inplace=True)
             
             # 只使用收盘价作为特征，简化预测逻辑
-            # 使用前5天的收盘价预测后1天的收盘价
-            look_back = 5
-            
             # 准备训练数据
             close_prices = df['close'].values
             
@@ -219,32 +286,35 @@ class PredictionManager:
                     'error': '数据量不足，无法进行预测'
                 }
             
-            # 构建训练集
-            X = []
-            y = []
+            # 构建训练集：使用前look_back天的收盘价预测后1天的收盘价
+            windows = WindowBuilder(look_back, dtype=np.float64).build(close_prices, close_prices)
+            X = windows.flatten()
+            y = windows.y
             
-            for i in range(len(close_prices) - look_back):
-                # 使用前look_back天的收盘价预测后1天的收盘价
-                X.append(close_prices[i:i+look_back])
-                # 预测后一天的收盘价
-                y.append(close_prices[i+look_back])
-            
-            X = np.array(X)
-            y = np.array(y)
+            # 非深度学习模型在收盘价窗口之外使用窗口最后一天的特征，特征从特征存储读取，
+            # 同一股票的重复请求只计算新增K线的特征
+            features = self.stored_features(full_symbol, data, df.index)
+            X_model = np.hstack([X, features[look_back - 1:-1]])
             
             # 数据归一化 - 对深度学习模型至关重要
-            from sklearn.preprocessing import MinMaxScaler
-            scaler = MinMaxScaler(feature_range=(0, 1))
-            scaler_y = MinMaxScaler(feature_range=(0, 1))
+            # 归一化参数按 (股票代码, 数据水位) 保存在注册表中，同一交易日的重复请求直接复用；
+            # 数据库维护的数据指纹随历史数据修正而变化，加入水位后修正过的数据不会复用旧的参数
+            watermark = df.index[-1].strftime('%Y%m%d')
+            fingerprint = data_collector.storage.get_fingerprints([full_symbol]).get(full_symbol)
+            if fingerprint:
+                watermark = f"{watermark}:{fingerprint['token']}"
             
             # 对X进行归一化（每个样本是look_back天的价格）
             # 将X重塑为2D数组，每个样本一行，look_back列
             X_2d = X.reshape(-1, look_back)
-            X_scaled = scaler.fit_transform(X_2d)
+            X_columns = [f'close_t-{look_back - k}' for k in range(look_back)]
+            scaler = self.scaler_registry.fit(full_symbol, X_2d, X_columns, 'minmax', watermark)
+            X_scaled = scaler.transform(X_2d)
             
             # 对y进行归一化
             y_2d = y.reshape(-1, 1)
-            y_scaled = scaler_y.fit_transform(y_2d).flatten()
+            scaler_y = self.scaler_registry.fit(full_symbol, y_2d, ['close'], 'minmax', watermark)
+            y_scaled = scaler_y.transform(y_2d).flatten()
             
             # 根据model_type训练不同的模型
             if model_type == 'ensemble':
@@ -252,25 +322,25 @@ class PredictionManager:
                 print(f"训练模型融合...")
                 
                 # 基础模型列表
-                base_models = ['xgboost', 'lightgbm', 'random_forest']
+                base_models = MODEL_TYPE_MODELS['ensemble']
                 model_keys = []
                 
                 # 训练每个基础模型
                 for base_model in base_models:
-                    model_key = f"{symbol}_{base_model}"
+                    model_key = (symbol_id, base_model)
                     model_keys.append(model_key)
                     
                     if model_key not in self.trained_models:
                         print(f"训练基础模型: {base_model}")
                         # 训练基础模型，使用原始数据
                         model = self.create_model(base_model, None)
-                        model.train(X, y)
+                        model.train(X_model, y)
                         self.trained_models[model_key] = model
                 
                 # 创建融合模型
                 from .model_ensemble import ModelEnsemble
                 ensemble = ModelEnsemble([self.trained_models[model_key] for model_key in model_keys])
-                ensemble_model_key = f"{symbol}_ensemble"
+                ensemble_model_key = (symbol_id, 'ensemble')
                 self.trained_models[ensemble_model_key] = ensemble
                 
                 # 使用融合模型进行预测
@@ -280,14 +350,14 @@ class PredictionManager:
             elif model_type == 'traditional':
                 # 传统机器学习模型：使用随机森林模型
                 print(f"使用传统机器学习模型...")
-                traditional_model = 'random_forest'  # 使用随机森林作为传统模型的默认选项，与xgboost区分
-                model_key = f"{symbol}_{traditional_model}"
+                traditional_model = MODEL_TYPE_MODELS['traditional'][0]  # 使用随机森林作为传统模型的默认选项，与xgboost区分
+                model_key = (symbol_id, traditional_model)
                 
                 if model_key not in self.trained_models:
                     print(f"训练传统模型: {traditional_model}")
                     # 训练模型，使用原始数据
                     model = self.create_model(traditional_model, None)
-                    model.train(X, y)
+                    model.train(X_model, y)
                     self.trained_models[model_key] = model
                 
                 # 使用传统模型进行预测
@@ -297,8 +367,8 @@ class PredictionManager:
             elif model_type == 'deep_learning':
                 # 深度学习模型：使用LSTM模型
                 print(f"使用深度学习模型...")
-                deep_model = 'lstm'  # 默认使用LSTM模型
-                model_key = f"{symbol}_{deep_model}"
+                deep_model = MODEL_TYPE_MODELS['deep_learning'][0]  # 默认使用LSTM模型
+                model_key = (symbol_id, deep_model)
                 
                 if model_key not in self.trained_models:
                     print(f"训练深度学习模型: {deep_model}")
@@ -322,13 +392,13 @@ class PredictionManager:
                 use_scaled = True
             else:
                 # 单一模型：直接使用model_type作为模型名称
-                model_key = f"{symbol}_{model_type}"
+                model_key = (symbol_id, model_type)
                 
                 if model_key not in self.trained_models:
                     print(f"训练 {model_type} 模型...")
                     # 训练模型，使用原始数据
                     model = self.create_model(model_type, None)
-                    model.train(X, y)
+                    model.train(X_model, y)
                     self.trained_models[model_key] = model
                 
                 # 使用单一模型进行预测
@@ -339,9 +409,12 @@ class PredictionManager:
             # 获取最新的价格数据作为预测的起点
             latest_prices = close_prices[-look_back:].reshape(1, -1)
             
-            # 进行多步预测
+            # 进行多步预测，预测日期为最后一根K线之后的交易日
             predictions = []
             current_prices = latest_prices.copy()
+            history_prices = close_prices.astype(float)
+            current_features = features[-1:]
+            prediction_dates = format_days(get_trading_calendar().next_trading_days(df.index[-1], days), '-')
             
             for i in range(days):
                 if use_scaled:
@@ -358,21 +431,18 @@ class PredictionManager:
                     # 反归一化预测结果
                     next_price = scaler_y.inverse_transform(np.array([[next_price_scaled]]))[0][0]
                 else:
-                    # 传统模型：直接使用原始数据进行预测
+                    # 传统模型：直接使用原始数据和特征进行预测
                     # 使用模型进行预测
-                    next_price = self.predict_with_model(final_model_key, current_prices)[0]
+                    next_price = self.predict_with_model(final_model_key, np.hstack([current_prices, current_features]))[0]
                 
                 # 计算变化值和变化百分比
                 previous_price = current_prices[0][-1]
                 change = next_price - previous_price
                 change_percent = (change / previous_price) * 100 if previous_price != 0 else 0
                 
-                # 计算预测日期
-                pred_date = (datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d')
-                
                 # 添加到预测结果
                 predictions.append({
-                    'date': pred_date,
+                    'date': prediction_dates[i],
                     'predicted_price': round(float(next_price), 2),
                     'change': round(float(change), 2),
                     'change_percent': round(float(change_percent), 2)
@@ -381,6 +451,8 @@ class PredictionManager:
                 # 更新当前价格序列，用于下一步预测
                 current_prices = np.roll(current_prices, -1, axis=1)
                 current_prices[0][-1] = next_price
+                history_prices = np.append(history_prices, next_price)
+                current_features = self.latest_features(history_prices).reshape(1, -1)
             
             # 计算模型置信度（使用训练数据的R²）
             from sklearn.metrics import r2_score
@@ -397,7 +469,7 @@ class PredictionManager:
                 y_pred_train = scaler_y.inverse_transform(y_pred_train_scaled.reshape(-1, 1)).flatten()
             else:
                 # 传统模型：直接预测训练数据
-                y_pred_train = self.predict_with_model(final_model_key, X)
+                y_pred_train = self.predict_with_model(final_model_key, X_model)
             
             r2 = r2_score(y, y_pred_train)
             confidence = max(0.5, min(r2, 0.99))  # 限制在0.5到0.99之间
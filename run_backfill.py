@@ -0,0 +1,39 @@
+# 全市场K线回填任务，支持中断后从检查点继续
+import argparse
+from data_collection.data_collector import DataCollector
+from data_collection.backfill_job import BackfillJob
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="可断点续传的K线回填任务")
+    parser.add_argument("--start", required=True, help="开始日期，格式：YYYYMMDD")
+    parser.add_argument("--end", required=True, help="结束日期，格式：YYYYMMDD")
+    parser.add_argument("--freq", default="D", help="K线频率")
+    parser.add_argument("--symbols", default=None, help="股票代码列表，用逗号分隔，默认回填全部股票")
+    parser.add_argument("--job-name", default=None, help="任务名称，同名任务共享检查点")
+    parser.add_argument("--workers", type=int, default=4, help="并发线程数")
+    parser.add_argument("--max-attempts", type=int, default=3, help="每只股票的最大尝试次数")
+    parser.add_argument("--retry-delay", type=float, default=30.0, help="失败后重试前的等待秒数")
+    parser.add_argument("--worker-id", default=None, help="执行进程标识，默认为 主机名-进程号")
+    parser.add_argument("--requeue-dead", action="store_true", help="将死信列表中的股票重新加入队列")
+    args = parser.parse_args()
+
+    collector = DataCollector()
+    if args.symbols:
+        symbols = args.symbols.split(',')
+    else:
+        symbols = [stock['ts_code'] for stock in collector.get_stock_list()]
+
+    job = BackfillJob(collector, job_name=args.job_name, max_workers=args.workers,
+                      max_attempts=args.max_attempts, retry_delay=args.retry_delay, worker_id=args.worker_id)
+    job.plan(symbols, args.start, args.end, args.freq)
+
+    if args.requeue_dead:
+        print(f"重新加入队列 {job.requeue_dead_letters()} 只股票")
+
+    job.run()
+
+    dead_letters = job.get_dead_letters()
+    if dead_letters:
+        print(f"死信列表共 {len(dead_letters)} 只股票：")
+        for item in dead_letters:
+            print(f"  {item['ts_code']} 尝试 {item['attempts']} 次，最后错误: {item['last_error']}")
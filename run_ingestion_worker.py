@@ -0,0 +1,38 @@
+# 分片采集工作进程，可在多个进程或机器上同时运行同一命令
+import argparse
+from data_collection.data_collector import DataCollector
+from data_collection.ingestion_coordinator import IngestionCoordinator, IngestionWorker
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基于租约表的分片K线采集")
+    parser.add_argument("--job-name", required=True, help="采集任务名称，所有工作进程使用同一名称")
+    parser.add_argument("--start", help="开始日期，格式：YYYYMMDD（登记分片时需要）")
+    parser.add_argument("--end", help="结束日期，格式：YYYYMMDD（登记分片时需要）")
+    parser.add_argument("--freq", default="D", help="K线频率")
+    parser.add_argument("--symbols", default=None, help="股票代码列表，用逗号分隔，默认为全部股票")
+    parser.add_argument("--shard-size", type=int, default=50, help="每个分片的股票数量")
+    parser.add_argument("--lease-seconds", type=int, default=300, help="租约时长（秒）")
+    parser.add_argument("--heartbeat", type=float, default=60.0, help="心跳续约间隔（秒）")
+    parser.add_argument("--max-attempts", type=int, default=3, help="每个分片的最大尝试次数")
+    parser.add_argument("--retry-delay", type=float, default=30.0, help="分片失败后重试前的等待秒数")
+    args = parser.parse_args()
+
+    collector = DataCollector()
+
+    # 登记分片（幂等，多个进程同时登记不会重复）
+    if args.start and args.end:
+        if args.symbols:
+            symbols = args.symbols.split(',')
+        else:
+            symbols = [stock['ts_code'] for stock in collector.get_stock_list()]
+        coordinator = IngestionCoordinator(collector.storage.db_url)
+        try:
+            coordinator.create_shards(args.job_name, symbols, args.start, args.end, args.freq, args.shard_size)
+        except ValueError as e:
+            print(e)
+            raise SystemExit(1)
+
+    worker = IngestionWorker(args.job_name, collector, lease_seconds=args.lease_seconds,
+                             heartbeat_interval=args.heartbeat, max_attempts=args.max_attempts,
+                             retry_delay=args.retry_delay)
+    worker.run()
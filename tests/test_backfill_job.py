@@ -0,0 +1,131 @@
+import os
+import time
+import unittest
+from types import SimpleNamespace
+import psycopg2
+from data_collection.backfill_job import BackfillJob
+from data_collection.data_collector import (DataCollector, FETCH_EMPTY, FETCH_ERROR, FETCH_QUOTA, FETCH_SAVED,
+                                            is_quota_error)
+
+# 设置后运行依赖 PostgreSQL 的测试（会写入并清理测试任务的检查点）
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+class FakeSource:
+    def __init__(self, result):
+        self.result = result
+
+    def get_kline_data(self, symbol, start_date, end_date, freq='D'):
+        return self.result
+
+class FakeCollector:
+    """按股票代码返回预设结果的收集器"""
+
+    def __init__(self, results, db_url=None):
+        self.storage = SimpleNamespace(db_url=db_url)
+        self.results = results
+        self.calls = []
+
+    def fetch_and_save_kline_status(self, symbol, start_date, end_date, freq='D'):
+        self.calls.append(symbol)
+        status = self.results.get(symbol, FETCH_SAVED)
+        return {'status': status, 'error': None if status in (FETCH_SAVED, FETCH_EMPTY) else status}
+
+class TestFetchStatus(unittest.TestCase):
+    def test_classify_fetch_results(self):
+        """测试区分已保存、区间内没有数据、配额超限和其他错误"""
+        storage = SimpleNamespace(save_kline_data=lambda symbol, data, freq: True)
+        cases = [
+            ({'data': [{'trade_date': '20240102', 'close': 10.0}]}, FETCH_SAVED),
+            ({'data': [], 'columns': []}, FETCH_EMPTY),
+            ({'data': [], 'columns': [], 'error': '抱歉，您每分钟最多访问该接口500次'}, FETCH_QUOTA),
+            ({'data': [], 'columns': [], 'error': 'Connection reset by peer'}, FETCH_ERROR)
+        ]
+        for result, status in cases:
+            collector = DataCollector(FakeSource(result), storage)
+            self.assertEqual(collector.fetch_and_save_kline_status('600000.SH', '20240101', '20240131')['status'],
+                             status)
+        self.assertTrue(is_quota_error('Rate limit exceeded'))
+        self.assertFalse(is_quota_error('权限不足'))
+
+    def test_task_outcomes(self):
+        """测试没有数据视为完成，配额超限退回队列且不计入尝试次数，错误重试直至死信"""
+        collector = FakeCollector({'A': FETCH_EMPTY, 'B': FETCH_QUOTA, 'C': FETCH_ERROR, 'D': FETCH_ERROR})
+        job = BackfillJob(collector, job_name='test', max_attempts=3, quota_delay=0.01)
+        updates = []
+        job._execute = lambda sql, params: updates.append((sql, params)) or 1
+
+        for symbol, attempts in (('A', 1), ('B', 1), ('C', 1), ('D', 3)):
+            job._run_task({'id': symbol, 'ts_code': symbol, 'start_date': '20240101', 'end_date': '20240131',
+                           'freq': 'D', 'attempts': attempts})
+
+        self.assertEqual(updates[0][1][:2], ('done', '区间内没有K线数据'))
+        self.assertIn("status = 'pending', attempts = attempts - 1", updates[1][0])
+        self.assertEqual(updates[2][1][0], 'failed')
+        self.assertEqual(updates[3][1][0], 'dead')
+        # 配额超限后的退避时间加倍
+        self.assertAlmostEqual(job._current_quota_delay, 0.02)
+
+@unittest.skipUnless(TEST_DATABASE_URL, '需要 TEST_DATABASE_URL 指向测试用 PostgreSQL 数据库')
+class TestBackfillJobWithDatabase(unittest.TestCase):
+    JOB_NAME = 'test_backfill_resume'
+
+    def setUp(self):
+        self.tearDown()
+
+    def tearDown(self):
+        conn = psycopg2.connect(TEST_DATABASE_URL)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM backfill_checkpoint WHERE job_name = %s", (self.JOB_NAME,))
+            conn.commit()
+        except psycopg2.Error:
+            # 检查点表尚未创建
+            conn.rollback()
+        finally:
+            conn.close()
+
+    def make_job(self, collector, worker_id):
+        return BackfillJob(collector, job_name=self.JOB_NAME, max_workers=2, max_attempts=2, retry_delay=0,
+                           worker_id=worker_id, heartbeat_interval=0.1, batch_size=2)
+
+    def test_resume_from_checkpoint(self):
+        """测试重启后只执行未完成的股票，失败的股票重试后进入死信，过期的租约被接管"""
+        symbols = ['600000.SH', '600001.SH', '600002.SH', '600003.SH']
+        first = FakeCollector({'600002.SH': FETCH_ERROR}, TEST_DATABASE_URL)
+        job = self.make_job(first, 'worker-1')
+        self.assertEqual(job.plan(symbols, '20240101', '20240131'), 4)
+        self.assertEqual(job.plan(symbols, '20240101', '20240131'), 0)
+
+        summary = job.run(idle_interval=0.1)
+        self.assertEqual(summary, {'done': 3, 'dead': 1})
+        self.assertEqual(first.calls.count('600002.SH'), 2)
+
+        # 模拟另一个进程中途退出：记录停留在 running 且租约已过期
+        job._execute('''
+        UPDATE backfill_checkpoint SET status = 'running', owner = 'crashed', attempts = 1,
+            lease_expires_at = NOW() - INTERVAL '1 second'
+        WHERE job_name = %s AND ts_code = %s
+        ''', (self.JOB_NAME, '600000.SH'))
+        job.requeue_dead_letters()
+
+        second = FakeCollector({}, TEST_DATABASE_URL)
+        summary = self.make_job(second, 'worker-2').run(idle_interval=0.1)
+        self.assertEqual(sorted(second.calls), ['600000.SH', '600002.SH'])
+        self.assertEqual(summary, {'done': 4})
+
+    def test_live_lease_not_stolen(self):
+        """测试其他进程持有未过期租约的记录不会被领取"""
+        job = self.make_job(FakeCollector({}, TEST_DATABASE_URL), 'worker-1')
+        job.plan(['600000.SH'], '20240101', '20240131')
+        job._execute('''
+        UPDATE backfill_checkpoint SET status = 'running', owner = 'other', attempts = 1,
+            lease_expires_at = NOW() + INTERVAL '1 hour'
+        WHERE job_name = %s
+        ''', (self.JOB_NAME,))
+        self.assertEqual(job._claim_tasks(), [])
+        started = time.time()
+        self.assertGreater(job._next_wait(), 60)
+        self.assertLess(time.time() - started, 5)
+
+if __name__ == '__main__':
+    unittest.main()
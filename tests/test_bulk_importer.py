@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+import pandas as pd
+from data_collection.bulk_importer import BulkImporter
+
+class TestBulkImporter(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.importer = BulkImporter(SimpleNamespace(db_url=None))
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_csv(self, name, text):
+        path = os.path.join(self.data_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_read_csv_with_vendor_columns(self):
+        """测试中文列名映射、代码和日期标准化，不合法的行被拒绝"""
+        path = self.write_csv('prices.csv', (
+            '股票代码,交易日期,开盘,最高,最低,收盘,成交量\n'
+            'sh600000,2024-01-02,10.0,10.5,9.8,10.2,1000\n'
+            '000001,2024/01/03,11.0,11.2,10.9,11.1,2000\n'
+            '600000.XSHG,20240104 15:00:00,10.2,10.4,10.1,10.3,1500\n'
+            '00700.HK,2024-01-02,300,310,290,305,100\n'
+            '600000.SH,2024-01-05,10.0,9.0,10.5,10.0,100\n'
+            '600000.SH,bad-date,10.0,10.5,9.8,10.2,100\n'
+        ))
+
+        df, rejected = self.importer.read_file(path)
+        self.assertEqual(rejected, 3)
+        self.assertEqual(list(df.columns), BulkImporter.COLUMNS)
+        self.assertEqual(list(zip(df['ts_code'], df['trade_date'])),
+                         [('600000.SH', '20240102'), ('000001.SZ', '20240103'), ('600000.SH', '20240104')])
+        self.assertEqual(df['vol'].tolist(), [1000.0, 2000.0, 1500.0])
+        self.assertTrue(df['amount'].isna().all())
+        self.assertEqual(set(df['freq']), {'D'})
+
+    def test_index_codes_and_symbol_from_file_name(self):
+        """测试指数代码按指数代码段推断交易所，没有代码列时按文件名推断"""
+        path = self.write_csv('sh000300.csv', 'date,open,high,low,close\n20240102,3400,3420,3390,3410\n')
+        df, rejected = self.importer.read_file(path, is_index=True)
+        self.assertEqual((df['ts_code'].tolist(), rejected), (['000300.SH'], 0))
+
+        path = self.write_csv('index.csv', 'code,date,open,high,low,close\n000001,20240102,1,2,1,2\n')
+        self.assertEqual(self.importer.read_file(path, is_index=True)[0]['ts_code'].tolist(), ['000001.SH'])
+        self.assertEqual(self.importer.read_file(path)[0]['ts_code'].tolist(), ['000001.SZ'])
+
+    def test_parquet_integer_codes_keep_leading_zeros(self):
+        """测试 Parquet 中整数类型的代码列补齐前导零"""
+        path = os.path.join(self.data_dir, 'prices.parquet')
+        pd.DataFrame({
+            'symbol': [1, 600000],
+            'trade_date': ['20240102', '20240102'],
+            'open': [10.0, 20.0], 'high': [10.5, 20.5], 'low': [9.5, 19.5], 'close': [10.2, 20.2]
+        }).to_parquet(path)
+
+        df, rejected = self.importer.read_file(path)
+        self.assertEqual((df['ts_code'].tolist(), rejected), (['000001.SZ', '600000.SH'], 0))
+
+    def test_missing_required_columns(self):
+        """测试缺少必需的列时报错，文件查找只返回支持的格式"""
+        path = self.write_csv('600000.SH.csv', 'trade_date,close\n20240102,10.0\n')
+        self.write_csv('notes.txt', 'ignored')
+        with self.assertRaises(ValueError):
+            self.importer.read_file(path)
+        self.assertEqual(self.importer.find_files(self.data_dir), [path])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+from data_collection.cold_storage import ColdStorage, merge_hot_cold
+
+# 设置后运行依赖 PostgreSQL 的测试（会写入并清理测试股票的数据）
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+def bar(ts_code, trade_date, close):
+    return (ts_code, trade_date, close, close + 1, close - 1, close, close, 0.0, 0.0, 1000.0, 10000.0, 'D')
+
+class TestColdStorage(unittest.TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.cold = ColdStorage(self.archive_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+
+    def test_archive_and_read(self):
+        """测试归档后按股票和日期范围读取，补录已归档年份时合并分区"""
+        self.cold.write_partition('kline_data', 'D', 2020, [[bar('600000.SH', '20200102', 10.0),
+                                                             bar('600000.SH', '20200103', 11.0),
+                                                             bar('000001.SZ', '20200102', 20.0)]])
+        self.cold.write_partition('kline_data', 'D', 2020, [[bar('600000.SH', '20200103', 12.0)]])
+
+        rows = self.cold.read('kline_data', '600000.SH', '20200101', '20201231', 'D')
+        self.assertEqual([(row['trade_date'], row['close']) for row in rows], [('20200102', 10.0), ('20200103', 12.0)])
+        universe = self.cold.read_universe('kline_data', None, '20200101', '20200102', 'D')
+        self.assertEqual(sorted(row['ts_code'] for row in universe), ['000001.SZ', '600000.SH'])
+
+    def test_hot_rows_win_over_cold(self):
+        """测试热数据与冷数据合并时同一交易日以热数据为准"""
+        cold = [{'ts_code': '600000.SH', 'trade_date': '20200102', 'close': 10.0},
+                {'ts_code': '600000.SH', 'trade_date': '20200103', 'close': 11.0}]
+        hot = [{'ts_code': '600000.SH', 'trade_date': '20200103', 'close': 11.5},
+               {'ts_code': '600000.SH', 'trade_date': '20200106', 'close': 12.0}]
+        merged = merge_hot_cold(hot, cold)
+        self.assertEqual([(row['trade_date'], row['close']) for row in merged],
+                         [('20200102', 10.0), ('20200103', 11.5), ('20200106', 12.0)])
+        self.assertEqual(len(merge_hot_cold(hot, cold, ('ts_code', 'trade_date'))), 3)
+
+    def test_delete_symbol(self):
+        """测试从所有分区删除一只股票，删空的分区文件被移除"""
+        self.cold.write_partition('kline_data', 'D', 2019, [[bar('600000.SH', '20191231', 9.0)]])
+        self.cold.write_partition('kline_data', 'D', 2020, [[bar('600000.SH', '20200102', 10.0),
+                                                             bar('000001.SZ', '20200102', 20.0)]])
+
+        self.assertEqual(self.cold.delete_symbol('kline_data', '600000.SH'), 2)
+        self.assertEqual(self.cold.read('kline_data', '600000.SH', '20190101', '20201231', 'D'), [])
+        self.assertEqual(len(self.cold.read('kline_data', '000001.SZ', '20200101', '20201231', 'D')), 1)
+        self.assertEqual(self.cold.archived_years('kline_data', 'D'), [2020])
+        self.assertEqual(self.cold.delete_symbol('kline_data', '600000.SH'), 0)
+
+@unittest.skipUnless(TEST_DATABASE_URL, '需要 TEST_DATABASE_URL 指向测试用 PostgreSQL 数据库')
+class TestColdStorageWithDatabase(unittest.TestCase):
+    TS_CODE = '688999.SH'
+
+    def setUp(self):
+        from data_collection.data_storage import DataStorage
+        self.archive_dir = tempfile.mkdtemp()
+        self.storage = DataStorage(TEST_DATABASE_URL, ColdStorage(self.archive_dir), cache_ttl=0)
+        self.storage.delete_stock(self.TS_CODE)
+
+    def tearDown(self):
+        self.storage.delete_stock(self.TS_CODE)
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+
+    def test_archive_read_merge_and_delete(self):
+        """测试归档后读取合并冷热数据、热数据优先，删除股票后冷数据不再出现"""
+        bars = [{'trade_date': '20000103', 'close': 10.0}, {'trade_date': '20000104', 'close': 11.0}]
+        self.assertTrue(self.storage.save_kline_data(self.TS_CODE, bars, 'D'))
+        self.storage.archive_closed_years('kline_data', before_year=2001, vacuum=False)
+        self.assertEqual(len(self.storage.get_kline_data(self.TS_CODE, '20000101', '20001231', 'D')), 2)
+
+        # 修正已归档年份的数据：读取时以热数据为准
+        self.assertTrue(self.storage.save_kline_data(self.TS_CODE, [{'trade_date': '20000104', 'close': 12.0}], 'D'))
+        rows = self.storage.get_kline_data(self.TS_CODE, '20000101', '20001231', 'D')
+        self.assertEqual([row['close'] for row in rows], [10.0, 12.0])
+
+        self.assertTrue(self.storage.delete_stock(self.TS_CODE))
+        self.assertEqual(self.storage.get_kline_data(self.TS_CODE, '20000101', '20001231', 'D'), [])
+        self.assertEqual(self.storage.get_kline_universe([self.TS_CODE], '20000101', '20001231'), [])
+
+if __name__ == '__main__':
+    unittest.main()
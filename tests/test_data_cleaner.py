@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing.data_cleaner import DataCleaner
+
+class TestDataCleaner(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        n = 3000
+        # 持续上涨的股票，加一个错误报价
+        close = 10 * np.exp(np.cumsum(rng.normal(0.002, 0.01, n)))
+        close[500] *= 3
+        self.df = pd.DataFrame({
+            'ts_code': '600000.SH',
+            'trade_time': pd.date_range('2020-01-02 09:30', periods=n, freq='min'),
+            'open': close, 'high': close * 1.005, 'low': close * 0.995, 'close': close,
+            'vol': rng.uniform(1e3, 1e4, n)
+        })
+        # 开头 700 行没有成交量，停牌期间缺少价格
+        self.df.loc[:699, 'vol'] = np.nan
+        self.df.loc[1200:1210, 'close'] = np.nan
+        self.cleaner = DataCleaner()
+
+    def test_chunked_matches_full_pass(self):
+        """测试分块清洗与一次性清洗的结果相同（包括跨块的前向填充和开头的回填）"""
+        full = list(self.cleaner.clean_kline_chunks([self.df], time_col='trade_time'))[0]
+        chunks = [self.df.iloc[i:i + 250] for i in range(0, len(self.df), 250)]
+        chunked = pd.concat(list(self.cleaner.clean_kline_chunks(chunks, time_col='trade_time')))
+
+        self.assertEqual(len(chunked), len(self.df))
+        for col in ['close', 'vol', 'is_outlier']:
+            np.testing.assert_array_equal(chunked[col].to_numpy(), full[col].to_numpy(), err_msg=col)
+        self.assertFalse(full['vol'].isna().any())
+        self.assertEqual(full.loc[1205, 'close'], full.loc[1199, 'close'])
+
+    def test_outliers_flagged_not_dropped(self):
+        """测试异常报价被标记而不是删除，趋势行情不被误判"""
+        result = list(self.cleaner.clean_kline_chunks([self.df], time_col='trade_time'))[0]
+        self.assertEqual(len(result), len(self.df))
+        self.assertTrue(result.loc[500, 'is_outlier'])
+        self.assertLess(result['is_outlier'].sum(), 5)
+        # 异常K线的价格用前一根正常K线的价格代替
+        self.assertEqual(result.loc[500, 'close'], result.loc[499, 'close'])
+        self.assertEqual(result.loc[500, 'high'], result.loc[499, 'high'])
+
+    def test_outlier_flag_not_a_feature(self):
+        """测试 is_outlier 不作为特征参与训练数据和标准化"""
+        from data_processing.data_processor import DataProcessor
+        daily = self.df.iloc[:400].rename(columns={'trade_time': 'trade_date'})
+        daily['trade_date'] = pd.bdate_range('2020-01-02', periods=len(daily))
+        processor = DataProcessor(engine='pandas')
+
+        training = processor.prepare_training_data(daily.to_dict('records'), lookback=10)
+        self.assertNotIn('is_outlier', training['feature_cols'])
+        self.assertEqual(training['X'].shape[1], 10 * len(training['feature_cols']))
+
+        standardized = processor.standardize_features(training['data'])
+        self.assertEqual(standardized['is_outlier'].dtype, bool)
+
+if __name__ == '__main__':
+    unittest.main()
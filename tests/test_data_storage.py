@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from data_collection.data_collector import DataCollector, FETCH_SAVED
+
+# 设置后运行依赖 PostgreSQL 的测试（会写入并清理测试股票的数据）
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+class FakeSource:
+    def get_kline_data(self, symbol, start_date, end_date, freq='D'):
+        return {'data': [{'trade_date': '20240102', 'close': 10.0}], 'columns': ['trade_date', 'close']}
+
+class TestWritePathNormalization(unittest.TestCase):
+    def test_fetch_and_save_normalizes_code(self):
+        """测试采集时按规范化的代码保存"""
+        saved = []
+        storage = SimpleNamespace(save_kline_data=lambda symbol, data, freq: saved.append(symbol) or True)
+        collector = DataCollector(FakeSource(), storage)
+        for symbol in ('600000', 'sh600000', '600000.XSHG'):
+            self.assertEqual(collector.fetch_and_save_kline_status(symbol, '20240101', '20240131')['status'],
+                             FETCH_SAVED)
+        self.assertEqual(saved, ['600000.SH'] * 3)
+
+@unittest.skipUnless(TEST_DATABASE_URL, '需要 TEST_DATABASE_URL 指向测试用 PostgreSQL 数据库')
+class TestDataStorageWithDatabase(unittest.TestCase):
+    TS_CODE = '688998.SH'
+
+    def setUp(self):
+        from data_collection.cold_storage import ColdStorage
+        from data_collection.data_storage import DataStorage
+        self.archive_dir = tempfile.mkdtemp()
+        self.storage = DataStorage(TEST_DATABASE_URL, ColdStorage(self.archive_dir), cache_ttl=0)
+        self.storage.delete_stock(self.TS_CODE)
+
+    def tearDown(self):
+        self.storage.delete_stock(self.TS_CODE)
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+
+    def token(self):
+        fingerprint = self.storage.get_fingerprints([self.TS_CODE]).get(self.TS_CODE)
+        return fingerprint['token'] if fingerprint else None
+
+    def test_save_bare_code_then_read(self):
+        """测试用不带交易所的代码保存后，任意写法都能读到同一份数据"""
+        bars = [{'trade_date': '20240102', 'open': 10.0, 'high': 10.5, 'low': 9.8, 'close': 10.2}]
+        self.assertTrue(self.storage.save_kline_data('688998', bars, 'D'))
+
+        for symbol in (self.TS_CODE, '688998', 'sh688998'):
+            rows = self.storage.get_kline_data(symbol, '20240101', '20240131', 'D')
+            self.assertEqual([row['close'] for row in rows], [10.2], symbol)
+        self.assertEqual(len(self.storage.get_prefix_sums('688998', '20240101', '20240131')), 1)
+
+    def test_fingerprint_tracks_changes_not_archiving(self):
+        """测试数据指纹随写入、修正和删除变化，归档到冷存储前后保持不变"""
+        bars = [{'trade_date': '20000103', 'close': 10.0}, {'trade_date': '20000104', 'close': 11.0}]
+        self.assertTrue(self.storage.save_kline_data(self.TS_CODE, bars, 'D'))
+        saved = self.token()
+        self.assertIsNotNone(saved)
+
+        self.assertTrue(self.storage.save_kline_data(self.TS_CODE, [{'trade_date': '20000104', 'close': 12.0}], 'D'))
+        corrected = self.token()
+        self.assertNotEqual(corrected, saved)
+
+        self.storage.archive_closed_years('kline_data', before_year=2001, vacuum=False)
+        self.assertEqual(self.token(), corrected)
+
+        self.assertTrue(self.storage.save_kline_data(self.TS_CODE, [{'trade_date': '20240102', 'close': 13.0}], 'D'))
+        appended = self.token()
+        self.assertNotEqual(appended, corrected)
+
+        self.assertTrue(self.storage.delete_stock(self.TS_CODE))
+        self.assertIsNone(self.token())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing.feature_importance import FeatureImportance
+
+class TestFeatureImportance(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.df = pd.DataFrame(rng.normal(size=(300, 6)), columns=[f'f{i}' for i in range(6)])
+        self.df['close'] = self.df['f0'] * 2 - self.df['f1'] + rng.normal(size=300)
+        self.df.iloc[::7, 2] = np.nan
+        self.columns = [f'f{i}' for i in range(6)]
+
+    def test_correlation_matches_pandas(self):
+        """测试批量相关系数与逐列 Series.corr 一致（包括缺失值）"""
+        importance = FeatureImportance(max_workers=2)
+        for method in ('pearson', 'spearman'):
+            result = importance.compute(self.df, 'close', method)
+            for col in self.columns:
+                expected = abs(self.df[col].corr(self.df['close'], method=method))
+                self.assertAlmostEqual(result[col], expected, places=12)
+            self.assertEqual(list(result)[:2], ['f0', 'f1'])
+
+    def test_cache_by_fingerprint(self):
+        """测试同一份数据的结果被缓存，数据变化后重新计算"""
+        importance = FeatureImportance(max_workers=2)
+        first = importance.compute(self.df, 'close', 'mutual_info')
+        self.assertEqual(list(first)[0], 'f0')
+        self.assertEqual(len(importance._cache), 1)
+
+        importance.compute(self.df, 'close', 'mutual_info')
+        self.assertEqual(len(importance._cache), 1)
+
+        changed = self.df.copy()
+        changed.loc[0, 'f0'] += 1
+        importance.compute(changed, 'close', 'mutual_info')
+        self.assertEqual(len(importance._cache), 2)
+
+if __name__ == '__main__':
+    unittest.main()
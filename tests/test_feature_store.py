@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing.feature_store import FeatureStore
+
+class TestFeatureStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        close = 20 + np.cumsum(rng.normal(0, 0.3, 300))
+        self.df = pd.DataFrame({
+            'trade_date': pd.bdate_range('2023-01-02', periods=300),
+            'high': close + 0.3, 'low': close - 0.3, 'close': close
+        })
+        self.features = ['MA20', 'ATR', 'volatility']
+        self.store = FeatureStore(self.make_dir())
+
+    def make_dir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        return path
+
+    def test_incremental_update(self):
+        """测试增量更新只追加新行，结果与全量计算一致"""
+        self.store.update('600000.SH', self.df.iloc[:200], self.features)
+        result = self.store.update('600000.SH', self.df, self.features)
+
+        full = FeatureStore(self.make_dir()).update('600000.SH', self.df, self.features)
+        for name in self.features:
+            np.testing.assert_allclose(result[name], full[name], rtol=1e-6, equal_nan=True)
+        self.assertIsInstance(result['MA20'], np.memmap)
+
+        path = self.store.path('600000.SH', self.features)
+        self.assertEqual(os.path.getsize(os.path.join(path, 'MA20.bin')), 300 * 4)
+
+    def test_sliding_window_aligns_by_date(self):
+        """测试固定长度的窗口向前滑动或变短时按交易日对齐，不重建也不重复存储"""
+        self.store.update('600000.SH', self.df.iloc[:250], self.features)
+        path = self.store.path('600000.SH', self.features)
+        created = os.stat(os.path.join(path, 'MA20.bin')).st_ino
+
+        sliding = self.df.iloc[10:260].reset_index(drop=True)
+        result = self.store.update('600000.SH', sliding, self.features)
+        full = FeatureStore(self.make_dir()).update('600000.SH', self.df.iloc[:260], self.features)
+        np.testing.assert_array_equal(result['trade_date'], sliding['trade_date'].to_numpy().astype('datetime64[D]'))
+        np.testing.assert_allclose(result['MA20'], full['MA20'][10:], rtol=1e-6, equal_nan=True)
+
+        shorter = self.store.update('600000.SH', self.df.iloc[100:200].reset_index(drop=True), self.features)
+        np.testing.assert_allclose(shorter['ATR'], full['ATR'][100:200], rtol=1e-6, equal_nan=True)
+
+        self.assertEqual(os.stat(os.path.join(path, 'MA20.bin')).st_ino, created)
+        self.assertEqual(os.path.getsize(os.path.join(path, 'MA20.bin')), 260 * 4)
+
+    def test_rebuild_when_history_changes(self):
+        """测试历史数据被修正后重建"""
+        self.store.update('600000.SH', self.df, self.features)
+        changed = self.df.copy()
+        changed.loc[10, 'close'] += 1
+        result = self.store.update('600000.SH', changed, self.features)
+        self.assertAlmostEqual(float(result['MA20'][29]), changed['close'].iloc[10:30].mean(), places=4)
+
+    def test_prune_old_store_versions(self):
+        """测试创建新的特征集目录时删除旧存储版本的目录，保留当前版本的其他特征集"""
+        stale = os.path.join(self.store.store_dir, '600000.SH', 'old-version')
+        os.makedirs(stale)
+        with open(os.path.join(stale, 'meta.json'), 'w') as f:
+            f.write('{"rows": 0, "features": []}')
+
+        self.store.update('600000.SH', self.df, ['MA5'])
+        self.store.update('600000.SH', self.df, self.features)
+        self.assertFalse(os.path.exists(stale))
+        self.assertIsNotNone(self.store.load('600000.SH', ['MA5']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import unittest
+import numpy as np
+import pandas as pd
+from analysis import indicators, kernels
+from analysis.indicator_cache import IndicatorCache
+from analysis.streaming_indicators import StreamingIndicator, StreamingIndicatorSet, RealtimeIndicatorEngine, RSI
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        n = 500
+        close = 100 + np.cumsum(rng.normal(0, 1, n))
+        self.df = pd.DataFrame({
+            'close': close,
+            'high': close + rng.uniform(0, 2, n),
+            'low': close - rng.uniform(0, 2, n)
+        })
+        # 插入缺失值，检查与 pandas 的缺失值处理一致
+        self.df.loc[[100, 101, 300], ['close', 'high', 'low']] = np.nan
+
+    def assertSeriesClose(self, actual, expected):
+        np.testing.assert_allclose(actual, expected.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    def test_rolling_kernels(self):
+        """测试滚动均值、标准差、最大最小值"""
+        close = self.df['close']
+        self.assertSeriesClose(indicators.sma(close.to_numpy(), 20), close.rolling(20).mean())
+        self.assertSeriesClose(indicators.rolling_std(close.to_numpy(), 20), close.rolling(20).std())
+        self.assertSeriesClose(indicators.rolling_max(close.to_numpy(), 9), close.rolling(9).max())
+        self.assertSeriesClose(indicators.rolling_min(close.to_numpy(), 9), close.rolling(9).min())
+        self.assertSeriesClose(indicators.rolling_median_mad(close.to_numpy(), 21)[0], close.rolling(21).median())
+        sparse = close.where(np.arange(len(close)) % 5 != 0)
+        expected = sparse.rolling(21, min_periods=11).median()
+        expected.iloc[:20] = np.nan
+        self.assertSeriesClose(indicators.rolling_median_mad(sparse.to_numpy(), 21, 11)[0], expected)
+
+        returns = close.pct_change(fill_method=None)
+        np.testing.assert_allclose(indicators.rolling_skew(returns.to_numpy(), 20), returns.rolling(20).skew(),
+                                   rtol=1e-6, atol=1e-8, equal_nan=True)
+        np.testing.assert_allclose(indicators.rolling_kurt(returns.to_numpy(), 20), returns.rolling(20).kurt(),
+                                   rtol=1e-6, atol=1e-8, equal_nan=True)
+
+    def test_ema_and_macd(self):
+        """测试 EMA 和 MACD"""
+        close = self.df['close']
+        self.assertSeriesClose(indicators.ema(close.to_numpy(), span=12), close.ewm(span=12, adjust=False).mean())
+
+        macd_line, signal_line, hist = indicators.macd(close.to_numpy())
+        expected = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        self.assertSeriesClose(macd_line, expected)
+        self.assertSeriesClose(signal_line, expected.ewm(span=9, adjust=False).mean())
+
+    def test_kdj_and_rsi(self):
+        """测试 KDJ 和 RSI"""
+        df = self.df
+        rsv, k, d, j = indicators.kdj(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+        low_min = df['low'].rolling(9).min()
+        high_max = df['high'].rolling(9).max()
+        expected_rsv = (df['close'] - low_min) / (high_max - low_min) * 100
+        expected_k = expected_rsv.ewm(alpha=1/3, adjust=False).mean()
+        self.assertSeriesClose(rsv, expected_rsv)
+        self.assertSeriesClose(k, expected_k)
+        self.assertSeriesClose(d, expected_k.ewm(alpha=1/3, adjust=False).mean())
+
+        delta = df['close'].diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        self.assertSeriesClose(indicators.rsi(df['close'].to_numpy()), 100 - 100 / (1 + gain / loss))
+
+    def test_atr(self):
+        """测试真实波幅使用前一日收盘价"""
+        df = self.df
+        prev_close = df['close'].shift(1)
+        expected = pd.concat([df['high'] - df['low'], (df['high'] - prev_close).abs(),
+                              (df['low'] - prev_close).abs()], axis=1).max(axis=1, skipna=True)
+        expected[df['high'].isna() | df['low'].isna()] = np.nan
+        result = indicators.atr(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+        self.assertSeriesClose(result, expected.rolling(14).mean())
+
+    def test_panel_input(self):
+        """测试二维输入按列计算，并保留 float32 类型"""
+        panel = np.column_stack([self.df['close'].to_numpy(), self.df['high'].to_numpy()]).astype(np.float32)
+        result = indicators.sma(panel, 5)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertEqual(result.shape, panel.shape)
+        np.testing.assert_allclose(result[:, 1], indicators.sma(panel[:, 1], 5), equal_nan=True)
+
+    def test_crossover(self):
+        """测试交叉信号"""
+        fast = np.array([1.0, 2.0, 3.0, 2.0, np.nan, 3.0])
+        slow = np.array([2.0, 2.0, 2.0, 2.5, 2.0, 2.0])
+        self.assertEqual(indicators.crossover(fast, slow).tolist(), [0, 0, 1, -1, 0, 0])
+
+    def test_indicator_cache(self):
+        """测试指标帧缓存复用计算结果并返回只读视图"""
+        cache = IndicatorCache()
+        df = self.df.assign(trade_date=range(len(self.df)))
+        frame = cache.frame(df, ts_code='600000.SH')
+
+        ma20 = frame.get('sma', window=20)
+        self.assertIs(cache.frame(df.copy(), ts_code='600000.SH'), frame)
+        self.assertIs(frame.get('sma', window=20), ma20)
+        self.assertFalse(ma20.flags.writeable)
+        with self.assertRaises(ValueError):
+            ma20[0] = 1.0
+
+        # 数据被修正后不会命中旧的指标帧
+        changed = df.copy()
+        changed.loc[len(changed) - 1, 'close'] += 1
+        self.assertIsNot(cache.frame(changed, ts_code='600000.SH'), frame)
+
+        self.assertEqual(cache.invalidate(ts_code='600000.SH'), 2)
+
+    def test_streaming_indicators(self):
+        """测试增量指标与批量计算一致，快照恢复后继续计算结果不变"""
+        df = self.df.assign(vol=np.arange(len(self.df), dtype=float),
+                            trade_date=[str(20200101 + i) for i in range(len(self.df))])
+        indicator_set = StreamingIndicatorSet()
+        rows = []
+        for i, bar in enumerate(df.to_dict('records')):
+            # 未提交的计算不改变状态
+            indicator_set.update(dict(bar, close=bar['close'] * 1.1), commit=False)
+            rows.append(indicator_set.update(bar))
+            if i == 250:
+                indicator_set = StreamingIndicator.restore(indicator_set.snapshot())
+        result = pd.DataFrame(rows)
+
+        close, high, low = df['close'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy()
+        np.testing.assert_allclose(result['ma20'], indicators.sma(close, 20), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(result['macd_hist'], indicators.macd(close)[2], rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(result['rsi'], indicators.rsi(close), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(result['j'], indicators.kdj(high, low, close)[3], rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(result['bb_upper'], indicators.bollinger_bands(close)[2], rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(result['atr'], indicators.atr(high, low, close), rtol=1e-9, equal_nan=True)
+
+        # 盘中报价只更新未完成的K线，交易日切换时写入上一交易日
+        engine = RealtimeIndicatorEngine(lambda ts_code: df.iloc[:-2].to_dict('records'))
+        last_two = df.iloc[-2:].to_dict('records')
+        engine.on_quote('600000.SH', dict(last_two[0], close=last_two[0]['close'] + 1))
+        engine.on_quote('600000.SH', last_two[0])
+        values = engine.on_quote('600000.SH', last_two[1])
+        self.assertAlmostEqual(values['ma20'], result['ma20'].iloc[-1])
+        self.assertEqual(engine.snapshot()['pending']['600000.SH']['trade_date'], last_two[1]['trade_date'])
+
+        # 历史数据加载失败时不缓存未预热的指标，下次使用时重新加载
+        calls = []
+
+        def flaky_loader(ts_code):
+            calls.append(ts_code)
+            if len(calls) == 1:
+                raise RuntimeError('配额超限')
+            return df.iloc[:-2].to_dict('records')
+        engine = RealtimeIndicatorEngine(flaky_loader)
+        engine.on_quote('600000.SH', last_two[0])
+        self.assertNotIn('600000.SH', engine.snapshot()['sets'])
+        engine.on_quote('600000.SH', last_two[0])
+        values = engine.on_quote('600000.SH', last_two[1])
+        self.assertEqual(len(calls), 2)
+        self.assertAlmostEqual(values['ma20'], result['ma20'].iloc[-1])
+
+    def test_recursive_kernels(self):
+        """测试递推内核：Wilder RSI 与逐笔计算一致，持仓模拟与逐根K线循环一致"""
+        close = self.df['close'].ffill().to_numpy()
+        model = RSI(14, 'wilder')
+        np.testing.assert_allclose(indicators.rsi(close, 14, 'wilder'), [model.update(c) for c in close],
+                                   rtol=1e-9, equal_nan=True)
+
+        gappy = self.df['close'].to_numpy()
+        self.assertSeriesClose(indicators.ema(gappy, alpha=0.1), self.df['close'].ewm(alpha=0.1, adjust=False).mean())
+
+        signals = np.random.default_rng(0).choice([-1, 0, 0, 1], len(close))
+        positions, capitals, orders = kernels.simulate_long_only(close, signals, 100000)
+        position, cash = 0, 100000
+        for i, signal in enumerate(signals):
+            self.assertEqual((positions[i], capitals[i]), (position, cash))
+            if signal == 1 and position == 0:
+                position = cash // close[i]
+                cash -= position * close[i]
+            elif signal == -1 and position > 0:
+                cash += position * close[i]
+                position = 0
+        self.assertEqual(orders['capital'][-1], cash)
+
+        with self.assertRaises(ValueError):
+            kernels.set_backend('gpu')
+
+if __name__ == '__main__':
+    unittest.main()
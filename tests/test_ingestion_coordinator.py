@@ -0,0 +1,137 @@
+import json
+import os
+import unittest
+from types import SimpleNamespace
+import psycopg2
+from data_collection.data_collector import FETCH_EMPTY, FETCH_ERROR, FETCH_QUOTA, FETCH_SAVED
+from data_collection.ingestion_coordinator import IngestionCoordinator, IngestionWorker
+
+# 设置后运行依赖 PostgreSQL 的测试（会写入并清理测试任务的分片）
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+class FakeCollector:
+    """按股票代码返回预设结果的收集器"""
+
+    def __init__(self, results, db_url=None):
+        self.storage = SimpleNamespace(db_url=db_url)
+        self.results = results
+        self.calls = []
+
+    def fetch_and_save_kline_status(self, symbol, start_date, end_date, freq='D'):
+        self.calls.append(symbol)
+        status = self.results.get(symbol, FETCH_SAVED)
+        return {'status': status, 'error': None if status in (FETCH_SAVED, FETCH_EMPTY) else status}
+
+def make_shard(symbols, attempts=1):
+    return {'id': 1, 'shard_index': 0, 'symbols': symbols, 'start_date': '20240101', 'end_date': '20240131',
+            'freq': 'D', 'attempts': attempts}
+
+class TestIngestionWorker(unittest.TestCase):
+    def make_worker(self, collector, **kwargs):
+        worker = IngestionWorker('test', collector, worker_id='worker-1', heartbeat_interval=60, **kwargs)
+        worker.updates = []
+        worker._update_shard = lambda sql, params: worker.updates.append((sql, params)) or True
+        return worker
+
+    def test_empty_is_done_and_errors_retry(self):
+        """测试区间内没有数据的股票视为完成，出错的股票在重试时单独处理"""
+        collector = FakeCollector({'A': FETCH_EMPTY, 'B': FETCH_ERROR})
+        worker = self.make_worker(collector, max_attempts=2, retry_delay=5)
+
+        result = worker.process_shard(make_shard(['A', 'B', 'C']))
+        self.assertEqual(result, {'failed': ['B'], 'deferred': []})
+        worker.complete_shard(make_shard(['A', 'B', 'C']), result)
+        self.assertEqual(worker.updates[-1][1][:2], ('failed', json.dumps(['B'])))
+        self.assertEqual(worker.updates[-1][1][4], 5)
+
+        worker.complete_shard(make_shard(['B'], attempts=2), worker.process_shard(make_shard(['B'], attempts=2)))
+        self.assertEqual(worker.updates[-1][1][0], 'dead')
+
+        worker.complete_shard(make_shard(['A', 'C']), worker.process_shard(make_shard(['A', 'C'])))
+        self.assertEqual(worker.updates[-1][1][:2], ('done', None))
+
+    def test_quota_defers_remaining_symbols(self):
+        """测试配额超限时停止处理分片，剩余股票退回队列且不计入尝试次数，退避时间加倍"""
+        collector = FakeCollector({'B': FETCH_QUOTA})
+        worker = self.make_worker(collector, quota_delay=10, max_quota_delay=15)
+
+        result = worker.process_shard(make_shard(['A', 'B', 'C']))
+        self.assertEqual(result, {'failed': [], 'deferred': ['B', 'C']})
+        self.assertEqual(collector.calls, ['A', 'B'])
+
+        worker.complete_shard(make_shard(['A', 'B', 'C'], attempts=3), result)
+        params = worker.updates[-1][1]
+        self.assertEqual(params[:3], ('pending', json.dumps(['B', 'C']), 'pending'))
+        self.assertEqual(params[4], 10)
+        self.assertEqual(worker._current_quota_delay, 15)
+
+@unittest.skipUnless(TEST_DATABASE_URL, '需要 TEST_DATABASE_URL 指向测试用 PostgreSQL 数据库')
+class TestIngestionWorkerWithDatabase(unittest.TestCase):
+    JOB_NAME = 'test_ingestion_shards'
+
+    def setUp(self):
+        self.coordinator = IngestionCoordinator(TEST_DATABASE_URL)
+        self.tearDown()
+
+    def tearDown(self):
+        self.execute("DELETE FROM ingestion_shards WHERE job_name = %s", (self.JOB_NAME,))
+
+    def execute(self, sql, params):
+        conn = psycopg2.connect(TEST_DATABASE_URL)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def make_worker(self, collector, worker_id, **kwargs):
+        return IngestionWorker(self.JOB_NAME, collector, worker_id=worker_id, heartbeat_interval=0.1,
+                               max_attempts=2, retry_delay=0, **kwargs)
+
+    def test_claim_and_lease_expiry(self):
+        """测试未过期的租约不会被领取，过期后由其他进程接管，用完尝试次数后进入 dead"""
+        self.assertEqual(self.coordinator.create_shards(self.JOB_NAME, ['600000.SH', '600001.SH'],
+                                                        '20240101', '20240131', shard_size=1), 2)
+        first = self.make_worker(FakeCollector({}, TEST_DATABASE_URL), 'worker-1')
+        second = self.make_worker(FakeCollector({}, TEST_DATABASE_URL), 'worker-2')
+
+        claimed = first.claim_shard()
+        self.assertEqual(claimed['symbols'], ['600000.SH'])
+        self.assertEqual(second.claim_shard()['symbols'], ['600001.SH'])
+        self.assertIsNone(second.claim_shard())
+
+        # 第一个进程中途退出，租约过期后被接管；原进程不能再提交结果
+        self.execute("UPDATE ingestion_shards SET lease_expires_at = NOW() - INTERVAL '1 second' WHERE id = %s",
+                     (claimed['id'],))
+        taken = second.claim_shard()
+        self.assertEqual((taken['id'], taken['attempts']), (claimed['id'], 2))
+        self.assertFalse(first.complete_shard(claimed, {'failed': [], 'deferred': []}))
+
+        # 接管后再次过期，尝试次数已用完
+        self.execute("UPDATE ingestion_shards SET lease_expires_at = NOW() - INTERVAL '1 second' WHERE id = %s",
+                     (claimed['id'],))
+        self.assertIsNone(first.claim_shard())
+        self.assertEqual(self.coordinator.get_progress(self.JOB_NAME).get('dead'), 1)
+
+    def test_retry_and_quota_paths(self):
+        """测试失败的股票单独重试，配额超限的分片在退避期间不会被领取"""
+        self.coordinator.create_shards(self.JOB_NAME, ['600000.SH', '600001.SH'], '20240101', '20240131')
+        collector = FakeCollector({'600001.SH': FETCH_ERROR}, TEST_DATABASE_URL)
+        worker = self.make_worker(collector, 'worker-1', quota_delay=3600)
+
+        self.assertEqual(worker.run(idle_interval=0.1), 2)
+        self.assertEqual(collector.calls, ['600000.SH', '600001.SH', '600001.SH'])
+        self.assertEqual(self.coordinator.get_progress(self.JOB_NAME), {'dead': 1})
+
+        self.execute("UPDATE ingestion_shards SET status = 'pending', attempts = 0, failed_symbols = NULL "
+                     "WHERE job_name = %s", (self.JOB_NAME,))
+        collector.results = {'600000.SH': FETCH_QUOTA}
+        shard = worker.claim_shard()
+        worker.complete_shard(shard, worker.process_shard(shard))
+        self.assertIsNone(worker.claim_shard())
+        self.assertGreater(worker._next_wait(), 60)
+        self.assertEqual(self.coordinator.get_progress(self.JOB_NAME), {'pending': 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from data_collection.kline_cache import KlineCache, cache_key
+from data_collection.symbol_resolver import UNKNOWN_ID, get_symbol_resolver
+
+class TestKlineCache(unittest.TestCase):
+    def test_invalidate_overlapping_range(self):
+        """测试只失效同一股票且日期范围有重叠的条目"""
+        cache = KlineCache(ttl=60)
+        first = cache_key('kline_data', '600000.SH', 'D', '20240101', '20240131')
+        second = cache_key('kline_data', '600000.SH', 'D', '20240201', '20240229')
+        other = cache_key('kline_data', '000001.SZ', 'D', '20240101', '20240131')
+        for key in (first, second, other):
+            cache.set(key, [key])
+
+        self.assertEqual(cache.invalidate('kline_data', '600000.SH', 'D', '20240115', '20240115'), 1)
+        self.assertIsNone(cache.get(first))
+        self.assertIsNotNone(cache.get(second))
+        self.assertIsNotNone(cache.get(other))
+
+    def test_stale_set_after_invalidate(self):
+        """测试查询期间发生失效时，查询结果不写入缓存"""
+        cache = KlineCache(ttl=60)
+        key = cache_key('kline_data', '600000.SH', 'D', '20240101', '20240131')
+
+        generation = cache.generation()
+        cache.invalidate('kline_data', '600000.SH', 'D', '20240102', '20240102')
+        self.assertFalse(cache.set(key, ['stale'], generation))
+        self.assertIsNone(cache.get(key))
+
+        self.assertTrue(cache.set(key, ['fresh'], cache.generation()))
+        self.assertEqual(cache.get(key), ['fresh'])
+
+    def test_unknown_symbols_keep_distinct_keys(self):
+        """测试无法编号的代码不共用缓存键，失效时只读查找不登记新代码"""
+        self.assertNotEqual(cache_key('kline_data', 'AAPL', 'D', '20240101', '20240131'),
+                            cache_key('kline_data', 'HSI', 'D', '20240101', '20240131'))
+        self.assertEqual(cache_key('kline_data', '600000.SH', 'D', '2024-01-01', '2024-01-31'),
+                         cache_key('kline_data', 'sh600000', 'D', '20240101', '20240131'))
+
+        resolver = get_symbol_resolver()
+        registered = len(resolver)
+        self.assertEqual(resolver.lookup('688981.SH'), UNKNOWN_ID)
+        KlineCache(ttl=60).invalidate('kline_data', '688981.SH', 'D', '20240101', '20240131')
+        self.assertEqual(len(resolver), registered)
+
+    def test_invalidate_entries_cached_before_registration(self):
+        """测试读取时未登记的代码以 ts_code 作键，写入登记后失效仍能匹配"""
+        resolver = get_symbol_resolver()
+        cache = KlineCache(ttl=60)
+        key = cache_key('kline_data', '688982', 'D', '20240101', '20240131')
+        self.assertEqual(key[1], '688982.SH')
+        cache.set(key, ['bar'])
+
+        resolver.register(['688982.SH'])
+        self.assertEqual(cache.invalidate('kline_data', '688982.SH', 'D', '20240102', '20240102'), 1)
+        self.assertIsNone(cache.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from data_collection import data_collector
+from data_collection.data_collector import DataCollector
+from data_collection.trading_calendar import TradingCalendar, format_days, set_trading_calendar
+from data_processing.lookback_planner import LookbackPlanner
+
+class FakeStorage:
+    """按交易日返回K线的存储，suspended 中的交易日停牌"""
+
+    def __init__(self, trading_days, suspended=()):
+        self.days = [day for day in trading_days if day not in set(suspended)]
+        self.requests = []
+
+    def get_kline_data(self, symbol, start_date, end_date, freq):
+        self.requests.append((start_date, end_date))
+        return [{'trade_date': day, 'close': 10.0} for day in self.days if start_date <= day <= end_date]
+
+    def save_kline_data(self, symbol, data, freq):
+        self.days = sorted(set(self.days) | {bar['trade_date'] for bar in data})
+        return True
+
+class FakeSource:
+    """只有 listed 中交易日K线的数据源"""
+
+    def __init__(self, listed=()):
+        self.listed = list(listed)
+        self.requests = []
+
+    def get_kline_data(self, symbol, start_date, end_date, freq='D'):
+        self.requests.append((start_date, end_date))
+        return {'data': [{'trade_date': day, 'close': 10.0} for day in self.listed if start_date <= day <= end_date],
+                'columns': ['trade_date', 'close']}
+
+class TestLookbackPlanner(unittest.TestCase):
+    def setUp(self):
+        set_trading_calendar(TradingCalendar(exchange='SSE'))
+        days = np.arange(np.datetime64('2023-01-02'), np.datetime64('2024-03-01'))
+        self.trading_days = [format_days(day) for day in days[np.is_busday(days)]]
+        data_collector._source_ranges.clear()
+
+    def test_plan_covers_longest_indicator(self):
+        """测试计划的K线数量为最长指标的需求，区间内恰好包含这么多个交易日"""
+        planner = LookbackPlanner()
+        plan = planner.plan(['MA5', 'MA60', 'RSI'], end_date='20240106')
+        self.assertEqual(plan.bars, 60)
+        self.assertEqual(plan.end_date, '20240105')
+        self.assertEqual(planner.calendar.count(plan.start_date, plan.end_date), 60)
+        self.assertEqual(plan.insufficient(30), ['MA60'])
+        self.assertEqual(planner.plan(bars=245, end_date='20240105').bars, 245)
+
+    def test_fetch_extends_over_suspension(self):
+        """测试停牌导致K线不足时向前扩展，只返回需要的数量"""
+        storage = FakeStorage(self.trading_days, suspended=self.trading_days[-20:-10])
+        collector = DataCollector(FakeSource(), storage)
+        plan, data = LookbackPlanner().fetch(collector, '600000.SH', ['MA60'], end_date='20240229')
+
+        self.assertEqual(len(data), plan.bars)
+        self.assertEqual(data[-1]['trade_date'], '20240229')
+        self.assertEqual(len(storage.requests), 2)
+        self.assertEqual(storage.requests[0], (plan.start_date, '20240229'))
+
+    def test_new_listing_saved_and_not_refetched(self):
+        """测试上市时间不足时保存从数据源获取的K线，之后直接从存储返回，不再请求数据源"""
+        storage = FakeStorage([])
+        source = FakeSource(self.trading_days[-30:])
+        collector = DataCollector(source, storage)
+
+        first = collector.get_kline_bars('688999.SH', 60, end_date='20240229')
+        self.assertEqual(len(first), 30)
+        self.assertEqual(len(storage.days), 30)
+        requests = len(source.requests)
+
+        second = collector.get_kline_bars('688999.SH', 60, end_date='20240229')
+        self.assertEqual([bar['trade_date'] for bar in second], [bar['trade_date'] for bar in first])
+        self.assertEqual(len(source.requests), requests)
+
+        # 新的交易日之后重新确认
+        collector.get_kline_bars('688999.SH', 60, end_date='20240301')
+        self.assertGreater(len(source.requests), requests)
+
+if __name__ == '__main__':
+    unittest.main()
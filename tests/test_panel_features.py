@@ -0,0 +1,105 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing.feature_engineer import FeatureEngineer
+from data_processing.panel_feature_engineer import KlinePanel, PanelFeatureEngineer
+from data_processing.feature_registry import FEATURE_REGISTRY
+from data_processing.dtype_policy import DtypePolicy
+from data_processing.data_processor import DataProcessor
+from data_processing.engines import ColumnarEngine
+
+class TestPanelFeatures(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        dates = pd.bdate_range('2022-01-03', periods=200)
+        rows = []
+        # 第二只股票中途上市并停牌三天，第三只股票停牌一天
+        for i, (listed, suspended) in enumerate([(0, []), (40, [90, 91, 92]), (0, [10])]):
+            close = 20 + np.cumsum(rng.normal(0, 0.3, len(dates)))
+            for j, date in enumerate(dates):
+                if j < listed or j in suspended:
+                    continue
+                rows.append({
+                    'ts_code': f'60000{i}.SH', 'trade_date': date.strftime('%Y%m%d'),
+                    'open': close[j] + rng.normal(0, 0.1), 'high': close[j] + 0.5,
+                    'low': close[j] - 0.5, 'close': close[j], 'vol': rng.uniform(1e4, 1e5)
+                })
+        self.df = pd.DataFrame(rows)
+
+    def test_panel_matches_single_symbol(self):
+        """测试面板特征与逐只股票计算的结果一致"""
+        panel = KlinePanel.from_frame(self.df)
+        engineer = PanelFeatureEngineer()
+        result = engineer.to_frame(panel, engineer.compute(panel))
+        self.assertEqual(len(result), len(self.df))
+
+        feature_engineer = FeatureEngineer(dtype_policy=DtypePolicy.full_precision())
+        for ts_code, group in self.df.groupby('ts_code'):
+            df = group.assign(trade_date=pd.to_datetime(group['trade_date'])).reset_index(drop=True)
+            df = feature_engineer.generate_time_based_features(df)
+            df = feature_engineer.generate_price_features(df)
+            df = feature_engineer.generate_volatility_features(df)
+            df = feature_engineer.calculate_technical_indicators(df)
+
+            actual = result[result['ts_code'] == ts_code].reset_index(drop=True)
+            for col in ['price_change_pct', 'volatility', 'skewness', 'MA60', 'MACD', 'K', 'RSI', 'ATR', 'is_month_end']:
+                np.testing.assert_allclose(actual[col].to_numpy(dtype=float), df[col].to_numpy(dtype=float),
+                                           rtol=1e-7, atol=1e-7, err_msg=f'{ts_code} {col}')
+
+    def test_dtype_policy(self):
+        """测试默认数据类型策略：特征为 float32，日历特征为窄整数，结果与全精度一致"""
+        records = self.df[self.df['ts_code'] == '600000.SH'].to_dict('records')
+        lean = DataProcessor().process_kline_data(records)
+        full = DataProcessor(dtype_policy=DtypePolicy.full_precision()).process_kline_data(records)
+
+        self.assertEqual(lean['MA20'].dtype, np.float32)
+        self.assertEqual(lean['month'].dtype, np.int8)
+        self.assertEqual(lean['year'].dtype, np.int16)
+        self.assertIsInstance(lean['ts_code'].dtype, pd.CategoricalDtype)
+        self.assertEqual(full['MA20'].dtype, np.float64)
+        for col in ['MA20', 'MACD', 'volatility', 'price_change_pct', 'is_month_end']:
+            np.testing.assert_allclose(lean[col].to_numpy(dtype=float), full[col].to_numpy(dtype=float),
+                                       rtol=1e-6, atol=1e-6, err_msg=col)
+
+    def test_engines_interchangeable(self):
+        """测试列式引擎批量处理的结果与 pandas 引擎逐只处理一致"""
+        records = {ts_code: group.to_dict('records') for ts_code, group in self.df.groupby('ts_code')}
+        records['600000.SH'][5]['close'] = None
+        pandas_processor = DataProcessor(engine='pandas')
+        result = DataProcessor(engine=ColumnarEngine(max_workers=3)).process_kline_universe(records)
+
+        self.assertEqual(list(result), list(records))
+        for ts_code, kline in records.items():
+            expected = pandas_processor.process_kline_data(kline)
+            pd.testing.assert_frame_equal(result[ts_code], expected, obj=ts_code)
+        with self.assertRaises(ValueError):
+            DataProcessor(engine='spark')
+
+    def test_missing_positions_stay_nan(self):
+        """测试停牌和未上市的位置不产生特征"""
+        panel = KlinePanel.from_frame(self.df)
+        features = PanelFeatureEngineer().compute(panel)
+        column = panel.symbols.index('600001.SH')
+        self.assertTrue(np.isnan(features['MA5'][:40, column]).all())
+        self.assertTrue(np.isnan(features['MA5'][90, column]))
+        self.assertFalse(np.isnan(features['MA5'][93, column]))
+
+    def test_feature_plan(self):
+        """测试计划只包含请求的特征及其依赖，共享的中间结果只计算一次"""
+        plan = FEATURE_REGISTRY.plan(['volatility', 'price_change_pct', 'ATR'])
+        names = [spec.name for spec in plan.steps]
+        self.assertEqual(names.count('returns'), 1)
+        self.assertLess(names.index('returns'), names.index('volatility'))
+        self.assertLess(names.index('true_range'), names.index('ATR'))
+        self.assertNotIn('MACD', names)
+        self.assertEqual(sorted(plan.inputs), ['close', 'high', 'low'])
+        # 收益率回看 1 根，波动率窗口 20
+        self.assertEqual(plan.min_history, 21)
+        self.assertEqual(FEATURE_REGISTRY.plan(['volatility'], {'volatility_window': 30}).min_history, 31)
+
+        close = self.df.loc[self.df['ts_code'] == '600000.SH', 'close'].to_numpy()
+        result = FEATURE_REGISTRY.plan(['MA5']).execute({'close': close})
+        self.assertEqual(list(result), ['MA5'])
+
+if __name__ == '__main__':
+    unittest.main()
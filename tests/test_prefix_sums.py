@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing.prefix_sums import PrefixSums, rolling_frame
+
+class TestPrefixSums(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        dates = pd.bdate_range('2023-01-02', periods=300)
+        close = 20 + np.cumsum(rng.normal(0, 0.3, len(dates)))
+        vol = rng.uniform(1e4, 1e5, len(dates))
+        self.df = pd.DataFrame({'trade_date': dates.strftime('%Y%m%d'), 'close': close,
+                                'vol': vol, 'amount': close * vol / 10})
+
+    def test_rolling_matches_pandas(self):
+        """测试任意窗口的均值、标准差和 VWAP 与 pandas rolling 一致"""
+        prefix = PrefixSums.from_bars(self.df)
+        close = self.df['close']
+        for window in (5, 20, 250):
+            stats = prefix.rolling(window)
+            np.testing.assert_allclose(stats['mean'], close.rolling(window).mean(), rtol=1e-10)
+            np.testing.assert_allclose(stats['std'], close.rolling(window).std(), rtol=1e-8)
+            vwap = self.df['amount'].rolling(window).sum() / self.df['vol'].rolling(window).sum() * 10
+            np.testing.assert_allclose(stats['vwap'], vwap, rtol=1e-10)
+        self.assertEqual(list(rolling_frame(prefix, [5], ['mean']).columns), ['mean_5'])
+
+    def test_partial_records_and_range(self):
+        """测试只读取区间和窗口起点的累计和时结果不变，区间统计只需两端查找"""
+        full = PrefixSums.from_bars(self.df)
+        records = [{'trade_date': day, 'n': n, 'sum_close': full.sums['sum_close'][i],
+                    'sum_close2': full.sums['sum_close2'][i], 'sum_vol': full.sums['sum_vol'][i],
+                    'sum_amount': full.sums['sum_amount'][i]}
+                   for i, (day, n) in enumerate(zip(self.df['trade_date'], full.counts))]
+        # 区间从第 200 根K线开始，附带之前 20 条作为窗口起点
+        partial = PrefixSums.from_records(records[180:])
+        np.testing.assert_allclose(partial.rolling(20)['mean'][20:], full.rolling(20)['mean'][200:], rtol=1e-10)
+        self.assertTrue(np.isnan(partial.rolling(60)['mean'][:60]).all())
+
+        stats = partial.range_stats(self.df['trade_date'][200], self.df['trade_date'][219])
+        self.assertEqual(stats['bars'], 20)
+        self.assertAlmostEqual(stats['mean'], self.df['close'][200:220].mean())
+        self.assertAlmostEqual(stats['std'], self.df['close'][200:220].std())
+        with self.assertRaises(ValueError):
+            partial.range_stats(self.df['trade_date'][180], self.df['trade_date'][219])
+
+if __name__ == '__main__':
+    unittest.main()
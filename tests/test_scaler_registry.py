@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
+from data_processing.scaler_registry import AffineScaler, ScalerRegistry
+from data_processing.data_standardizer import DataStandardizer
+
+class TestScalerRegistry(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.values = rng.normal(10, 3, (200, 3))
+        self.values[:, 2] = 5.0
+        self.columns = ['a', 'b', 'c']
+        self.store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store_dir, True)
+
+    def test_affine_matches_sklearn(self):
+        """测试仿射参数与 sklearn 的转换结果一致（包括常数列）"""
+        for method, cls in (('standard', StandardScaler), ('minmax', MinMaxScaler), ('robust', RobustScaler)):
+            scaler = AffineScaler.fit(self.values, self.columns, method)
+            expected = cls().fit(self.values)
+            np.testing.assert_allclose(scaler.transform(self.values), expected.transform(self.values), atol=1e-12)
+            np.testing.assert_allclose(scaler.inverse_transform(scaler.transform(self.values)), self.values)
+
+    def test_registry_reuse_and_persistence(self):
+        """测试同一键只拟合一次，并能从磁盘恢复"""
+        registry = ScalerRegistry(self.store_dir)
+        first = registry.fit('600000.SH', self.values, self.columns, 'minmax', '20240105')
+        # 同一水位再次请求时不重新拟合
+        again = registry.fit('600000.SH', self.values * 2, self.columns, 'minmax', '20240105')
+        self.assertIs(first, again)
+        self.assertIsNone(registry.get('600000.SH', self.columns, 'minmax', '20240108'))
+
+        restored = ScalerRegistry(self.store_dir).get('600000.SH', self.columns, 'minmax', '20240105')
+        np.testing.assert_array_equal(restored.scale, first.scale)
+        np.testing.assert_array_equal(restored.bias, first.bias)
+
+    def test_superseded_watermarks_pruned(self):
+        """测试保存新水位后删除同一键被取代的参数文件，其他列集合和方法不受影响"""
+        registry = ScalerRegistry(self.store_dir)
+        for watermark in ('20240105', '20240108', '20240109'):
+            registry.fit('600000.SH', self.values, self.columns, 'minmax', watermark)
+        registry.fit('600000.SH', self.values, self.columns, 'standard', '20240105')
+        registry.fit('600000.SH', self.values[:, :2], self.columns[:2], 'minmax', '20240105')
+
+        self.assertEqual(len(os.listdir(os.path.join(self.store_dir, '600000.SH'))), 3)
+        restored = ScalerRegistry(self.store_dir)
+        self.assertIsNone(restored.get('600000.SH', self.columns, 'minmax', '20240108'))
+        self.assertIsNotNone(restored.get('600000.SH', self.columns, 'minmax', '20240109'))
+
+    def test_standardizer_with_symbol(self):
+        """测试按股票代码标准化和转换新数据"""
+        df = pd.DataFrame(self.values, columns=self.columns)
+        df['trade_date'] = pd.bdate_range('2024-01-02', periods=len(df))
+        standardizer = DataStandardizer(ScalerRegistry(self.store_dir))
+
+        result = standardizer.standardize(df, self.columns, 'standard', symbol='000001.SZ')
+        expected = StandardScaler().fit_transform(self.values)
+        np.testing.assert_allclose(result[self.columns].to_numpy(), expected, atol=1e-12)
+
+        watermark = str(df['trade_date'].max())
+        transformed = DataStandardizer(ScalerRegistry(self.store_dir)).transform_new_data(
+            df.tail(5), self.columns, 'standard', symbol='000001.SZ', watermark=watermark)
+        np.testing.assert_allclose(transformed[self.columns].to_numpy(), expected[-5:], atol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+import pandas as pd
+from analysis.indicator_cache import IndicatorCache
+from analysis.screener import SIGNAL_COLUMNS, TechnicalScreener, parse_filters
+from analysis.technical_analyzer import TechnicalAnalyzer
+from data_processing.panel_feature_engineer import KlinePanel
+
+class TestScreener(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        dates = pd.bdate_range('2023-01-02', periods=150)
+        rows = []
+        # 第二只股票中途上市，第三只股票最后一天停牌，第四只股票倒数第二天停牌
+        for i, (listed, suspended) in enumerate([(0, []), (100, []), (0, [149]), (0, [148]), (0, [])]):
+            close = 20 + np.cumsum(rng.normal(0, 0.5, len(dates)))
+            for j, date in enumerate(dates):
+                if j < listed or j in suspended:
+                    continue
+                rows.append({
+                    'ts_code': f'60000{i}.SH', 'trade_date': date.strftime('%Y%m%d'),
+                    'open': close[j], 'high': close[j] + rng.uniform(0, 1), 'low': close[j] - rng.uniform(0, 1),
+                    'close': close[j], 'vol': rng.uniform(1e4, 1e5)
+                })
+        self.df = pd.DataFrame(rows)
+
+    def test_signals_match_single_symbol_analysis(self):
+        """测试全市场信号与逐只股票的技术分析一致，最后一天停牌的股票不在信号表中"""
+        table = TechnicalScreener(storage=object()).compute(KlinePanel.from_frame(self.df))
+        self.assertEqual(sorted(table['ts_code']), ['600000.SH', '600001.SH', '600003.SH', '600004.SH'])
+        self.assertTrue((table['trade_date'] == self.df['trade_date'].max()).all())
+
+        analyzer = TechnicalAnalyzer(IndicatorCache())
+        for row in table.to_dict('records'):
+            group = self.df[self.df['ts_code'] == row['ts_code']].reset_index(drop=True)
+            analysis = analyzer.analyze(group)
+            for name in SIGNAL_COLUMNS:
+                self.assertEqual(row[name], analysis.signal(name), f"{row['ts_code']} {name}")
+            for name in ('ma20', 'prev_ma60', 'macd', 'k', 'rsi', 'bb_lower', 'vol_ma10'):
+                np.testing.assert_allclose(row[name], analysis.value(name), rtol=1e-9, equal_nan=True)
+
+    def test_query_filters_and_sorts(self):
+        """测试筛选条件解析、筛选和排序"""
+        table = TechnicalScreener(storage=object()).compute(KlinePanel.from_frame(self.df))
+        result = TechnicalScreener.query(table, parse_filters('rsi>=0, overall_signal!=无'), sort_by='-rsi', limit=2)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result['rsi'].tolist(), sorted(table['rsi'].dropna(), reverse=True)[:2])
+
+        expected = table[(table['rsi'] < 50) & (table['macd_signal'] == '金叉看多')]['ts_code'].tolist()
+        result = TechnicalScreener.query(table, parse_filters('rsi<50,macd_signal=金叉看多'))
+        self.assertEqual(result['ts_code'].tolist(), expected)
+        for text in ('rsi<abc', 'unknown=1', 'rsi_signal<超卖', 'rsi'):
+            with self.assertRaises(ValueError):
+                parse_filters(text)
+
+    def test_load_reuses_table_until_data_changes(self):
+        """测试信号表按请求日期和信号日期缓存，数据指纹汇总变化后重新计算"""
+        df = self.df
+
+        class Storage:
+            token, universe_calls, runs, signals = 'v1', 0, {}, {}
+
+            def get_fingerprint_summary(self, ts_codes=None):
+                return self.token
+
+            def get_kline_universe(self, ts_codes, start_date, end_date):
+                self.universe_calls += 1
+                return df[(df['trade_date'] >= start_date) & (df['trade_date'] <= end_date)].to_dict('records')
+
+            def save_technical_signals(self, trade_date, signals, end_date=None, data_token=None):
+                self.signals[trade_date] = signals
+                for key in (end_date, trade_date):
+                    self.runs[key] = {'trade_date': trade_date, 'data_token': data_token}
+
+            def get_technical_signal_run(self, end_date):
+                return self.runs.get(end_date)
+
+            def get_technical_signals(self, trade_date):
+                return self.signals.get(trade_date, [])
+
+        storage = Storage()
+        last_date = df['trade_date'].max()
+        # 请求日期的行情尚未入库，信号日期为之前最近的交易日
+        requested = (pd.Timestamp(last_date) + pd.offsets.BDay(1)).strftime('%Y%m%d')
+        table = TechnicalScreener(storage).load(requested)
+        self.assertEqual(table['trade_date'].iloc[0], last_date)
+
+        for date in (requested, last_date):
+            TechnicalScreener(storage).load(date)
+        self.assertEqual(storage.universe_calls, 1)
+
+        storage.token = 'v2'
+        screener = TechnicalScreener(storage)
+        screener.load(requested)
+        screener.load(requested)
+        self.assertEqual(storage.universe_calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+from data_collection.symbol_resolver import SymbolResolver, UNKNOWN_ID, decode_dates, encode_dates
+from data_collection.symbol_utils import normalize_ts_code
+
+class FakeStorage:
+    """记录登记请求的存储"""
+
+    def __init__(self):
+        self.registered = []
+
+    def get_symbol_ids(self):
+        return {}
+
+    def register_symbols(self, ts_codes):
+        start = len(self.registered)
+        self.registered.extend(ts_codes)
+        return {code: start + i for i, code in enumerate(ts_codes)}
+
+class TestSymbolResolver(unittest.TestCase):
+    def test_normalize_matches_symbol_utils(self):
+        """测试编号查找的规范化结果与 normalize_ts_code 一致"""
+        resolver = SymbolResolver()
+        for symbol in ['600000', 'sh600000', 'SH.600000', '600000.XSHG', '000001', '000001.SH', 'sz000001',
+                       '000001.sz', '830799', 'BJ830799', ' 600519 ', 'abc', '',
+                       'abc123', '1234567', '60000', '00700.HK', 'hk00700', 'sh600000.SH']:
+            # 第二次查询走预先生成的写法表
+            for _ in range(2):
+                self.assertEqual(resolver.normalize(symbol), normalize_ts_code(symbol), symbol)
+        self.assertNotEqual(resolver.symbol_id('000001'), resolver.symbol_id('000001.SH'))
+
+    def test_normalize_is_read_only(self):
+        """测试规范化和只读查找不登记新代码，登记后两者返回同一代码"""
+        storage = FakeStorage()
+        resolver = SymbolResolver(storage)
+        self.assertEqual(resolver.normalize('sh688001'), '688001.SH')
+        self.assertEqual(resolver.lookup('688001.SH'), UNKNOWN_ID)
+        self.assertEqual((len(resolver), storage.registered), (0, []))
+
+        symbol_id = resolver.register(['688001.SH'])[0]
+        self.assertEqual(storage.registered, ['688001.SH'])
+        self.assertEqual(resolver.lookup('sh688001'), symbol_id)
+        self.assertEqual(resolver.normalize('688001'), '688001.SH')
+
+    def test_normalize_rejects_malformed(self):
+        """测试不是恰好6位数字或交易所标识无法识别的代码返回 None"""
+        for symbol in ['abc123', '1234567', '60000', '00700.HK', 'hk00700', '000700.HK', 'sh600000.SH']:
+            self.assertIsNone(normalize_ts_code(symbol), symbol)
+        self.assertEqual(normalize_ts_code('SH.600000'), '600000.SH')
+        self.assertEqual(normalize_ts_code('000001', is_index=True), '000001.SH')
+
+    def test_encode_decode(self):
+        """测试批量编码为 int32 编号并还原，无法识别和缺失的代码为 UNKNOWN_ID"""
+        resolver = SymbolResolver()
+        ids = resolver.encode(['600000.SH', 'sh600000', '000001.SZ', None, 'abc'])
+        self.assertEqual(ids.dtype, np.int32)
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(ids[3], UNKNOWN_ID)
+        self.assertEqual(ids[4], UNKNOWN_ID)
+        self.assertEqual(list(resolver.decode(ids[:3])), ['600000.SH', '600000.SH', '000001.SZ'])
+
+        days = encode_dates(['20240102', '20240103'])
+        self.assertEqual(days.dtype, np.int32)
+        self.assertEqual(list(decode_dates(days).astype(str)), ['2024-01-02', '2024-01-03'])
+
+if __name__ == '__main__':
+    unittest.main()
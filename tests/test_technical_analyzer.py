@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from analysis.indicator_cache import IndicatorCache
+from analysis.technical_analyzer import TechnicalAnalysis, TechnicalAnalyzer
+
+class TestTechnicalAnalyzer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        close = 20 + np.cumsum(rng.normal(0, 0.5, 120))
+        self.df = pd.DataFrame({
+            'trade_date': pd.bdate_range('2023-01-02', periods=120).strftime('%Y%m%d'),
+            'open': close, 'high': close + 0.5, 'low': close - 0.5, 'close': close,
+            'vol': rng.uniform(1e4, 1e5, 120)
+        })
+        self.analyzer = TechnicalAnalyzer(IndicatorCache())
+
+    def test_analyze_does_not_mutate_input(self):
+        """测试分析不修改传入的行情数据，结果与逐项计算的指标一致"""
+        snapshot = self.df.copy()
+        result = self.analyzer.analyze(self.df)
+        pd.testing.assert_frame_equal(self.df, snapshot)
+
+        close = self.df['close']
+        self.assertAlmostEqual(result.value('ma20'), close.rolling(20).mean().iloc[-1])
+        self.assertAlmostEqual(result.value('prev_ma5'), close.rolling(5).mean().iloc[-2])
+        expected = '上升' if close.rolling(20).mean().iloc[-1] > close.rolling(20).mean().iloc[-2] else '下降'
+        self.assertEqual(result['trend_analysis']['medium_term_trend'], expected)
+        self.assertIn(result['overall_signal'], ('看多', '看空', '中性'))
+
+    def test_result_is_immutable_view(self):
+        """测试结果不可修改，字典视图与 comprehensive_technical_analysis 一致"""
+        result = self.analyzer.analyze(self.df)
+        with self.assertRaises(AttributeError):
+            result.length = 0
+        with self.assertRaises(ValueError):
+            result.values[0] = 0.0
+        with self.assertRaises(TypeError):
+            result['macd_analysis']['signal'] = '看多'
+
+        self.assertEqual(result.to_dict(), self.analyzer.comprehensive_technical_analysis(self.df))
+        self.assertEqual(set(result), set(TechnicalAnalysis.SECTIONS))
+        self.assertEqual(len(self.analyzer.analyze(self.df.iloc[:0])), 0)
+        self.assertEqual(self.analyzer.comprehensive_technical_analysis(self.df.iloc[:0]), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from data_collection.trading_calendar import TradingCalendar, format_days
+
+class TestTradingCalendar(unittest.TestCase):
+    def setUp(self):
+        # 2024 年元旦和春节（2 月 12 日至 16 日）休市
+        holidays = {'20240101', '20240212', '20240213', '20240214', '20240215', '20240216'}
+        days = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-12-31') + 1)
+        records = [{'cal_date': format_days(day), 'is_open': int(bool(np.is_busday(day)) and format_days(day) not in holidays)}
+                   for day in days]
+        self.calendar = TradingCalendar.from_records(records)
+
+    def test_offsets_and_counts(self):
+        """测试交易日判断、计数和偏移跳过周末与节假日"""
+        calendar = self.calendar
+        self.assertFalse(calendar.is_trading_day('20240101'))
+        self.assertTrue(calendar.is_trading_day('20240102'))
+        self.assertEqual(calendar.count('20240201', '20240229'), 16)
+        self.assertEqual(format_days(calendar.offset('20240209', 1)), '20240219')
+        self.assertEqual(format_days(calendar.offset('20240218', 0)), '20240209')
+        self.assertEqual(format_days(calendar.window_start('20240220', 3)), '20240209')
+        self.assertEqual(list(format_days(calendar.next_trading_days('20240208', 3))), ['20240209', '20240219', '20240220'])
+        np.testing.assert_array_equal(calendar.count(['20240101', '20240105'], ['20240131', '20240105']), [22, 1])
+        # 已导入区间之外按工作日处理
+        self.assertTrue(calendar.is_trading_day('20250102'))
+
+    def test_gaps_and_day_features(self):
+        """测试缺口检测和日历特征（月末为当月最后一个交易日）"""
+        calendar = self.calendar
+        missing = calendar.missing_days(['20240205', '20240207'], end='20240219')
+        self.assertEqual(list(format_days(missing)), ['20240206', '20240208', '20240209', '20240219'])
+
+        features = calendar.day_features(np.array(['2024-03-29', '2024-03-28', '2024-06-28', '2024-12-31'],
+                                                  dtype='datetime64[D]'))
+        self.assertEqual(features['is_month_end'].tolist(), [1, 0, 1, 1])
+        self.assertEqual(features['is_quarter_end'].tolist(), [1, 0, 1, 1])
+        self.assertEqual(features['is_year_end'].tolist(), [0, 0, 0, 1])
+        self.assertEqual(features['weekday'].tolist(), [4, 3, 4, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing.window_builder import WindowBuilder
+
+class TestWindowBuilder(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame(rng.normal(size=(120, 4)), columns=['a', 'b', 'c', 'close'])
+        self.feature_cols = ['a', 'b', 'c']
+
+    def test_matches_loop(self):
+        """测试与逐行循环构建的样本一致，且窗口是视图"""
+        windows = WindowBuilder(lookback=10).from_frame(self.df, self.feature_cols)
+
+        X = [self.df[self.feature_cols].iloc[i - 10:i].values.flatten() for i in range(10, len(self.df))]
+        y = [self.df['close'].iloc[i] for i in range(10, len(self.df))]
+
+        self.assertEqual(windows.shape, (110, 10, 3))
+        self.assertEqual(windows.X.dtype, np.float32)
+        self.assertTrue(np.shares_memory(windows.X, windows.windows))
+        np.testing.assert_allclose(windows.flatten(), np.array(X, dtype=np.float32))
+        np.testing.assert_allclose(windows.y, np.array(y, dtype=np.float32))
+
+    def test_multi_symbol(self):
+        """测试多只股票拼接时窗口不跨越股票"""
+        df = self.df.assign(ts_code=np.repeat(['600000.SH', '000001.SZ'], 60))
+        windows = WindowBuilder(lookback=10, horizon=3).from_frame(df, self.feature_cols, group_by='ts_code')
+
+        self.assertEqual(len(windows), 2 * (60 - 10 - 3 + 1))
+        self.assertEqual(windows.y.shape, (len(windows), 3))
+
+        second = df[df['ts_code'] == '000001.SZ'].reset_index(drop=True)
+        first_sample = list(windows.symbols).index('000001.SZ')
+        np.testing.assert_allclose(windows.X[first_sample], second[self.feature_cols].iloc[:10].to_numpy(dtype=np.float32))
+        np.testing.assert_allclose(windows.y[first_sample], second['close'].iloc[10:13].to_numpy(dtype=np.float32))
+
+        batches = list(windows.batches(batch_size=25, flatten=True))
+        self.assertEqual(sum(len(X) for X, _ in batches), len(windows))
+        self.assertEqual(batches[0][0].shape, (25, 30))
+
+if __name__ == '__main__':
+    unittest.main()
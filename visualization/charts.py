@@ -3,12 +3,19 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional
 import seaborn as sns
+from analysis.indicator_cache import IndicatorCache, IndicatorFrame, get_indicator_cache
 
 class Charts:
     """图表绘制类"""
     
-    def __init__(self):
-        """初始化图表设置"""
+    def __init__(self, indicator_cache: IndicatorCache = None):
+        """初始化图表设置
+        
+        Args:
+            indicator_cache: 指标缓存，如果为 None，使用进程内共享的缓存
+        """
+        self.indicator_cache = indicator_cache or get_indicator_cache()
+        
         # 设置中文字体
         plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
         plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
@@ -16,6 +23,10 @@ class Charts:
         # 设置图表风格
         sns.set_style("whitegrid")
     
+    def _frame(self, df: pd.DataFrame, frame: IndicatorFrame = None) -> IndicatorFrame:
+        """获取行情数据对应的指标帧"""
+        return frame or self.indicator_cache.frame(df)
+    
     def plot_kline(self, df: pd.DataFrame, title: str = 'K线图') -> plt.Figure:
         """绘制K线图"""
         if df.empty:
@@ -44,7 +55,7 @@ class Charts:
         
         return fig
     
-    def plot_ma(self, df: pd.DataFrame, title: str = '移动平均线') -> plt.Figure:
+    def plot_ma(self, df: pd.DataFrame, title: str = '移动平均线', frame: IndicatorFrame = None) -> plt.Figure:
         """绘制移动平均线"""
         if df.empty:
             return None
@@ -52,17 +63,14 @@ class Charts:
         fig, ax = plt.subplots(figsize=(12, 6))
         
         # 计算移动平均线
-        df['MA5'] = df['close'].rolling(window=5).mean()
-        df['MA10'] = df['close'].rolling(window=10).mean()
-        df['MA20'] = df['close'].rolling(window=20).mean()
-        df['MA60'] = df['close'].rolling(window=60).mean()
+        frame = self._frame(df, frame)
         
         # 绘制收盘价和移动平均线
         ax.plot(df['trade_date'], df['close'], label='收盘价', color='blue', alpha=0.5)
-        ax.plot(df['trade_date'], df['MA5'], label='MA5', color='red')
-        ax.plot(df['trade_date'], df['MA10'], label='MA10', color='green')
-        ax.plot(df['trade_date'], df['MA20'], label='MA20', color='orange')
-        ax.plot(df['trade_date'], df['MA60'], label='MA60', color='purple')
+        ax.plot(df['trade_date'], frame.get('sma', window=5), label='MA5', color='red')
+        ax.plot(df['trade_date'], frame.get('sma', window=10), label='MA10', color='green')
+        ax.plot(df['trade_date'], frame.get('sma', window=20), label='MA20', color='orange')
+        ax.plot(df['trade_date'], frame.get('sma', window=60), label='MA60', color='purple')
         
         # 添加标题和标签
         ax.set_title(title)
@@ -78,17 +86,13 @@ class Charts:
         
         return fig
     
-    def plot_macd(self, df: pd.DataFrame, title: str = 'MACD指标') -> plt.Figure:
+    def plot_macd(self, df: pd.DataFrame, title: str = 'MACD指标', frame: IndicatorFrame = None) -> plt.Figure:
         """绘制MACD指标"""
         if df.empty:
             return None
         
         # 计算MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal']
+        macd_line, signal_line, macd_hist = self._frame(df, frame).get('macd')
         
         # 创建双轴图表
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
@@ -100,12 +104,12 @@ class Charts:
         ax1.legend()
         
         # 绘制MACD
-        ax2.plot(df['trade_date'], df['MACD'], label='MACD', color='blue')
-        ax2.plot(df['trade_date'], df['Signal'], label='Signal', color='red')
+        ax2.plot(df['trade_date'], macd_line, label='MACD', color='blue')
+        ax2.plot(df['trade_date'], signal_line, label='Signal', color='red')
         
         # 绘制MACD柱状图
-        colors = ['green' if val > 0 else 'red' for val in df['MACD_Hist']]
-        ax2.bar(df['trade_date'], df['MACD_Hist'], color=colors, alpha=0.5)
+        colors = np.where(macd_hist > 0, 'green', 'red')
+        ax2.bar(df['trade_date'], macd_hist, color=colors, alpha=0.5)
         
         ax2.set_xlabel('日期')
         ax2.set_ylabel('MACD')
@@ -117,17 +121,13 @@ class Charts:
         
         return fig
     
-    def plot_rsi(self, df: pd.DataFrame, title: str = 'RSI指标') -> plt.Figure:
+    def plot_rsi(self, df: pd.DataFrame, title: str = 'RSI指标', frame: IndicatorFrame = None) -> plt.Figure:
         """绘制RSI指标"""
         if df.empty:
             return None
         
         # 计算RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        rsi = self._frame(df, frame).get('rsi', window=14)
         
         # 创建双轴图表
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
@@ -139,7 +139,7 @@ class Charts:
         ax1.legend()
         
         # 绘制RSI
-        ax2.plot(df['trade_date'], df['RSI'], label='RSI', color='purple')
+        ax2.plot(df['trade_date'], rsi, label='RSI', color='purple')
         
         # 添加超买超卖线
         ax2.axhline(y=70, color='red', linestyle='--', label='超买线')
@@ -156,16 +156,13 @@ class Charts:
         
         return fig
     
-    def plot_bollinger_bands(self, df: pd.DataFrame, title: str = '布林带') -> plt.Figure:
+    def plot_bollinger_bands(self, df: pd.DataFrame, title: str = '布林带', frame: IndicatorFrame = None) -> plt.Figure:
         """绘制布林带"""
         if df.empty:
             return None
         
         # 计算布林带
-        df['BB_Mid'] = df['close'].rolling(window=20).mean()
-        df['BB_Std'] = df['close'].rolling(window=20).std()
-        df['BB_Upper'] = df['BB_Mid'] + 2 * df['BB_Std']
-        df['BB_Lower'] = df['BB_Mid'] - 2 * df['BB_Std']
+        bb_mid, _, bb_upper, bb_lower = self._frame(df, frame).get('bollinger_bands', window=20, num_std=2)
         
         fig, ax = plt.subplots(figsize=(12, 6))
         
@@ -173,12 +170,12 @@ class Charts:
         ax.plot(df['trade_date'], df['close'], label='收盘价', color='blue')
         
         # 绘制布林带
-        ax.plot(df['trade_date'], df['BB_Mid'], label='中轨', color='orange')
-        ax.plot(df['trade_date'], df['BB_Upper'], label='上轨', color='green', linestyle='--')
-        ax.plot(df['trade_date'], df['BB_Lower'], label='下轨', color='red', linestyle='--')
+        ax.plot(df['trade_date'], bb_mid, label='中轨', color='orange')
+        ax.plot(df['trade_date'], bb_upper, label='上轨', color='green', linestyle='--')
+        ax.plot(df['trade_date'], bb_lower, label='下轨', color='red', linestyle='--')
         
         # 填充布林带区域
-        ax.fill_between(df['trade_date'], df['BB_Upper'], df['BB_Lower'], color='gray', alpha=0.1)
+        ax.fill_between(df['trade_date'], bb_upper, bb_lower, color='gray', alpha=0.1)
         
         # 添加标题和标签
         ax.set_title(title)
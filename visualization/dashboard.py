@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional
 from .charts import Charts
+from data_collection.trading_calendar import format_days, get_trading_calendar
 
 class Dashboard:
     """仪表盘类"""
@@ -21,6 +22,9 @@ class Dashboard:
         
         df = pd.DataFrame(kline_data)
         
+        # 所有图表共享同一个指标帧，指标只计算一次
+        frame = self.charts.indicator_cache.frame(df)
+        
         # 创建图表
         dashboard_data = {
             'title': title,
@@ -33,19 +37,19 @@ class Dashboard:
         dashboard_data['charts']['kline'] = kline_fig
         
         # 2. 移动平均线
-        ma_fig = self.charts.plot_ma(df)
+        ma_fig = self.charts.plot_ma(df, frame=frame)
         dashboard_data['charts']['ma'] = ma_fig
         
         # 3. MACD指标
-        macd_fig = self.charts.plot_macd(df)
+        macd_fig = self.charts.plot_macd(df, frame=frame)
         dashboard_data['charts']['macd'] = macd_fig
         
         # 4. RSI指标
-        rsi_fig = self.charts.plot_rsi(df)
+        rsi_fig = self.charts.plot_rsi(df, frame=frame)
         dashboard_data['charts']['rsi'] = rsi_fig
         
         # 5. 布林带
-        bb_fig = self.charts.plot_bollinger_bands(df)
+        bb_fig = self.charts.plot_bollinger_bands(df, frame=frame)
         dashboard_data['charts']['bollinger_bands'] = bb_fig
         
         # 6. 成交量
@@ -117,12 +121,12 @@ class Dashboard:
             ax = fig.gca()
             
             # 添加预测价格
-            # 假设预测数据是未来几天的价格
+            # 预测数据为最后一根K线之后的交易日的价格
             last_date = df['trade_date'].iloc[-1]
-            prediction_dates = pd.date_range(last_date, periods=len(prediction_data) + 1)[1:]
+            prediction_dates = get_trading_calendar().next_trading_days(last_date, len(prediction_data))
             
             # 转换为与历史数据相同的日期格式
-            prediction_dates_str = [date.strftime('%Y%m%d') for date in prediction_dates]
+            prediction_dates_str = list(format_days(prediction_dates))
             
             # 添加预测价格到图表
             ax.plot(prediction_dates_str, prediction_data, label='预测价格', color='red', linestyle='--')